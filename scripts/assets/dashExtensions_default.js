@@ -10,16 +10,34 @@ window.dashExtensions = Object.assign({}, window.dashExtensions, {
             }
             return L.marker(latlng);
         },
-        function1: function(feature, layer) {
-                if (feature.properties && feature.properties["name:en"]) {
-                    layer.bindTooltip(feature.properties["name:en"], {
-                        sticky: true
-                    });
-                }
+        function1: function(feature, latlng, context) {
+            const p = feature.properties;
+            if (!p.cluster) {
+                return L.circleMarker(latlng, {
+                    radius: 5,
+                    color: '#d7301f',
+                    fillOpacity: 0.8
+                })
+            }
+            const size = p.point_count < 100 ? 'small' : (p.point_count < 1000 ? 'medium' : 'large');
+            const icon = L.divIcon({
+                html: '<div><span>' + p.point_count_abbreviated + '</span></div>',
+                className: 'marker-cluster marker-cluster-' + size,
+                iconSize: L.point(40, 40)
+            });
+            return L.marker(latlng, {
+                icon: icon
+            });
+        },
+        function2: function(feature, layer, context) {
+            const key = context && context.hideout ? context.hideout.tooltip_property : null;
+            if (key && feature.properties && feature.properties[key]) {
+                layer.bindTooltip(feature.properties[key], {
+                    sticky: true
+                });
             }
-
-            ,
-        function2: function(feature, latlng, context) {
+        },
+        function3: function(feature, latlng, context) {
             const p = feature.properties;
             if (p.type === 'circlemarker') {
                 return L.circleMarker(latlng, radius = p._radius)
@@ -30,4 +48,4 @@ window.dashExtensions = Object.assign({}, window.dashExtensions, {
             return L.marker(latlng);
         }
     }
-});
+});
\ No newline at end of file
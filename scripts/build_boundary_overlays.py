@@ -0,0 +1,54 @@
+import argparse
+import json
+
+from loguru import logger
+
+from library.ui.boundary_overlays import (
+    DEFAULT_BOUNDARY_OVERLAYS,
+    DEFAULT_OVERLAY_ZOOM_LEVELS,
+    build_boundary_overlays,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-o",
+    "--boundary_overlay_dir",
+    default="boundary_overlays",
+    help="The directory the simplified overlays are written to and served from by the labelling app",
+)
+parser.add_argument(
+    "--boundary_overlay_config",
+    default=None,
+    help="A json file with a list of overlays (id, name, source, color, checked, tooltip_property) to build instead of the Ukraine and Russia boundaries",
+)
+parser.add_argument(
+    "--zoom_levels",
+    default=",".join(str(zoom) for zoom in DEFAULT_OVERLAY_ZOOM_LEVELS),
+    help="Comma separated list of zoom levels to simplify the overlays for",
+)
+parser.add_argument(
+    "--simplify_pixel_tolerance",
+    type=float,
+    default=1.0,
+    help="How many screen pixels a simplified edge may move at its zoom level",
+)
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    overlays = DEFAULT_BOUNDARY_OVERLAYS
+    if args.boundary_overlay_config is not None:
+        with open(args.boundary_overlay_config) as f:
+            overlays = json.load(f)
+
+    written_paths = build_boundary_overlays(
+        overlays,
+        [int(zoom) for zoom in args.zoom_levels.split(",")],
+        {
+            "boundary_overlay_dir": args.boundary_overlay_dir,
+            "simplify_pixel_tolerance": args.simplify_pixel_tolerance,
+        },
+    )
+    logger.info(
+        f"Built {len(written_paths)} overlay files in {args.boundary_overlay_dir}"
+    )
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import time
+import uuid
+
+import sqlalchemy as sa
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from library.types import RedditPostDict
+from library.io_interfaces.async_db_io import (
+    AsyncDatabaseInterface,
+    AsyncSQLiteInterface,
+    AsyncPostgresInterface,
+    create_async_sqlite_engine,
+    create_async_postgres_engine,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-db",
+    "--db_uri",
+    help="A postgres URI to benchmark against. If unset --sqlite_db_path is used",
+)
+parser.add_argument(
+    "--sqlite_db_path", help="The full filepath to a scratch SQLite database"
+)
+parser.add_argument(
+    "-n",
+    "--num_pages",
+    type=int,
+    default=200,
+    help="The number of simulated crawler pages (one dedup query + 25 inserts each)",
+)
+parser.add_argument(
+    "--pool_sizes",
+    default="1,2,4,8,16,32",
+    help="Comma separated list of pool sizes to sweep",
+)
+args = parser.parse_args()
+
+POSTS_PER_PAGE = 25
+
+
+def build_page(page_idx: int) -> list[RedditPostDict]:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "type": "reddit_post",
+            "created_date": 1723456789000 + page_idx,
+            "fields": {"title": f"benchmark post {page_idx}-{i}", "static_files": []},
+        }
+        for i in range(POSTS_PER_PAGE)
+    ]
+
+
+async def ingest_page(
+    db_io: AsyncDatabaseInterface, db_engine: AsyncEngine, posts: list[RedditPostDict]
+) -> int:
+    # Mirrors recursive_insert_raw_reddit_post: dedup the page, then insert the unique posts:
+    existing_ids = await db_io.get_unique_posts(
+        ids=[post["id"] for post in posts], db_engine=db_engine, config={}
+    )
+    results = await asyncio.gather(
+        *[
+            db_io.insert_reddit_posts_db(
+                reddit_post=post, db_engine=db_engine, config={}
+            )
+            for post in posts
+            if post["id"] not in existing_ids
+        ]
+    )
+    return len([result for result in results if result is not None])
+
+
+async def reset_tables(db_engine: AsyncEngine, is_postgres: bool):
+    async with db_engine.begin() as conn:
+        if is_postgres:
+            await conn.execute(sa.text("CREATE SCHEMA IF NOT EXISTS core;"))
+            await conn.execute(sa.text("DROP TABLE IF EXISTS core.source CASCADE;"))
+            await conn.execute(
+                sa.text(
+                    """
+                    CREATE TABLE core.source (
+                        id UUID PRIMARY KEY,
+                        type TEXT NOT NULL,
+                        created_date TIMESTAMPTZ NOT NULL,
+                        fields JSONB NOT NULL
+                    );
+                    """
+                )
+            )
+        else:
+            await conn.execute(sa.text("DROP TABLE IF EXISTS source;"))
+            await conn.execute(
+                sa.text(
+                    """
+                    CREATE TABLE source (
+                        id TEXT PRIMARY KEY,
+                        type TEXT NOT NULL,
+                        created_date TIMESTAMP NOT NULL,
+                        fields TEXT
+                    );
+                    """
+                )
+            )
+
+
+async def run_sweep():
+    is_postgres = args.db_uri is not None
+    db_io = AsyncPostgresInterface if is_postgres else AsyncSQLiteInterface
+
+    results = []
+    for pool_size in [int(size) for size in args.pool_sizes.split(",")]:
+        if is_postgres:
+            db_engine = create_async_postgres_engine(
+                args.db_uri, config={"pool_size": pool_size, "max_overflow": 0}
+            )
+        else:
+            db_engine = create_async_sqlite_engine(
+                args.sqlite_db_path,
+                config={"pool_size": pool_size, "load_spatialite": False},
+            )
+
+        await reset_tables(db_engine, is_postgres)
+        pages = [build_page(page_idx) for page_idx in range(args.num_pages)]
+
+        logger.disable("library")
+        start = time.perf_counter()
+        inserted = await asyncio.gather(
+            *[ingest_page(db_io, db_engine, page) for page in pages]
+        )
+        elapsed = time.perf_counter() - start
+        logger.enable("library")
+
+        await db_engine.dispose()
+
+        total_ops = args.num_pages * (POSTS_PER_PAGE + 1)
+        results.append((pool_size, elapsed, total_ops / elapsed))
+        logger.info(
+            f"pool_size={pool_size}: inserted {sum(inserted)} posts in {elapsed:.2f}s ({total_ops / elapsed:.0f} queries/s)"
+        )
+
+    baseline = results[0][2]
+    for pool_size, elapsed, ops_per_sec in results:
+        logger.info(
+            f"pool_size={pool_size:>3} | {elapsed:>7.2f}s | {ops_per_sec:>8.0f} queries/s | {ops_per_sec / baseline:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(run_sweep())
@@ -0,0 +1,171 @@
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import uuid
+from typing import Iterable
+
+import sqlalchemy as sa
+from loguru import logger
+
+from library.types import RedditPostDict
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.bulk_comment_extraction import run_bulk_comment_extraction
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-db",
+    "--sqlite_db_path",
+    help="An ingested SQLite database to benchmark against. If unset a synthetic corpus is generated",
+)
+parser.add_argument(
+    "-f",
+    "--file_directory",
+    help="The root directory of the static files for --sqlite_db_path",
+)
+parser.add_argument(
+    "-n",
+    "--synthetic_posts",
+    type=int,
+    default=400,
+    help="The number of posts in the generated corpus",
+)
+parser.add_argument(
+    "-c",
+    "--synthetic_comments",
+    type=int,
+    default=500,
+    help="The number of comments per generated post",
+)
+parser.add_argument(
+    "--worker_counts",
+    default=",".join(
+        str(count) for count in [1, 2, 4, 8, 16] if count <= (os.cpu_count() or 1)
+    ),
+    help="Comma separated list of process counts to sweep",
+)
+parser.add_argument("--chunk_size", type=int, default=20, help="Posts per unit of work")
+args = parser.parse_args()
+
+
+def build_synthetic_post_json(num_comments: int) -> bytes:
+    top_level_comments: list[dict] = []
+    all_comments: list[dict] = []
+    for i in range(num_comments):
+        author = f"user_{random.randint(0, 200)}"
+        comment = {
+            "kind": "t1",
+            "data": {
+                "id": uuid.uuid4().hex[:7],
+                "author": author,
+                "author_fullname": f"t2_{author}",
+                "body": "lorem ipsum " * random.randint(1, 30),
+                "created_utc": 1723456789 + i * 30,
+                "replies": "",
+            },
+        }
+        if len(all_comments) == 0 or random.random() < 0.33:
+            top_level_comments.append(comment)
+        else:
+            parent = random.choice(all_comments[-50:])
+            if parent["data"]["replies"] == "":
+                parent["data"]["replies"] = {
+                    "kind": "Listing",
+                    "data": {"children": []},
+                }
+            parent["data"]["replies"]["data"]["children"].append(comment)
+        all_comments.append(comment)
+
+    return json.dumps(
+        [
+            {"kind": "Listing", "data": {"children": []}},
+            {"kind": "Listing", "data": {"children": top_level_comments}},
+        ]
+    ).encode()
+
+
+def build_synthetic_corpus(scratch_dir: str) -> tuple[sa.engine.Engine, str]:
+    db_engine = sa.create_engine(f"sqlite:///{scratch_dir}/corpus.db")
+    file_directory = f"{scratch_dir}/static"
+
+    with db_engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                "CREATE TABLE source (id TEXT PRIMARY KEY, type TEXT NOT NULL, created_date TIMESTAMP NOT NULL, fields TEXT);"
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+                CREATE TABLE tasks (
+                    id TEXT PRIMARY KEY, post_id TEXT NOT NULL, task_type TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending', created_date TIMESTAMP NOT NULL,
+                    claimed_by TEXT, claimed_date TIMESTAMP, attempts INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+        )
+
+    logger.disable("library")
+    for _ in range(args.synthetic_posts):
+        post_id = str(uuid.uuid4())
+        post: RedditPostDict = {
+            "id": post_id,
+            "type": "reddit_post",
+            "created_date": 1723456789000,
+            "fields": {"json_file_path": f"{post_id}/post.json", "static_files": []},
+        }
+        LocalFSInterface.upload_file(
+            io.BytesIO(build_synthetic_post_json(args.synthetic_comments)),
+            file_directory,
+            post["fields"]["json_file_path"],
+            {},
+        )
+        SQLiteInterface.insert_reddit_posts_db(post, db_engine, {})
+    logger.enable("library")
+
+    return db_engine, file_directory
+
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+
+        if args.sqlite_db_path is not None:
+            db_engine = sa.create_engine(f"sqlite:////{args.sqlite_db_path}")
+            file_directory = args.file_directory
+        else:
+            logger.info(
+                f"Generating {args.synthetic_posts} posts of {args.synthetic_comments} comments in {scratch_dir}"
+            )
+            db_engine, file_directory = build_synthetic_corpus(scratch_dir)
+
+        # Results are discarded so the sweep measures read + parse + extract only:
+        def discard_sink(results: list[tuple[RedditPostDict, Iterable[dict]]]):
+            pass
+
+        results = []
+        for num_workers in [int(count) for count in args.worker_counts.split(",")]:
+            logger.disable("library")
+            stats = run_bulk_comment_extraction(
+                SQLiteInterface,
+                LocalFSInterface,
+                discard_sink,
+                config={
+                    "db_engine": db_engine,
+                    "root_dir_name": file_directory,
+                    "num_workers": num_workers,
+                    "chunk_size": args.chunk_size,
+                },
+            )
+            logger.enable("library")
+            results.append((num_workers, stats))
+
+        baseline_seconds = results[0][1]["seconds"]
+        for num_workers, stats in results:
+            logger.info(
+                f"workers={num_workers:>3}  {stats['seconds']:.2f}s  {stats['posts_per_second']:.1f} posts/s  {baseline_seconds / stats['seconds']:.2f}x"
+            )
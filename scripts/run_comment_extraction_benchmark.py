@@ -0,0 +1,135 @@
+import argparse
+import io
+import json
+import random
+import time
+import uuid
+
+from loguru import logger
+
+from library.types import RedditPostDict
+from library.comments_extraction_methods import get_comments_from_json
+from library.columnar_comment_extraction import (
+    get_comment_graph_tables_from_json,
+    comment_graph_tables_to_dicts,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-f",
+    "--post_json_paths",
+    nargs="*",
+    default=[],
+    help="Saved post.json files to benchmark. If none are given a synthetic megathread is generated",
+)
+parser.add_argument(
+    "-n",
+    "--synthetic_comments",
+    type=int,
+    default=20_000,
+    help="The number of comments in the generated megathread",
+)
+parser.add_argument(
+    "-r", "--repeats", type=int, default=3, help="Timed runs per extractor"
+)
+args = parser.parse_args()
+
+
+def build_synthetic_post_json(num_comments: int) -> bytes:
+    authors = [f"user_{i}" for i in range(max(1, num_comments // 10))]
+    start_utc = 1723456789
+
+    top_level_comments: list[dict] = []
+    all_comments: list[dict] = []
+    for i in range(num_comments):
+        comment = {
+            "kind": "t1",
+            "data": {
+                "id": f"c{i}",
+                "author": random.choice(authors),
+                "body": "lorem ipsum " * random.randint(1, 30),
+                "created_utc": start_utc + i * 30,
+                "replies": "",
+            },
+        }
+        comment["data"]["author_fullname"] = f"t2_{comment['data']['author']}"
+
+        # Roughly a third of comments are top level, the rest reply to an earlier comment:
+        if len(all_comments) == 0 or random.random() < 0.33:
+            top_level_comments.append(comment)
+        else:
+            parent = random.choice(all_comments[-200:])
+            if parent["data"]["replies"] == "":
+                parent["data"]["replies"] = {
+                    "kind": "Listing",
+                    "data": {"children": []},
+                }
+            parent["data"]["replies"]["data"]["children"].append(comment)
+        all_comments.append(comment)
+
+    return json.dumps(
+        [
+            {"kind": "Listing", "data": {"children": []}},
+            {"kind": "Listing", "data": {"children": top_level_comments}},
+        ]
+    ).encode()
+
+
+def time_extractor(extract_fn, json_payloads: list[bytes], post: RedditPostDict):
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        element_count = 0
+        for payload in json_payloads:
+            element_count += len(extract_fn(post, io.BytesIO(payload)))
+        timings.append(time.perf_counter() - start)
+    return min(timings), element_count
+
+
+if __name__ == "__main__":
+
+    if len(args.post_json_paths) > 0:
+        json_payloads = []
+        for post_json_path in args.post_json_paths:
+            with open(post_json_path, "rb") as f:
+                json_payloads.append(f.read())
+    else:
+        logger.info(f"Generating a megathread of {args.synthetic_comments} comments")
+        json_payloads = [build_synthetic_post_json(args.synthetic_comments)]
+
+    post: RedditPostDict = {
+        "id": str(uuid.uuid4()),
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+
+    logger.disable("library")
+
+    dicts_seconds, dicts_elements = time_extractor(
+        get_comments_from_json, json_payloads, post
+    )
+    columnar_seconds, columnar_rows = time_extractor(
+        lambda post, stream: get_comment_graph_tables_from_json(post, stream)["edges"],
+        json_payloads,
+        post,
+    )
+    adapter_seconds, adapter_elements = time_extractor(
+        lambda post, stream: comment_graph_tables_to_dicts(
+            get_comment_graph_tables_from_json(post, stream)
+        ),
+        json_payloads,
+        post,
+    )
+
+    logger.enable("library")
+
+    logger.info(
+        f"list-of-dicts:           {dicts_seconds:.3f}s ({dicts_elements} elements)"
+    )
+    logger.info(
+        f"columnar tables:         {columnar_seconds:.3f}s ({columnar_rows} edges) - {dicts_seconds / columnar_seconds:.1f}x"
+    )
+    logger.info(
+        f"columnar + dict adapter: {adapter_seconds:.3f}s ({adapter_elements} elements) - {dicts_seconds / adapter_seconds:.1f}x"
+    )
@@ -0,0 +1,82 @@
+import argparse
+import os
+from typing import Iterable
+
+import sqlalchemy as sa
+import sqlalchemy.engine.url as url
+from loguru import logger
+
+from library.types import RedditPostDict
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.comments_extraction_methods import build_post_graph_node
+from library.bulk_comment_extraction import run_bulk_comment_extraction
+from library.graph_bulk_export import Neo4jImportExporter
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-db", "--sqlite_db_path", help="The full filepath to the SQlite database"
+)
+parser.add_argument(
+    "-f",
+    "--file_directory",
+    help="The full path for the root path where the static files are stored",
+)
+parser.add_argument(
+    "-o",
+    "--output_directory",
+    help="The directory the neo4j-admin import files are written to",
+)
+parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+parser.add_argument("--rows_per_part", type=int, default=100_000)
+parser.add_argument("--num_workers", type=int, default=os.cpu_count() or 1)
+parser.add_argument(
+    "--stream_comments_json",
+    action="store_true",
+    help="Parse each post.json incrementally off the file instead of reading it into memory",
+)
+parser.add_argument(
+    "--claim_tasks",
+    action="store_true",
+    help="Only export posts with a pending COMMENT_EXTRACTION task and mark their tasks done",
+)
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    DB_URI = url.make_url(f"sqlite:////{args.sqlite_db_path}")
+    SQLITE_ENGINE: sa.engine.Engine = sa.create_engine(DB_URI)
+
+    with Neo4jImportExporter(
+        args.output_directory, file_format=args.format, rows_per_part=args.rows_per_part
+    ) as exporter:
+
+        def export_sink(results: list[tuple[RedditPostDict, Iterable[dict]]]):
+            # Each post's elements are written as they are read back from the worker's spool file.
+            # The post node is exported too so the import doesn't skip its COMMENTED_ON edges:
+            for post, elements in results:
+                exporter.write_elements([build_post_graph_node(post)])
+                exporter.write_elements(elements)
+            # Parts are written before the chunk is checkpointed so a crash can't lose checkpointed posts:
+            exporter.flush()
+
+        # The checkpoint lives next to the export so a rerun appends to the same parts:
+        run_bulk_comment_extraction(
+            SQLiteInterface,
+            LocalFSInterface,
+            export_sink,
+            config={
+                "db_engine": SQLITE_ENGINE,
+                "root_dir_name": args.file_directory,
+                "num_workers": args.num_workers,
+                "claim_tasks": args.claim_tasks,
+                "worker_config": {"stream_comments_json": args.stream_comments_json},
+                "checkpoint_path": os.path.join(
+                    args.output_directory, "_extracted_posts.txt"
+                ),
+            },
+        )
+
+    logger.info(
+        f"Import with: cd {args.output_directory} && {exporter.import_command()}"
+    )
@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import minio
+import dotenv
+
+import sqlalchemy as sa
+from loguru import logger
+
+from library.io_interfaces.filestore_io import S3FSInterface
+from library.io_interfaces.db_io import PostgresInterface, create_postgres_engine
+from library.ui.data_labeling import generate_data_labelling_dash_app
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--env_file",
+    "-e",
+    help="The path to the environment file used to load all of the secrets",
+)
+
+parser.add_argument(
+    "-b", "--bucket_name", help="The bucket in S3 storage where data is stored"
+)
+
+parser.add_argument(
+    "-db", "--db_uri", help="The URI that is used to connect to the postgres database"
+)
+
+parser.add_argument(
+    "--pool_size",
+    type=int,
+    default=10,
+    help="The number of persistent connections kept open to postgres",
+)
+parser.add_argument(
+    "--prefetch_depth",
+    type=int,
+    default=5,
+    help="The number of posts after the selected one whose screenshots and json are read ahead",
+)
+parser.add_argument(
+    "--boundary_overlay_dir",
+    default="boundary_overlays",
+    help="The directory scripts/build_boundary_overlays.py wrote the simplified overlays to",
+)
+parser.add_argument(
+    "--boundary_overlay_config",
+    default=None,
+    help="A json file with the list of overlays to show, the Ukraine and Russia boundaries by default",
+)
+parser.add_argument(
+    "--tile_cache_dir",
+    default=None,
+    help="A directory basemap tiles are cached in, tiles are proxied through the app when it is set",
+)
+parser.add_argument(
+    "--tile_cache_max_bytes",
+    type=int,
+    default=1024 * 1024 * 1024,
+    help="The size the tile cache is kept under by deleting the least recently used tiles",
+)
+parser.add_argument(
+    "--tile_cache_offline",
+    action="store_true",
+    help="Only serve tiles already in the tile cache, e.g. one filled by seed_tile_cache.py",
+)
+args = parser.parse_args()
+
+logger.info(f"Loading secrets from env file {args.env_file}")
+dotenv.load_dotenv(args.env_file)
+
+if __name__ == "__main__":
+
+    MINIO_CLIENT = minio.Minio(
+        os.environ.get("MINIO_URL"),
+        access_key=os.environ.get("MINIO_ACCESS_KEY"),
+        secret_key=os.environ.get("MINIO_SECRET_KEY"),
+        secure=False,
+    )
+
+    POSTGRES_ENGINE: sa.engine.Engine = create_postgres_engine(
+        args.db_uri, config={"pool_size": args.pool_size}
+    )
+
+    postgres_s3_config = {
+        "db_engine": POSTGRES_ENGINE,
+        "MINIO_CLIENT": MINIO_CLIENT,
+        "root_dir_name": args.bucket_name,
+        "prefetch_depth": args.prefetch_depth,
+        "boundary_overlay_dir": args.boundary_overlay_dir,
+        "tile_cache_dir": args.tile_cache_dir,
+        "tile_cache_max_bytes": args.tile_cache_max_bytes,
+        "tile_cache_offline": args.tile_cache_offline,
+    }
+    if args.boundary_overlay_config is not None:
+        with open(args.boundary_overlay_config) as f:
+            postgres_s3_config["boundary_overlays"] = json.load(f)
+
+    app = generate_data_labelling_dash_app(
+        db_io=PostgresInterface, file_io=S3FSInterface, config=postgres_s3_config
+    )
+    app.run(debug=True)
@@ -1,4 +1,5 @@
 import argparse
+import json
 
 import sqlalchemy as sa
 import sqlalchemy.engine.url as url
@@ -18,6 +19,38 @@ parser.add_argument(
 parser.add_argument(
     "-db", "--sqlite_db_path", help="The full filepath to the SQlite database"
 )
+parser.add_argument(
+    "--prefetch_depth",
+    type=int,
+    default=5,
+    help="The number of posts after the selected one whose screenshots and json are read ahead",
+)
+parser.add_argument(
+    "--boundary_overlay_dir",
+    default="boundary_overlays",
+    help="The directory scripts/build_boundary_overlays.py wrote the simplified overlays to",
+)
+parser.add_argument(
+    "--boundary_overlay_config",
+    default=None,
+    help="A json file with the list of overlays to show, the Ukraine and Russia boundaries by default",
+)
+parser.add_argument(
+    "--tile_cache_dir",
+    default=None,
+    help="A directory basemap tiles are cached in, tiles are proxied through the app when it is set",
+)
+parser.add_argument(
+    "--tile_cache_max_bytes",
+    type=int,
+    default=1024 * 1024 * 1024,
+    help="The size the tile cache is kept under by deleting the least recently used tiles",
+)
+parser.add_argument(
+    "--tile_cache_offline",
+    action="store_true",
+    help="Only serve tiles already in the tile cache, e.g. one filled by seed_tile_cache.py",
+)
 args = parser.parse_args()
 
 if __name__ == "__main__":
@@ -25,7 +58,18 @@ if __name__ == "__main__":
     DB_URI = url.make_url(f"sqlite:////{args.sqlite_db_path}")
     SQLITE_ENGINE: sa.engine.Engine = sa.create_engine(DB_URI)
 
-    sqlite_localfiles_config = {"db_engine": SQLITE_ENGINE}
+    sqlite_localfiles_config = {
+        "db_engine": SQLITE_ENGINE,
+        "root_dir_name": args.file_directory,
+        "prefetch_depth": args.prefetch_depth,
+        "boundary_overlay_dir": args.boundary_overlay_dir,
+        "tile_cache_dir": args.tile_cache_dir,
+        "tile_cache_max_bytes": args.tile_cache_max_bytes,
+        "tile_cache_offline": args.tile_cache_offline,
+    }
+    if args.boundary_overlay_config is not None:
+        with open(args.boundary_overlay_config) as f:
+            sqlite_localfiles_config["boundary_overlays"] = json.load(f)
 
     app = generate_data_labelling_dash_app(
         db_io=SQLiteInterface, file_io=LocalFSInterface, config=sqlite_localfiles_config
@@ -0,0 +1,82 @@
+import argparse
+import os
+import time
+import dotenv
+
+import sqlalchemy as sa
+import sqlalchemy.engine.url as url
+from loguru import logger
+from neo4j import GraphDatabase
+
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.io_interfaces.graph_io import Neo4jGraphInterface
+from library.incremental_comment_refresh import refresh_post_comments
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--env_file",
+    "-e",
+    help="The path to the environment file with NEO4J_URI, NEO4J_USERNAME and NEO4J_PASSWORD",
+)
+parser.add_argument(
+    "-db", "--sqlite_db_path", help="The full filepath to the SQlite database"
+)
+parser.add_argument(
+    "-f",
+    "--file_directory",
+    help="The full path for the root path where the static files and comment indexes are stored",
+)
+parser.add_argument(
+    "--max_age_days",
+    type=float,
+    default=3,
+    help="Only refresh posts created within this many days, older threads have stopped growing",
+)
+args = parser.parse_args()
+
+dotenv.load_dotenv(args.env_file)
+
+if __name__ == "__main__":
+
+    DB_URI = url.make_url(f"sqlite:////{args.sqlite_db_path}")
+    SQLITE_ENGINE: sa.engine.Engine = sa.create_engine(DB_URI)
+
+    config = {
+        "db_engine": SQLITE_ENGINE,
+        "root_dir_name": args.file_directory,
+        "graph_create_constraints": True,
+    }
+    min_created_date = (time.time() - args.max_age_days * 86400) * 1000
+
+    with GraphDatabase.driver(
+        os.environ.get("NEO4J_URI"),
+        auth=(os.environ.get("NEO4J_USERNAME"), os.environ.get("NEO4J_PASSWORD")),
+    ) as driver:
+
+        def write_elements(elements: list[dict]):
+            return Neo4jGraphInterface.write_graph_elements(elements, driver, config)
+
+        refreshed_posts, written_elements = 0, 0
+        after_id = None
+        while True:
+            posts = SQLiteInterface.get_reddit_posts_page(
+                after_id, 500, SQLITE_ENGINE, config
+            )
+            if posts is None or len(posts) == 0:
+                break
+            after_id = posts[-1]["id"]
+
+            for post in posts:
+                if post["created_date"] < min_created_date:
+                    continue
+                refresh_stats = refresh_post_comments(
+                    post, LocalFSInterface, write_elements, config
+                )
+                if refresh_stats is not None:
+                    refreshed_posts += 1
+                    written_elements += refresh_stats["elements"]
+
+        logger.info(
+            f"Refreshed {refreshed_posts} posts, writing {written_elements} changed elements"
+        )
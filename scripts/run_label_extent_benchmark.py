@@ -0,0 +1,203 @@
+import argparse
+import random
+import time
+import uuid
+import sys
+
+import pysqlite3
+
+sys.modules["sqlite3"] = pysqlite3
+
+import sqlalchemy as sa
+from geoalchemy2 import load_spatialite
+from sqlalchemy.event import listen
+
+import sqlalchemy.engine.url as url
+from loguru import logger
+
+from library.io_interfaces.db_io import SQLiteInterface
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-db",
+    "--sqlite_db_path",
+    help="The full filepath to the SQlite database that the synthetic labels are written to",
+)
+parser.add_argument(
+    "-n",
+    "--num_labels",
+    type=int,
+    default=1_000_000,
+    help="The number of synthetic label polygons to generate",
+)
+parser.add_argument(
+    "-q",
+    "--num_queries",
+    type=int,
+    default=50,
+    help="The number of random extent queries to time",
+)
+parser.add_argument(
+    "--bbox_size",
+    type=float,
+    default=0.5,
+    help="The width/height in degrees of each random query extent",
+)
+args = parser.parse_args()
+
+# Synthetic labels are scattered over roughly the extent of Ukraine:
+MIN_X, MIN_Y, MAX_X, MAX_Y = 22.0, 44.0, 40.0, 52.5
+INSERT_BATCH_SIZE = 50_000
+
+
+def random_extent(size: float) -> tuple[float, float, float, float]:
+    min_x = random.uniform(MIN_X, MAX_X - size)
+    min_y = random.uniform(MIN_Y, MAX_Y - size)
+    return (min_x, min_y, min_x + size, min_y + size)
+
+
+def time_queries(query_fn, extents: list[tuple]) -> tuple[float, int]:
+    total_rows = 0
+    start = time.perf_counter()
+    for extent in extents:
+        total_rows += query_fn(extent)
+    return time.perf_counter() - start, total_rows
+
+
+if __name__ == "__main__":
+
+    DB_URI = url.make_url(f"sqlite:////{args.sqlite_db_path}")
+    SQLITE_ENGINE: sa.engine.Engine = sa.create_engine(DB_URI)
+    listen(SQLITE_ENGINE, "connect", load_spatialite)
+
+    with SQLITE_ENGINE.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+                CREATE TABLE source (
+                    id TEXT PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    created_date TIMESTAMP NOT NULL,
+                    fields TEXT
+                );
+                """
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+                CREATE TABLE labels (
+                    label_id TEXT PRIMARY KEY,
+                    post_id TEXT NOT NULL,
+                    comment TEXT
+                );
+                """
+            )
+        )
+        conn.execute(
+            sa.text(
+                "SELECT AddGeometryColumn('labels', 'geometry', 4326, 'POLYGON', 'XY');"
+            )
+        )
+
+    logger.info(f"Generating {args.num_labels} synthetic label polygons")
+    load_start = time.perf_counter()
+    for batch_start in range(0, args.num_labels, INSERT_BATCH_SIZE):
+        batch_size = min(INSERT_BATCH_SIZE, args.num_labels - batch_start)
+        posts, labels = [], []
+        for _ in range(batch_size):
+            post_id = str(uuid.uuid4())
+            min_x, min_y, max_x, max_y = random_extent(random.uniform(0.001, 0.05))
+            posts.append(
+                {
+                    "id": post_id,
+                    "created_date": "2024-01-01 00:00:00+00:00",
+                    "fields": "{}",
+                }
+            )
+            labels.append(
+                {
+                    "label_id": str(uuid.uuid4()),
+                    "post_id": post_id,
+                    "min_x": min_x,
+                    "min_y": min_y,
+                    "max_x": max_x,
+                    "max_y": max_y,
+                }
+            )
+
+        with SQLITE_ENGINE.connect() as conn, conn.begin():
+            conn.execute(
+                sa.text(
+                    """
+                    INSERT INTO source (id, type, created_date, fields)
+                    VALUES (:id, 'reddit_post', :created_date, :fields)
+                    """
+                ),
+                posts,
+            )
+            conn.execute(
+                sa.text(
+                    """
+                    INSERT INTO labels (label_id, post_id, comment, geometry)
+                    VALUES (
+                        :label_id,
+                        :post_id,
+                        'synthetic label',
+                        BuildMbr(:min_x, :min_y, :max_x, :max_y, 4326)
+                    )
+                    """
+                ),
+                labels,
+            )
+        logger.info(f"Inserted {batch_start + batch_size} / {args.num_labels} labels")
+
+    logger.info(f"Loaded synthetic labels in {time.perf_counter() - load_start:.2f}s")
+
+    extents = [random_extent(args.bbox_size) for _ in range(args.num_queries)]
+
+    def full_scan_query(extent: tuple) -> int:
+        with SQLITE_ENGINE.connect() as conn:
+            result = conn.execute(
+                sa.text(
+                    """
+                    SELECT labels.label_id
+                    FROM labels as labels
+                    JOIN source as source
+                    ON labels.post_id == source.id
+                    WHERE ST_Intersects(
+                        labels.geometry,
+                        BuildMbr(:min_x, :min_y, :max_x, :max_y, 4326)
+                    )
+                    """
+                ),
+                dict(zip(["min_x", "min_y", "max_x", "max_y"], extent)),
+            )
+            return len(result.all())
+
+    def indexed_query(extent: tuple) -> int:
+        df = SQLiteInterface.get_posts_in_extent(
+            bbox=extent, time_range=None, db_engine=SQLITE_ENGINE, config={}
+        )
+        return len(df)
+
+    scan_seconds, scan_rows = time_queries(full_scan_query, extents)
+    logger.info(
+        f"Full scan: {args.num_queries} queries in {scan_seconds:.2f}s ({scan_seconds / args.num_queries * 1000:.1f} ms/query, {scan_rows} rows)"
+    )
+
+    index_start = time.perf_counter()
+    with SQLITE_ENGINE.connect() as conn, conn.begin():
+        conn.execute(sa.text("SELECT CreateSpatialIndex('labels', 'geometry');"))
+    logger.info(f"Built R-tree index in {time.perf_counter() - index_start:.2f}s")
+
+    logger.disable("library")
+    index_seconds, index_rows = time_queries(indexed_query, extents)
+    logger.enable("library")
+    logger.info(
+        f"R-tree index: {args.num_queries} queries in {index_seconds:.2f}s ({index_seconds / args.num_queries * 1000:.1f} ms/query, {index_rows} rows)"
+    )
+    assert (
+        scan_rows == index_rows
+    ), "Indexed and full scan queries returned different rows"
+    logger.info(f"Speedup: {scan_seconds / index_seconds:.1f}x")
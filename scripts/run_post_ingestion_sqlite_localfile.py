@@ -83,9 +83,64 @@ if __name__ == "__main__":
             """
         )
 
+        # R-tree index over the label extents used by get_posts_in_extent:
+        create_spatial_index_query = sa.text(
+            """
+            SELECT CreateSpatialIndex('labels', 'geometry');
+            """
+        )
+
+        labels_post_id_index_query = sa.text(
+            """
+            CREATE INDEX IF NOT EXISTS labels_post_id_idx ON labels (post_id);
+            """
+        )
+
+        # Outbox of downstream work written by insert_reddit_posts_db:
+        tasks_table_create_query = sa.text(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMP NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+
+        tasks_pending_index_query = sa.text(
+            """
+            CREATE INDEX IF NOT EXISTS tasks_pending_idx
+                ON tasks (task_type, status, created_date);
+            """
+        )
+
+        # DASH streams stored by ingest_all_video_data, one row per video post:
+        content_table_create_query = sa.text(
+            """
+            CREATE TABLE IF NOT EXISTS content (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                type TEXT NOT NULL,
+                created_date TIMESTAMP NOT NULL,
+                storage_path TEXT,
+                fields TEXT
+            );
+            """
+        )
+
         conn.execute(source_table_create_query)
         conn.execute(labels_table_create_query)
         conn.execute(create_geometry_col_query)
+        conn.execute(create_spatial_index_query)
+        conn.execute(labels_post_id_index_query)
+        conn.execute(tasks_table_create_query)
+        conn.execute(tasks_pending_index_query)
+        conn.execute(content_table_create_query)
 
     sqlite_localfiles_config = {
         "reddit_username": os.environ.get("REDDIT_USERNAME"),
@@ -0,0 +1,227 @@
+import argparse
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sqlalchemy as sa
+from loguru import logger
+
+from library.types import RedditPostDict
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.ingest_reddit_video import ingest_all_video_data
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-n",
+    "--synthetic_posts",
+    type=int,
+    default=40,
+    help="The number of video posts in the generated corpus",
+)
+parser.add_argument(
+    "--representation_mib",
+    type=float,
+    default=4,
+    help="The size of each video representation served by the media server",
+)
+parser.add_argument(
+    "--latency_ms",
+    type=float,
+    default=50,
+    help="Time to first byte added to every media server response",
+)
+parser.add_argument(
+    "--worker_counts",
+    default="1,2,4,8",
+    help="Comma separated list of video_worker_count values to sweep",
+)
+parser.add_argument("--representation_concurrency", type=int, default=4)
+args = parser.parse_args()
+
+REPRESENTATION_BLOCK = bytes(range(256)) * 256
+
+
+def build_mpd_document(num_bytes: int) -> bytes:
+    # Bandwidths are picked so the predicted size matches what the server sends for a 10s period:
+    bandwidth = num_bytes * 8 // 10
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static">
+  <Period id="0" duration="PT10S">
+    <AdaptationSet id="0" contentType="video">
+      <Representation id="1" bandwidth="{bandwidth // 2}" height="480" mimeType="video/mp4"><BaseURL>DASH_480.mp4</BaseURL></Representation>
+      <Representation id="2" bandwidth="{bandwidth}" height="720" mimeType="video/mp4"><BaseURL>DASH_720.mp4</BaseURL></Representation>
+    </AdaptationSet>
+    <AdaptationSet id="1" contentType="audio">
+      <Representation id="3" bandwidth="{bandwidth // 16}" mimeType="audio/mp4"><BaseURL>DASH_AUDIO_128.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>""".encode()
+
+
+class StandInMediaHandler(BaseHTTPRequestHandler):
+    """Serves a manifest and representations of the configured size for any post path, like v.redd.it."""
+
+    representation_bytes = int(args.representation_mib * 1024 * 1024)
+    mpd_document = build_mpd_document(representation_bytes)
+
+    def do_GET(self):
+        time.sleep(args.latency_ms / 1000)
+
+        if self.path.endswith(".mpd"):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/dash+xml")
+            self.send_header("Content-Length", str(len(self.mpd_document)))
+            self.end_headers()
+            self.wfile.write(self.mpd_document)
+            return
+
+        num_bytes = self.representation_bytes
+        if "480" in self.path:
+            num_bytes //= 2
+        elif "AUDIO" in self.path:
+            num_bytes //= 16
+
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(num_bytes))
+        self.end_headers()
+        for _ in range(num_bytes // len(REPRESENTATION_BLOCK)):
+            self.wfile.write(REPRESENTATION_BLOCK)
+        self.wfile.write(REPRESENTATION_BLOCK[: num_bytes % len(REPRESENTATION_BLOCK)])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_synthetic_corpus(
+    scratch_dir: str, media_server_url: str
+) -> tuple[sa.engine.Engine, str]:
+    os.makedirs(scratch_dir)
+    db_engine = sa.create_engine(f"sqlite:///{scratch_dir}/corpus.db")
+    file_directory = f"{scratch_dir}/static"
+
+    with db_engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                "CREATE TABLE source (id TEXT PRIMARY KEY, type TEXT NOT NULL, created_date TIMESTAMP NOT NULL, fields TEXT);"
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+                CREATE TABLE tasks (
+                    id TEXT PRIMARY KEY, post_id TEXT NOT NULL, task_type TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending', created_date TIMESTAMP NOT NULL,
+                    claimed_by TEXT, claimed_date TIMESTAMP, attempts INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+        )
+        conn.execute(
+            sa.text(
+                "CREATE TABLE content (id TEXT PRIMARY KEY, source TEXT NOT NULL, type TEXT NOT NULL, created_date TIMESTAMP NOT NULL, storage_path TEXT, fields TEXT);"
+            )
+        )
+
+    logger.disable("library")
+    for _ in range(args.synthetic_posts):
+        post_id = str(uuid.uuid4())
+        video_url = f"{media_server_url}/{post_id}"
+        post_json = [
+            {
+                "kind": "Listing",
+                "data": {
+                    "children": [
+                        {
+                            "kind": "t3",
+                            "data": {
+                                "url": video_url,
+                                "secure_media": {
+                                    "reddit_video": {
+                                        "dash_url": f"{video_url}/DASHPlaylist.mpd",
+                                        "duration": 10,
+                                    }
+                                },
+                            },
+                        }
+                    ]
+                },
+            },
+            {"kind": "Listing", "data": {"children": []}},
+        ]
+        post: RedditPostDict = {
+            "id": post_id,
+            "type": "reddit_post",
+            "created_date": 1723456789000,
+            "fields": {
+                "json_file_path": f"{post_id}/post.json",
+                "static_files": [{"id": "NULL", "type": "video"}],
+            },
+        }
+        LocalFSInterface.upload_file(
+            io.BytesIO(json.dumps(post_json).encode()),
+            file_directory,
+            post["fields"]["json_file_path"],
+            {},
+        )
+        SQLiteInterface.insert_reddit_posts_db(post, db_engine, {})
+    logger.enable("library")
+
+    return db_engine, file_directory
+
+
+if __name__ == "__main__":
+
+    media_server = ThreadingHTTPServer(("127.0.0.1", 0), StandInMediaHandler)
+    threading.Thread(target=media_server.serve_forever, daemon=True).start()
+    media_server_url = f"http://127.0.0.1:{media_server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+
+        results = []
+        for num_workers in [int(count) for count in args.worker_counts.split(",")]:
+            db_engine, file_directory = build_synthetic_corpus(
+                f"{scratch_dir}/workers_{num_workers}", media_server_url
+            )
+
+            logger.disable("library")
+            start = time.perf_counter()
+            ingested_posts = ingest_all_video_data(
+                LocalFSInterface,
+                SQLiteInterface,
+                {
+                    "db_engine": db_engine,
+                    "root_dir_name": file_directory,
+                    "partial_download_dir": f"{scratch_dir}/workers_{num_workers}/partial",
+                    "task_batch_size": args.synthetic_posts,
+                    "video_worker_count": num_workers,
+                    "representation_concurrency": args.representation_concurrency,
+                    # The stand-in server is local, only concurrency is being measured:
+                    "video_requests_per_second": 10_000,
+                    "video_request_burst": 100,
+                },
+            )
+            seconds = time.perf_counter() - start
+            logger.enable("library")
+
+            stored_bytes = sum(
+                os.path.getsize(os.path.join(root, filename))
+                for root, _, filenames in os.walk(file_directory)
+                for filename in filenames
+                if filename.endswith(".mp4")
+            )
+            results.append((num_workers, ingested_posts, seconds, stored_bytes))
+
+        media_server.shutdown()
+
+        baseline_seconds = results[0][2]
+        for num_workers, ingested_posts, seconds, stored_bytes in results:
+            logger.info(
+                f"workers={num_workers:>3}  {ingested_posts} posts in {seconds:.2f}s  {ingested_posts / seconds:.1f} posts/s  {stored_bytes / seconds / (1024 * 1024):.1f} MiB/s  {baseline_seconds / seconds:.2f}x"
+            )
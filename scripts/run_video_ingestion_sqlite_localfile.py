@@ -0,0 +1,87 @@
+import argparse
+
+import sqlalchemy as sa
+import sqlalchemy.engine.url as url
+from loguru import logger
+
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.ingest_reddit_video import ingest_all_video_data
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "-db", "--sqlite_db_path", help="The full filepath to the SQlite database"
+)
+parser.add_argument(
+    "-f",
+    "--file_directory",
+    help="The full path for the root path where the static files are stored",
+)
+parser.add_argument(
+    "--video_worker_count", type=int, default=2, help="Posts ingested concurrently"
+)
+parser.add_argument(
+    "--representation_concurrency",
+    type=int,
+    default=4,
+    help="Representations downloaded concurrently per post",
+)
+parser.add_argument(
+    "--video_requests_per_second",
+    type=float,
+    default=0.5,
+    help="Request rate limit shared by every worker per host",
+)
+parser.add_argument("--max_video_height", type=int, default=None)
+parser.add_argument("--max_post_bytes", type=int, default=None)
+parser.add_argument("--daily_bandwidth_budget_bytes", type=int, default=None)
+parser.add_argument(
+    "--bandwidth_budget_path",
+    default=None,
+    help="A json file the daily bandwidth usage is kept in between runs",
+)
+parser.add_argument(
+    "--http_cache_dir",
+    default=None,
+    help="A directory DASH manifests are cached in between runs and retries",
+)
+parser.add_argument(
+    "--task_batch_size",
+    type=int,
+    default=100,
+    help="The number of VIDEO_DOWNLOAD tasks claimed per batch",
+)
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    DB_URI = url.make_url(f"sqlite:////{args.sqlite_db_path}")
+    SQLITE_ENGINE: sa.engine.Engine = sa.create_engine(DB_URI)
+
+    config = {
+        "db_engine": SQLITE_ENGINE,
+        "root_dir_name": args.file_directory,
+        "video_worker_count": args.video_worker_count,
+        "representation_concurrency": args.representation_concurrency,
+        "video_requests_per_second": args.video_requests_per_second,
+        "task_batch_size": args.task_batch_size,
+    }
+    # Selection policy, budget and manifest cache are only applied when set:
+    for option in [
+        "max_video_height",
+        "max_post_bytes",
+        "daily_bandwidth_budget_bytes",
+        "bandwidth_budget_path",
+        "http_cache_dir",
+    ]:
+        if getattr(args, option) is not None:
+            config[option] = getattr(args, option)
+
+    # Keep claiming batches until the outbox is drained or nothing in a batch succeeds:
+    total_ingested = 0
+    while (
+        ingested := ingest_all_video_data(LocalFSInterface, SQLiteInterface, config)
+    ) > 0:
+        total_ingested += ingested
+
+    logger.info(f"Ingested {total_ingested} video posts")
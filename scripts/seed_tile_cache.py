@@ -0,0 +1,61 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from library.ui.tile_proxy import TileCache, get_tile_sources, iter_tiles_in_bbox
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    "--tile_cache_dir",
+    help="The tile cache directory the labelling app is started with",
+)
+parser.add_argument(
+    "--bbox",
+    default="22.1,44.3,40.3,52.4",
+    help="min_x,min_y,max_x,max_y extent in EPSG:4326 to seed, Ukraine by default",
+)
+parser.add_argument("--min_zoom", type=int, default=0)
+parser.add_argument("--max_zoom", type=int, default=10)
+parser.add_argument(
+    "--tile_sources",
+    default="osm",
+    help="Comma separated list of tile sources to seed (osm, google)",
+)
+parser.add_argument(
+    "--tile_cache_max_bytes",
+    type=int,
+    default=1024 * 1024 * 1024,
+    help="Must fit the seeded tiles, otherwise the first ones are evicted again",
+)
+parser.add_argument(
+    "--workers",
+    type=int,
+    default=2,
+    help="Concurrent tile requests, keep this low to respect the tile servers' usage policies",
+)
+args = parser.parse_args()
+
+if __name__ == "__main__":
+
+    config = {"tile_cache_dir": args.tile_cache_dir}
+    tile_cache = TileCache(
+        args.tile_cache_dir,
+        get_tile_sources(config),
+        max_bytes=args.tile_cache_max_bytes,
+        config=config,
+    )
+
+    bbox = tuple(float(coordinate) for coordinate in args.bbox.split(","))
+    tiles = [
+        (source, z, x, y)
+        for source in args.tile_sources.split(",")
+        for zoom in range(args.min_zoom, args.max_zoom + 1)
+        for z, x, y in iter_tiles_in_bbox(bbox, zoom)
+    ]
+    logger.info(f"Seeding {len(tiles)} tiles into {args.tile_cache_dir}")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(lambda tile: tile_cache.get_tile(*tile), tiles))
+
+    logger.info(f"Tile cache stats: {tile_cache.stats()}")
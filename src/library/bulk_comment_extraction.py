@@ -0,0 +1,429 @@
+import io
+import os
+import json
+import time
+import shutil
+import socket
+import tempfile
+import traceback
+from loguru import logger
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypedDict
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from library.types import RedditPostDict, PipelineTaskDict
+from library.io_interfaces.db_io import DatabaseInterface, COMMENT_EXTRACTION_TASK
+from library.io_interfaces.filestore_io import FileInterface
+from library.comments_extraction_methods import iter_comments_from_json
+
+# Called in the parent process with every (post, elements) pair from one finished chunk. Each
+# post's elements are read lazily off disk, so a sink should consume them one at a time:
+CommentSink = Callable[[list[tuple[RedditPostDict, Iterable[dict]]]], None]
+
+
+class BulkExtractionStatsDict(TypedDict):
+    posts_extracted: int
+    posts_failed: int
+    posts_skipped: int
+    elements: int
+    seconds: float
+    posts_per_second: float
+
+
+# Per-process config built once by the pool initializer. Clients such as minio.Minio hold locks and
+# can't be pickled into each task, so workers construct their own from `worker_config_factory`:
+_worker_config: dict = {}
+
+
+def _init_extraction_worker(
+    worker_config_factory: Callable[[], dict] | None, worker_config: dict
+):
+    global _worker_config
+    _worker_config = dict(worker_config)
+    if worker_config_factory is not None:
+        _worker_config.update(worker_config_factory())
+
+
+def _spool_post_elements(
+    post: RedditPostDict, elements: Iterable[dict], spool_dir: str
+) -> tuple[str, int]:
+    # Elements cross the process boundary through a file, one line each, so neither the worker
+    # nor the parent ever holds a whole post's element list:
+    spool_path = os.path.join(spool_dir, f"{post['id']}.jsonl")
+    element_count = 0
+    with open(spool_path, "w") as f:
+        for element in elements:
+            f.write(json.dumps(element))
+            f.write("\n")
+            element_count += 1
+    return spool_path, element_count
+
+
+def iter_spooled_elements(spool_path: str) -> Iterator[dict]:
+    with open(spool_path, "r") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _is_streaming_comments_json(config: dict) -> bool:
+    # Stub expansion needs the whole tree to merge into so it always reads the full file:
+    return config.get("stream_comments_json", False) and not config.get(
+        "expand_more_comments", False
+    )
+
+
+def _extract_post_comments(
+    post: RedditPostDict, file_io: FileInterface
+) -> tuple[str, int]:
+    spool_dir: str = _worker_config["spool_dir"]
+
+    if _is_streaming_comments_json(_worker_config):
+        # The json is parsed straight off the file or object store response, never read whole:
+        with file_io.open_file_stream(
+            dir_name=_worker_config["root_dir_name"],
+            filepath=post["fields"]["json_file_path"],
+            config=_worker_config,
+        ) as json_stream:
+            return _spool_post_elements(
+                post,
+                iter_comments_from_json(post, json_stream, config=_worker_config),
+                spool_dir,
+            )
+
+    json_stream: io.BytesIO | str | None = file_io.read_file(
+        dir_name=_worker_config["root_dir_name"],
+        filepath=post["fields"]["json_file_path"],
+        config=_worker_config,
+    )
+    if not isinstance(json_stream, io.BytesIO):
+        raise FileNotFoundError(f"Unable to read post json for post {post['id']}")
+
+    return _spool_post_elements(
+        post,
+        iter_comments_from_json(post, json_stream, config=_worker_config),
+        spool_dir,
+    )
+
+
+def _extract_comments_chunk(
+    posts: list[RedditPostDict], file_io: FileInterface
+) -> list[tuple[RedditPostDict, str | None, int]]:
+    results = []
+    for post in posts:
+        try:
+            spool_path, element_count = _extract_post_comments(post, file_io)
+            results.append((post, spool_path, element_count))
+
+        except Exception as e:
+            logger.error(
+                f"Unable to extract all comments from comments json for post {post['id']}: {traceback.format_exc()}"
+            )
+            partial_spool_path = os.path.join(
+                _worker_config["spool_dir"], f"{post['id']}.jsonl"
+            )
+            if os.path.exists(partial_spool_path):
+                os.remove(partial_spool_path)
+            results.append((post, None, 0))
+    return results
+
+
+def read_checkpoint(checkpoint_path: str) -> set[str]:
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, "r") as f:
+        return {line.strip() for line in f if line.strip() != ""}
+
+
+def _append_checkpoint(checkpoint_path: str, post_ids: list[str]):
+    with open(checkpoint_path, "a") as f:
+        f.writelines(f"{post_id}\n" for post_id in post_ids)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def iter_post_chunks(
+    database_io: DatabaseInterface,
+    completed_post_ids: set[str],
+    chunk_size: int,
+    config: dict,
+) -> Iterator[list[RedditPostDict]]:
+    """
+    Page through every stored post and yield chunks that still need extracting.
+
+    Posts in `completed_post_ids` or without a stored json file are skipped.
+    """
+    after_id = None
+    while True:
+        posts = database_io.get_reddit_posts_page(
+            after_id=after_id,
+            limit=chunk_size,
+            db_engine=config["db_engine"],
+            config=config,
+        )
+        if posts is None:
+            raise RuntimeError(f"Unable to read the page of posts after id {after_id}")
+        if len(posts) == 0:
+            return
+        after_id = posts[-1]["id"]
+
+        pending_posts = [
+            post
+            for post in posts
+            if post["id"] not in completed_post_ids
+            and post["fields"].get("json_file_path", None) is not None
+        ]
+        if len(pending_posts) > 0:
+            yield pending_posts
+
+
+def complete_comment_task(
+    comment_task: PipelineTaskDict | None,
+    status: str,
+    database_io: DatabaseInterface,
+    config: dict,
+):
+    # Posts paged out of the source table have no task to complete:
+    if comment_task is None:
+        return
+    database_io.complete_task(
+        id=str(comment_task["id"]),
+        status=status,
+        db_engine=config["db_engine"],
+        config=config,
+    )
+
+
+def iter_claimed_post_chunks(
+    database_io: DatabaseInterface,
+    comment_tasks_by_post_id: dict[str, PipelineTaskDict],
+    chunk_size: int,
+    config: dict,
+) -> Iterator[list[RedditPostDict]]:
+    """
+    Claim pending COMMENT_EXTRACTION tasks `chunk_size` at a time and yield their posts.
+
+    The claimed task of every yielded post is added to `comment_tasks_by_post_id`
+    so it can be completed once the post reaches the sink. Tasks whose post is
+    gone are failed and tasks of posts without a stored json file are done.
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    while True:
+        claimed_tasks = database_io.claim_tasks(
+            task_type=COMMENT_EXTRACTION_TASK,
+            limit=chunk_size,
+            worker_id=worker_id,
+            db_engine=config["db_engine"],
+            config=config,
+        )
+        if claimed_tasks is None:
+            raise RuntimeError("Unable to claim comment extraction tasks")
+        if len(claimed_tasks) == 0:
+            return
+
+        claimed_tasks_by_post_id = {
+            str(task["post_id"]): task for task in claimed_tasks
+        }
+        posts = database_io.get_reddit_posts(
+            list(claimed_tasks_by_post_id.keys()), config["db_engine"], config
+        )
+        if posts is None:
+            raise RuntimeError("Unable to read the posts of the claimed tasks")
+
+        found_post_ids = {post["id"] for post in posts}
+        for post_id, comment_task in claimed_tasks_by_post_id.items():
+            if post_id not in found_post_ids:
+                complete_comment_task(comment_task, "failed", database_io, config)
+
+        pending_posts = []
+        for post in posts:
+            if post["fields"].get("json_file_path", None) is None:
+                complete_comment_task(
+                    claimed_tasks_by_post_id[post["id"]], "done", database_io, config
+                )
+                continue
+            comment_tasks_by_post_id[post["id"]] = claimed_tasks_by_post_id[post["id"]]
+            pending_posts.append(post)
+
+        if len(pending_posts) > 0:
+            yield pending_posts
+
+
+def build_jsonl_comment_sink(output_path: str) -> CommentSink:
+    """Append each post's graph elements to a JSON lines file as `{"post_id": ..., "elements": [...]}`."""
+
+    def write_jsonl(results: list[tuple[RedditPostDict, Iterable[dict]]]):
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "a") as f:
+            for post, elements in results:
+                # Written element by element so a post's elements are never all in memory:
+                f.write(f'{{"post_id": {json.dumps(post["id"])}, "elements": [')
+                for i, element in enumerate(elements):
+                    if i > 0:
+                        f.write(", ")
+                    f.write(json.dumps(element))
+                f.write("]}\n")
+
+    return write_jsonl
+
+
+def run_bulk_comment_extraction(
+    database_io: DatabaseInterface,
+    file_io: FileInterface,
+    sink: CommentSink,
+    config: dict,
+) -> BulkExtractionStatsDict | None:
+    """
+    Extract the comment graph for every stored post across a pool of processes.
+
+    Posts are paged out of the database in chunks of `chunk_size`, or with
+    `claim_tasks` taken from the pending COMMENT_EXTRACTION tasks in the outbox
+    and their tasks completed once they reach the sink. Each chunk is
+    one unit of work for a `ProcessPoolExecutor` worker, and finished chunks are
+    handed to `sink` in the parent process. Workers stream each post's elements
+    into a spool file under `spool_dir` and the sink reads them back one at a
+    time, so no post's element list is held whole. Ids of posts that made it into the
+    sink are appended to `checkpoint_path`, so rerunning after an interruption
+    skips them. At most two chunks per worker are in flight at once, which keeps
+    memory flat regardless of corpus size.
+
+    Args:
+        database_io (DatabaseInterface): Used to page through the stored posts.
+        file_io (FileInterface): Used by the workers to read each post's json_file_path.
+        sink (CommentSink): Receives the (post, elements) pairs of each finished chunk.
+        config (dict): db_engine, root_dir_name, num_workers, chunk_size, claim_tasks, checkpoint_path, spool_dir
+            (a temporary directory by default), progress_interval_seconds and the picklable
+            worker_config/worker_config_factory.
+
+    Returns:
+        BulkExtractionStatsDict | None: Post, element and throughput counts, or None on error.
+    """
+    num_workers: int = config.get("num_workers", os.cpu_count() or 1)
+    chunk_size: int = config.get("chunk_size", 50)
+    checkpoint_path: str | None = config.get("checkpoint_path", None)
+    progress_interval_seconds: float = config.get("progress_interval_seconds", 10.0)
+
+    spool_dir: str = config.get("spool_dir", None) or tempfile.mkdtemp(
+        prefix="comment_spool_"
+    )
+    os.makedirs(spool_dir, exist_ok=True)
+
+    worker_config = {
+        "root_dir_name": config["root_dir_name"],
+        "spool_dir": spool_dir,
+        **config.get("worker_config", {}),
+    }
+
+    completed_post_ids = (
+        read_checkpoint(checkpoint_path) if checkpoint_path is not None else set()
+    )
+    if len(completed_post_ids) > 0:
+        logger.info(
+            f"Resuming comment extraction, {len(completed_post_ids)} posts already done"
+        )
+
+    claim_tasks: bool = config.get("claim_tasks", False)
+    comment_tasks_by_post_id: dict[str, PipelineTaskDict] = {}
+
+    posts_extracted, posts_failed, elements_count = 0, 0, 0
+
+    try:
+        start = time.perf_counter()
+        last_progress_log = start
+
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_extraction_worker,
+            initargs=(config.get("worker_config_factory", None), worker_config),
+        ) as executor:
+
+            in_flight: set[Future] = set()
+
+            def drain(return_when: str):
+                nonlocal posts_extracted, posts_failed, elements_count
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    in_flight.remove(future)
+                    results = future.result()
+
+                    extracted = [
+                        (post, spool_path, element_count)
+                        for post, spool_path, element_count in results
+                        if spool_path is not None
+                    ]
+                    sink(
+                        [
+                            (post, iter_spooled_elements(spool_path))
+                            for post, spool_path, _ in extracted
+                        ]
+                    )
+                    if checkpoint_path is not None:
+                        _append_checkpoint(
+                            checkpoint_path, [post["id"] for post, _, _ in extracted]
+                        )
+                    for _, spool_path, _ in extracted:
+                        os.remove(spool_path)
+                    for post, spool_path, _ in results:
+                        complete_comment_task(
+                            comment_tasks_by_post_id.pop(post["id"], None),
+                            "done" if spool_path is not None else "failed",
+                            database_io,
+                            config,
+                        )
+
+                    posts_extracted += len(extracted)
+                    posts_failed += len(results) - len(extracted)
+                    elements_count += sum(
+                        element_count for _, _, element_count in extracted
+                    )
+
+            post_chunks = (
+                iter_claimed_post_chunks(
+                    database_io, comment_tasks_by_post_id, chunk_size, config
+                )
+                if claim_tasks
+                else iter_post_chunks(
+                    database_io, completed_post_ids, chunk_size, config
+                )
+            )
+            for posts in post_chunks:
+                in_flight.add(executor.submit(_extract_comments_chunk, posts, file_io))
+                if len(in_flight) >= num_workers * 2:
+                    drain(FIRST_COMPLETED)
+
+                now = time.perf_counter()
+                if now - last_progress_log >= progress_interval_seconds:
+                    last_progress_log = now
+                    logger.info(
+                        f"Extracted comments from {posts_extracted} posts ({posts_failed} failed) at {posts_extracted / (now - start):.1f} posts/s"
+                    )
+
+            drain(ALL_COMPLETED)
+
+        seconds = time.perf_counter() - start
+        stats: BulkExtractionStatsDict = {
+            "posts_extracted": posts_extracted,
+            "posts_failed": posts_failed,
+            "posts_skipped": len(completed_post_ids),
+            "elements": elements_count,
+            "seconds": seconds,
+            "posts_per_second": posts_extracted / seconds if seconds > 0 else 0.0,
+        }
+        logger.info(
+            f"Extracted {elements_count} elements from {posts_extracted} posts ({posts_failed} failed, {len(completed_post_ids)} skipped) in {seconds:.2f}s with {num_workers} workers"
+        )
+        return stats
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(error_msg)
+        return None
+
+    finally:
+        if config.get("spool_dir", None) is None:
+            shutil.rmtree(spool_dir, ignore_errors=True)
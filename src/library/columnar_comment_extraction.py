@@ -0,0 +1,217 @@
+import json
+import uuid
+import pyarrow as pa
+from loguru import logger
+from typing import IO, Iterable, TypedDict
+from datetime import datetime, timezone
+
+from library.comments_extraction_methods import (
+    extract_author_from_json,
+    iter_comment_tree,
+    iter_comment_listing_from_json_stream,
+)
+from library.types import RedditPostDict
+from library.comment_expansion_methods import expand_more_comment_stubs
+
+
+class CommentGraphTables(TypedDict):
+    comments: pa.Table
+    users: pa.Table
+    days: pa.Table
+    edges: pa.Table
+
+
+COMMENT_NODE_LABELS = ["Reddit", "Entity", "Comment"]
+USER_NODE_LABELS = ["Reddit", "User", "Entity", "Account"]
+DAY_NODE_LABELS = ["Date"]
+
+# The edges the list-of-dicts extractor emits with an explicit "query_type":
+MERGE_QUERY_EDGE_TYPES = {"REPLIED_TO", "HAS_REPLY"}
+
+
+def extract_comment_graph_tables(
+    post: RedditPostDict, comment_json_objs: Iterable[dict]
+) -> CommentGraphTables:
+    """
+    Walk a post's comment tree once and build deduplicated, columnar node and edge tables.
+
+    Produces the same graph as `recursively_build_comment_creation_lst` but each
+    comment timestamp is formatted once, author and day ids are computed once
+    per distinct author/day, and every node appears exactly once.
+
+    Args:
+        post (RedditPostDict): The post the comments belong to.
+        comment_json_objs (Iterable[dict]): The `[1]["data"]["children"]` listing from the post json, or a lazy parser yielding it.
+
+    Returns:
+        CommentGraphTables: Arrow tables of comment, user and day nodes plus a single edge table.
+    """
+    comment_ids, comment_bodies, comment_datetimes = [], [], []
+    user_ids, user_names, user_full_names = [], [], []
+    day_ids, day_strs = [], []
+    edge_types, edge_from_ids, edge_to_ids, edge_datetimes = [], [], [], []
+
+    seen_comment_ids: set[str] = set()
+    seen_user_ids: set[str] = set()
+    user_ids_by_author: dict[tuple, str] = {}
+    day_ids_by_day: dict[str, str] = {}
+
+    post_id: str = post["id"]
+
+    for comment_data, parent_id in iter_comment_tree(comment_json_objs):
+        comment_id: str = comment_data["id"]
+
+        created_datetime = datetime.fromtimestamp(
+            int(comment_data["created_utc"]), tz=timezone.utc
+        )
+        datetime_str = created_datetime.strftime("%Y-%m-%dT%H:%M:%SZ")
+        day_str = datetime_str[:10]
+
+        author_key = (comment_data.get("author"), comment_data.get("author_fullname"))
+        user_id = user_ids_by_author.get(author_key, None)
+        if user_id is None:
+            associated_author = extract_author_from_json(comment_data)
+            user_id = associated_author["id"]
+            user_ids_by_author[author_key] = user_id
+            if user_id not in seen_user_ids:
+                seen_user_ids.add(user_id)
+                user_ids.append(user_id)
+                user_names.append(associated_author["author_name"])
+                user_full_names.append(associated_author["author_full_name"])
+
+        day_id = day_ids_by_day.get(day_str, None)
+        if day_id is None:
+            day_id = str(uuid.uuid3(uuid.NAMESPACE_URL, day_str))
+            day_ids_by_day[day_str] = day_id
+            day_ids.append(day_id)
+            day_strs.append(day_str)
+
+        if comment_id not in seen_comment_ids:
+            seen_comment_ids.add(comment_id)
+            comment_ids.append(comment_id)
+            comment_bodies.append(comment_data["body"])
+            comment_datetimes.append(datetime_str)
+
+        edge_types.extend(["POSTED", "POSTED_ON", "COMMENTED_ON"])
+        edge_from_ids.extend([user_id, comment_id, comment_id])
+        edge_to_ids.extend([comment_id, day_id, post_id])
+        edge_datetimes.extend([datetime_str, None, datetime_str])
+
+        if parent_id is not None:
+            edge_types.extend(["REPLIED_TO", "HAS_REPLY"])
+            edge_from_ids.extend([comment_id, parent_id])
+            edge_to_ids.extend([parent_id, comment_id])
+            edge_datetimes.extend([datetime_str, datetime_str])
+
+    return {
+        "comments": pa.table(
+            {
+                "id": pa.array(comment_ids, type=pa.string()),
+                "body": pa.array(comment_bodies, type=pa.string()),
+                "datetime": pa.array(comment_datetimes, type=pa.string()),
+            }
+        ),
+        "users": pa.table(
+            {
+                "id": pa.array(user_ids, type=pa.string()),
+                "author_name": pa.array(user_names, type=pa.string()),
+                "author_full_name": pa.array(user_full_names, type=pa.string()),
+            }
+        ),
+        "days": pa.table(
+            {
+                "id": pa.array(day_ids, type=pa.string()),
+                "day": pa.array(day_strs, type=pa.string()),
+            }
+        ),
+        "edges": pa.table(
+            {
+                "type": pa.array(edge_types, type=pa.string()).dictionary_encode(),
+                "from_id": pa.array(edge_from_ids, type=pa.string()),
+                "to_id": pa.array(edge_to_ids, type=pa.string()),
+                "datetime": pa.array(edge_datetimes, type=pa.string()),
+            }
+        ),
+    }
+
+
+def comment_graph_tables_to_dicts(tables: CommentGraphTables) -> list[dict]:
+    """
+    Convert columnar comment graph tables to the node/edge dict format produced by
+    `recursively_build_comment_creation_lst`.
+
+    Nodes are emitted once each, followed by all edges.
+    """
+    output_lst: list[dict] = []
+
+    for comment in tables["comments"].to_pylist():
+        output_lst.append(
+            {
+                "type": "node",
+                "query_type": "MERGE",
+                "labels": list(COMMENT_NODE_LABELS),
+                "properties": comment,
+            }
+        )
+    for user in tables["users"].to_pylist():
+        output_lst.append(
+            {
+                "type": "node",
+                "query_type": "MERGE",
+                "labels": list(USER_NODE_LABELS),
+                "properties": user,
+            }
+        )
+    for day in tables["days"].to_pylist():
+        output_lst.append(
+            {
+                "type": "node",
+                "query_type": "MERGE",
+                "labels": list(DAY_NODE_LABELS),
+                "properties": day,
+            }
+        )
+
+    for edge in tables["edges"].to_pylist():
+        edge_dict = {
+            "type": "edge",
+            "labels": [edge["type"]],
+            "connection": {"from": edge["from_id"], "to": edge["to_id"]},
+            "properties": (
+                {} if edge["datetime"] is None else {"datetime": edge["datetime"]}
+            ),
+        }
+        if edge["type"] in MERGE_QUERY_EDGE_TYPES:
+            edge_dict["query_type"] = "MERGE"
+        output_lst.append(edge_dict)
+
+    return output_lst
+
+
+def get_comment_graph_tables_from_json(
+    post: RedditPostDict, json_bytes_stream: IO[bytes], config: dict = {}
+) -> CommentGraphTables | None:
+    try:
+        # Object store response bodies can only be read forward:
+        if json_bytes_stream.seekable():
+            json_bytes_stream.seek(0)
+
+        if config.get("stream_comments_json", False) and not config.get(
+            "expand_more_comments", False
+        ):
+            return extract_comment_graph_tables(
+                post, iter_comment_listing_from_json_stream(json_bytes_stream)
+            )
+
+        row_reddit_json = json.loads(json_bytes_stream.read())
+        if config.get("expand_more_comments", False):
+            expand_more_comment_stubs(row_reddit_json, config)
+        comment_content = row_reddit_json[1]["data"]["children"]
+
+        return extract_comment_graph_tables(post, comment_content)
+
+    except Exception as e:
+        logger.error(
+            f"Unable to extract comment graph tables from comments json: {str(e)}"
+        )
+        return None
@@ -0,0 +1,247 @@
+import traceback
+import requests
+from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+
+from library.http_methods import get_shared_rate_limiter
+
+# The morechildren endpoint rejects requests for more than 100 ids:
+MORE_CHILDREN_BATCH_SIZE = 100
+
+
+def collect_more_stubs(comment_json_objs: list[dict]) -> list[dict]:
+    """
+    Remove every expandable `more` stub from a comment listing and return their data dicts.
+
+    The listing is modified in place so the fetched comments can be merged back
+    without leaving the stubs behind. "Continue this thread" stubs have no
+    child ids, can't be expanded through morechildren and are left where they are.
+    """
+    more_stubs: list[dict] = []
+
+    stack: list[list[dict]] = [comment_json_objs]
+    while stack:
+        children = stack.pop()
+
+        kept_children = []
+        for comment_json_obj in children:
+            if comment_json_obj["kind"] == "more" and (
+                len(comment_json_obj["data"].get("children", [])) > 0
+            ):
+                more_stubs.append(comment_json_obj["data"])
+                continue
+            kept_children.append(comment_json_obj)
+
+            replies = (
+                comment_json_obj["data"].get("replies", None)
+                if comment_json_obj["kind"] == "t1"
+                else None
+            )
+            if isinstance(replies, dict):
+                stack.append(replies["data"]["children"])
+
+        children[:] = kept_children
+
+    return more_stubs
+
+
+def fetch_more_children(
+    link_id: str, children_ids: list[str], config: dict
+) -> list[dict] | None:
+    """
+    Fetch one batch of comments hidden behind `more` stubs.
+
+    Args:
+        link_id (str): The fullname of the post the comments belong to, e.g. `t3_abc123`.
+        children_ids (list[str]): At most 100 comment ids taken from `more` stubs.
+        config (dict): Base url, rate limit and request options.
+
+    Returns:
+        list[dict] | None: The flat list of `t1`/`more` things, each with a `parent_id`, or None on error.
+    """
+    base_url: str = config.get("reddit_base_url", "https://www.reddit.com")
+    more_children_url = f"{base_url}/api/morechildren.json"
+
+    rate_limiter = get_shared_rate_limiter(
+        more_children_url,
+        requests_per_second=config.get("reddit_requests_per_second", 1.0),
+        burst=config.get("reddit_request_burst", 1),
+    )
+
+    try:
+        rate_limiter.acquire()
+        response = requests.get(
+            more_children_url,
+            params={
+                "api_type": "json",
+                "link_id": link_id,
+                "children": ",".join(children_ids),
+                "limit_children": "false",
+                "raw_json": 1,
+            },
+            headers={
+                "User-Agent": config.get("user_agent", "reddit-ingestion-pipeline")
+            },
+            timeout=config.get("request_timeout", 30),
+        )
+        response.raise_for_status()
+
+        return response.json()["json"]["data"]["things"]
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(
+            f"Unable to fetch {len(children_ids)} more children for {link_id}: {error_msg}"
+        )
+        return None
+
+
+def merge_more_children(comment_json_objs: list[dict], things: list[dict]) -> int:
+    """
+    Attach fetched `t1`/`more` things to their parents in the comment listing.
+
+    Things whose parent is the post itself are appended to the top level
+    listing. A thing can reply to another thing from the same response, so
+    anything whose parent hasn't been seen yet is retried once the rest have
+    been placed.
+
+    Returns:
+        int: The number of things that were merged into the tree.
+    """
+    comments_by_fullname: dict[str, dict] = {}
+
+    stack = list(comment_json_objs)
+    while stack:
+        comment_json_obj = stack.pop()
+        if comment_json_obj["kind"] != "t1":
+            continue
+        comment_data = comment_json_obj["data"]
+        comments_by_fullname[f"t1_{comment_data['id']}"] = comment_data
+
+        replies = comment_data.get("replies", None)
+        if isinstance(replies, dict):
+            stack.extend(replies["data"]["children"])
+
+    merged_count = 0
+    pending_things = things
+    while len(pending_things) > 0:
+        unplaced_things = []
+        for thing in pending_things:
+            parent_fullname: str = thing["data"].get("parent_id", "")
+
+            if parent_fullname.startswith("t3_"):
+                comment_json_objs.append(thing)
+            elif parent_fullname in comments_by_fullname:
+                parent_data = comments_by_fullname[parent_fullname]
+                if not isinstance(parent_data.get("replies", None), dict):
+                    parent_data["replies"] = {
+                        "kind": "Listing",
+                        "data": {"children": []},
+                    }
+                parent_data["replies"]["data"]["children"].append(thing)
+            else:
+                unplaced_things.append(thing)
+                continue
+
+            if thing["kind"] == "t1":
+                comments_by_fullname[f"t1_{thing['data']['id']}"] = thing["data"]
+            merged_count += 1
+
+        if len(unplaced_things) == len(pending_things):
+            logger.warning(
+                f"Dropping {len(unplaced_things)} more children whose parent comment is not in the thread"
+            )
+            break
+        pending_things = unplaced_things
+
+    return merged_count
+
+
+def expand_more_comment_stubs(post_json: list[dict], config: dict) -> int | None:
+    """
+    Replace the `more` stubs in a post json with the comments they hide.
+
+    All stub ids for the post are fetched in batches of 100 through the
+    morechildren endpoint. The batches run concurrently under the shared
+    rate limit for the host. Fetched comments are merged back into the tree
+    so the graph extraction sees one complete listing. Responses can contain
+    further stubs, so this repeats for up to `max_more_children_rounds` rounds.
+
+    Args:
+        post_json (list[dict]): The parsed post.json, `[post listing, comment listing]`. Modified in place.
+        config (dict): Base url, concurrency, rate limit and round options.
+
+    Returns:
+        int | None: The number of things merged into the comment tree, or None on error.
+    """
+    concurrency: int = config.get("more_children_concurrency", 4)
+    max_rounds: int = config.get("max_more_children_rounds", 10)
+
+    try:
+        link_id: str = post_json[0]["data"]["children"][0]["data"]["name"]
+        comment_json_objs: list[dict] = post_json[1]["data"]["children"]
+
+        merged_count = 0
+        for expansion_round in range(max_rounds):
+            more_stubs = collect_more_stubs(comment_json_objs)
+            children_ids = list(
+                dict.fromkeys(
+                    child_id
+                    for more_stub in more_stubs
+                    for child_id in more_stub["children"]
+                )
+            )
+            if len(children_ids) == 0:
+                break
+
+            batches = [
+                children_ids[i : i + MORE_CHILDREN_BATCH_SIZE]
+                for i in range(0, len(children_ids), MORE_CHILDREN_BATCH_SIZE)
+            ]
+            logger.info(
+                f"Expanding {len(children_ids)} more children for {link_id} in {len(batches)} batches"
+            )
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                fetched_batches = list(
+                    executor.map(
+                        lambda batch: fetch_more_children(link_id, batch, config),
+                        batches,
+                    )
+                )
+
+            things = [
+                thing
+                for fetched_batch in fetched_batches
+                if fetched_batch is not None
+                for thing in fetched_batch
+            ]
+            merged_count += merge_more_children(comment_json_objs, things)
+
+            failed_ids = {
+                child_id
+                for batch, fetched_batch in zip(batches, fetched_batches)
+                if fetched_batch is None
+                for child_id in batch
+            }
+            if len(failed_ids) > 0:
+                # Put the unexpanded stubs back so the extraction still reports them:
+                merge_more_children(
+                    comment_json_objs,
+                    [
+                        {"kind": "more", "data": more_stub}
+                        for more_stub in more_stubs
+                        if not failed_ids.isdisjoint(more_stub["children"])
+                    ],
+                )
+                logger.warning(
+                    f"{len(failed_ids)} more children for {link_id} could not be fetched, not expanding further"
+                )
+                break
+
+        return merged_count
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(error_msg)
+        return None
@@ -1,6 +1,8 @@
 from loguru import logger
-import pandas as pd
-from datetime import datetime
+from typing import IO, Iterable, Iterator
+from datetime import datetime, timezone
+import traceback
+import ijson
 import json
 import io
 import uuid
@@ -10,6 +12,7 @@ from library.reddit_post_extraction_methods import (
     RedditCommentDict,
 )
 from library.types import RedditPostDict
+from library.comment_expansion_methods import expand_more_comment_stubs
 
 
 def extract_author_from_json(comment_data: dict) -> dict:
@@ -43,157 +46,252 @@ def extract_author_from_json(comment_data: dict) -> dict:
     return associated_user
 
 
-def recursively_build_comment_creation_lst(
-    output_lst: list[dict], post, comment_json_obj, parent_object: dict = None
-):
+def iter_comment_tree(
+    comment_json_objs: Iterable[dict], parent_id: str | None = None
+) -> Iterator[tuple[dict, str | None]]:
+    """
+    Walk a comment listing depth first without recursion.
 
-    comment_listing_type = comment_json_obj["kind"]
+    Yields each `t1` comment's data dict with the id of the comment it replies
+    to (None for top level comments) in the same pre-order the recursive walk
+    used. An explicit stack replaces the call stack so arbitrarily deep reply
+    chains can't hit the interpreter recursion limit. Top level comments are
+    pulled from `comment_json_objs` one at a time so it can be a lazy parser.
+    """
+    more_stub_count = 0
 
-    if comment_listing_type == "t1":
-        comment_data = comment_json_obj["data"]
-        associated_author = extract_author_from_json(comment_data)
+    for top_level_json_obj in comment_json_objs:
+        stack: list[tuple[dict, str | None]] = [(top_level_json_obj, parent_id)]
+        while stack:
+            comment_json_obj, comment_parent_id = stack.pop()
 
-        comment_full_id: str = comment_data["id"]
-        comment_node_datetime_obj = pd.to_datetime(
-            int(comment_data["created_utc"]), utc=True, unit="s"
-        )
-        comment_node = {
-            "type": "node",
-            "query_type": "MERGE",
-            "labels": ["Reddit", "Entity", "Comment"],
-            "properties": {
-                "id": comment_full_id,
-                "body": comment_data["body"],
-                "datetime": comment_node_datetime_obj.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            },
-        }
+            comment_listing_type = comment_json_obj["kind"]
+            if comment_listing_type == "more":
+                more_stub_count += 1
+                continue
+            if comment_listing_type != "t1":
+                continue
+
+            comment_data = comment_json_obj["data"]
+            yield comment_data, comment_parent_id
 
-        post_day_str: str = comment_node_datetime_obj.strftime("%Y-%m-%d").replace(
-            '"', ""
+            # Pushed in reverse so siblings are popped in document order:
+            replies = comment_data.get("replies", None)
+            if isinstance(replies, dict) and replies["kind"] != "more":
+                for reply in reversed(replies["data"]["children"]):
+                    stack.append((reply, comment_data["id"]))
+
+    if more_stub_count > 0:
+        logger.warning(
+            f"Comment extraction hit {more_stub_count} 'more' components that were not expanded."
         )
-        day_date_id = str(uuid.uuid3(uuid.NAMESPACE_URL, post_day_str))
-        day_node = {
-            "type": "node",
-            "query_type": "MERGE",
-            "labels": ["Date"],
-            "properties": {"id": day_date_id, "day": post_day_str},
-        }
 
-        author_node = {
-            "type": "node",
-            "query_type": "MERGE",
-            "labels": ["Reddit", "User", "Entity", "Account"],
-            "properties": {
-                "id": associated_author["id"],
-                "author_name": associated_author["author_name"],
-                "author_full_name": associated_author["author_full_name"],
-            },
-        }
 
-        author_post_comment_edge = {
-            "type": "edge",
-            "labels": ["POSTED"],
-            "connection": {"from": associated_author["id"], "to": comment_full_id},
-            "properties": {
-                "datetime": pd.to_datetime(
-                    int(comment_data["created_utc"]), utc=True, unit="s"
-                ).strftime("%Y-%m-%dT%H:%M:%SZ")
-            },
-        }
+def build_post_graph_node(post: RedditPostDict) -> dict:
+    """The Post node the post's COMMENTED_ON edges point at, for exports that don't MERGE post stubs."""
+    post_datetime_str = datetime.fromtimestamp(
+        int(post["created_date"]) / 1000, tz=timezone.utc
+    ).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        "type": "node",
+        "query_type": "MERGE",
+        "labels": ["Reddit", "Entity", "Post"],
+        "properties": {
+            "id": post["id"],
+            "subreddit": post["fields"].get("subreddit", None),
+            "title": post["fields"].get("title", None),
+            "url": post["fields"].get("url", None),
+            "datetime": post_datetime_str,
+        },
+    }
+
+
+def build_comment_graph_elements(
+    post: RedditPostDict, comment_data: dict, parent_id: str | None = None
+) -> list[dict]:
+    associated_author = extract_author_from_json(comment_data)
+
+    comment_full_id: str = comment_data["id"]
+    comment_node_datetime_obj = datetime.fromtimestamp(
+        int(comment_data["created_utc"]), tz=timezone.utc
+    )
+    comment_datetime_str = comment_node_datetime_obj.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    comment_node = {
+        "type": "node",
+        "query_type": "MERGE",
+        "labels": ["Reddit", "Entity", "Comment"],
+        "properties": {
+            "id": comment_full_id,
+            "body": comment_data["body"],
+            "datetime": comment_datetime_str,
+        },
+    }
+
+    post_day_str: str = comment_datetime_str[:10]
+    day_date_id = str(uuid.uuid3(uuid.NAMESPACE_URL, post_day_str))
+    day_node = {
+        "type": "node",
+        "query_type": "MERGE",
+        "labels": ["Date"],
+        "properties": {"id": day_date_id, "day": post_day_str},
+    }
 
-        comment_to_day_edge = {
+    author_node = {
+        "type": "node",
+        "query_type": "MERGE",
+        "labels": ["Reddit", "User", "Entity", "Account"],
+        "properties": {
+            "id": associated_author["id"],
+            "author_name": associated_author["author_name"],
+            "author_full_name": associated_author["author_full_name"],
+        },
+    }
+
+    author_post_comment_edge = {
+        "type": "edge",
+        "labels": ["POSTED"],
+        "connection": {"from": associated_author["id"], "to": comment_full_id},
+        "properties": {"datetime": comment_datetime_str},
+    }
+
+    comment_to_day_edge = {
+        "type": "edge",
+        "labels": ["POSTED_ON"],
+        "connection": {"from": comment_full_id, "to": day_date_id},
+        "properties": {},
+    }
+
+    comment_to_post_edge = {
+        "type": "edge",
+        "labels": ["COMMENTED_ON"],
+        "connection": {"from": comment_full_id, "to": post["id"]},
+        "properties": {"datetime": comment_datetime_str},
+    }
+
+    elements = [
+        comment_node,
+        author_node,
+        day_node,
+        author_post_comment_edge,
+        comment_to_day_edge,
+        comment_to_post_edge,
+    ]
+
+    # If the comment is a reply connect the current comment to the parent comment:
+    if parent_id is not None:
+        reply_to_parent_comment_edge = {
             "type": "edge",
-            "labels": ["POSTED_ON"],
-            "connection": {"from": comment_full_id, "to": day_date_id},
-            "properties": {},
+            "query_type": "MERGE",
+            "labels": ["REPLIED_TO"],
+            "connection": {"from": comment_full_id, "to": parent_id},
+            "properties": {"datetime": comment_datetime_str},
         }
-
-        comment_to_post_edge = {
+        parent_to_reply_comment_edge = {
             "type": "edge",
-            "labels": ["COMMENTED_ON"],
-            "connection": {"from": comment_full_id, "to": post["id"]},
-            "properties": {
-                "datetime": pd.to_datetime(
-                    int(comment_data["created_utc"]), utc=True, unit="s"
-                ).strftime("%Y-%m-%dT%H:%M:%SZ")
-            },
+            "query_type": "MERGE",
+            "labels": ["HAS_REPLY"],
+            "connection": {"from": parent_id, "to": comment_full_id},
+            "properties": {"datetime": comment_datetime_str},
         }
-        output_lst.append(comment_node)
-        output_lst.append(author_node)
-        output_lst.append(day_node)
-        output_lst.append(author_post_comment_edge)
-        output_lst.append(comment_to_day_edge)
-        output_lst.append(comment_to_post_edge)
-
-        # If this is a recursive call that has provided a parent comment node (it is a reply) connect the current comment to the parent comment:
-        if parent_object is not None:
-            reply_to_parent_comment_edge = {
-                "type": "edge",
-                "query_type": "MERGE",
-                "labels": ["REPLIED_TO"],
-                "connection": {
-                    "from": comment_full_id,
-                    "to": parent_object["properties"]["id"],
-                },
-                "properties": {
-                    "datetime": pd.to_datetime(
-                        int(comment_data["created_utc"]), utc=True, unit="s"
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-                },
-            }
-            parent_to_reply_comment_edge = {
-                "type": "edge",
-                "query_type": "MERGE",
-                "labels": ["HAS_REPLY"],
-                "connection": {
-                    "from": parent_object["properties"]["id"],
-                    "to": comment_full_id,
-                },
-                "properties": {
-                    "datetime": pd.to_datetime(
-                        int(comment_data["created_utc"]), utc=True, unit="s"
-                    ).strftime("%Y-%m-%dT%H:%M:%SZ")
-                },
-            }
-            output_lst.append(reply_to_parent_comment_edge)
-            output_lst.append(parent_to_reply_comment_edge)
-
-        replies = comment_data.get("replies", None)
-        if isinstance(replies, dict):
-            if replies["kind"] != "more":
-                for reply in replies["data"]["children"]:
-                    recursively_build_comment_creation_lst(
-                        output_lst, post, reply, parent_object=comment_node
-                    )
-        else:
-            return
-
-    elif comment_listing_type == "more":
-        logger.warning(
-            "Recursive post extraction has hit the 'more' component. Exiting recursive extraction."
+        elements.append(reply_to_parent_comment_edge)
+        elements.append(parent_to_reply_comment_edge)
+
+    return elements
+
+
+def iter_comment_graph_elements(
+    post: RedditPostDict,
+    comment_json_objs: Iterable[dict],
+    parent_id: str | None = None,
+) -> Iterator[dict]:
+    """
+    Lazily yield the node/edge dicts for every comment in a listing.
+
+    Elements are produced in the same order as `recursively_build_comment_creation_lst`
+    one comment at a time, so a downstream writer can start consuming them
+    before the whole thread has been walked.
+    """
+    for comment_data, comment_parent_id in iter_comment_tree(
+        comment_json_objs, parent_id=parent_id
+    ):
+        yield from build_comment_graph_elements(post, comment_data, comment_parent_id)
+
+
+def recursively_build_comment_creation_lst(
+    output_lst: list[dict], post, comment_json_obj, parent_object: dict = None
+):
+    # Kept for existing callers. The walk itself is iterative (see iter_comment_tree):
+    parent_id = None if parent_object is None else parent_object["properties"]["id"]
+    output_lst.extend(
+        iter_comment_graph_elements(post, [comment_json_obj], parent_id=parent_id)
+    )
+
+
+def iter_comment_listing_from_json_stream(json_stream: IO[bytes]) -> Iterator[dict]:
+    """
+    Incrementally parse a post.json stream and yield each top level comment subtree.
+
+    Only one top level comment (with its replies) is materialised at a time, so
+    peak memory is bounded by the largest single subtree rather than the whole
+    document. The post listing at index 0 holds the `t3` post itself, which the
+    comment walk skips.
+    """
+    # "item.data.children.item" matches the children of both listings in the [post, comments] array:
+    for listing_child in ijson.items(
+        json_stream, "item.data.children.item", use_float=True
+    ):
+        if listing_child["kind"] == "t3":
+            continue
+        yield listing_child
+
+
+def iter_comments_from_json(
+    post: RedditPostDict, json_bytes_stream: IO[bytes], config: dict = {}
+) -> Iterator[dict]:
+    """
+    Lazily yield the node/edge dicts for every comment in a post.json stream.
+
+    With `stream_comments_json` set the listing is parsed incrementally, so
+    neither the json document nor the element list is ever held whole and a
+    consumer such as `Neo4jImportExporter.write_elements` can write each element
+    as it is produced. Parse errors are raised to the consumer.
+    """
+    # Object store response bodies can only be read forward:
+    if json_bytes_stream.seekable():
+        json_bytes_stream.seek(0)
+
+    # Stub expansion needs the whole tree to merge into so it always uses the full parse:
+    if config.get("stream_comments_json", False) and not config.get(
+        "expand_more_comments", False
+    ):
+        yield from iter_comment_graph_elements(
+            post, iter_comment_listing_from_json_stream(json_bytes_stream)
         )
         return
 
+    row_reddit_json = json.loads(json_bytes_stream.read())
+    if config.get("expand_more_comments", False):
+        expand_more_comment_stubs(row_reddit_json, config)
+    comment_content = row_reddit_json[1]["data"]["children"]
+
+    yield from iter_comment_graph_elements(post, comment_content)
+
 
 def get_comments_from_json(
-    post: RedditPostDict, json_bytes_stream: io.BytesIO
+    post: RedditPostDict, json_bytes_stream: IO[bytes], config: dict = {}
 ) -> RedditCommentAttachmentDict:
+    # Kept for existing callers, see iter_comments_from_json for the streaming form:
     try:
-        json_bytes_stream.seek(0)
-
-        row_reddit_json = json.loads(json_bytes_stream.read())
-        comment_content = row_reddit_json[1]["data"]["children"]
-
-        post_comment_dicts: list[RedditCommentDict] = []
-        for comment_json in comment_content:
-            recursively_build_comment_creation_lst(
-                output_lst=post_comment_dicts, post=post, comment_json_obj=comment_json
-            )
+        post_comment_dicts: list[RedditCommentDict] = list(
+            iter_comments_from_json(post, json_bytes_stream, config)
+        )
 
         return post_comment_dicts
 
     except Exception as e:
         logger.error(
-            f"Unable to recusrively extract all comments from comments json: {str(e.with_traceback(None))}"
+            f"Unable to extract all comments from comments json for post {post['id']}: {traceback.format_exc()}"
         )
         return None
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import threading
+from datetime import datetime, timezone
+from loguru import logger
+from typing import TypedDict
+
+
+class DashRepresentationDict(TypedDict):
+    id: str
+    bandwidth: int
+    height: int | None
+    mime_type: str
+    base_url: str
+
+
+class RepresentationPolicyDict(TypedDict, total=False):
+    max_video_height: int
+    target_video_bitrate: int
+    max_post_bytes: int
+
+
+def parse_mpd_duration(duration: str | None) -> float | None:
+    """Convert an ISO 8601 MPD duration such as `PT1M12.5S` into seconds."""
+    if duration is None:
+        return None
+
+    match = re.fullmatch(
+        r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:([\d.]+)S)?)?", duration
+    )
+    if match is None:
+        return None
+
+    days, hours, minutes, seconds = (float(value or 0) for value in match.groups())
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+def estimate_representation_bytes(
+    representation: DashRepresentationDict, duration_seconds: float
+) -> int:
+    return int(representation["bandwidth"] * duration_seconds / 8)
+
+
+def select_video_representation(
+    representations: list[DashRepresentationDict], policy: RepresentationPolicyDict
+) -> DashRepresentationDict | None:
+    """
+    Pick the video representation to archive from an adaptation set.
+
+    Without a policy this is the highest bandwidth representation. `max_video_height`
+    drops taller representations (falling back to the shortest one if all are taller)
+    and `target_video_bitrate` picks the highest bandwidth at or under the target
+    (falling back to the lowest bandwidth if all are over).
+    """
+    if len(representations) == 0:
+        return None
+
+    candidates = list(representations)
+
+    max_video_height = policy.get("max_video_height", None)
+    if max_video_height is not None:
+        within_height = [
+            representation
+            for representation in candidates
+            if representation["height"] is None
+            or representation["height"] <= max_video_height
+        ]
+        candidates = within_height or [
+            min(candidates, key=lambda representation: representation["height"])
+        ]
+
+    target_video_bitrate = policy.get("target_video_bitrate", None)
+    if target_video_bitrate is not None:
+        within_bitrate = [
+            representation
+            for representation in candidates
+            if representation["bandwidth"] <= target_video_bitrate
+        ]
+        candidates = within_bitrate or [
+            min(candidates, key=lambda representation: representation["bandwidth"])
+        ]
+
+    return max(candidates, key=lambda representation: representation["bandwidth"])
+
+
+def select_audio_representation(
+    representations: list[DashRepresentationDict],
+) -> DashRepresentationDict | None:
+    if len(representations) == 0:
+        return None
+    return max(representations, key=lambda representation: representation["bandwidth"])
+
+
+class DailyBandwidthBudget:
+    """
+    Thread-safe byte budget that resets at UTC midnight.
+
+    Workers `reserve` a post's predicted transfer size before downloading it and
+    `adjust` by the difference once the real size is known. With a `state_path`
+    the usage is persisted so separate runs on the same day share one budget.
+    """
+
+    def __init__(self, daily_budget_bytes: int, state_path: str | None = None):
+        self.daily_budget_bytes = daily_budget_bytes
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._day, self.used_bytes = self._load_state()
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _load_state(self) -> tuple[str, int]:
+        if self.state_path is None or not os.path.exists(self.state_path):
+            return self._today(), 0
+
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state["day"] != self._today():
+            return self._today(), 0
+        return state["day"], state["used_bytes"]
+
+    def _save_state(self):
+        if self.state_path is None:
+            return
+        with open(self.state_path, "w") as f:
+            json.dump({"day": self._day, "used_bytes": self.used_bytes}, f)
+
+    def _roll_over(self):
+        if self._day != self._today():
+            self._day, self.used_bytes = self._today(), 0
+
+    def remaining_bytes(self) -> int:
+        with self._lock:
+            self._roll_over()
+            return max(0, self.daily_budget_bytes - self.used_bytes)
+
+    def reserve(self, num_bytes: int) -> bool:
+        with self._lock:
+            self._roll_over()
+            if self.used_bytes + num_bytes > self.daily_budget_bytes:
+                logger.warning(
+                    f"Daily bandwidth budget exhausted, {self.used_bytes} of {self.daily_budget_bytes} bytes used and {num_bytes} requested"
+                )
+                return False
+
+            self.used_bytes += num_bytes
+            self._save_state()
+            return True
+
+    def adjust(self, num_bytes: int):
+        with self._lock:
+            self._roll_over()
+            self.used_bytes = max(0, self.used_bytes + num_bytes)
+            self._save_state()
@@ -0,0 +1,253 @@
+import csv
+import os
+import sqlite3
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+from pathlib import Path
+from typing import Iterable
+
+# neo4j-admin header type suffixes. Anything not listed is written as a plain string property:
+NEO4J_IMPORT_TYPES = {bool: "boolean", int: "long", float: "double"}
+
+
+def _property_header(name: str, value) -> str:
+    neo4j_type = NEO4J_IMPORT_TYPES.get(type(value), None)
+    return name if neo4j_type is None else f"{name}:{neo4j_type}"
+
+
+def _safe_file_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+class Neo4jImportExporter:
+    """
+    Streams comment graph node/edge dicts into files for `neo4j-admin database import full`.
+
+    Nodes are partitioned by their label set and edges by relationship type, one
+    directory of part files each. Headers are typed from the first row of each
+    partition (`datetime`, `count:long`, ...) and ids share the global id space so
+    edges only need `:START_ID`/`:END_ID`. Every node id is recorded in an on-disk
+    SQLite table the first time it is exported, so author and day nodes repeated
+    across millions of comments are written once while memory stays bounded by
+    `rows_per_part` rows per open partition.
+
+    Parts are written under a `staged-` name and only renamed into place by
+    `flush`, so after a crash the parts of the unflushed chunk are deleted when
+    the exporter is reopened and rerunning the chunk doesn't duplicate its edges.
+
+    COMMENTED_ON edges point at post ids that aren't part of the comment elements,
+    so a `build_post_graph_node` has to be written per post or the import's
+    `--skip-bad-relationships` drops them.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        file_format: str = "csv",
+        rows_per_part: int = 100_000,
+        id_cache_size: int = 100_000,
+    ):
+        if file_format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported export format {file_format}")
+
+        self.output_dir = Path(output_dir)
+        self.file_format = file_format
+        self.rows_per_part = rows_per_part
+        self.id_cache_size = id_cache_size
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Parts a crashed run spilled before its chunk was flushed are written again by the rerun:
+        for staged_part_path in self.output_dir.glob("*/staged-part-*"):
+            logger.warning(f"Removing unflushed part {staged_part_path}")
+            staged_part_path.unlink()
+        self._staged_parts: list[tuple[Path, Path]] = []
+
+        self._node_ids_db = sqlite3.connect(
+            self.output_dir / "_exported_node_ids.sqlite"
+        )
+        self._node_ids_db.execute(
+            "CREATE TABLE IF NOT EXISTS exported_node_ids (id TEXT PRIMARY KEY) WITHOUT ROWID"
+        )
+        # A small in-memory front for the ids that repeat constantly (authors, days):
+        self._recent_node_ids: set[str] = set()
+
+        # partition key -> (header columns, buffered rows, next part number)
+        self._node_partitions: dict[tuple, list] = {}
+        self._edge_partitions: dict[str, list] = {}
+
+        self.nodes_written = 0
+        self.nodes_deduplicated = 0
+        self.edges_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+    def _is_new_node_id(self, node_id: str) -> bool:
+        if node_id in self._recent_node_ids:
+            return False
+
+        cursor = self._node_ids_db.execute(
+            "INSERT OR IGNORE INTO exported_node_ids (id) VALUES (?)", (node_id,)
+        )
+        if len(self._recent_node_ids) >= self.id_cache_size:
+            self._recent_node_ids.clear()
+        self._recent_node_ids.add(node_id)
+
+        return cursor.rowcount == 1
+
+    def _partition_dir(self, kind: str, name: str) -> Path:
+        partition_dir = self.output_dir / f"{kind}_{_safe_file_name(name)}"
+        partition_dir.mkdir(parents=True, exist_ok=True)
+        return partition_dir
+
+    def _existing_part_count(self, partition_dir: Path) -> int:
+        return len(list(partition_dir.glob(f"part-*.{self.file_format}")))
+
+    def _write_part(self, partition_dir: Path, partition: list):
+        header, rows, part_number = partition
+        if len(rows) == 0:
+            return
+
+        part_name = f"part-{part_number:05d}.{self.file_format}"
+        part_path = partition_dir / f"staged-{part_name}"
+        if self.file_format == "csv":
+            if not (partition_dir / "header.csv").exists():
+                with open(partition_dir / "header.csv", "w", newline="") as f:
+                    csv.writer(f).writerow(header)
+            with open(part_path, "w", newline="") as f:
+                csv.writer(f).writerows(rows)
+        else:
+            columns = list(zip(*rows))
+            pq.write_table(
+                pa.table({name: list(column) for name, column in zip(header, columns)}),
+                part_path,
+            )
+
+        self._staged_parts.append((part_path, partition_dir / part_name))
+        partition[1] = []
+        partition[2] = part_number + 1
+
+    def write_node(self, labels: list[str], properties: dict):
+        if not self._is_new_node_id(properties["id"]):
+            self.nodes_deduplicated += 1
+            return
+
+        partition_key = tuple(labels)
+        partition = self._node_partitions.get(partition_key, None)
+        if partition is None:
+            property_names = [name for name in properties if name != "id"]
+            header = (
+                ["id:ID"]
+                + [_property_header(name, properties[name]) for name in property_names]
+                + [":LABEL"]
+            )
+            partition_dir = self._partition_dir("nodes", "_".join(labels))
+            partition = [header, [], self._existing_part_count(partition_dir)]
+            self._node_partitions[partition_key] = partition
+
+        property_names = [column.split(":")[0] for column in partition[0][1:-1]]
+        partition[1].append(
+            [properties["id"]]
+            + [properties.get(name, None) for name in property_names]
+            + [";".join(labels)]
+        )
+        self.nodes_written += 1
+
+        if len(partition[1]) >= self.rows_per_part:
+            self._write_part(self._partition_dir("nodes", "_".join(labels)), partition)
+
+    def write_edge(self, relationship_type: str, connection: dict, properties: dict):
+        partition = self._edge_partitions.get(relationship_type, None)
+        if partition is None:
+            header = (
+                [":START_ID"]
+                + [_property_header(name, value) for name, value in properties.items()]
+                + [":END_ID", ":TYPE"]
+            )
+            partition_dir = self._partition_dir("relationships", relationship_type)
+            partition = [header, [], self._existing_part_count(partition_dir)]
+            self._edge_partitions[relationship_type] = partition
+
+        property_names = [column.split(":")[0] for column in partition[0][1:-2]]
+        partition[1].append(
+            [connection["from"]]
+            + [properties.get(name, None) for name in property_names]
+            + [connection["to"], relationship_type]
+        )
+        self.edges_written += 1
+
+        if len(partition[1]) >= self.rows_per_part:
+            self._write_part(
+                self._partition_dir("relationships", relationship_type), partition
+            )
+
+    def write_elements(self, elements: Iterable[dict]):
+        for element in elements:
+            if element["type"] == "node":
+                self.write_node(element["labels"], element["properties"])
+            elif element["type"] == "edge":
+                self.write_edge(
+                    element["labels"][0],
+                    element["connection"],
+                    element.get("properties", {}),
+                )
+
+    def flush(self):
+        for labels, partition in self._node_partitions.items():
+            self._write_part(self._partition_dir("nodes", "_".join(labels)), partition)
+        for relationship_type, partition in self._edge_partitions.items():
+            self._write_part(
+                self._partition_dir("relationships", relationship_type), partition
+            )
+
+        for staged_part_path, part_path in self._staged_parts:
+            staged_part_path.rename(part_path)
+        self._staged_parts = []
+
+        # Ids only count as exported once every part holding them is in place. A crash
+        # between the renames and this commit leaves duplicate nodes for the import to skip:
+        self._node_ids_db.commit()
+
+    def import_command(self, database: str = "neo4j") -> str:
+        """The `neo4j-admin` invocation, run from `output_dir`, that loads everything exported so far."""
+
+        def partition_files(partition_dir: Path) -> str:
+            relative_dir = os.path.relpath(partition_dir, self.output_dir)
+            if self.file_format == "csv":
+                return f"{relative_dir}/header.csv,{relative_dir}/part-.*"
+            return f"{relative_dir}/part-.*"
+
+        node_args = [
+            f"--nodes={partition_files(partition_dir)}"
+            for partition_dir in sorted(self.output_dir.glob("nodes_*"))
+        ]
+        relationship_args = [
+            f"--relationships={partition_files(partition_dir)}"
+            for partition_dir in sorted(self.output_dir.glob("relationships_*"))
+        ]
+        # Comment bodies span lines, which csv.writer quotes but neo4j-admin rejects by default:
+        format_arg = (
+            ["--input-type=parquet"]
+            if self.file_format == "parquet"
+            else ["--multiline-fields=true"]
+        )
+
+        return " ".join(
+            ["neo4j-admin database import full", database]
+            + format_arg
+            + node_args
+            + relationship_args
+            + ["--skip-bad-relationships", "--skip-duplicate-nodes"]
+        )
+
+    def close(self):
+        self.flush()
+        self._node_ids_db.close()
+        logger.info(
+            f"Exported {self.nodes_written} nodes ({self.nodes_deduplicated} duplicates skipped) and {self.edges_written} edges to {self.output_dir}"
+        )
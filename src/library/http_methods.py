@@ -0,0 +1,448 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import requests
+import threading
+import traceback
+from loguru import logger
+from typing import Iterator, TypedDict
+from urllib.parse import urlparse
+
+from library.io_interfaces.filestore_io import FileInterface
+
+
+class StreamDownloadDict(TypedDict):
+    url: str
+    path: str
+    bytes: int
+    seconds: float
+    bytes_per_second: float
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+
+    `acquire` blocks until a token is available so every thread sharing a
+    limiter is held to `requests_per_second` in aggregate, with short bursts
+    of up to `burst` requests.
+    """
+
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        self.requests_per_second = requests_per_second
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._last_refill) * self.requests_per_second,
+                )
+                self._last_refill = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait_seconds = (1 - self._tokens) / self.requests_per_second
+
+            time.sleep(wait_seconds)
+
+
+_shared_rate_limiters: dict[str, RateLimiter] = {}
+_shared_rate_limiters_lock = threading.Lock()
+
+
+def get_shared_rate_limiter(
+    url: str, requests_per_second: float, burst: int = 1
+) -> RateLimiter:
+    """
+    Return the process-wide RateLimiter for the host of `url`, creating it on first use.
+
+    Every caller hitting the same host shares one bucket regardless of which
+    thread or pipeline stage it runs in.
+    """
+    host = urlparse(url).netloc
+    with _shared_rate_limiters_lock:
+        rate_limiter = _shared_rate_limiters.get(host, None)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(requests_per_second, burst=burst)
+            _shared_rate_limiters[host] = rate_limiter
+        return rate_limiter
+
+
+class HttpCacheStatsDict(TypedDict):
+    hits: int
+    revalidated: int
+    misses: int
+    errors: int
+    hit_rate: float
+
+
+class HttpCache:
+    """
+    On-disk cache for small GET responses such as DASH manifests, keyed by url.
+
+    An entry younger than `ttl_seconds` is served without a request. An older
+    one is revalidated with `If-None-Match` / `If-Modified-Since`, so an unchanged
+    resource costs a 304 rather than the body. Hit, revalidation and miss counts
+    are kept for the lifetime of the instance, see `stats`.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: float = 3600):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "revalidated": 0, "misses": 0, "errors": 0}
+
+    def _entry_path(self, url: str) -> str:
+        url_key = hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, url_key)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _read_entry(self, url: str) -> tuple[dict, bytes] | None:
+        entry_path = self._entry_path(url)
+        try:
+            with open(f"{entry_path}.json") as f:
+                metadata = json.load(f)
+            with open(f"{entry_path}.body", "rb") as f:
+                body = f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # Two urls hashing to the same key is not worth handling beyond a miss:
+        if metadata.get("url") != url:
+            return None
+        return metadata, body
+
+    def _write_entry(self, url: str, metadata: dict, body: bytes | None = None):
+        entry_path = self._entry_path(url)
+        # Written to a temp name and renamed so concurrent readers never see half an entry:
+        temp_suffix = f".{threading.get_ident()}.tmp"
+        if body is not None:
+            with open(f"{entry_path}.body{temp_suffix}", "wb") as f:
+                f.write(body)
+            os.replace(f"{entry_path}.body{temp_suffix}", f"{entry_path}.body")
+        with open(f"{entry_path}.json{temp_suffix}", "w") as f:
+            json.dump(metadata, f)
+        os.replace(f"{entry_path}.json{temp_suffix}", f"{entry_path}.json")
+
+    def get(
+        self, url: str, config: dict, rate_limiter: RateLimiter | None = None
+    ) -> bytes | None:
+        """
+        Return the body of `url`, from the cache when it is fresh or unchanged.
+
+        Args:
+            url (str): The resource to GET.
+            config (dict): request_timeout and user_agent for requests that go out.
+            rate_limiter (RateLimiter | None): Acquired before a request is made, cache hits skip it.
+
+        Returns:
+            bytes | None: The response body, or None on error.
+        """
+        entry = self._read_entry(url)
+        if entry is not None and time.time() - entry[0]["stored_at"] < self.ttl_seconds:
+            self._count("hits")
+            return entry[1]
+
+        headers = {"User-Agent": config.get("user_agent", "reddit-ingestion-pipeline")}
+        if entry is not None:
+            if entry[0].get("etag", None) is not None:
+                headers["If-None-Match"] = entry[0]["etag"]
+            if entry[0].get("last_modified", None) is not None:
+                headers["If-Modified-Since"] = entry[0]["last_modified"]
+
+        try:
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            response = requests.get(
+                url, headers=headers, timeout=config.get("request_timeout", 30)
+            )
+
+            if response.status_code == 304 and entry is not None:
+                self._write_entry(url, {**entry[0], "stored_at": time.time()})
+                self._count("revalidated")
+                return entry[1]
+
+            response.raise_for_status()
+            self._write_entry(
+                url,
+                {
+                    "url": url,
+                    "stored_at": time.time(),
+                    "etag": response.headers.get("ETag", None),
+                    "last_modified": response.headers.get("Last-Modified", None),
+                },
+                response.content,
+            )
+            self._count("misses")
+            return response.content
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            self._count("errors")
+            return None
+
+    def stats(self) -> HttpCacheStatsDict:
+        with self._lock:
+            lookups = sum(self._stats.values())
+            return {
+                **self._stats,
+                "hit_rate": (
+                    (self._stats["hits"] + self._stats["revalidated"]) / lookups
+                    if lookups > 0
+                    else 0.0
+                ),
+            }
+
+
+_shared_http_caches: dict[str, HttpCache] = {}
+_shared_http_caches_lock = threading.Lock()
+
+
+def get_shared_http_cache(cache_dir: str, ttl_seconds: float = 3600) -> HttpCache:
+    """Return the process-wide HttpCache for `cache_dir`, so every worker's lookups land in one set of stats."""
+    with _shared_http_caches_lock:
+        http_cache = _shared_http_caches.get(cache_dir, None)
+        if http_cache is None:
+            http_cache = HttpCache(cache_dir, ttl_seconds=ttl_seconds)
+            _shared_http_caches[cache_dir] = http_cache
+        return http_cache
+
+
+def cached_get(
+    url: str, config: dict, rate_limiter: RateLimiter | None = None
+) -> bytes | None:
+    """
+    GET a small resource through the shared HttpCache in `http_cache_dir`.
+
+    Without `http_cache_dir` in the config this is a plain rate limited GET.
+    """
+    if config.get("http_cache_dir", None) is not None:
+        return get_shared_http_cache(
+            config["http_cache_dir"], config.get("http_cache_ttl_seconds", 3600)
+        ).get(url, config, rate_limiter=rate_limiter)
+
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        response = requests.get(
+            url,
+            headers={
+                "User-Agent": config.get("user_agent", "reddit-ingestion-pipeline")
+            },
+            timeout=config.get("request_timeout", 30),
+        )
+        response.raise_for_status()
+        return response.content
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(error_msg)
+        return None
+
+
+def get_partial_download_path(url: str, filepath: str, config: dict) -> str:
+    """The local `.part` file a resumable download of `url` to `filepath` is accumulated in."""
+    partial_download_dir = config.get(
+        "partial_download_dir",
+        os.path.join(tempfile.gettempdir(), "reddit-partial-downloads"),
+    )
+    download_key = hashlib.blake2b(
+        f"{url}\n{filepath}".encode(), digest_size=16
+    ).hexdigest()
+    return os.path.join(partial_download_dir, f"{download_key}.part")
+
+
+def _read_partial_checkpoint(partial_path: str) -> dict:
+    try:
+        with open(f"{partial_path}.json") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_partial_checkpoint(partial_path: str, checkpoint: dict):
+    with open(f"{partial_path}.json", "w") as f:
+        json.dump(checkpoint, f)
+
+
+def _remove_partial_download(partial_path: str):
+    for path in (partial_path, f"{partial_path}.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _iter_file_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def resumable_stream_url_to_storage(
+    url: str, file_io: FileInterface, dir_name: str, filepath: str, config: dict
+) -> StreamDownloadDict | None:
+    """
+    Download a url into storage, resuming from where a dropped transfer stopped.
+
+    Bytes are appended to a local `.part` file (see get_partial_download_path)
+    next to a small json checkpoint holding the expected size and validator.
+    Every retry, within this call or on a later run, sends `Range: bytes=<have>-`
+    with `If-Range` so it only costs the missing bytes; a server that answers
+    200 instead of 206 (no range support or a changed file) restarts the part.
+    Once the part reaches the advertised length it is streamed to
+    `file_io.upload_stream` and removed.
+
+    Args:
+        url (str): The file to download.
+        file_io (FileInterface): The storage backend to stream into.
+        dir_name (str): The root directory / bucket to write into.
+        filepath (str): Relative path from dir_name to write the file to.
+        config (dict): download_chunk_size, request_timeout, download_max_retries,
+            download_retry_backoff, partial_download_dir and the file_io upload options.
+
+    Returns:
+        StreamDownloadDict | None: The stored path, bytes transferred by this call and
+        throughput, or None if the download is still incomplete or failed.
+    """
+    chunk_size: int = config.get("download_chunk_size", 1024 * 1024)
+    max_retries: int = config.get("download_max_retries", 3)
+
+    partial_path = get_partial_download_path(url, filepath, config)
+    os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+    checkpoint = _read_partial_checkpoint(partial_path)
+
+    downloaded_bytes = 0
+    start = time.perf_counter()
+
+    for attempt in range(max_retries + 1):
+        if attempt > 0:
+            time.sleep(config.get("download_retry_backoff", 1.0) * attempt)
+
+        partial_bytes = (
+            os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        )
+        total_bytes: int | None = checkpoint.get("total_bytes", None)
+        if total_bytes is not None and partial_bytes == total_bytes:
+            break
+
+        # Ranges index the encoded body, so only unencoded transfers can be stitched together:
+        headers = {"Accept-Encoding": "identity"}
+        if partial_bytes > 0:
+            headers["Range"] = f"bytes={partial_bytes}-"
+            if checkpoint.get("validator", None) is not None:
+                headers["If-Range"] = checkpoint["validator"]
+
+        try:
+            with requests.get(
+                url,
+                headers=headers,
+                stream=True,
+                timeout=config.get("request_timeout", 30),
+            ) as response:
+                if response.status_code == 416:
+                    # The part no longer lines up with the remote file, start over:
+                    _remove_partial_download(partial_path)
+                    checkpoint = {}
+                response.raise_for_status()
+
+                if response.status_code == 206:
+                    file_mode = "ab"
+                    content_range = response.headers.get("Content-Range", "")
+                    total_bytes = int(content_range.rsplit("/", 1)[-1])
+                else:
+                    # The whole body is coming back, whatever was kept is stale:
+                    file_mode = "wb"
+                    if partial_bytes > 0:
+                        logger.warning(
+                            f"{url} ignored the range request, restarting from byte 0"
+                        )
+                    content_length = response.headers.get("Content-Length", None)
+                    total_bytes = (
+                        int(content_length) if content_length is not None else None
+                    )
+
+                checkpoint = {
+                    "url": url,
+                    "total_bytes": total_bytes,
+                    "validator": response.headers.get(
+                        "ETag", response.headers.get("Last-Modified", None)
+                    ),
+                }
+                _write_partial_checkpoint(partial_path, checkpoint)
+
+                # read1 hands over whatever has arrived, so a dropped connection only loses unsent bytes:
+                with open(partial_path, file_mode) as f:
+                    while chunk := response.raw.read1(chunk_size):
+                        f.write(chunk)
+                        downloaded_bytes += len(chunk)
+
+            # Without a known length a clean end of body is the only completion signal:
+            if total_bytes is None:
+                checkpoint["total_bytes"] = os.path.getsize(partial_path)
+                _write_partial_checkpoint(partial_path, checkpoint)
+            break
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(
+                f"Download of {url} interrupted on attempt {attempt + 1} of {max_retries + 1}: {error_msg}"
+            )
+            # Client errors won't go away by asking again:
+            if (
+                isinstance(e, requests.HTTPError)
+                and 400 <= e.response.status_code < 500
+                and e.response.status_code not in (408, 416, 429)
+            ):
+                break
+
+    partial_bytes = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+    total_bytes = checkpoint.get("total_bytes", None)
+    if total_bytes is not None and partial_bytes > total_bytes:
+        logger.error(
+            f"Download of {url} overran the expected {total_bytes} bytes, discarding {partial_path}"
+        )
+        _remove_partial_download(partial_path)
+        return None
+    if partial_bytes != total_bytes:
+        logger.error(
+            f"Download of {url} incomplete with {partial_bytes} of {total_bytes} bytes, kept {partial_path} to resume from"
+        )
+        return None
+
+    stored_path = file_io.upload_stream(
+        _iter_file_chunks(partial_path, chunk_size), dir_name, filepath, config
+    )
+    seconds = time.perf_counter() - start
+    if stored_path is None:
+        logger.error(f"Unable to store the download of {url} at {filepath}")
+        return None
+
+    _remove_partial_download(partial_path)
+
+    download_result: StreamDownloadDict = {
+        "url": url,
+        "path": stored_path,
+        "bytes": downloaded_bytes,
+        "seconds": seconds,
+        "bytes_per_second": downloaded_bytes / seconds if seconds > 0 else 0.0,
+    }
+    logger.info(
+        f"Downloaded {downloaded_bytes} of {partial_bytes} bytes from {url} to {stored_path}, the rest was resumed from a partial download"
+        if downloaded_bytes < partial_bytes
+        else f"Downloaded {downloaded_bytes} bytes from {url} to {stored_path}"
+    )
+    return download_result
@@ -0,0 +1,209 @@
+import io
+import json
+import hashlib
+import requests
+import traceback
+from loguru import logger
+from typing import Callable, Iterable, TypedDict
+
+from library.types import RedditPostDict
+from library.http_methods import get_shared_rate_limiter
+from library.io_interfaces.filestore_io import FileInterface
+from library.comment_expansion_methods import expand_more_comment_stubs
+from library.comments_extraction_methods import (
+    build_comment_graph_elements,
+    iter_comment_listing_from_json_stream,
+    iter_comment_tree,
+)
+
+# comment id -> short hash of the body that was last emitted for it:
+CommentIndex = dict[str, str]
+
+
+class CommentRefreshDict(TypedDict):
+    post_id: str
+    new_comments: int
+    edited_comments: int
+    unchanged_comments: int
+    elements: int
+
+
+def hash_comment_body(body: str) -> str:
+    return hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+
+
+def get_comment_index_path(post: RedditPostDict) -> str:
+    return f"{post['id']}/comment_index.json"
+
+
+def load_comment_index(
+    post: RedditPostDict, file_io: FileInterface, config: dict
+) -> CommentIndex:
+    """Read the index of comments already emitted for a post. A post that was never refreshed has an empty index."""
+    index_path = get_comment_index_path(post)
+
+    # Checked up front because a missing object makes S3 reads raise rather than return an error:
+    if file_io.get_file_info(config["root_dir_name"], index_path, config) is None:
+        logger.info(f"No comment index for post {post['id']}, emitting every comment")
+        return {}
+
+    index_stream: io.BytesIO | str | None = file_io.read_file(
+        dir_name=config["root_dir_name"],
+        filepath=index_path,
+        config=config,
+    )
+    # An index that exists but can't be read must not be mistaken for a first refresh:
+    if not isinstance(index_stream, io.BytesIO):
+        raise RuntimeError(f"Unable to read the comment index of post {post['id']}")
+
+    return json.loads(index_stream.read())
+
+
+def save_comment_index(
+    post: RedditPostDict,
+    comment_index: CommentIndex,
+    file_io: FileInterface,
+    config: dict,
+) -> str | None:
+    return file_io.upload_file(
+        io.BytesIO(json.dumps(comment_index, separators=(",", ":")).encode()),
+        dir_name=config["root_dir_name"],
+        filepath=get_comment_index_path(post),
+        config={**config, "content_type": "application/json"},
+    )
+
+
+def fetch_post_json(post: RedditPostDict, config: dict) -> io.BytesIO | None:
+    """Re-download a post's json listing (post + full comment tree) from its url."""
+    post_json_url = f"{post['fields']['url'].rstrip('/')}.json"
+
+    rate_limiter = get_shared_rate_limiter(
+        post_json_url,
+        requests_per_second=config.get("reddit_requests_per_second", 1.0),
+        burst=config.get("reddit_request_burst", 1),
+    )
+
+    try:
+        rate_limiter.acquire()
+        response = requests.get(
+            post_json_url,
+            params={"raw_json": 1, "limit": config.get("comment_limit", 500)},
+            headers={
+                "User-Agent": config.get("user_agent", "reddit-ingestion-pipeline")
+            },
+            timeout=config.get("request_timeout", 30),
+        )
+        response.raise_for_status()
+        return io.BytesIO(response.content)
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(f"Unable to fetch post json from {post_json_url}: {error_msg}")
+        return None
+
+
+def diff_comment_tree(
+    post: RedditPostDict,
+    comment_json_objs: Iterable[dict],
+    previous_index: CommentIndex,
+) -> tuple[list[dict], CommentIndex, CommentRefreshDict]:
+    """
+    Emit graph elements only for the comments that are new or edited since `previous_index`.
+
+    Unchanged comments are only hashed, never turned into nodes or edges, so
+    the output is proportional to the change rather than to the thread.
+
+    Returns:
+        tuple[list[dict], CommentIndex, CommentRefreshDict]: The elements to write,
+        the index to persist once they have been written, and the diff counts.
+    """
+    elements: list[dict] = []
+    comment_index: CommentIndex = dict(previous_index)
+    new_comments, edited_comments, unchanged_comments = 0, 0, 0
+
+    for comment_data, parent_id in iter_comment_tree(comment_json_objs):
+        comment_id: str = comment_data["id"]
+        body_hash = hash_comment_body(comment_data["body"])
+
+        previous_hash = previous_index.get(comment_id, None)
+        if previous_hash == body_hash:
+            unchanged_comments += 1
+            continue
+
+        if previous_hash is None:
+            new_comments += 1
+        else:
+            edited_comments += 1
+
+        comment_index[comment_id] = body_hash
+        elements.extend(build_comment_graph_elements(post, comment_data, parent_id))
+
+    refresh_stats: CommentRefreshDict = {
+        "post_id": post["id"],
+        "new_comments": new_comments,
+        "edited_comments": edited_comments,
+        "unchanged_comments": unchanged_comments,
+        "elements": len(elements),
+    }
+    return elements, comment_index, refresh_stats
+
+
+def refresh_post_comments(
+    post: RedditPostDict,
+    file_io: FileInterface,
+    write_elements: Callable[[list[dict]], object],
+    config: dict,
+) -> CommentRefreshDict | None:
+    """
+    Re-fetch a post's comments and write only what changed since the last refresh.
+
+    The index is only saved once `write_elements` returns something other than
+    None, so a failed write is retried on the next refresh instead of being
+    silently skipped.
+
+    Args:
+        post (RedditPostDict): A stored post with `fields.url`.
+        file_io (FileInterface): Where the per-post comment index is kept under `root_dir_name`.
+        write_elements (Callable[[list[dict]], object]): Writes the new/edited elements and returns
+            None on failure, e.g. a partial of `Neo4jGraphInterface.write_graph_elements`.
+        config (dict): root_dir_name plus the request and stub expansion options.
+
+    Returns:
+        CommentRefreshDict | None: The diff counts, or None on error.
+    """
+    try:
+        previous_index = load_comment_index(post, file_io, config)
+
+        json_stream = fetch_post_json(post, config)
+        if json_stream is None:
+            return None
+
+        # Stub expansion needs the whole tree to merge into, otherwise the listing is parsed incrementally:
+        if config.get("expand_more_comments", False):
+            post_json = json.loads(json_stream.read())
+            expand_more_comment_stubs(post_json, config)
+            comment_json_objs = post_json[1]["data"]["children"]
+        else:
+            comment_json_objs = iter_comment_listing_from_json_stream(json_stream)
+
+        elements, comment_index, refresh_stats = diff_comment_tree(
+            post, comment_json_objs, previous_index
+        )
+
+        if len(elements) > 0:
+            if write_elements(elements) is None:
+                logger.error(
+                    f"Writing {len(elements)} refreshed elements for post {post['id']} failed, keeping the previous index"
+                )
+                return None
+            save_comment_index(post, comment_index, file_io, config)
+
+        logger.info(
+            f"Refreshed post {post['id']}: {refresh_stats['new_comments']} new, {refresh_stats['edited_comments']} edited, {refresh_stats['unchanged_comments']} unchanged comments"
+        )
+        return refresh_stats
+
+    except Exception as e:
+        error_msg = traceback.format_exc()
+        logger.error(error_msg)
+        return None
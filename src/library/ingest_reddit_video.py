@@ -1,22 +1,38 @@
-from neo4j import GraphDatabase
-import neo4j
-import json
-import argparse
-import traceback
-import typing
-import pprint
-from datetime import datetime, timezone, time as dt_time
-import requests
 import io
-import sqlalchemy as sa
-import time
-import random
 import os
-from minio import Minio
-from loguru import logger
+import json
 import uuid
+import socket
+import typing
+import traceback
 import xml.etree.ElementTree as ET
-from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+
+from library.types import RedditPostDict, RedditContentDict, PipelineTaskDict
+from library.io_interfaces.db_io import (
+    DatabaseInterface,
+    VIDEO_DOWNLOAD_TASK,
+    is_pending_video_static_file,
+)
+from library.io_interfaces.filestore_io import FileInterface
+from library.dash_representation_selection import (
+    DailyBandwidthBudget,
+    DashRepresentationDict,
+    RepresentationPolicyDict,
+    estimate_representation_bytes,
+    parse_mpd_duration,
+    select_audio_representation,
+    select_video_representation,
+)
+from library.http_methods import (
+    RateLimiter,
+    StreamDownloadDict,
+    cached_get,
+    get_shared_http_cache,
+    get_shared_rate_limiter,
+    resumable_stream_url_to_storage,
+)
 
 
 class RedditVideoInfoDict(typing.TypedDict):
@@ -37,524 +53,643 @@ class VideoMPDResult(typing.TypedDict):
     extension: str
     url: str
     mime_type: str
-    video_byte_stream: io.BytesIO
+    bandwidth: int
+    estimated_bytes: int
 
 
 class AudioMPDResult(typing.TypedDict):
     extension: str
     url: str
     mime_type: str
-    audio_byte_stream: io.BytesIO
+    bandwidth: int
+    estimated_bytes: int
 
 
 class ParsedMPDResult(typing.TypedDict):
     mpd_file: str
     videos_periods: dict[int, VideoMPDResult]
     audio_periods: dict[int, AudioMPDResult]
+    estimated_bytes: int
 
 
-def parse_video_from_mpd_document(
-    reddit_video_info: RedditVideoInfoDict, reddit_post_data: dict
+def select_mpd_representations(
+    mpd_str: str,
+    reddit_post_data: dict,
+    duration_seconds: float,
+    policy: RepresentationPolicyDict,
 ) -> ParsedMPDResult:
-
-    response = requests.get(reddit_video_info["dash_url"])
-    logger.info(f"Extracted mpd file from {reddit_video_info['dash_url']}")
-
-    mpd_str: str = response.content.decode()
-
+    """
+    Choose one video and one audio representation per period of an MPD document.
+
+    Video follows the `max_video_height` / `target_video_bitrate` policy and audio
+    takes the highest bandwidth. Transfer sizes are predicted as period duration
+    (falling back to the post's `duration`) x bandwidth. When `max_post_bytes` is
+    set, the largest video representation is stepped down until the post fits or
+    nothing lower is left, the caller decides what to do with a post still over.
+
+    Args:
+        mpd_str (str): The DASH manifest.
+        reddit_post_data (dict): The post data, its `url` is the base of every representation.
+        duration_seconds (float): The video duration reported by reddit.
+        policy (RepresentationPolicyDict): The selection policy, usually the ingestion config.
+
+    Returns:
+        ParsedMPDResult: The selected representations and the predicted size of the post.
+    """
     root = ET.fromstring(mpd_str)
 
     namespace = root.tag.split("}")[0].strip("{")
+    namespaces = {"": namespace}
+
+    reddit_post_base_url = reddit_post_data.get("url", None)
+
+    def read_representations(adaptation_set) -> list[DashRepresentationDict]:
+        return [
+            {
+                "id": representation.attrib["id"],
+                "bandwidth": int(representation.attrib["bandwidth"]),
+                "height": (
+                    int(representation.attrib["height"])
+                    if "height" in representation.attrib
+                    else None
+                ),
+                "mime_type": representation.attrib.get(
+                    "mimeType", adaptation_set.attrib.get("mimeType", "")
+                ),
+                "base_url": representation.find("BaseURL", namespaces=namespaces).text,
+            }
+            for representation in adaptation_set.findall(
+                "Representation", namespaces=namespaces
+            )
+        ]
+
+    def build_period_result(
+        representation: DashRepresentationDict, period_seconds: float
+    ) -> VideoMPDResult:
+        return {
+            "mime_type": representation["mime_type"],
+            "extension": representation["base_url"],
+            "url": f"{reddit_post_base_url}/{representation['base_url']}",
+            "bandwidth": representation["bandwidth"],
+            "estimated_bytes": estimate_representation_bytes(
+                representation, period_seconds
+            ),
+        }
 
     parsed_result: ParsedMPDResult = {
         "mpd_file": mpd_str,
         "audio_periods": {},
         "videos_periods": {},
+        "estimated_bytes": 0,
     }
-
-    for period in root.findall("Period", namespaces={"": namespace}):
-        logger.info(
-            f"Period {period.attrib['id']} with a duration of: {period.attrib['duration']}"
-        )
-
-        # Getting each Adaptation set for the perod:
-        for adaptation_set in period.findall(
-            "AdaptationSet", namespaces={"": namespace}
-        ):
-            logger.info(
-                f"Adaptation Set {adaptation_set.attrib['id']} is {adaptation_set.attrib['contentType']} for period {period.attrib['id']}"
-            )
-
-            if adaptation_set.attrib["contentType"] == "video":
-
-                # Mapping adaptaion set ids to bandwith values to find the highest resoloution video:
-                adaptation_set_video_bandwith_dict = {}
-
-                for representation in adaptation_set.findall(
-                    "Representation", namespaces={"": namespace}
-                ):
-                    adaptation_set_video_bandwith_dict[
-                        int(representation.attrib["bandwidth"])
-                    ] = int(representation.attrib["id"])
-
-                all_video_bandwidths = [
-                    bandwidth for bandwidth in adaptation_set_video_bandwith_dict.keys()
-                ]
-                all_video_bandwidths.sort()
-                largest_video_bandwidth = all_video_bandwidths[0]
+    # Lower bandwidth video alternatives per period, for fitting the post into max_post_bytes:
+    video_alternatives: dict[int, list[DashRepresentationDict]] = {}
+    period_durations: dict[int, float] = {}
+
+    for period in root.findall("Period", namespaces=namespaces):
+        period_id = int(period.attrib["id"])
+        period_seconds = parse_mpd_duration(period.attrib.get("duration", None))
+        if period_seconds is None:
+            period_seconds = duration_seconds
+        period_durations[period_id] = period_seconds
+
+        logger.info(f"Period {period_id} with a duration of: {period_seconds}s")
+
+        for adaptation_set in period.findall("AdaptationSet", namespaces=namespaces):
+            content_type = adaptation_set.attrib.get("contentType", None)
+            representations = read_representations(adaptation_set)
+
+            if content_type == "video":
+                video_representation = select_video_representation(
+                    representations, policy
+                )
+                if video_representation is None:
+                    continue
+
+                video_alternatives[period_id] = sorted(
+                    [
+                        representation
+                        for representation in representations
+                        if representation["bandwidth"]
+                        < video_representation["bandwidth"]
+                    ],
+                    key=lambda representation: representation["bandwidth"],
+                )
+                parsed_result["videos_periods"][period_id] = build_period_result(
+                    video_representation, period_seconds
+                )
                 logger.info(
-                    f"Found a video for adaptation set {adaptation_set.attrib['id']} that has a bandwidth of {largest_video_bandwidth} in Representation {adaptation_set_video_bandwith_dict[largest_video_bandwidth]}"
+                    f"Selected video Representation {video_representation['id']} with a bandwidth of {video_representation['bandwidth']} for period {period_id}"
                 )
 
-                for representation in adaptation_set.findall(
-                    "Representation", namespaces={"": namespace}
-                ):
-                    if (
-                        int(representation.attrib["id"])
-                        == adaptation_set_video_bandwith_dict[largest_video_bandwidth]
-                    ):
-
-                        # TODO: Implement that actual video extraction:
-                        logger.info(
-                            "Extracted video from largest bandwidth representation set"
-                        )
+            if content_type == "audio":
+                audio_representation = select_audio_representation(representations)
+                if audio_representation is None:
+                    continue
 
-                        reddit_post_base_url = reddit_post_data.get("url", None)
-                        video_root_url = representation.find(
-                            "BaseURL", namespaces={"": namespace}
-                        ).text
-
-                        if (
-                            reddit_post_base_url is not None
-                            or video_root_url is not None
-                        ):
-                            video_url = f"{reddit_post_base_url}/{video_root_url}"
-                            logger.info(f"Making request to get video from {video_url}")
-
-                            time.sleep(random.randint(1, 3))
-                            video_response = requests.get(video_url)
-                            video_response.raise_for_status()
-                            time.sleep(random.randint(1, 3))
-
-                            video_stream = io.BytesIO(
-                                initial_bytes=video_response.content
-                            )
-                            logger.info(
-                                f"Extracted video file from reddit with {len(video_response.content)} bytes"
-                            )
-                            parsed_result["videos_periods"][
-                                int(period.attrib["id"])
-                            ] = {
-                                "mime_type": representation.attrib["mimeType"],
-                                "extension": video_root_url,
-                                "url": video_url,
-                                "video_byte_stream": video_stream,
-                            }
-
-            if adaptation_set.attrib["contentType"] == "audio":
-
-                # Mapping adaptaion set ids to bandwith values to find the highest resoloution video:
-                adaptation_set_audio_bandwith_dict = {}
-
-                for representation in adaptation_set.findall(
-                    "Representation", namespaces={"": namespace}
-                ):
-                    adaptation_set_audio_bandwith_dict[
-                        int(representation.attrib["bandwidth"])
-                    ] = int(representation.attrib["id"])
-
-                all_audio_bandwidths = [
-                    bandwidth for bandwidth in adaptation_set_audio_bandwith_dict.keys()
-                ]
-                all_audio_bandwidths.sort()
-                largest_audio_bandwidth = all_audio_bandwidths[0]
+                parsed_result["audio_periods"][period_id] = build_period_result(
+                    audio_representation, period_seconds
+                )
                 logger.info(
-                    f"Found audio for adaptation set {adaptation_set.attrib['id']} that has a bandwidth of {largest_audio_bandwidth} in Representation {adaptation_set_audio_bandwith_dict[largest_audio_bandwidth]}"
+                    f"Selected audio Representation {audio_representation['id']} with a bandwidth of {audio_representation['bandwidth']} for period {period_id}"
                 )
 
-                for representation in adaptation_set.findall(
-                    "Representation", namespaces={"": namespace}
-                ):
-                    if (
-                        int(representation.attrib["id"])
-                        == adaptation_set_audio_bandwith_dict[largest_audio_bandwidth]
-                    ):
+    def total_estimated_bytes() -> int:
+        return sum(
+            period_result["estimated_bytes"]
+            for period_results in (
+                parsed_result["videos_periods"],
+                parsed_result["audio_periods"],
+            )
+            for period_result in period_results.values()
+        )
 
-                        logger.info(
-                            "Extracted audio from largest bandwidth representation set"
-                        )
-                        reddit_post_base_url = reddit_post_data.get("url", None)
-                        audio_root_url = representation.find(
-                            "BaseURL", namespaces={"": namespace}
-                        ).text
-
-                        if (
-                            reddit_post_base_url is not None
-                            or audio_root_url is not None
-                        ):
-                            audio_full_url = f"{reddit_post_base_url}/{audio_root_url}"
-                            logger.info(
-                                f"Making requests to get audio from {audio_full_url}"
-                            )
-
-                            time.sleep(random.randint(1, 3))
-                            audio_response = requests.get(audio_full_url)
-                            audio_response.raise_for_status()
-                            time.sleep(random.randint(1, 3))
-
-                            audio_stream = io.BytesIO(
-                                initial_bytes=audio_response.content
-                            )
-                            logger.info(
-                                f"Extracted audio file from reddit with {len(audio_response.content)} bytes"
-                            )
-                            parsed_result["audio_periods"][int(period.attrib["id"])] = {
-                                "mime_type": representation.attrib["mimeType"],
-                                "extension": audio_root_url,
-                                "url": audio_full_url,
-                                "audio_byte_stream": audio_stream,
-                            }
+    max_post_bytes = policy.get("max_post_bytes", None)
+    while max_post_bytes is not None and total_estimated_bytes() > max_post_bytes:
+        reducible_periods = [
+            period_id
+            for period_id in parsed_result["videos_periods"]
+            if len(video_alternatives.get(period_id, [])) > 0
+        ]
+        if len(reducible_periods) == 0:
+            break
+
+        largest_period = max(
+            reducible_periods,
+            key=lambda period_id: parsed_result["videos_periods"][period_id][
+                "estimated_bytes"
+            ],
+        )
+        parsed_result["videos_periods"][largest_period] = build_period_result(
+            video_alternatives[largest_period].pop(), period_durations[largest_period]
+        )
 
+    parsed_result["estimated_bytes"] = total_estimated_bytes()
     return parsed_result
 
 
-def get_all_reddit_video_posts(secrets) -> list[dict]:
-    psql_engine = sa.create_engine(secrets["psql_uri"])
-
-    with psql_engine.connect() as conn, conn.begin():
-        get_all_posts = sa.text(
-            """
-            SELECT *
-            FROM core.source
-            WHERE type='reddit_post'
-            AND jsonb_typeof(fields->'staticFiles') = 'array'
-            AND EXISTS (
-                SELECT 1
-                FROM jsonb_array_elements(fields->'staticFiles') AS elem
-                WHERE elem->>'type' = 'REDDIT_VIDEO'
-                AND (
-                    NOT (elem ? 'static_downloaded_flag') -- Key does not exist
-                    OR elem->>'static_downloaded_flag' = 'false'
-                )
-                AND elem->>'id' = 'NULL'
-            );
-        """
-        )
-
-        results = conn.execute(get_all_posts)
-
-    return results.mappings().all()
-
-
-def get_reddit_video_posts(ids: list[str], secrets) -> list[dict]:
-    psql_engine = sa.create_engine(secrets["psql_uri"])
-
-    with psql_engine.connect() as conn, conn.begin():
-        get_all_posts = sa.text(
-            """
-            SELECT *
-            FROM core.source
-            WHERE source.id = ANY(:ids)
-            AND type='reddit_post'
-            AND jsonb_typeof(fields->'staticFiles') = 'array'
-            AND EXISTS (
-                SELECT 1
-                FROM jsonb_array_elements(fields->'staticFiles') AS elem
-                WHERE elem->>'type' = 'REDDIT_VIDEO'
-                AND (
-                    NOT (elem ? 'static_downloaded_flag') -- Key does not exist
-                    OR elem->>'static_downloaded_flag' = 'false'
-                )
-                AND elem->>'id' = 'NULL'
-            );
-        """
-        ).bindparams(sa.bindparam("ids", type_=ARRAY(UUID)))
-
-        results = conn.execute(get_all_posts, {"ids": ids})
+def parse_video_from_mpd_document(
+    reddit_video_info: RedditVideoInfoDict, reddit_post_data: dict, config: dict = {}
+) -> ParsedMPDResult:
 
-    return results.mappings().all()
+    # Retried posts usually find their manifest unchanged in the http cache:
+    mpd_content = cached_get(
+        reddit_video_info["dash_url"],
+        config,
+        rate_limiter=get_video_host_rate_limiter(reddit_video_info["dash_url"], config),
+    )
+    assert (
+        mpd_content is not None
+    ), f"Unable to fetch the mpd file from {reddit_video_info['dash_url']}"
+    logger.info(f"Extracted mpd file from {reddit_video_info['dash_url']}")
 
+    return select_mpd_representations(
+        mpd_content.decode(),
+        reddit_post_data,
+        reddit_video_info.get("duration", 0),
+        config,
+    )
 
-def update_reddit_post_video_content(
-    post_id: str, video_id: str, full_video_path: str, secrets
-) -> int:
 
-    psql_engine = sa.create_engine(secrets["psql_uri"])
+def get_video_host_rate_limiter(url: str, config: dict) -> RateLimiter:
+    return get_shared_rate_limiter(
+        url,
+        requests_per_second=config.get("video_requests_per_second", 0.5),
+        burst=config.get("video_request_burst", 1),
+    )
 
-    with psql_engine.connect() as conn, conn.begin():
-        update_reddit_post_query = sa.text(
-            """
-            UPDATE core.source
-            SET fields = jsonb_set(
-                jsonb_set(
-                    fields,
-                    '{staticFiles}',
-                    (
-                        SELECT jsonb_agg(
-                            CASE
-                                WHEN elem->>'id' = 'NULL' AND elem->>'type' = 'REDDIT_VIDEO'
-                                THEN elem || jsonb_build_object('id', :video_id, 'path', :full_video_path)
-                                ELSE elem
-                            END
-                        )
-                        FROM jsonb_array_elements(fields->'staticFiles') AS elem
-                    )
-                ),
-                '{static_downloaded_flag}',
-                'true'::jsonb,
-                true
-            )
-            WHERE id = :post_id
-            """
-        )
 
-        update_result = conn.execute(
-            update_reddit_post_query,
-            {
-                "post_id": post_id,
-                "video_id": video_id,
-                "full_video_path": full_video_path,
-            },
+def download_representations(
+    representation_downloads: list[tuple[str, str, str]],
+    file_io: FileInterface,
+    dir_name: str,
+    config: dict,
+) -> list[StreamDownloadDict | None]:
+    """
+    Stream a post's video and audio representations into storage in parallel.
+
+    Each download waits on the shared per-host rate limiter rather than sleeping
+    for a random interval, so concurrency is bounded by `representation_concurrency`
+    and the aggregate request rate to each host by `video_requests_per_second`.
+
+    Args:
+        representation_downloads (list[tuple[str, str, str]]): (url, filepath, mime type) for each representation.
+        file_io (FileInterface): The storage backend to stream into.
+        dir_name (str): The root directory / bucket to write into.
+        config (dict): The concurrency and rate limit settings plus the
+            resumable_stream_url_to_storage and file_io options.
+
+    Returns:
+        list[StreamDownloadDict | None]: One result per download in input order, None where it failed.
+    """
+
+    def download_representation(representation_download: tuple[str, str, str]):
+        url, filepath, mime_type = representation_download
+        get_video_host_rate_limiter(url, config).acquire()
+        return resumable_stream_url_to_storage(
+            url,
+            file_io,
+            dir_name,
+            filepath,
+            {**config, "content_type": mime_type},
         )
-        return update_result.rowcount
 
+    if len(representation_downloads) == 0:
+        return []
 
-def upload_mpd_reddit_record(reddit_video_content, secrets) -> int:
-    psql_engine = sa.create_engine(secrets["psql_uri"])
-    with psql_engine.connect() as conn, conn.begin():
-
-        insert_video_stream_query = sa.text(
-            """
-            INSERT INTO core.content (id, source, type, created_date, storage_path, fields)
-            VALUES (:id, :source, :type, :created_date, :storage_path, :fields)
-            """
+    with ThreadPoolExecutor(
+        max_workers=min(
+            config.get("representation_concurrency", 4), len(representation_downloads)
         )
-        video_stream_content_to_insert = {
-            "id": reddit_video_content.id,
-            "source": reddit_video_content.source,
-            "type": reddit_video_content.type,
-            "created_date": datetime.fromtimestamp(
-                reddit_video_content.created_date / 1000, tz=timezone.utc
-            ),
-            "storage_path": reddit_video_content.storage_path,
-            "fields": json.dumps(reddit_video_content.fields),
-        }
-
-        result = conn.execute(insert_video_stream_query, video_stream_content_to_insert)
-        logger.info(f"Inserted {result.rowcount} posts to tables")
-        return result.rowcount
-
+    ) as executor:
+        return list(executor.map(download_representation, representation_downloads))
 
-def ingest_all_video_data(secrets, reddit_ids: list[str] = []):
 
-    all_video_posts: list[dict] = get_reddit_video_posts(reddit_ids, secrets)
-
-    MINIO_CLIENT = Minio(
-        secrets["minio_url"],
-        access_key=secrets["minio_access_key"],
-        secret_key=secrets["minio_secret_key"],
-        secure=False,
+def get_representation_filepaths(
+    post_id: str, parsed_mpd_result: ParsedMPDResult
+) -> tuple[dict[int, str], dict[int, str]]:
+    """The storage paths of each period's video and audio representation, relative to the storage root."""
+    video_filepaths = {
+        period_id: f"{post_id}/{period_id}_{video_period['extension']}"
+        for period_id, video_period in parsed_mpd_result["videos_periods"].items()
+    }
+    audio_filepaths = {
+        period_id: f"{post_id}/{period_id}-{audio_period['extension']}"
+        for period_id, audio_period in parsed_mpd_result["audio_periods"].items()
+        if period_id in parsed_mpd_result["videos_periods"]
+    }
+    return video_filepaths, audio_filepaths
+
+
+def build_video_dash_manifest(
+    parsed_mpd_result: ParsedMPDResult,
+    video_filepaths: dict[int, str],
+    audio_filepaths: dict[int, str],
+) -> str:
+    """
+    Build the MPD file that plays the stored representations.
+
+    BaseURLs are relative to the manifest, which is stored next to the
+    representations in the post's directory.
+    """
+    mpd_ns = "urn:mpeg:dash:schema:mpd:2011"
+    xsi_ns = "http://www.w3.org/2001/XMLSchema-instance"
+    ET.register_namespace("", mpd_ns)
+    ET.register_namespace("xsi", xsi_ns)
+    mpd = ET.Element(
+        "MPD",
+        {
+            "xmlns": mpd_ns,
+            "xmlns:xsi": xsi_ns,
+            "profiles": "urn:mpeg:dash:profile:isoff-on-demand:2011",
+            "type": "static",
+            "xsi:schemaLocation": "urn:mpeg:dash:schema:mpd:2011 DASH-MPD.xsd",
+        },
     )
-    BUCKET_NAME = "reddit-posts"
 
-    for video_post in all_video_posts:
+    for period_id, video_period in parsed_mpd_result["videos_periods"].items():
 
-        time.sleep(random.randint(2, 4))
+        period = ET.SubElement(mpd, "Period", {"id": str(period_id)})
 
-        logger.info(
-            f"Starting to parse reddit video from node with id {video_post['id']}"
+        video_adaptation_set = ET.SubElement(
+            period,
+            "AdaptationSet",
+            {
+                "contentType": "video",
+                "id": str(period_id),
+            },
         )
-
-        try:
-            response = MINIO_CLIENT.get_object(
-                BUCKET_NAME, video_post["fields"]["jsonFilePath"]
+        representation = ET.SubElement(
+            video_adaptation_set,
+            "Representation",
+            {
+                "id": str(period_id),
+                "mimeType": video_period["mime_type"],
+                "bandwidth": str(video_period["bandwidth"]),
+            },
+        )
+        base_url = ET.SubElement(representation, "BaseURL")
+        base_url.text = os.path.basename(video_filepaths[period_id])
+
+        # Checking to see if video in this period has accompanying audio:
+        audio_period = parsed_mpd_result["audio_periods"].get(period_id, None)
+        if audio_period is not None:
+            audio_adaptation_set = ET.SubElement(
+                period,
+                "AdaptationSet",
+                {
+                    "contentType": "audio",
+                    "id": str(period_id),
+                },
             )
-            decoded_json = json.loads(response.data)
-
-            response_json = decoded_json[0]["data"]
-
-            post_data = response_json["children"][0]["data"]
+            audio_representation = ET.SubElement(
+                audio_adaptation_set,
+                "Representation",
+                {
+                    "id": str(period_id),
+                    "mimeType": audio_period["mime_type"],
+                    "bandwidth": str(audio_period["bandwidth"]),
+                },
+            )
+            base_url = ET.SubElement(audio_representation, "BaseURL")
+            base_url.text = os.path.basename(audio_filepaths[period_id])
+
+    return ET.tostring(mpd, encoding="unicode", method="xml")
+
+
+def complete_video_task(
+    video_task: PipelineTaskDict | None,
+    status: str,
+    database_io: DatabaseInterface,
+    config: dict,
+):
+    # Posts ingested by explicit id have no task to complete:
+    if video_task is None:
+        return
+    database_io.complete_task(
+        id=str(video_task["id"]),
+        status=status,
+        db_engine=config["db_engine"],
+        config=config,
+    )
 
-            media_dict = post_data.get("secure_media", None)
-            if media_dict is not None:
-                reddit_video: RedditVideoInfoDict = media_dict.get("reddit_video", None)
-                parsed_mpd_result: ParsedMPDResult = parse_video_from_mpd_document(
-                    reddit_video, post_data
-                )
 
-                logger.info(
-                    f"Successfully parsed the mpd result with {len(parsed_mpd_result['videos_periods'].keys())} periods"
-                )
+def ingest_video_post(
+    video_post: RedditPostDict,
+    video_task: PipelineTaskDict | None,
+    file_io: FileInterface,
+    database_io: DatabaseInterface,
+    config: dict,
+    bandwidth_budget: DailyBandwidthBudget | None = None,
+) -> bool:
+    """
+    Download one reddit video post's DASH streams into storage and record the new content.
+
+    The predicted transfer size is checked against `max_post_bytes` and reserved
+    from `bandwidth_budget` before anything is downloaded. A post that doesn't fit
+    today's budget is put back on the queue as pending.
+
+    Args:
+        video_post (RedditPostDict): A stored post with a pending video static file.
+        video_task (PipelineTaskDict | None): The claimed VIDEO_DOWNLOAD task for the post, if any.
+        file_io (FileInterface): Where the post json is read from and the streams are written to, under `root_dir_name`.
+        database_io (DatabaseInterface): Where the content record and task status are written.
+        config (dict): db_engine, root_dir_name plus the download, selection and file_io options.
+        bandwidth_budget (DailyBandwidthBudget | None): The shared daily budget, None for no limit.
+
+    Returns:
+        bool: True if the post was ingested, False if it failed or was deferred.
+    """
+    root_dir_name: str = config["root_dir_name"]
+
+    logger.info(f"Starting to parse reddit video from node with id {video_post['id']}")
+
+    try:
+        json_stream = file_io.read_file(
+            dir_name=root_dir_name,
+            filepath=video_post["fields"]["json_file_path"],
+            config=config,
+        )
+        assert isinstance(
+            json_stream, io.BytesIO
+        ), f"Unable to read post json for {video_post['id']}"
+
+        post_data = json.loads(json_stream.read())[0]["data"]["children"][0]["data"]
+
+        reddit_video: RedditVideoInfoDict | None = (
+            post_data.get("secure_media", None) or {}
+        ).get("reddit_video", None)
+        if reddit_video is None:
+            logger.warning(f"Post {video_post['id']} has no reddit video to ingest")
+            complete_video_task(video_task, "done", database_io, config)
+            return True
+
+        parsed_mpd_result: ParsedMPDResult = parse_video_from_mpd_document(
+            reddit_video, post_data, config
+        )
+        logger.info(
+            f"Successfully parsed the mpd result with {len(parsed_mpd_result['videos_periods'].keys())} periods, predicted transfer of {parsed_mpd_result['estimated_bytes']} bytes"
+        )
 
-                mpd_file_byte_stream = io.BytesIO(
-                    parsed_mpd_result["mpd_file"].encode("UTF-8")
-                )
+        max_post_bytes = config.get("max_post_bytes", None)
+        assert (
+            max_post_bytes is None
+            or parsed_mpd_result["estimated_bytes"] <= max_post_bytes
+        ), f"Smallest representations of post {video_post['id']} need {parsed_mpd_result['estimated_bytes']} bytes, over max_post_bytes of {max_post_bytes}"
 
-                MINIO_CLIENT.put_object(
-                    bucket_name=BUCKET_NAME,
-                    object_name=f"{video_post['id']}/Origin_DASH.mpd",
-                    data=mpd_file_byte_stream,
-                    length=mpd_file_byte_stream.getbuffer().nbytes,
-                    content_type="application/dash+xml",
-                )
+        if bandwidth_budget is not None and not bandwidth_budget.reserve(
+            parsed_mpd_result["estimated_bytes"]
+        ):
+            complete_video_task(video_task, "pending", database_io, config)
+            return False
 
-                # Creating the new MDP file for the uploaded content:
-                mpd_ns = "urn:mpeg:dash:schema:mpd:2011"
-                xsi_ns = "http://www.w3.org/2001/XMLSchema-instance"
-                ET.register_namespace("", mpd_ns)
-                ET.register_namespace("xsi", xsi_ns)
-                mpd = ET.Element(
-                    "MPD",
-                    {
-                        "xmlns": mpd_ns,
-                        "xmlns:xsi": xsi_ns,
-                        "profiles": "urn:mpeg:dash:profile:isoff-on-demand:2011",
-                        "type": "static",
-                        "xsi:schemaLocation": "urn:mpeg:dash:schema:mpd:2011 DASH-MPD.xsd",
-                    },
+        # The reservation is always settled to what was transferred, so failed downloads don't eat the budget:
+        transferred_bytes = 0
+        try:
+            assert (
+                file_io.upload_file(
+                    io.BytesIO(parsed_mpd_result["mpd_file"].encode("UTF-8")),
+                    dir_name=root_dir_name,
+                    filepath=f"{video_post['id']}/Origin_DASH.mpd",
+                    config={**config, "content_type": "application/dash+xml"},
                 )
+                is not None
+            ), f"Unable to store the original MPD file for {video_post['id']}"
 
-                # Uploading video files:
-                for period_id, video_period in parsed_mpd_result[
-                    "videos_periods"
-                ].items():
-
-                    period = ET.SubElement(mpd, "Period", {"id": str(period_id)})
-
-                    video_period_filename = (
-                        f"{video_post['id']}/{period_id}_{video_period['extension']}"
-                    )
-                    video_period["video_byte_stream"].seek(0)
-
-                    # Static File Uploads:
-                    MINIO_CLIENT.put_object(
-                        bucket_name=BUCKET_NAME,
-                        object_name=video_period_filename,
-                        data=video_period["video_byte_stream"],
-                        length=video_period["video_byte_stream"].getbuffer().nbytes,
-                        content_type=video_period["mime_type"],
-                    )
-
-                    logger.info(
-                        f"Uploaded video file to blob at {video_period_filename}"
+            # Every period's video and audio representation is downloaded concurrently up front:
+            video_filepaths, audio_filepaths = get_representation_filepaths(
+                video_post["id"], parsed_mpd_result
+            )
+            representation_downloads: list[tuple[str, str, str]] = []
+            for period_id, video_period in parsed_mpd_result["videos_periods"].items():
+                representation_downloads.append(
+                    (
+                        video_period["url"],
+                        video_filepaths[period_id],
+                        video_period["mime_type"],
                     )
-
-                    video_adaptation_set = ET.SubElement(
-                        period,
-                        "AdaptationSet",
-                        {
-                            "contentType": "video",
-                            "id": str(period_id),
-                        },
+                )
+                if period_id in audio_filepaths:
+                    audio_period = parsed_mpd_result["audio_periods"][period_id]
+                    representation_downloads.append(
+                        (
+                            audio_period["url"],
+                            audio_filepaths[period_id],
+                            audio_period["mime_type"],
+                        )
                     )
 
-                    representation = ET.SubElement(
-                        video_adaptation_set,
-                        "Representation",
-                        {
-                            "id": str(period_id),
-                            "mimeType": video_period["mime_type"],
-                        },
-                    )
-                    base_url = ET.SubElement(representation, "BaseURL")
-                    base_url.text = video_period_filename
+            representation_results = download_representations(
+                representation_downloads, file_io, root_dir_name, config
+            )
+            transferred_bytes = sum(
+                representation_result["bytes"]
+                for representation_result in representation_results
+                if representation_result is not None
+            )
+        finally:
+            if bandwidth_budget is not None:
+                bandwidth_budget.adjust(
+                    transferred_bytes - parsed_mpd_result["estimated_bytes"]
+                )
 
-                    # Checking to see if video in this period has accompanying audio:
-                    audio_period = parsed_mpd_result["audio_periods"].get(
-                        period_id, None
-                    )
-                    if audio_period is not None:
-                        logger.info(
-                            f"Extracting audio stream for video in period {period_id}"
-                        )
-                        audio_period_filename = f"{video_post['id']}/{period_id}-{audio_period['extension']}"
-                        audio_period["audio_byte_stream"].seek(0)
-
-                        # Static File Uploads:
-                        MINIO_CLIENT.put_object(
-                            bucket_name=BUCKET_NAME,
-                            object_name=audio_period_filename,
-                            data=audio_period["audio_byte_stream"],
-                            length=audio_period["audio_byte_stream"].getbuffer().nbytes,
-                            content_type=audio_period["mime_type"],
-                        )
+        for (url, filepath, _), representation_result in zip(
+            representation_downloads, representation_results
+        ):
+            assert (
+                representation_result is not None
+            ), f"Unable to stream representation from {url}"
+            logger.info(f"Stored representation at {filepath}")
+
+        video_stream_path = f"{video_post['id']}/Video_DASH.mpd"
+        assert (
+            file_io.upload_file(
+                io.BytesIO(
+                    build_video_dash_manifest(
+                        parsed_mpd_result, video_filepaths, audio_filepaths
+                    ).encode()
+                ),
+                dir_name=root_dir_name,
+                filepath=video_stream_path,
+                config={**config, "content_type": "application/dash+xml"},
+            )
+            is not None
+        ), f"Unable to store {video_stream_path}"
+        logger.info(f"Uploaded {video_stream_path}")
+
+        # Create a content record for the uploaded MPD:
+        video_stream_content: RedditContentDict = {
+            "id": str(uuid.uuid3(uuid.NAMESPACE_URL, video_stream_path)),
+            "source": str(video_post["id"]),
+            "type": "VIDEO_DASH_STREAM",
+            "created_date": video_post["created_date"],
+            "storage_path": video_stream_path,
+            "fields": reddit_video,
+        }
+        assert (
+            database_io.upload_mpd_reddit_record(
+                video_stream_content, config["db_engine"], config
+            )
+            == 1
+        )
+        assert (
+            database_io.update_reddit_post_video_content(
+                post_id=video_post["id"],
+                video_id=video_stream_content["id"],
+                full_video_path=video_stream_path,
+                db_engine=config["db_engine"],
+                config=config,
+            )
+            == 1
+        )
 
-                        logger.info(
-                            f"Uploaded audio file to blob at {audio_period_filename}"
-                        )
+        logger.info(
+            f"Sucessfully uploaded video stream for reddit post {video_post['id']}"
+        )
+        complete_video_task(video_task, "done", database_io, config)
+        return True
 
-                        audio_adaptation_set = ET.SubElement(
-                            period,
-                            "AdaptationSet",
-                            {
-                                "contentType": "audio",
-                                "id": str(period_id),
-                            },
-                        )
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        complete_video_task(video_task, "failed", database_io, config)
+        return False
 
-                        audio_representation = ET.SubElement(
-                            audio_adaptation_set,
-                            "Representation",
-                            {
-                                "id": str(period_id),
-                                "mimeType": audio_period["mime_type"],
-                            },
-                        )
-                        base_url = ET.SubElement(audio_representation, "BaseURL")
-                        base_url.text = audio_period_filename
-
-                new_mpd_file = ET.tostring(mpd, encoding="unicode", method="xml")
-                new_mpd_file_byte_stream = io.BytesIO(new_mpd_file.encode())
-                logger.info("Built new MPD file referencing uploaded video files")
-
-                MINIO_CLIENT.put_object(
-                    bucket_name=BUCKET_NAME,
-                    object_name=f"{video_post['id']}/Video_DASH.mpd",
-                    data=new_mpd_file_byte_stream,
-                    length=new_mpd_file_byte_stream.getbuffer().nbytes,
-                    content_type="application/dash+xml",
-                )
-                logger.info(f"Uploaded {video_post['id']}/Video_DASH.mpd")
 
-                # Create a content record:
-                video_stream_id: str = str(
-                    uuid.uuid3(uuid.NAMESPACE_URL, f"{video_post['id']}/Video_DASH.mpd")
-                )
-                video_stream_path = f"{video_post['id']}/Video_DASH.mpd"
-                # Upload an MPD content object:
-                utc_datetime = int(
-                    datetime.combine(video_post["created_date"], dt_time.min)
-                    .replace(tzinfo=timezone.utc)
-                    .timestamp()
-                    * 1000
-                )
-                video_stream_content = dict(
-                    id=video_stream_id,
-                    source=str(video_post["id"]),
-                    type="VIDEO_DASH_STREAM",
-                    created_date=utc_datetime,
-                    storage_path=video_stream_path,
-                    fields=reddit_video,
-                )
-                assert upload_mpd_reddit_record(video_stream_content, secrets) == 1
-
-                assert (
-                    update_reddit_post_video_content(
-                        post_id=video_post["id"],
-                        video_id=video_stream_id,
-                        full_video_path=video_stream_path,
-                        secrets=secrets,
-                    )
-                    == 1
-                )
+def ingest_all_video_data(
+    file_io: FileInterface,
+    database_io: DatabaseInterface,
+    config: dict,
+    reddit_ids: list[str] = [],
+) -> int:
+    """
+    Ingest every claimed (or explicitly listed) video post with a pool of `video_worker_count` workers.
+
+    Posts are processed concurrently and each post downloads its representations
+    concurrently, the shared per-host rate limiters keep the combined request
+    rate to reddit within `video_requests_per_second`.
+
+    Args:
+        file_io (FileInterface): The storage backend holding the post json and receiving the streams.
+        database_io (DatabaseInterface): The database holding the posts and the tasks outbox.
+        config (dict): db_engine, root_dir_name (plus MINIO_CLIENT for S3) and the ingestion options.
+        reddit_ids (list[str]): Posts to ingest. If empty, up to `task_batch_size` pending
+            VIDEO_DOWNLOAD tasks are claimed instead.
+
+    Returns:
+        int: The number of posts ingested.
+    """
+
+    # With no explicit ids the posts to process are drained from the tasks outbox:
+    video_tasks_by_post_id: dict[str, PipelineTaskDict] = {}
+    if len(reddit_ids) == 0:
+        claimed_tasks = database_io.claim_tasks(
+            task_type=VIDEO_DOWNLOAD_TASK,
+            limit=config.get("task_batch_size", 100),
+            worker_id=f"{socket.gethostname()}-{os.getpid()}",
+            db_engine=config["db_engine"],
+            config=config,
+        )
+        if claimed_tasks is None:
+            logger.error("Exiting after error claiming video tasks")
+            return 0
+
+        video_tasks_by_post_id = {str(task["post_id"]): task for task in claimed_tasks}
+        reddit_ids = list(video_tasks_by_post_id.keys())
+        logger.info(f"Claimed {len(reddit_ids)} video posts from the tasks outbox")
+
+    all_posts = database_io.get_reddit_posts(reddit_ids, config["db_engine"], config)
+    if all_posts is None:
+        logger.error("Exiting after error reading the video posts")
+        return 0
+
+    all_video_posts: list[RedditPostDict] = []
+    for post in all_posts:
+        if any(
+            is_pending_video_static_file(static_file)
+            for static_file in post["fields"].get("static_files", [])
+        ):
+            all_video_posts.append(post)
+        else:
+            logger.info(f"Post {post['id']} has no video left to ingest")
+            complete_video_task(
+                video_tasks_by_post_id.get(post["id"], None),
+                "done",
+                database_io,
+                config,
+            )
 
-                logger.info(
-                    f"Sucessfully uploaded video stream for reddit post {video_post['id']}"
-                )
+    bandwidth_budget = (
+        DailyBandwidthBudget(
+            config["daily_bandwidth_budget_bytes"],
+            state_path=config.get("bandwidth_budget_path", None),
+        )
+        if config.get("daily_bandwidth_budget_bytes", None) is not None
+        else None
+    )
 
-        except Exception as e:
-            logger.error(traceback.format_exc())
+    with ThreadPoolExecutor(
+        max_workers=max(1, config.get("video_worker_count", 1))
+    ) as executor:
+        ingested_posts = list(
+            executor.map(
+                lambda video_post: ingest_video_post(
+                    video_post,
+                    video_tasks_by_post_id.get(video_post["id"], None),
+                    file_io,
+                    database_io,
+                    config,
+                    bandwidth_budget,
+                ),
+                all_video_posts,
+            )
+        )
 
-        finally:
-            response.close()
-            response.release_conn()
+    logger.info(
+        f"Ingested {sum(ingested_posts)} of {len(all_video_posts)} reddit video posts"
+    )
+    if config.get("http_cache_dir", None) is not None:
+        http_cache_stats = get_shared_http_cache(config["http_cache_dir"]).stats()
+        logger.info(
+            f"Manifest cache: {http_cache_stats['hits']} hits, {http_cache_stats['revalidated']} revalidated, {http_cache_stats['misses']} misses ({http_cache_stats['hit_rate']:.0%} served without a download)"
+        )
+    return sum(ingested_posts)
@@ -0,0 +1,436 @@
+import os
+import json
+import uuid
+import traceback
+import pprint
+import pandas as pd
+import sqlalchemy as sa
+
+from loguru import logger
+from typing import Protocol
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
+
+from library.types import RedditPostDict, PostSpatialLabelDict
+from library.io_interfaces.db_io import (
+    _insert_sqlite_post_labels,
+    _get_sqlite_posts_w_labels,
+    _insert_postgres_post_labels,
+    _get_postgres_posts_w_labels,
+    _insert_sqlite_post_tasks,
+    _insert_postgres_post_tasks,
+)
+
+
+class AsyncDatabaseInterface(Protocol):
+    """
+    asyncio variant of the DatabaseInterface.
+
+    Methods mirror the DatabaseInterface signatures but are coroutines that
+    take an AsyncEngine, so an orchestrator can `asyncio.gather` dedup, insert
+    and label calls without parking a thread on each query. Concurrency is
+    bounded by the pool size of the AsyncEngine.
+    """
+
+    async def get_unique_posts(
+        ids: list[str], db_engine: AsyncEngine, config: dict
+    ) -> list[str] | None:
+        ...
+
+    async def insert_reddit_posts_db(
+        reddit_post: RedditPostDict, db_engine: AsyncEngine, config: dict
+    ) -> str | None:
+        ...
+
+    async def get_post_w_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        ...
+
+    async def add_post_labels(
+        labels: list[PostSpatialLabelDict], db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        ...
+
+    async def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: AsyncEngine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        ...
+
+    async def remove_post_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> int | None:
+        ...
+
+
+class AsyncSQLiteInterface(AsyncDatabaseInterface):
+    async def get_unique_posts(
+        ids: list[str], db_engine: AsyncEngine, config: dict
+    ) -> list[str] | None:
+        try:
+            async with db_engine.begin() as conn:
+                get_unique_id_query = sa.text(
+                    """
+                SELECT id
+                FROM source
+                WHERE source.id IN :ids
+                AND type = 'reddit_post'
+                """
+                ).bindparams(sa.bindparam("ids", expanding=True))
+
+                logger.info(f"Querying all ids that already exists from id set {ids}")
+                existing_id_results = await conn.execute(
+                    get_unique_id_query, {"ids": ids}
+                )
+                existing_ids_dicts = existing_id_results.mappings().all()
+
+            return [str(post["id"]) for post in existing_ids_dicts]
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def insert_reddit_posts_db(
+        reddit_post: RedditPostDict, db_engine: AsyncEngine, config: dict
+    ) -> str | None:
+        try:
+            async with db_engine.begin() as conn:
+                insert_query = sa.text(
+                    """
+                    INSERT INTO source (id, type, created_date, fields)
+                    VALUES (:id, :type, :created_date, :fields);
+                    """
+                )
+
+                posts_to_insert = {
+                    "id": reddit_post["id"],
+                    "type": reddit_post["type"],
+                    "created_date": datetime.fromtimestamp(
+                        reddit_post["created_date"] / 1000, tz=timezone.utc
+                    ),
+                    "fields": json.dumps(reddit_post["fields"]),
+                }
+
+                result = await conn.execute(insert_query, posts_to_insert)
+                await conn.run_sync(
+                    _insert_sqlite_post_tasks,
+                    reddit_post,
+                    posts_to_insert["created_date"],
+                )
+                result_message = f"Inserted {result.rowcount} posts to tables {pprint.pformat(posts_to_insert)}"
+                logger.info(result_message)
+
+                return result_message
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def get_post_w_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            async with db_engine.begin() as conn:
+                df = await conn.run_sync(_get_sqlite_posts_w_labels, [id])
+                logger.info(df)
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def add_post_labels(
+        labels: list[PostSpatialLabelDict], db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            async with db_engine.begin() as conn:
+                await conn.run_sync(_insert_sqlite_post_labels, labels)
+                df = await conn.run_sync(
+                    _get_sqlite_posts_w_labels,
+                    list({label["post_id"] for label in labels}),
+                )
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: AsyncEngine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        try:
+            if any(label["post_id"] != id for label in labels):
+                raise ValueError(
+                    f"All labels passed to replace_post_labels must belong to post {id}"
+                )
+
+            async with db_engine.begin() as conn:
+                delete_query = sa.text("DELETE FROM labels WHERE labels.post_id = :id")
+                result = await conn.execute(delete_query, parameters={"id": id})
+                logger.info(f"Deleted {result.rowcount} existing labels for post {id}")
+
+                await conn.run_sync(_insert_sqlite_post_labels, labels)
+                df = await conn.run_sync(_get_sqlite_posts_w_labels, [id])
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def remove_post_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> int | None:
+        try:
+            async with db_engine.begin() as conn:
+                delete_query = sa.text("DELETE FROM labels WHERE labels.label_id = :id")
+                result = await conn.execute(delete_query, parameters={"id": id})
+                logger.info(
+                    f"Deleted row {id} from labels table sucessfully. Rows removed: {result.rowcount}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+
+class AsyncPostgresInterface(AsyncDatabaseInterface):
+    async def get_unique_posts(
+        ids: list[str], db_engine: AsyncEngine, config: dict
+    ) -> list[str] | None:
+        try:
+            async with db_engine.begin() as conn:
+                get_unique_id_query = sa.text(
+                    """
+                SELECT id
+                FROM core.source
+                WHERE source.id = ANY(:ids)
+                AND type = 'reddit_post'
+                """
+                ).bindparams(sa.bindparam("ids", type_=ARRAY(UUID)))
+
+                logger.info(f"Querying all ids that already exists from id set {ids}")
+                existing_id_results = await conn.execute(
+                    get_unique_id_query, {"ids": [uuid.UUID(id) for id in ids]}
+                )
+                existing_ids_dicts = existing_id_results.mappings().all()
+
+            return [str(post["id"]) for post in existing_ids_dicts]
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def insert_reddit_posts_db(
+        reddit_post: RedditPostDict, db_engine: AsyncEngine, config: dict
+    ) -> str | None:
+        try:
+            async with db_engine.begin() as conn:
+                insert_query = sa.text(
+                    """
+                    INSERT INTO core.source (id, type, created_date, fields)
+                    VALUES (:id, :type, :created_date, :fields);
+                    """
+                ).bindparams(
+                    sa.bindparam("id", type_=UUID),
+                    sa.bindparam("fields", type_=JSONB),
+                )
+
+                posts_to_insert = {
+                    "id": uuid.UUID(reddit_post["id"]),
+                    "type": reddit_post["type"],
+                    "created_date": datetime.fromtimestamp(
+                        reddit_post["created_date"] / 1000, tz=timezone.utc
+                    ),
+                    "fields": reddit_post["fields"],
+                }
+
+                result = await conn.execute(insert_query, posts_to_insert)
+                await conn.run_sync(
+                    _insert_postgres_post_tasks,
+                    reddit_post,
+                    posts_to_insert["created_date"],
+                )
+                result_message = f"Inserted {result.rowcount} posts to tables {pprint.pformat(posts_to_insert)}"
+                logger.info(result_message)
+
+                return result_message
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def get_post_w_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            async with db_engine.begin() as conn:
+                df = await conn.run_sync(_get_postgres_posts_w_labels, [id])
+                logger.info(df)
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def add_post_labels(
+        labels: list[PostSpatialLabelDict], db_engine: AsyncEngine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            async with db_engine.begin() as conn:
+                await conn.run_sync(_insert_postgres_post_labels, labels)
+                df = await conn.run_sync(
+                    _get_postgres_posts_w_labels,
+                    list({label["post_id"] for label in labels}),
+                )
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: AsyncEngine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        try:
+            if any(label["post_id"] != id for label in labels):
+                raise ValueError(
+                    f"All labels passed to replace_post_labels must belong to post {id}"
+                )
+
+            async with db_engine.begin() as conn:
+                delete_query = sa.text(
+                    "DELETE FROM core.labels WHERE labels.post_id = :id"
+                ).bindparams(sa.bindparam("id", type_=UUID))
+                result = await conn.execute(
+                    delete_query, parameters={"id": uuid.UUID(id)}
+                )
+                logger.info(f"Deleted {result.rowcount} existing labels for post {id}")
+
+                await conn.run_sync(_insert_postgres_post_labels, labels)
+                df = await conn.run_sync(_get_postgres_posts_w_labels, [id])
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    async def remove_post_labels(
+        id: str, db_engine: AsyncEngine, config: dict
+    ) -> int | None:
+        try:
+            async with db_engine.begin() as conn:
+                delete_query = sa.text(
+                    "DELETE FROM core.labels WHERE labels.label_id = :id"
+                )
+                result = await conn.execute(delete_query, parameters={"id": id})
+                logger.info(
+                    f"Deleted row {id} from labels table sucessfully. Rows removed: {result.rowcount}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+
+def _load_spatialite_aiosqlite(dbapi_conn, connection_record):
+    # geoalchemy2's load_spatialite expects a blocking sqlite3 connection so the extension
+    # is loaded through the aiosqlite connection that sits under SQLAlchemy's adapter:
+    spatialite_path = os.environ.get("SPATIALITE_LIBRARY_PATH", "mod_spatialite")
+
+    async def load_extension(driver_conn):
+        await driver_conn.enable_load_extension(True)
+        await driver_conn.load_extension(spatialite_path)
+        await driver_conn.enable_load_extension(False)
+
+    dbapi_conn.run_async(load_extension)
+
+
+def create_async_sqlite_engine(sqlite_db_path: str, config: dict) -> AsyncEngine:
+    """
+    Build an aiosqlite backed AsyncEngine for the AsyncSQLiteInterface.
+
+    Args:
+        sqlite_db_path (str): The full filepath to the SQLite database.
+        config (dict): Optional `pool_size`, `max_overflow` and `load_spatialite` (defaults to True).
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:////{sqlite_db_path}",
+        pool_size=config.get("pool_size", 5),
+        max_overflow=config.get("max_overflow", 0),
+        poolclass=sa.pool.AsyncAdaptedQueuePool,
+    )
+    if config.get("load_spatialite", True):
+        sa.event.listen(engine.sync_engine, "connect", _load_spatialite_aiosqlite)
+
+    return engine
+
+
+def create_async_postgres_engine(db_uri: str, config: dict) -> AsyncEngine:
+    """
+    Build an asyncpg backed AsyncEngine for the AsyncPostgresInterface.
+
+    asyncpg prepares every statement it runs and keeps them in a per-connection
+    LRU, sized here by `prepared_statement_cache_size`.
+
+    Args:
+        db_uri (str): A postgres URI. The driver is always switched to asyncpg.
+        config (dict): Optional overrides for `pool_size`, `max_overflow`,
+            `pool_recycle`, `pool_timeout` and `prepared_statement_cache_size`.
+
+    Returns:
+        AsyncEngine: The configured engine.
+    """
+    postgres_url = sa.engine.make_url(db_uri).set(
+        drivername="postgresql+asyncpg",
+    )
+    postgres_url = postgres_url.update_query_dict(
+        {
+            "prepared_statement_cache_size": str(
+                config.get("prepared_statement_cache_size", 100)
+            )
+        }
+    )
+
+    return create_async_engine(
+        postgres_url,
+        pool_size=config.get("pool_size", 10),
+        max_overflow=config.get("max_overflow", 20),
+        pool_recycle=config.get("pool_recycle", 1800),
+        pool_timeout=config.get("pool_timeout", 30),
+        pool_pre_ping=True,
+    )
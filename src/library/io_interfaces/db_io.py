@@ -7,10 +7,19 @@ import pprint
 
 from loguru import logger
 from typing import Protocol
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.dialects.postgresql import ARRAY, UUID, VARCHAR
 
-from library.types import RedditPostDict, PostSpatialLabelDict
+from library.types import (
+    RedditPostDict,
+    RedditContentDict,
+    PostSpatialLabelDict,
+    PipelineTaskDict,
+)
+
+# Downstream work implied by a newly inserted post, written to the tasks outbox in the same transaction:
+VIDEO_DOWNLOAD_TASK = "VIDEO_DOWNLOAD"
+COMMENT_EXTRACTION_TASK = "COMMENT_EXTRACTION"
 
 
 class DatabaseInterface(Protocol):
@@ -41,15 +50,74 @@ class DatabaseInterface(Protocol):
             db_engine (sa.engine.Engine): SQLAlchemy engine for database connection.
             config (dict): Configuration dictionary (currently unused).
 
+        The downstream tasks the post implies (see `get_post_task_types`) are
+        written to the tasks outbox table in the same transaction.
+
         Returns:
             Optional[str]: A log message describing the insert result, or None if an error occurs.
         """
         ...
 
-    def upload_mpd_reddit_record():
+    def get_reddit_posts(
+        ids: list[str], db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+        """
+        Retrieve stored Reddit posts by id.
+
+        Args:
+            ids (list[str]): The ids of the posts to read. Ids that don't exist are skipped.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            list[RedditPostDict] | None: The posts that were found, or None on error.
+        """
+        ...
+
+    def upload_mpd_reddit_record(
+        reddit_video_content: RedditContentDict,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        """
+        Insert the content record for an ingested video stream.
+
+        Re-uploading the same content id replaces the record so a post retried
+        after a failed `update_reddit_post_video_content` doesn't conflict.
+
+        Args:
+            reddit_video_content (RedditContentDict): The content record, `storage_path` is the DASH manifest.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            int | None: The number of content records written, or None on error.
+        """
         ...
 
-    def update_reddit_post_video_content():
+    def update_reddit_post_video_content(
+        post_id: str,
+        video_id: str,
+        full_video_path: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        """
+        Point a post's pending video static file at its ingested content record.
+
+        Every `static_files` entry of type video with an id of "NULL" gets the
+        content id and manifest path, and the post's `static_downloaded_flag` is set.
+
+        Args:
+            post_id (str): The post that was ingested.
+            video_id (str): The id of the content record from `upload_mpd_reddit_record`.
+            full_video_path (str): The storage path of the DASH manifest.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            int | None: The number of posts updated, or None on error.
+        """
         ...
 
     def get_all_posts_w_labels(
@@ -62,22 +130,447 @@ class DatabaseInterface(Protocol):
     ) -> pd.DataFrame | None:
         ...
 
+    def get_unlabeled_posts_page(
+        page_current: int,
+        page_size: int,
+        filters: list[tuple[str, str, str | float]],
+        sort_by: list[dict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> tuple[pd.DataFrame, int] | None:
+        """
+        Retrieve one page of lightweight rows for the posts that have no labels yet.
+
+        Rows only carry the UNLABELED_POSTS_TABLE_COLUMNS, not the full `fields`
+        json, so a page stays small regardless of the post metadata. Filtering,
+        sorting and paging all happen in the database.
+
+        Args:
+            page_current (int): The zero based page to return.
+            page_size (int): The number of rows per page.
+            filters (list[tuple[str, str, str | float]]): (column, operator, value) conditions that
+                are ANDed together. Operators are =, !=, <, <=, >, >=, contains and datestartswith.
+            sort_by (list[dict]): Dash DataTable style `{"column_id": ..., "direction": "asc" | "desc"}`
+                sort keys in priority order. Newest posts first when empty.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            tuple[pd.DataFrame, int] | None: The page of rows and the total number of matching posts, or None on error.
+        """
+        ...
+
     def get_post_w_labels(
         id: str, db_engine: sa.engine.Engine, config: dict
     ) -> dict[RedditPostDict, list[PostSpatialLabelDict]] | None:
         ...
 
-    def replace_post_labels():
+    def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        """
+        Replace every label attached to a post with a new set of labels.
+
+        The delete of the existing labels and the insert of the new ones run in
+        a single transaction so a failed save never leaves a post half-labelled.
+
+        Args:
+            id (str): The id of the post whose labels are replaced.
+            labels (list[PostSpatialLabelDict]): The new labels. Every label must reference post `id`.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            pd.DataFrame | None: The post joined to its new labels, or None on error.
+        """
         ...
 
     def add_post_labels(
         labels: list[PostSpatialLabelDict], db_engine: sa.engine.Engine, config: dict
     ) -> pd.DataFrame | None:
+        """
+        Insert a batch of labels.
+
+        Args:
+            labels (list[PostSpatialLabelDict]): The labels to insert.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            pd.DataFrame | None: The posts referenced by `labels` joined to all of their labels, or None on error.
+        """
         ...
 
     def remove_post_labels(id: str, db_engine: sa.engine.Engine, config: dict) -> int:
         ...
 
+    def get_reddit_posts_page(
+        after_id: str | None, limit: int, db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+        """
+        Retrieve a page of stored Reddit posts ordered by id.
+
+        Pages are keyed on the last id seen rather than an OFFSET so walking the
+        whole corpus costs one primary key range scan per page.
+
+        Args:
+            after_id (str | None): Only return posts with an id greater than this. None for the first page.
+            limit (int): The maximum number of posts to return.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            list[RedditPostDict] | None: Up to `limit` posts, an empty list once the corpus is exhausted, or None on error.
+        """
+        ...
+
+    def get_posts_in_extent(
+        bbox: tuple[float, float, float, float],
+        time_range: tuple[datetime, datetime] | None,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        """
+        Retrieve all posts that have a label intersecting a bounding box.
+
+        The query is expected to be answered through the spatial index on the
+        labels geometry column (SpatiaLite R-tree / PostGIS GiST) rather than a
+        scan of the labels table.
+
+        Args:
+            bbox (tuple[float, float, float, float]): The extent to search as
+                (min_x, min_y, max_x, max_y) in EPSG:4326.
+            time_range (tuple[datetime, datetime] | None): Optional inclusive
+                (start, end) range that the post created_date must fall within.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            pd.DataFrame | None: One row per matching label joined to its post, or None on error.
+        """
+        ...
+
+    def get_label_centroids(
+        db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        """
+        Retrieve the centroid of every label geometry.
+
+        Only the ids and two coordinates per label leave the database, which is what
+        the map's label clusters are built from.
+
+        Args:
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            pd.DataFrame | None: One row per label with label_id, post_id, longitude and latitude, or None on error.
+        """
+        ...
+
+    def claim_tasks(
+        task_type: str,
+        limit: int,
+        worker_id: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> list[PipelineTaskDict] | None:
+        """
+        Atomically claim up to `limit` pending tasks of a given type from the tasks outbox.
+
+        Concurrent workers never receive the same task, and the cost of a claim
+        is proportional to the amount of pending work rather than the size of
+        the source table. A claim is a lease: tasks still 'claimed' more than
+        `task_claim_timeout_seconds` (default one hour) after their `claimed_date`
+        belong to a worker that died and are claimed again.
+
+        Args:
+            task_type (str): One of the *_TASK constants.
+            limit (int): The maximum number of tasks to claim.
+            worker_id (str): An identifier for the claiming worker, stored on the task.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict, optionally with `task_claim_timeout_seconds`.
+
+        Returns:
+            list[PipelineTaskDict] | None: The claimed tasks, or None on error.
+        """
+        ...
+
+    def complete_task(
+        id: str, status: str, db_engine: sa.engine.Engine, config: dict
+    ) -> int | None:
+        """
+        Mark a claimed task as finished.
+
+        Args:
+            id (str): The task id.
+            status (str): "done", "failed", or "pending" to put the task back on the queue.
+            db_engine (sa.engine.Engine): SQLAlchemy engine.
+            config (dict): Additional config data dict.
+
+        Returns:
+            int | None: The number of tasks updated, or None on error.
+        """
+        ...
+
+
+def _insert_sqlite_post_labels(
+    conn: sa.engine.Connection, labels: list[PostSpatialLabelDict]
+) -> int:
+    # Sent as a single executemany so the insert cost is one round-trip per batch rather than per label:
+    if len(labels) == 0:
+        return 0
+
+    post_label_insert_query = sa.text(
+        """
+        INSERT INTO labels (label_id, post_id, comment, geometry)
+        VALUES (
+            :label_id,
+            :post_id,
+            :comment,
+            ST_GeomFromText(:geometry, 4326)
+        )
+        """
+    )
+    result = conn.execute(post_label_insert_query, labels)
+    logger.info(f"Inserted {result.rowcount} rows into labels")
+    return result.rowcount
+
+
+def _get_sqlite_posts_w_labels(
+    conn: sa.engine.Connection, post_ids: list[str]
+) -> pd.DataFrame:
+    posts_w_labels_query = sa.text(
+        """
+        SELECT
+            source.id AS post_id,
+            source.type AS post_type,
+            source.created_date AS post_created_date,
+            JSON(source.fields) AS fields,
+            labels.label_id as label_id,
+            labels.comment as label_comment,
+            ST_AsText(labels.geometry) as geometry
+        FROM source as source
+        JOIN labels as labels
+        ON labels.post_id == source.id
+        WHERE source.id IN :post_ids
+    """
+    ).bindparams(sa.bindparam("post_ids", expanding=True))
+
+    return pd.read_sql(posts_w_labels_query, con=conn, params={"post_ids": post_ids})
+
+
+def _insert_postgres_post_labels(
+    conn: sa.engine.Connection, labels: list[PostSpatialLabelDict]
+) -> int:
+    if len(labels) == 0:
+        return 0
+
+    post_label_insert_query = sa.text(
+        """
+        INSERT INTO core.labels (label_id, post_id, comment, geometry)
+        VALUES (
+            :label_id,
+            :post_id,
+            :comment,
+            ST_GeomFromText(:geometry, 4326)
+        )
+        """
+    ).bindparams(sa.bindparam("post_id", type_=UUID))
+    result = conn.execute(
+        post_label_insert_query,
+        [{**label, "post_id": uuid.UUID(label["post_id"])} for label in labels],
+    )
+    logger.info(f"Inserted {result.rowcount} rows into core.labels")
+    return result.rowcount
+
+
+def _get_postgres_posts_w_labels(
+    conn: sa.engine.Connection, post_ids: list[str]
+) -> pd.DataFrame:
+    posts_w_labels_query = sa.text(
+        """
+        SELECT
+            source.id::text AS post_id,
+            source.type AS post_type,
+            source.created_date AS post_created_date,
+            source.fields::text AS fields,
+            labels.label_id AS label_id,
+            labels.comment AS label_comment,
+            ST_AsText(labels.geometry) AS geometry
+        FROM core.source AS source
+        JOIN core.labels AS labels
+        ON labels.post_id = source.id
+        WHERE source.id = ANY(:post_ids)
+    """
+    ).bindparams(sa.bindparam("post_ids", type_=ARRAY(UUID)))
+
+    return pd.read_sql(
+        posts_w_labels_query,
+        con=conn,
+        params={"post_ids": [uuid.UUID(id) for id in post_ids]},
+    )
+
+
+# The columns of the unlabeled posts table, in display order:
+UNLABELED_POSTS_TABLE_COLUMNS = [
+    "post_id",
+    "post_created_date",
+    "subreddit",
+    "title",
+    "url",
+]
+
+
+def _build_table_page_clauses(
+    column_expressions: dict[str, str],
+    filters: list[tuple[str, str, str | float]],
+    sort_by: list[dict],
+    contains_operator: str,
+) -> tuple[str, str, dict]:
+    # Column names and operators are checked against fixed sets, only values are ever bound into the query:
+    conditions: list[str] = []
+    params: dict = {}
+    for i, (column, operator, value) in enumerate(filters):
+        if column not in column_expressions:
+            raise ValueError(f"Cannot filter on unknown column {column}")
+
+        expression = column_expressions[column]
+        param = f"filter_{i}"
+        if operator == "contains":
+            conditions.append(f"{expression} {contains_operator} :{param}")
+            params[param] = f"%{value}%"
+        elif operator == "datestartswith":
+            conditions.append(f"CAST({expression} AS TEXT) LIKE :{param}")
+            params[param] = f"{value}%"
+        elif operator in ("=", "!=", "<", "<=", ">", ">="):
+            conditions.append(f"{expression} {operator} :{param}")
+            params[param] = value
+        else:
+            raise ValueError(f"Unsupported filter operator {operator}")
+
+    order_terms: list[str] = []
+    for sort_key in sort_by:
+        if sort_key["column_id"] not in column_expressions:
+            raise ValueError(f"Cannot sort on unknown column {sort_key['column_id']}")
+        order_terms.append(
+            f"{column_expressions[sort_key['column_id']]} {'DESC' if sort_key['direction'] == 'desc' else 'ASC'}"
+        )
+    if len(order_terms) == 0:
+        order_terms.append(f"{column_expressions['post_created_date']} DESC")
+    # The id breaks ties so rows never move between pages:
+    order_terms.append(column_expressions["post_id"])
+
+    where_clause = "".join(f" AND {condition}" for condition in conditions)
+    return where_clause, ", ".join(order_terms), params
+
+
+def _row_to_reddit_post(row: dict) -> RedditPostDict:
+    # SQLite hands back TEXT for both columns, psycopg decodes TIMESTAMPTZ and JSONB itself:
+    created_date = row["created_date"]
+    if isinstance(created_date, str):
+        created_date = datetime.fromisoformat(created_date)
+    fields = row["fields"]
+    if isinstance(fields, str):
+        fields = json.loads(fields)
+
+    return {
+        "id": str(row["id"]),
+        "type": row["type"],
+        "created_date": int(created_date.timestamp() * 1000),
+        "fields": fields,
+    }
+
+
+def is_pending_video_static_file(static_file: dict) -> bool:
+    return (
+        static_file.get("type") in ("video", "REDDIT_VIDEO")
+        and static_file.get("id") == "NULL"
+    )
+
+
+def get_post_task_types(reddit_post: RedditPostDict) -> list[str]:
+    task_types: list[str] = []
+
+    fields = reddit_post["fields"]
+    if any(
+        is_pending_video_static_file(static_file)
+        for static_file in fields.get("static_files", [])
+    ):
+        task_types.append(VIDEO_DOWNLOAD_TASK)
+    # Only stages with a consumer get a task, a row nothing claims would stay pending forever:
+    if fields.get("json_file_path") is not None:
+        task_types.append(COMMENT_EXTRACTION_TASK)
+
+    return task_types
+
+
+def _build_post_tasks(
+    reddit_post: RedditPostDict, created_date: datetime
+) -> list[dict]:
+    # Task ids are derived from the post id so re-inserting a post never duplicates its work:
+    return [
+        {
+            "id": str(
+                uuid.uuid3(uuid.NAMESPACE_URL, f"{reddit_post['id']}/{task_type}")
+            ),
+            "post_id": reddit_post["id"],
+            "task_type": task_type,
+            "created_date": created_date,
+        }
+        for task_type in get_post_task_types(reddit_post)
+    ]
+
+
+def _insert_sqlite_post_tasks(
+    conn: sa.engine.Connection, reddit_post: RedditPostDict, created_date: datetime
+) -> int:
+    post_tasks = _build_post_tasks(reddit_post, created_date)
+    if len(post_tasks) == 0:
+        return 0
+
+    task_insert_query = sa.text(
+        """
+        INSERT OR IGNORE INTO tasks (id, post_id, task_type, status, created_date)
+        VALUES (:id, :post_id, :task_type, 'pending', :created_date)
+        """
+    )
+    result = conn.execute(task_insert_query, post_tasks)
+    logger.info(
+        f"Queued tasks {[task['task_type'] for task in post_tasks]} for post {reddit_post['id']}"
+    )
+    return result.rowcount
+
+
+def _insert_postgres_post_tasks(
+    conn: sa.engine.Connection, reddit_post: RedditPostDict, created_date: datetime
+) -> int:
+    post_tasks = _build_post_tasks(reddit_post, created_date)
+    if len(post_tasks) == 0:
+        return 0
+
+    task_insert_query = sa.text(
+        """
+        INSERT INTO core.tasks (id, post_id, task_type, status, created_date)
+        VALUES (:id, :post_id, :task_type, 'pending', :created_date)
+        ON CONFLICT (id) DO NOTHING
+        """
+    ).bindparams(sa.bindparam("id", type_=UUID), sa.bindparam("post_id", type_=UUID))
+    result = conn.execute(
+        task_insert_query,
+        [
+            {**task, "id": uuid.UUID(task["id"]), "post_id": uuid.UUID(task["post_id"])}
+            for task in post_tasks
+        ],
+    )
+    logger.info(
+        f"Queued tasks {[task['task_type'] for task in post_tasks]} for post {reddit_post['id']}"
+    )
+    return result.rowcount
+
 
 class SQLiteInterface(DatabaseInterface):
     def get_unique_posts(
@@ -129,6 +622,9 @@ class SQLiteInterface(DatabaseInterface):
                 }
 
                 result = conn.execute(insert_query, posts_to_insert)
+                _insert_sqlite_post_tasks(
+                    conn, reddit_post, posts_to_insert["created_date"]
+                )
                 result_message = f"Inserted {result.rowcount} posts to tables {pprint.pformat(posts_to_insert)}"
                 logger.info(result_message)
 
@@ -139,6 +635,106 @@ class SQLiteInterface(DatabaseInterface):
             logger.error(error_msg)
             return None
 
+    def get_reddit_posts(
+        ids: list[str], db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+        if len(ids) == 0:
+            return []
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_query = sa.text(
+                    """
+                    SELECT id, type, created_date, fields
+                    FROM source
+                    WHERE id IN :ids
+                    AND type = 'reddit_post'
+                    """
+                ).bindparams(sa.bindparam("ids", expanding=True))
+                rows = conn.execute(posts_query, {"ids": [str(id) for id in ids]})
+                posts = [_row_to_reddit_post(row) for row in rows.mappings().all()]
+
+            logger.info(f"Read {len(posts)} of {len(ids)} requested posts")
+            return posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def upload_mpd_reddit_record(
+        reddit_video_content: RedditContentDict,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                insert_video_stream_query = sa.text(
+                    """
+                    INSERT OR REPLACE INTO content (id, source, type, created_date, storage_path, fields)
+                    VALUES (:id, :source, :type, :created_date, :storage_path, :fields)
+                    """
+                )
+                result = conn.execute(
+                    insert_video_stream_query,
+                    {
+                        **reddit_video_content,
+                        "created_date": datetime.fromtimestamp(
+                            reddit_video_content["created_date"] / 1000, tz=timezone.utc
+                        ),
+                        "fields": json.dumps(reddit_video_content["fields"]),
+                    },
+                )
+                logger.info(
+                    f"Inserted {result.rowcount} content records for {reddit_video_content['source']}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def update_reddit_post_video_content(
+        post_id: str,
+        video_id: str,
+        full_video_path: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                # SQLite has no jsonb_set over arrays so the fields are rewritten in the same transaction:
+                fields_row = (
+                    conn.execute(
+                        sa.text("SELECT fields FROM source WHERE id = :post_id"),
+                        {"post_id": post_id},
+                    )
+                    .mappings()
+                    .first()
+                )
+                if fields_row is None:
+                    logger.warning(f"No post {post_id} to attach video {video_id} to")
+                    return 0
+
+                fields = json.loads(fields_row["fields"])
+                for static_file in fields.get("static_files", []):
+                    if is_pending_video_static_file(static_file):
+                        static_file["id"] = video_id
+                        static_file["path"] = full_video_path
+                fields["static_downloaded_flag"] = True
+
+                result = conn.execute(
+                    sa.text("UPDATE source SET fields = :fields WHERE id = :post_id"),
+                    {"post_id": post_id, "fields": json.dumps(fields)},
+                )
+                logger.info(f"Attached video {video_id} to post {post_id}")
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
     def get_all_posts_w_labels(
         db_engine: sa.engine.Engine, config: dict
     ) -> pd.DataFrame | None:
@@ -168,43 +764,39 @@ class SQLiteInterface(DatabaseInterface):
 
         try:
             with db_engine.connect() as conn, conn.begin():
-
-                post_label_insert_query = sa.text(
-                    """
-                    INSERT INTO labels (label_id, post_id, comment, geometry)
-                    VALUES (
-                        :label_id,
-                        :post_id,
-                        :comment,
-                        ST_GeomFromText(:geometry, 4326)
-                    )
-                    """
+                _insert_sqlite_post_labels(conn, labels)
+                df = _get_sqlite_posts_w_labels(
+                    conn, list({label["post_id"] for label in labels})
                 )
-                for post_label in labels:
-                    result = conn.execute(
-                        post_label_insert_query, parameters=post_label
-                    )
-                    logger.info(
-                        f"Inserted {result.rowcount} row {pprint.pformat(post_label)} into labels"
-                    )
+                logger.info(df)
 
-                posts_w_labels_query = sa.text(
-                    """
-                    SELECT
-                        source.id AS post_id,
-                        source.type AS post_type,
-                        source.created_date AS post_created_date,
-                        JSON(source.fields) AS fields,
-                        labels.label_id as label_id,
-                        labels.comment as label_comment,
-                        ST_AsText(labels.geometry) as geometry
-                    FROM source as source
-                    JOIN labels as labels
-                    ON labels.post_id == source.id
-                """
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+
+        try:
+            if any(label["post_id"] != id for label in labels):
+                raise ValueError(
+                    f"All labels passed to replace_post_labels must belong to post {id}"
                 )
 
-                df = pd.read_sql(posts_w_labels_query, con=conn)
+            with db_engine.connect() as conn, conn.begin():
+                delete_query = sa.text("DELETE FROM labels WHERE labels.post_id = :id")
+                result = conn.execute(delete_query, parameters={"id": id})
+                logger.info(f"Deleted {result.rowcount} existing labels for post {id}")
+
+                _insert_sqlite_post_labels(conn, labels)
+                df = _get_sqlite_posts_w_labels(conn, [id])
                 logger.info(df)
 
             return df
@@ -274,18 +866,270 @@ class SQLiteInterface(DatabaseInterface):
             logger.error(error_msg)
             return None
 
-    def remove_post_labels(id: str, db_engine: sa.engine.Engine, config: dict) -> int:
+    def get_unlabeled_posts_page(
+        page_current: int,
+        page_size: int,
+        filters: list[tuple[str, str, str | float]],
+        sort_by: list[dict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> tuple[pd.DataFrame, int] | None:
+        column_expressions = {
+            "post_id": "source.id",
+            "post_created_date": "source.created_date",
+            "subreddit": "json_extract(source.fields, '$.subreddit')",
+            "title": "json_extract(source.fields, '$.title')",
+            "url": "json_extract(source.fields, '$.url')",
+        }
         try:
+            where_clause, order_clause, params = _build_table_page_clauses(
+                column_expressions, filters, sort_by, contains_operator="LIKE"
+            )
+            unlabeled_condition = """
+                NOT EXISTS (
+                    SELECT 1 FROM labels WHERE labels.post_id = source.id
+                )
+            """
+
             with db_engine.connect() as conn, conn.begin():
+                page_query = sa.text(
+                    f"""
+                    SELECT
+                        {", ".join(f"{expression} AS {column}" for column, expression in column_expressions.items())}
+                    FROM source AS source
+                    WHERE {unlabeled_condition}{where_clause}
+                    ORDER BY {order_clause}
+                    LIMIT :limit OFFSET :offset
+                    """
+                )
+                count_query = sa.text(
+                    f"""
+                    SELECT COUNT(*)
+                    FROM source AS source
+                    WHERE {unlabeled_condition}{where_clause}
+                    """
+                )
 
-                delete_query = sa.text("DELETE FROM labels WHERE labels.label_id = :id")
-                result = conn.execute(delete_query, parameters={"id": id})
-                logger.info(
-                    f"Deleted row {id} from labels table sucessfully. Rows removed: {result.rowcount}"
+                df = pd.read_sql(
+                    page_query,
+                    con=conn,
+                    params={
+                        **params,
+                        "limit": page_size,
+                        "offset": page_current * page_size,
+                    },
                 )
-                return result.rowcount
+                total_posts = conn.execute(count_query, params).scalar_one()
 
-        except Exception as e:
+            logger.info(
+                f"Read page {page_current} of {len(df)} unlabeled posts out of {total_posts}"
+            )
+            return df, total_posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def remove_post_labels(id: str, db_engine: sa.engine.Engine, config: dict) -> int:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+
+                delete_query = sa.text("DELETE FROM labels WHERE labels.label_id = :id")
+                result = conn.execute(delete_query, parameters={"id": id})
+                logger.info(
+                    f"Deleted row {id} from labels table sucessfully. Rows removed: {result.rowcount}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_reddit_posts_page(
+        after_id: str | None, limit: int, db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_page_query = sa.text(
+                    """
+                    SELECT id, type, created_date, fields
+                    FROM source
+                    WHERE type = 'reddit_post'
+                    AND (:after_id IS NULL OR id > :after_id)
+                    ORDER BY id
+                    LIMIT :limit
+                    """
+                )
+                rows = conn.execute(
+                    posts_page_query, {"after_id": after_id, "limit": limit}
+                )
+                posts = [_row_to_reddit_post(row) for row in rows.mappings().all()]
+
+            logger.info(f"Read a page of {len(posts)} posts after id {after_id}")
+            return posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_posts_in_extent(
+        bbox: tuple[float, float, float, float],
+        time_range: tuple[datetime, datetime] | None,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+
+        min_x, min_y, max_x, max_y = bbox
+        params = {"min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
+
+        # The SpatialIndex virtual table resolves the bbox against the R-tree created by CreateSpatialIndex:
+        time_range_filter = ""
+        if time_range is not None:
+            time_range_filter = (
+                "AND source.created_date BETWEEN :start_date AND :end_date"
+            )
+            params["start_date"], params["end_date"] = time_range
+
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_in_extent_query = sa.text(
+                    f"""
+                    SELECT
+                        source.id AS post_id,
+                        source.type AS post_type,
+                        source.created_date AS post_created_date,
+                        JSON(source.fields) AS fields,
+                        labels.label_id as label_id,
+                        labels.comment as label_comment,
+                        ST_AsText(labels.geometry) as geometry
+                    FROM labels as labels
+                    JOIN source as source
+                    ON labels.post_id == source.id
+                    WHERE labels.ROWID IN (
+                        SELECT ROWID
+                        FROM SpatialIndex
+                        WHERE f_table_name = 'labels'
+                        AND f_geometry_column = 'geometry'
+                        AND search_frame = BuildMbr(:min_x, :min_y, :max_x, :max_y, 4326)
+                    )
+                    AND ST_Intersects(
+                        labels.geometry,
+                        BuildMbr(:min_x, :min_y, :max_x, :max_y, 4326)
+                    )
+                    {time_range_filter}
+                """
+                )
+
+                df = pd.read_sql(posts_in_extent_query, con=conn, params=params)
+                logger.info(f"Found {len(df)} labels intersecting extent {bbox}")
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_label_centroids(
+        db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                label_centroids_query = sa.text(
+                    """
+                    SELECT
+                        labels.label_id AS label_id,
+                        labels.post_id AS post_id,
+                        ST_X(ST_Centroid(labels.geometry)) AS longitude,
+                        ST_Y(ST_Centroid(labels.geometry)) AS latitude
+                    FROM labels AS labels
+                    WHERE labels.geometry IS NOT NULL
+                """
+                )
+
+                df = pd.read_sql(label_centroids_query, con=conn)
+                logger.info(f"Read the centroids of {len(df)} labels")
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def claim_tasks(
+        task_type: str,
+        limit: int,
+        worker_id: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> list[PipelineTaskDict] | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                # A single UPDATE ... RETURNING runs under SQLite's write lock so two workers can't claim the same row:
+                claim_query = sa.text(
+                    """
+                    UPDATE tasks
+                    SET
+                        status = 'claimed',
+                        claimed_by = :worker_id,
+                        claimed_date = :claimed_date,
+                        attempts = attempts + 1
+                    WHERE id IN (
+                        SELECT id
+                        FROM tasks
+                        WHERE task_type = :task_type
+                        AND (
+                            status = 'pending'
+                            OR (status = 'claimed' AND claimed_date < :claim_expired_date)
+                        )
+                        ORDER BY created_date
+                        LIMIT :limit
+                    )
+                    RETURNING
+                        id, post_id, task_type, status, created_date,
+                        claimed_by, claimed_date, attempts
+                    """
+                )
+                claimed_date = datetime.now(tz=timezone.utc)
+                claimed_tasks = conn.execute(
+                    claim_query,
+                    {
+                        "task_type": task_type,
+                        "limit": limit,
+                        "worker_id": worker_id,
+                        "claimed_date": claimed_date,
+                        # Lexically comparable with the stored claimed_date since both are bound the same way:
+                        "claim_expired_date": claimed_date
+                        - timedelta(
+                            seconds=config.get("task_claim_timeout_seconds", 3600)
+                        ),
+                    },
+                )
+                tasks = [dict(task) for task in claimed_tasks.mappings().all()]
+
+            logger.info(f"Worker {worker_id} claimed {len(tasks)} {task_type} tasks")
+            return tasks
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def complete_task(
+        id: str, status: str, db_engine: sa.engine.Engine, config: dict
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                complete_query = sa.text(
+                    "UPDATE tasks SET status = :status WHERE tasks.id = :id"
+                )
+                result = conn.execute(complete_query, {"id": id, "status": status})
+                logger.info(f"Marked task {id} as {status}")
+                return result.rowcount
+
+        except Exception as e:
             error_msg = traceback.format_exc()
             logger.error(error_msg)
             return None
@@ -342,6 +1186,9 @@ class PostgresInterface(DatabaseInterface):
                 }
 
                 result = conn.execute(insert_query, posts_to_insert)
+                _insert_postgres_post_tasks(
+                    conn, reddit_post, posts_to_insert["created_date"]
+                )
                 result_message = f"Inserted {result.rowcount} posts to tables {pprint.pformat(posts_to_insert)}"
                 logger.info(result_message)
 
@@ -351,3 +1198,552 @@ class PostgresInterface(DatabaseInterface):
             error_msg = traceback.format_exc()
             logger.error(error_msg)
             return None
+
+    def get_reddit_posts(
+        ids: list[str], db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_query = sa.text(
+                    """
+                    SELECT id, type, created_date, fields
+                    FROM core.source
+                    WHERE id = ANY(:ids)
+                    AND type = 'reddit_post'
+                    """
+                ).bindparams(sa.bindparam("ids", type_=ARRAY(UUID)))
+                rows = conn.execute(
+                    posts_query, {"ids": [uuid.UUID(str(id)) for id in ids]}
+                )
+                posts = [_row_to_reddit_post(row) for row in rows.mappings().all()]
+
+            logger.info(f"Read {len(posts)} of {len(ids)} requested posts")
+            return posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def upload_mpd_reddit_record(
+        reddit_video_content: RedditContentDict,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                insert_video_stream_query = sa.text(
+                    """
+                    INSERT INTO core.content (id, source, type, created_date, storage_path, fields)
+                    VALUES (:id, :source, :type, :created_date, :storage_path, :fields)
+                    ON CONFLICT (id) DO UPDATE SET
+                        storage_path = EXCLUDED.storage_path,
+                        fields = EXCLUDED.fields
+                    """
+                ).bindparams(
+                    sa.bindparam("id", type_=UUID), sa.bindparam("source", type_=UUID)
+                )
+                result = conn.execute(
+                    insert_video_stream_query,
+                    {
+                        **reddit_video_content,
+                        "id": uuid.UUID(reddit_video_content["id"]),
+                        "source": uuid.UUID(reddit_video_content["source"]),
+                        "created_date": datetime.fromtimestamp(
+                            reddit_video_content["created_date"] / 1000, tz=timezone.utc
+                        ),
+                        "fields": json.dumps(reddit_video_content["fields"]),
+                    },
+                )
+                logger.info(
+                    f"Inserted {result.rowcount} content records for {reddit_video_content['source']}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def update_reddit_post_video_content(
+        post_id: str,
+        video_id: str,
+        full_video_path: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                update_reddit_post_query = sa.text(
+                    """
+                    UPDATE core.source
+                    SET fields = jsonb_set(
+                        jsonb_set(
+                            fields,
+                            '{static_files}',
+                            (
+                                SELECT jsonb_agg(
+                                    CASE
+                                        WHEN elem->>'id' = 'NULL' AND elem->>'type' IN ('video', 'REDDIT_VIDEO')
+                                        THEN elem || jsonb_build_object('id', CAST(:video_id AS TEXT), 'path', CAST(:full_video_path AS TEXT))
+                                        ELSE elem
+                                    END
+                                )
+                                FROM jsonb_array_elements(fields->'static_files') AS elem
+                            )
+                        ),
+                        '{static_downloaded_flag}',
+                        'true'::jsonb,
+                        true
+                    )
+                    WHERE id = :post_id
+                    AND jsonb_typeof(fields->'static_files') = 'array'
+                    """
+                ).bindparams(sa.bindparam("post_id", type_=UUID))
+                result = conn.execute(
+                    update_reddit_post_query,
+                    {
+                        "post_id": uuid.UUID(str(post_id)),
+                        "video_id": video_id,
+                        "full_video_path": full_video_path,
+                    },
+                )
+                logger.info(f"Attached video {video_id} to post {post_id}")
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_all_posts_w_labels(
+        db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_w_labels_query = sa.text(
+                    """
+                    SELECT
+                        source.id::text AS post_id,
+                        source.type AS post_type,
+                        source.created_date AS post_created_date,
+                        source.fields::text AS fields,
+                        labels.label_id AS label_id,
+                        labels.comment AS label_comment,
+                        ST_AsText(labels.geometry) AS geometry
+                    FROM core.source AS source
+                    JOIN core.labels AS labels
+                    ON labels.post_id = source.id
+                """
+                )
+
+                df = pd.read_sql(posts_w_labels_query, con=conn)
+                logger.info(df)
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_post_w_labels(
+        id: str, db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                df = _get_postgres_posts_w_labels(conn, [id])
+                logger.info(df)
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_all_unlabeled_posts(
+        db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                unlabeled_posts_query = sa.text(
+                    """
+                    SELECT
+                        source.id::text AS post_id,
+                        source.type AS post_type,
+                        source.created_date AS post_created_date,
+                        source.fields::text AS fields
+                    FROM core.source AS source
+                    WHERE NOT EXISTS (
+                        SELECT 1
+                        FROM core.labels AS labels
+                        WHERE labels.post_id = source.id
+                    )
+                """
+                )
+
+                df = pd.read_sql(unlabeled_posts_query, con=conn)
+                logger.info(df)
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_unlabeled_posts_page(
+        page_current: int,
+        page_size: int,
+        filters: list[tuple[str, str, str | float]],
+        sort_by: list[dict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> tuple[pd.DataFrame, int] | None:
+        # The date is rendered as text so it compares against the strings the table filters send:
+        column_expressions = {
+            "post_id": "source.id::text",
+            "post_created_date": "to_char(source.created_date AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')",
+            "subreddit": "source.fields->>'subreddit'",
+            "title": "source.fields->>'title'",
+            "url": "source.fields->>'url'",
+        }
+        try:
+            where_clause, order_clause, params = _build_table_page_clauses(
+                column_expressions, filters, sort_by, contains_operator="ILIKE"
+            )
+            unlabeled_condition = """
+                NOT EXISTS (
+                    SELECT 1 FROM core.labels AS labels WHERE labels.post_id = source.id
+                )
+            """
+
+            with db_engine.connect() as conn, conn.begin():
+                page_query = sa.text(
+                    f"""
+                    SELECT
+                        {", ".join(f"{expression} AS {column}" for column, expression in column_expressions.items())}
+                    FROM core.source AS source
+                    WHERE {unlabeled_condition}{where_clause}
+                    ORDER BY {order_clause}
+                    LIMIT :limit OFFSET :offset
+                    """
+                )
+                count_query = sa.text(
+                    f"""
+                    SELECT COUNT(*)
+                    FROM core.source AS source
+                    WHERE {unlabeled_condition}{where_clause}
+                    """
+                )
+
+                df = pd.read_sql(
+                    page_query,
+                    con=conn,
+                    params={
+                        **params,
+                        "limit": page_size,
+                        "offset": page_current * page_size,
+                    },
+                )
+                total_posts = conn.execute(count_query, params).scalar_one()
+
+            logger.info(
+                f"Read page {page_current} of {len(df)} unlabeled posts out of {total_posts}"
+            )
+            return df, total_posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def add_post_labels(
+        labels: list[PostSpatialLabelDict], db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                _insert_postgres_post_labels(conn, labels)
+                df = _get_postgres_posts_w_labels(
+                    conn, list({label["post_id"] for label in labels})
+                )
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def replace_post_labels(
+        id: str,
+        labels: list[PostSpatialLabelDict],
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+        try:
+            if any(label["post_id"] != id for label in labels):
+                raise ValueError(
+                    f"All labels passed to replace_post_labels must belong to post {id}"
+                )
+
+            with db_engine.connect() as conn, conn.begin():
+                delete_query = sa.text(
+                    "DELETE FROM core.labels WHERE labels.post_id = :id"
+                ).bindparams(sa.bindparam("id", type_=UUID))
+                result = conn.execute(delete_query, parameters={"id": uuid.UUID(id)})
+                logger.info(f"Deleted {result.rowcount} existing labels for post {id}")
+
+                _insert_postgres_post_labels(conn, labels)
+                df = _get_postgres_posts_w_labels(conn, [id])
+                logger.info(df)
+
+            return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def remove_post_labels(id: str, db_engine: sa.engine.Engine, config: dict) -> int:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+
+                delete_query = sa.text(
+                    "DELETE FROM core.labels WHERE labels.label_id = :id"
+                )
+                result = conn.execute(delete_query, parameters={"id": id})
+                logger.info(
+                    f"Deleted row {id} from labels table sucessfully. Rows removed: {result.rowcount}"
+                )
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_reddit_posts_page(
+        after_id: str | None, limit: int, db_engine: sa.engine.Engine, config: dict
+    ) -> list[RedditPostDict] | None:
+
+        # An untyped NULL parameter can't be compared to a UUID so the filter is only added when needed:
+        params = {"limit": limit}
+        after_id_filter = ""
+        if after_id is not None:
+            after_id_filter = "AND id > :after_id"
+            params["after_id"] = uuid.UUID(after_id)
+
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_page_query = sa.text(
+                    f"""
+                    SELECT id, type, created_date, fields
+                    FROM core.source
+                    WHERE type = 'reddit_post'
+                    {after_id_filter}
+                    ORDER BY id
+                    LIMIT :limit
+                    """
+                )
+                rows = conn.execute(posts_page_query, params)
+                posts = [_row_to_reddit_post(row) for row in rows.mappings().all()]
+
+            logger.info(f"Read a page of {len(posts)} posts after id {after_id}")
+            return posts
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_posts_in_extent(
+        bbox: tuple[float, float, float, float],
+        time_range: tuple[datetime, datetime] | None,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> pd.DataFrame | None:
+
+        min_x, min_y, max_x, max_y = bbox
+        params = {"min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
+
+        # The && operator is what lets the planner use the GiST index on core.labels.geometry:
+        time_range_filter = ""
+        if time_range is not None:
+            time_range_filter = (
+                "AND source.created_date BETWEEN :start_date AND :end_date"
+            )
+            params["start_date"], params["end_date"] = time_range
+
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                posts_in_extent_query = sa.text(
+                    f"""
+                    SELECT
+                        source.id::text AS post_id,
+                        source.type AS post_type,
+                        source.created_date AS post_created_date,
+                        source.fields::text AS fields,
+                        labels.label_id AS label_id,
+                        labels.comment AS label_comment,
+                        ST_AsText(labels.geometry) AS geometry
+                    FROM core.labels AS labels
+                    JOIN core.source AS source
+                    ON labels.post_id = source.id
+                    WHERE labels.geometry && ST_MakeEnvelope(:min_x, :min_y, :max_x, :max_y, 4326)
+                    AND ST_Intersects(
+                        labels.geometry,
+                        ST_MakeEnvelope(:min_x, :min_y, :max_x, :max_y, 4326)
+                    )
+                    {time_range_filter}
+                """
+                )
+
+                df = pd.read_sql(posts_in_extent_query, con=conn, params=params)
+                logger.info(f"Found {len(df)} labels intersecting extent {bbox}")
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def get_label_centroids(
+        db_engine: sa.engine.Engine, config: dict
+    ) -> pd.DataFrame | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                label_centroids_query = sa.text(
+                    """
+                    SELECT
+                        labels.label_id::text AS label_id,
+                        labels.post_id::text AS post_id,
+                        ST_X(ST_Centroid(labels.geometry)) AS longitude,
+                        ST_Y(ST_Centroid(labels.geometry)) AS latitude
+                    FROM core.labels AS labels
+                    WHERE labels.geometry IS NOT NULL
+                """
+                )
+
+                df = pd.read_sql(label_centroids_query, con=conn)
+                logger.info(f"Read the centroids of {len(df)} labels")
+                return df
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def claim_tasks(
+        task_type: str,
+        limit: int,
+        worker_id: str,
+        db_engine: sa.engine.Engine,
+        config: dict,
+    ) -> list[PipelineTaskDict] | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                # SKIP LOCKED lets concurrent workers each take a disjoint batch without blocking on one another:
+                claim_query = sa.text(
+                    """
+                    UPDATE core.tasks AS tasks
+                    SET
+                        status = 'claimed',
+                        claimed_by = :worker_id,
+                        claimed_date = now(),
+                        attempts = tasks.attempts + 1
+                    WHERE tasks.id IN (
+                        SELECT id
+                        FROM core.tasks
+                        WHERE task_type = :task_type
+                        AND (
+                            status = 'pending'
+                            OR (
+                                status = 'claimed'
+                                AND claimed_date < now() - make_interval(secs => :claim_timeout_seconds)
+                            )
+                        )
+                        ORDER BY created_date
+                        LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING
+                        tasks.id::text AS id,
+                        tasks.post_id::text AS post_id,
+                        tasks.task_type,
+                        tasks.status,
+                        tasks.created_date,
+                        tasks.claimed_by,
+                        tasks.claimed_date,
+                        tasks.attempts
+                    """
+                )
+                claimed_tasks = conn.execute(
+                    claim_query,
+                    {
+                        "task_type": task_type,
+                        "limit": limit,
+                        "worker_id": worker_id,
+                        "claim_timeout_seconds": config.get(
+                            "task_claim_timeout_seconds", 3600
+                        ),
+                    },
+                )
+                tasks = [dict(task) for task in claimed_tasks.mappings().all()]
+
+            logger.info(f"Worker {worker_id} claimed {len(tasks)} {task_type} tasks")
+            return tasks
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def complete_task(
+        id: str, status: str, db_engine: sa.engine.Engine, config: dict
+    ) -> int | None:
+        try:
+            with db_engine.connect() as conn, conn.begin():
+                complete_query = sa.text(
+                    "UPDATE core.tasks SET status = :status WHERE tasks.id = :id"
+                ).bindparams(sa.bindparam("id", type_=UUID))
+                result = conn.execute(
+                    complete_query, {"id": uuid.UUID(id), "status": status}
+                )
+                logger.info(f"Marked task {id} as {status}")
+                return result.rowcount
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+
+def create_postgres_engine(db_uri: str, config: dict) -> sa.engine.Engine:
+    """
+    Build a pooled SQLAlchemy engine for the PostgresInterface.
+
+    Connections go through psycopg 3 so that statements executed more than
+    `prepare_threshold` times on a connection are turned into server-side
+    prepared statements. Every query in the PostgresInterface is a fixed
+    `sa.text` construct, so the labelling UI and the crawler re-use a small
+    set of prepared plans per pooled connection.
+
+    Args:
+        db_uri (str): A postgres URI. The driver is always switched to psycopg.
+        config (dict): Optional overrides for `pool_size`, `max_overflow`,
+            `pool_recycle`, `pool_timeout` and `prepare_threshold`.
+
+    Returns:
+        sa.engine.Engine: The configured engine.
+    """
+    postgres_url = sa.engine.make_url(db_uri).set(drivername="postgresql+psycopg")
+
+    return sa.create_engine(
+        postgres_url,
+        pool_size=config.get("pool_size", 10),
+        max_overflow=config.get("max_overflow", 20),
+        pool_recycle=config.get("pool_recycle", 1800),
+        pool_timeout=config.get("pool_timeout", 30),
+        pool_pre_ping=True,
+        connect_args={"prepare_threshold": config.get("prepare_threshold", 2)},
+    )
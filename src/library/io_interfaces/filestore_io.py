@@ -1,10 +1,18 @@
 import io
 import os
 import minio
+import hashlib
 import traceback
 from loguru import logger
 from pathlib import Path
-from typing import Protocol
+from typing import IO, Iterable, Iterator, Protocol, TypedDict
+from contextlib import contextmanager
+
+
+class StoredFileInfoDict(TypedDict):
+    size: int
+    last_modified: float
+    etag: str
 
 
 class FileInterface(Protocol):
@@ -39,6 +47,99 @@ class FileInterface(Protocol):
         """
         ...
 
+    def upload_stream(
+        chunks: Iterable[bytes], dir_name: str, filepath: str, config: dict
+    ) -> str | None:
+        """
+        Uploads a file from an iterable of byte chunks without buffering the whole file.
+
+        Args:
+            chunks (Iterable[bytes]): The file contents in order, e.g. `response.iter_content(...)`.
+            dir_name (str): The root directory to write into.
+            filepath (str): Relative path from dir_name to write the file to.
+            config (dict): Additional config options (`content_type`, `upload_part_size` for S3).
+
+        Returns:
+            str | None: Full path to the uploaded file as a string, or None on failure.
+        """
+        ...
+
+    def open_file_stream(dir_name: str, filepath: str, config: dict) -> IO[bytes]:
+        """
+        Opens a file for incremental reading without loading it into memory.
+
+        Used as a context manager: `with Interface.open_file_stream(...) as stream:`.
+        The underlying file handle or connection is released on exit.
+
+        Args:
+            dir_name (str): The base directory to read from.
+            filepath (str): Relative path from dir_name to locate the file.
+            config (dict): Additional config options (unused by local FS).
+
+        Returns:
+            IO[bytes]: A readable binary stream positioned at the start of the file.
+        """
+        ...
+
+    def get_file_info(
+        dir_name: str, filepath: str, config: dict
+    ) -> StoredFileInfoDict | None:
+        """
+        Reads the size, modification time and an entity tag of a stored file without reading its contents.
+
+        Args:
+            dir_name (str): The base directory to read from.
+            filepath (str): Relative path from dir_name to locate the file.
+            config (dict): Additional config options (unused by local FS).
+
+        Returns:
+            StoredFileInfoDict | None: The file metadata, or None if the file does not exist or cannot be read.
+        """
+        ...
+
+    def open_file_range(
+        dir_name: str, filepath: str, start: int, length: int, config: dict
+    ) -> IO[bytes]:
+        """
+        Opens `length` bytes of a file starting at byte `start` for incremental reading.
+
+        Used as a context manager like `open_file_stream`. Reading past `length` bytes
+        is up to the caller to avoid, the stream is not truncated for local files.
+
+        Args:
+            dir_name (str): The base directory to read from.
+            filepath (str): Relative path from dir_name to locate the file.
+            start (int): The offset of the first byte to read.
+            length (int): The number of bytes the caller is going to read.
+            config (dict): Additional config options (unused by local FS).
+
+        Returns:
+            IO[bytes]: A readable binary stream positioned at `start`.
+        """
+        ...
+
+
+class _ChunkIteratorReader(io.RawIOBase):
+    # Adapts an iterable of byte chunks to the read() interface minio's multipart upload expects:
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._leftover = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._leftover) == 0:
+            try:
+                self._leftover = next(self._chunks)
+            except StopIteration:
+                return 0
+
+        read_size = min(len(buffer), len(self._leftover))
+        buffer[:read_size] = self._leftover[:read_size]
+        self._leftover = self._leftover[read_size:]
+        return read_size
+
 
 class LocalFSInterface(FileInterface):
     def read_file(dir_name: str, filepath: str, config: dict) -> io.BytesIO | None:
@@ -61,6 +162,75 @@ class LocalFSInterface(FileInterface):
             logger.error(error_msg)
             return None
 
+    def upload_stream(
+        chunks: Iterable[bytes], dir_name: str, filepath: str, config: dict
+    ) -> str | None:
+        try:
+            full_filepath = Path(dir_name) / Path(filepath)
+            os.makedirs(full_filepath.parent, exist_ok=True)
+
+            written_bytes = 0
+            with open(full_filepath, "wb") as f:
+                for chunk in chunks:
+                    written_bytes += f.write(chunk)
+
+            logger.info(f"Streamed {written_bytes} bytes to {full_filepath}")
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+        return str(full_filepath)
+
+    @contextmanager
+    def open_file_stream(
+        dir_name: str, filepath: str, config: dict
+    ) -> Iterator[IO[bytes]]:
+        full_filepath = Path(dir_name) / Path(filepath)
+        with open(full_filepath, "rb") as f:
+            logger.info(f"Opened {full_filepath} for streaming")
+            yield f
+
+    def get_file_info(
+        dir_name: str, filepath: str, config: dict
+    ) -> StoredFileInfoDict | None:
+        try:
+            full_filepath = Path(dir_name) / Path(filepath)
+            if not full_filepath.is_file():
+                logger.info(f"No file info for {full_filepath}. Does not exist")
+                return None
+
+            file_stat = full_filepath.stat()
+            # Every write changes the mtime, so size, mtime and inode identify one version of the bytes:
+            version_key = (
+                f"{file_stat.st_ino}-{file_stat.st_size}-{file_stat.st_mtime_ns}"
+            )
+            return {
+                "size": file_stat.st_size,
+                "last_modified": file_stat.st_mtime,
+                "etag": hashlib.blake2b(
+                    version_key.encode(), digest_size=16
+                ).hexdigest(),
+            }
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    @contextmanager
+    def open_file_range(
+        dir_name: str, filepath: str, start: int, length: int, config: dict
+    ) -> Iterator[IO[bytes]]:
+        full_filepath = Path(dir_name) / Path(filepath)
+        with open(full_filepath, "rb") as f:
+            f.seek(start)
+            logger.info(
+                f"Opened {full_filepath} for streaming {length} bytes from offset {start}"
+            )
+            yield f
+
     def upload_file(
         contents_buffer: io.BytesIO, dir_name: str, filepath: str, config: dict
     ) -> str | None:
@@ -116,6 +286,103 @@ class S3FSInterface(FileInterface):
             response.release_conn()
             logger.info("Closed minio connection")
 
+    def upload_stream(
+        chunks: Iterable[bytes], dir_name: str, filepath: str, config: dict
+    ) -> str | None:
+
+        MINIO_CLIENT: minio.Minio = config["MINIO_CLIENT"]
+        BUCKET_NAME = dir_name
+
+        if not MINIO_CLIENT.bucket_exists(BUCKET_NAME):
+            MINIO_CLIENT.make_bucket(BUCKET_NAME)
+            logger.info(f"Created bucket {BUCKET_NAME}")
+
+        try:
+            # An unknown length makes minio do a multipart upload holding one part in memory at a time:
+            part_size: int = config.get("upload_part_size", 10 * 1024 * 1024)
+            result = MINIO_CLIENT.put_object(
+                bucket_name=BUCKET_NAME,
+                object_name=filepath,
+                data=io.BufferedReader(_ChunkIteratorReader(chunks)),
+                length=-1,
+                part_size=part_size,
+                content_type=config["content_type"]
+                if "content_type" in config
+                else "application/octet-stream",
+            )
+            logger.info(f"Streamed upload to bucket {BUCKET_NAME} at path {filepath}")
+            return result.object_name
+
+        except Exception as e:
+            error_msg = traceback.format_exception(e)
+            logger.error(error_msg)
+            return None
+
+    @contextmanager
+    def open_file_stream(
+        dir_name: str, filepath: str, config: dict
+    ) -> Iterator[IO[bytes]]:
+        MINIO_CLIENT: minio.Minio = config["MINIO_CLIENT"]
+
+        # get_object doesn't preload the body so it is read off the socket as the caller consumes it:
+        response = MINIO_CLIENT.get_object(dir_name, filepath)
+        try:
+            logger.info(
+                f"Opened bucket {dir_name} and filepath {filepath} for streaming"
+            )
+            yield response
+        finally:
+            response.close()
+            response.release_conn()
+            logger.info("Closed minio connection")
+
+    def get_file_info(
+        dir_name: str, filepath: str, config: dict
+    ) -> StoredFileInfoDict | None:
+        MINIO_CLIENT: minio.Minio = config["MINIO_CLIENT"]
+
+        try:
+            object_stat = MINIO_CLIENT.stat_object(dir_name, filepath)
+            return {
+                "size": object_stat.size,
+                "last_modified": object_stat.last_modified.timestamp(),
+                "etag": object_stat.etag.strip('"'),
+            }
+
+        except minio.error.S3Error as e:
+            if e.code == "NoSuchKey":
+                logger.info(
+                    f"No file info for bucket {dir_name} and filepath {filepath}. Does not exist"
+                )
+            else:
+                logger.error(traceback.format_exception(e))
+            return None
+
+        except Exception as e:
+            error_msg = traceback.format_exception(e)
+            logger.error(error_msg)
+            return None
+
+    @contextmanager
+    def open_file_range(
+        dir_name: str, filepath: str, start: int, length: int, config: dict
+    ) -> Iterator[IO[bytes]]:
+        MINIO_CLIENT: minio.Minio = config["MINIO_CLIENT"]
+
+        # The range is sent to S3 so only the requested bytes leave the bucket:
+        response = MINIO_CLIENT.get_object(
+            dir_name, filepath, offset=start, length=length
+        )
+        try:
+            logger.info(
+                f"Opened bucket {dir_name} and filepath {filepath} for streaming {length} bytes from offset {start}"
+            )
+            yield response
+        finally:
+            response.close()
+            response.release_conn()
+            logger.info("Closed minio connection")
+
     def upload_file(
         contents_buffer: io.BytesIO, dir_name: str, filepath: str, config: dict
     ) -> str | None:
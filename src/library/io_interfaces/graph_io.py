@@ -0,0 +1,278 @@
+import time
+import neo4j
+import traceback
+from loguru import logger
+from typing import Iterable, Protocol, TypedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class GraphWriteStatsDict(TypedDict):
+    nodes_written: int
+    edges_written: int
+    seconds: float
+    nodes_per_second: float
+    edges_per_second: float
+
+
+# The primary labels of each comment graph edge's (from, to) endpoints, used when an endpoint wasn't
+# part of the elements being written, e.g. the post or the parent comment of an incremental refresh:
+COMMENT_GRAPH_EDGE_ENDPOINT_LABELS: dict[str, tuple[str, str]] = {
+    "POSTED": ("Account", "Comment"),
+    "POSTED_ON": ("Comment", "Date"),
+    "COMMENTED_ON": ("Comment", "Post"),
+    "REPLIED_TO": ("Comment", "Comment"),
+    "HAS_REPLY": ("Comment", "Comment"),
+}
+
+# Endpoint labels the comment graph never writes nodes for. Their endpoints are MERGEd as stubs so
+# comments can be linked to posts that haven't been loaded into the graph yet:
+COMMENT_GRAPH_STUB_ENDPOINT_LABELS = {"Post"}
+
+
+class GraphInterface(Protocol):
+    def create_constraints(labels: list[str], driver, config: dict) -> int | None:
+        """
+        Create a uniqueness constraint on `id` for each node label.
+
+        Args:
+            labels (list[str]): The node labels to constrain.
+            driver: The graph database driver.
+            config (dict): Additional config options.
+
+        Returns:
+            int | None: The number of constraints that were ensured, or None on error.
+        """
+        ...
+
+    def write_graph_elements(
+        elements: Iterable[dict], driver, config: dict
+    ) -> GraphWriteStatsDict | None:
+        """
+        Write the node/edge dicts produced by the comment extraction methods to the graph.
+
+        Args:
+            elements (Iterable[dict]): `{"type": "node", ...}` and `{"type": "edge", ...}` dicts. May be a generator.
+            driver: The graph database driver.
+            config (dict): Batch size, parallelism and database options.
+
+        Returns:
+            GraphWriteStatsDict | None: Write counts and throughput, or None on error.
+        """
+        ...
+
+
+def _quote_cypher_name(name: str) -> str:
+    # Labels and relationship types can't be parameterised so they are escaped into the query text:
+    return "`" + name.replace("`", "``") + "`"
+
+
+def _primary_label(labels: list[str]) -> str:
+    # The most specific label is listed last, e.g. ["Reddit", "Entity", "Comment"]:
+    return labels[-1]
+
+
+def _build_node_merge_query(labels: list[str]) -> str:
+    primary_label = _primary_label(labels)
+    secondary_labels = "".join(
+        f":{_quote_cypher_name(label)}" for label in labels if label != primary_label
+    )
+    set_labels = f"SET n{secondary_labels} " if secondary_labels else ""
+
+    # MERGE on the constrained primary label only so the lookup is an index seek:
+    return (
+        "UNWIND $rows AS row "
+        f"MERGE (n:{_quote_cypher_name(primary_label)} {{id: row.id}}) "
+        f"{set_labels}"
+        "SET n += row.properties"
+    )
+
+
+def _build_edge_merge_query(
+    relationship_type: str,
+    from_label: str,
+    to_label: str,
+    stub_labels: set[str] = COMMENT_GRAPH_STUB_ENDPOINT_LABELS,
+) -> str:
+    # Endpoints are always looked up on their constrained label so each row is an index seek:
+    from_clause = "MERGE" if from_label in stub_labels else "MATCH"
+    to_clause = "MERGE" if to_label in stub_labels else "MATCH"
+
+    return (
+        "UNWIND $rows AS row "
+        f"{from_clause} (a:{_quote_cypher_name(from_label)} {{id: row.from}}) "
+        f"{to_clause} (b:{_quote_cypher_name(to_label)} {{id: row.to}}) "
+        f"MERGE (a)-[r:{_quote_cypher_name(relationship_type)}]->(b) "
+        "SET r += row.properties"
+    )
+
+
+def _run_unwind_batch(tx, query: str, rows: list[dict]) -> int:
+    # Rows whose endpoints don't exist are dropped by MATCH, so the counters are the only honest count:
+    summary = tx.run(query, rows=rows).consume()
+    return summary.counters.relationships_created
+
+
+class Neo4jGraphInterface(GraphInterface):
+    def create_constraints(
+        labels: list[str], driver: neo4j.Driver, config: dict
+    ) -> int | None:
+        try:
+            with driver.session(database=config.get("neo4j_database", None)) as session:
+                for label in labels:
+                    constraint_name = f"{label.lower()}_id_unique"
+                    session.run(
+                        f"CREATE CONSTRAINT {_quote_cypher_name(constraint_name)} IF NOT EXISTS "
+                        f"FOR (n:{_quote_cypher_name(label)}) REQUIRE n.id IS UNIQUE"
+                    ).consume()
+                    logger.info(f"Ensured uniqueness constraint on {label}.id")
+
+            return len(labels)
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+    def write_graph_elements(
+        elements: Iterable[dict], driver: neo4j.Driver, config: dict
+    ) -> GraphWriteStatsDict | None:
+
+        batch_size: int = config.get("graph_batch_size", 5000)
+        parallelism: int = config.get("graph_parallelism", 1)
+        database: str | None = config.get("neo4j_database", None)
+        create_constraints: bool = config.get("graph_create_constraints", True)
+        edge_endpoint_labels: dict[str, tuple[str, str]] = config.get(
+            "graph_edge_endpoint_labels", COMMENT_GRAPH_EDGE_ENDPOINT_LABELS
+        )
+        stub_endpoint_labels: set[str] = set(
+            config.get("graph_stub_endpoint_labels", COMMENT_GRAPH_STUB_ENDPOINT_LABELS)
+        )
+
+        # Pending rows grouped by label set / (relationship type, endpoint labels), keyed by id so duplicate
+        # node dicts collapse into a single MERGE:
+        pending_nodes: dict[tuple, dict[str, dict]] = {}
+        pending_edges: dict[tuple, list[dict]] = {}
+        primary_labels_by_id: dict[str, str] = {}
+        constrained_labels: set[str] = set()
+        nodes_written, edges_written = 0, 0
+
+        def ensure_constraint(label: str):
+            if create_constraints and label not in constrained_labels:
+                Neo4jGraphInterface.create_constraints([label], driver, config)
+                constrained_labels.add(label)
+
+        def write_batches(query_batches: list[tuple[str, list[dict]]]) -> int:
+            def write_batch(query_batch: tuple[str, list[dict]]) -> int:
+                query, rows = query_batch
+                with driver.session(database=database) as session:
+                    return session.execute_write(_run_unwind_batch, query, rows)
+
+            if parallelism > 1:
+                with ThreadPoolExecutor(max_workers=parallelism) as executor:
+                    return sum(executor.map(write_batch, query_batches))
+            return sum(write_batch(query_batch) for query_batch in query_batches)
+
+        def flush_nodes():
+            nonlocal nodes_written
+            node_batches = []
+            for labels, rows_by_id in pending_nodes.items():
+                rows = list(rows_by_id.values())
+                query = _build_node_merge_query(list(labels))
+                for i in range(0, len(rows), batch_size):
+                    node_batches.append((query, rows[i : i + batch_size]))
+                nodes_written += len(rows)
+            pending_nodes.clear()
+            write_batches(node_batches)
+
+        def flush_edges(edge_keys: list[tuple]):
+            nonlocal edges_written
+            # Edges MATCH their endpoints so every buffered node has to be written first:
+            flush_nodes()
+            edge_batches = []
+            for edge_key in edge_keys:
+                rows = pending_edges.pop(edge_key)
+                query = _build_edge_merge_query(*edge_key, stub_endpoint_labels)
+                for i in range(0, len(rows), batch_size):
+                    edge_batches.append((query, rows[i : i + batch_size]))
+            edges_written += write_batches(edge_batches)
+
+        try:
+            start = time.perf_counter()
+
+            for element in elements:
+                if element["type"] == "node":
+                    labels = tuple(element["labels"])
+                    properties = element["properties"]
+                    primary_label = _primary_label(element["labels"])
+                    # Author and day nodes repeat for every comment, once written there's nothing left to MERGE:
+                    if (
+                        primary_labels_by_id.get(properties["id"], None)
+                        == primary_label
+                    ):
+                        if properties["id"] not in pending_nodes.get(labels, {}):
+                            continue
+                    primary_labels_by_id[properties["id"]] = primary_label
+
+                    ensure_constraint(primary_label)
+
+                    node_rows = pending_nodes.setdefault(labels, {})
+                    node_row = node_rows.setdefault(
+                        properties["id"], {"id": properties["id"], "properties": {}}
+                    )
+                    node_row["properties"].update(properties)
+
+                    if len(node_rows) >= batch_size:
+                        flush_nodes()
+
+                elif element["type"] == "edge":
+                    connection = element["connection"]
+                    relationship_type = element["labels"][0]
+                    default_from_label, default_to_label = edge_endpoint_labels.get(
+                        relationship_type, (None, None)
+                    )
+                    edge_key = (
+                        relationship_type,
+                        primary_labels_by_id.get(
+                            connection["from"], default_from_label
+                        ),
+                        primary_labels_by_id.get(connection["to"], default_to_label),
+                    )
+                    # A label-less MATCH can't use the id constraint and scans every node per row:
+                    if edge_key[1] is None or edge_key[2] is None:
+                        raise ValueError(
+                            f"No endpoint labels for {relationship_type} edge {connection['from']} -> {connection['to']}, add it to graph_edge_endpoint_labels"
+                        )
+                    for endpoint_label in edge_key[1:]:
+                        if endpoint_label in stub_endpoint_labels:
+                            ensure_constraint(endpoint_label)
+                    edge_rows = pending_edges.setdefault(edge_key, [])
+                    edge_rows.append(
+                        {
+                            "from": connection["from"],
+                            "to": connection["to"],
+                            "properties": element.get("properties", {}),
+                        }
+                    )
+
+                    if len(edge_rows) >= batch_size:
+                        flush_edges([edge_key])
+
+            flush_edges(list(pending_edges.keys()))
+
+            seconds = time.perf_counter() - start
+            stats: GraphWriteStatsDict = {
+                "nodes_written": nodes_written,
+                "edges_written": edges_written,
+                "seconds": seconds,
+                "nodes_per_second": nodes_written / seconds if seconds > 0 else 0.0,
+                "edges_per_second": edges_written / seconds if seconds > 0 else 0.0,
+            }
+            logger.info(
+                f"Wrote {nodes_written} nodes ({stats['nodes_per_second']:.0f}/s) and {edges_written} edges ({stats['edges_per_second']:.0f}/s) in {seconds:.2f}s"
+            )
+            return stats
+
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
@@ -35,3 +35,29 @@ class PostSpatialLabelDict(TypedDict):
     label_id: str
     geometry: str
     comment: str
+
+
+# core.tasks  id | post_id | task_type | status | created_date | claimed_by | claimed_date | attempts
+
+
+class PipelineTaskDict(TypedDict):
+    id: str
+    post_id: str
+    task_type: str
+    status: str
+    created_date: str
+    claimed_by: Optional[str]
+    claimed_date: Optional[str]
+    attempts: int
+
+
+# core.content  id | source | type | created_date | storage_path | fields
+
+
+class RedditContentDict(TypedDict):
+    id: str
+    source: str
+    type: str
+    created_date: float
+    storage_path: str
+    fields: dict
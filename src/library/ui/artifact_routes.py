@@ -0,0 +1,159 @@
+import os
+import posixpath
+import mimetypes
+import urllib.parse
+from typing import Iterator
+from email.utils import formatdate
+from flask import Flask, Response, abort, request
+from loguru import logger
+
+from library.io_interfaces.filestore_io import FileInterface, StoredFileInfoDict
+from library.ui.post_prefetcher import PostPrefetcher
+
+ARTIFACT_ROUTE_PREFIX = "/artifacts"
+
+ARTIFACT_MIME_TYPES = {
+    ".mpd": "application/dash+xml",
+    ".mp4": "video/mp4",
+    ".png": "image/png",
+    ".json": "application/json",
+}
+
+
+def get_artifact_url(filepath: str | None, config: dict) -> str | None:
+    """
+    The URL the artifact route serves a stored file under.
+
+    Local uploads record absolute paths, those are made relative to `root_dir_name`.
+    Paths outside of it are never served so None is returned for them.
+    """
+    if filepath is None:
+        return None
+
+    if os.path.isabs(filepath):
+        root_dir = os.path.abspath(config["root_dir_name"])
+        if os.path.commonpath([root_dir, os.path.abspath(filepath)]) != root_dir:
+            return None
+        filepath = os.path.relpath(filepath, root_dir)
+
+    return f"{ARTIFACT_ROUTE_PREFIX}/{urllib.parse.quote(filepath)}"
+
+
+def get_artifact_cache_control(filepath: str, config: dict) -> str:
+    # Manifests are rewritten when a post is re-ingested, so they are always revalidated against the ETag:
+    if filepath.endswith(".mpd"):
+        return "no-cache"
+    return f"private, max-age={config.get('artifact_max_age_seconds', 3600)}"
+
+
+def stream_artifact_range(
+    file_io: FileInterface,
+    filepath: str,
+    start: int,
+    length: int,
+    config: dict,
+) -> Iterator[bytes]:
+    chunk_size: int = config.get("artifact_chunk_size", 256 * 1024)
+    with file_io.open_file_range(
+        config["root_dir_name"], filepath, start, length, config
+    ) as stream:
+        remaining_bytes = length
+        while remaining_bytes > 0:
+            chunk = stream.read(min(chunk_size, remaining_bytes))
+            if not chunk:
+                break
+            remaining_bytes -= len(chunk)
+            yield chunk
+
+
+def _is_range_current(file_info: StoredFileInfoDict) -> bool:
+    # A Range only applies to the version the client already holds part of, otherwise the whole file is sent:
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == file_info["etag"]
+    if if_range.date is not None:
+        return if_range.date.timestamp() >= int(file_info["last_modified"])
+    return True
+
+
+def register_artifact_routes(
+    server: Flask,
+    file_io: FileInterface,
+    config: dict,
+    post_prefetcher: PostPrefetcher | None = None,
+):
+    """
+    Serve stored screenshots, DASH segments and manifests from the Dash app's Flask server.
+
+    Responses carry a strong ETag, Last-Modified and Cache-Control so the browser
+    revalidates with a 304 instead of downloading an artifact again, and single
+    byte ranges are answered with a 206 so media elements can seek without
+    fetching the whole file. Whole files warmed by `post_prefetcher` are served
+    from memory.
+    """
+
+    @server.route(f"{ARTIFACT_ROUTE_PREFIX}/<path:filepath>", methods=["GET", "HEAD"])
+    def serve_artifact(filepath: str):
+
+        filepath = posixpath.normpath(filepath)
+        if filepath.startswith("/") or filepath.split("/")[0] == "..":
+            abort(404)
+
+        file_info: StoredFileInfoDict | None = file_io.get_file_info(
+            config["root_dir_name"], filepath, config
+        )
+        if file_info is None:
+            abort(404)
+
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Cache-Control": get_artifact_cache_control(filepath, config),
+            "Last-Modified": formatdate(file_info["last_modified"], usegmt=True),
+            "ETag": f'"{file_info["etag"]}"',
+        }
+        mime_type = (
+            ARTIFACT_MIME_TYPES.get(posixpath.splitext(filepath)[1])
+            or mimetypes.guess_type(filepath)[0]
+            or "application/octet-stream"
+        )
+
+        if request.if_none_match.contains_weak(file_info["etag"]):
+            return Response(status=304, headers=headers)
+
+        size = file_info["size"]
+        start, length, status = 0, size, 200
+        # Multi-range requests are answered with the whole file rather than a multipart body:
+        if (
+            request.range is not None
+            and len(request.range.ranges) == 1
+            and _is_range_current(file_info)
+        ):
+            byte_range = request.range.range_for_length(size)
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status=416, headers=headers)
+
+            start, length, status = byte_range[0], byte_range[1] - byte_range[0], 206
+            headers[
+                "Content-Range"
+            ] = f"bytes {byte_range[0]}-{byte_range[1] - 1}/{size}"
+
+        headers["Content-Length"] = str(length)
+        if request.method == "HEAD":
+            return Response(status=status, headers=headers, mimetype=mime_type)
+
+        if status == 200 and post_prefetcher is not None:
+            cached_contents = post_prefetcher.get_cached_file(filepath)
+            if cached_contents is not None and len(cached_contents) == size:
+                return Response(
+                    cached_contents, status=200, headers=headers, mimetype=mime_type
+                )
+
+        logger.info(f"Streaming {length} bytes of {filepath} from offset {start}")
+        return Response(
+            stream_artifact_range(file_io, filepath, start, length, config),
+            status=status,
+            headers=headers,
+            mimetype=mime_type,
+            direct_passthrough=True,
+        )
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import glob
+import shapely
+import requests
+import traceback
+from flask import Flask, abort, send_from_directory
+from loguru import logger
+from typing import NotRequired, TypedDict
+
+
+class BoundaryOverlayDict(TypedDict):
+    id: str
+    name: str
+    source: str
+    color: str
+    checked: bool
+    tooltip_property: NotRequired[str]
+
+
+DEFAULT_BOUNDARY_OVERLAYS: list[BoundaryOverlayDict] = [
+    {
+        "id": "ukraine",
+        "name": "Ukraine",
+        "source": "https://raw.githubusercontent.com/EugeneBorshch/ukraine_geojson/refs/heads/master/UA_FULL_Ukraine.geojson",
+        "color": "blue",
+        "checked": True,
+        "tooltip_property": "name:en",
+    },
+    {
+        "id": "russia",
+        "name": "Russia",
+        "source": "https://raw.githubusercontent.com/georgique/world-geojson/refs/heads/develop/countries/russia.json",
+        "color": "red",
+        "checked": True,
+    },
+]
+
+DEFAULT_OVERLAY_ZOOM_LEVELS = [3, 5, 7, 9]
+
+BOUNDARY_OVERLAY_ROUTE_PREFIX = "/overlays"
+
+_BUILT_OVERLAY_FILENAME = re.compile(r"^(?P<id>[\w-]+)_z(?P<zoom>\d+)\.geojson$")
+
+
+def get_boundary_overlays(config: dict) -> list[BoundaryOverlayDict]:
+    return config.get("boundary_overlays", DEFAULT_BOUNDARY_OVERLAYS)
+
+
+def get_boundary_overlay_dir(config: dict) -> str:
+    return os.path.abspath(config.get("boundary_overlay_dir", "boundary_overlays"))
+
+
+def get_simplification_tolerance(zoom: int, pixel_tolerance: float = 1.0) -> float:
+    """The width of `pixel_tolerance` screen pixels in degrees at a zoom level, so simplified edges move less than that."""
+    return pixel_tolerance * 360 / (256 * 2**zoom)
+
+
+def simplify_feature_collection(
+    feature_collection: dict, tolerance: float, precision: int = 5
+) -> dict:
+    """
+    Simplify every geometry of a GeoJSON FeatureCollection for display at one zoom level.
+
+    `preserve_topology` keeps polygons valid, so rings never collapse or self intersect,
+    and coordinates are snapped to `precision` decimal places to keep the file small.
+    """
+    simplified_features = []
+    for feature in feature_collection["features"]:
+        if feature.get("geometry") is None:
+            continue
+
+        geometry = shapely.geometry.shape(feature["geometry"]).simplify(
+            tolerance, preserve_topology=True
+        )
+        geometry = shapely.set_precision(geometry, 10**-precision)
+        if geometry.is_empty:
+            continue
+
+        simplified_features.append(
+            {
+                "type": "Feature",
+                "properties": feature.get("properties") or {},
+                "geometry": shapely.geometry.mapping(geometry),
+            }
+        )
+
+    return {"type": "FeatureCollection", "features": simplified_features}
+
+
+def read_boundary_overlay_source(overlay: BoundaryOverlayDict, config: dict) -> dict:
+    # A source can be a local file so the overlays can be rebuilt without network access:
+    if os.path.isfile(overlay["source"]):
+        with open(overlay["source"]) as f:
+            return json.load(f)
+
+    response = requests.get(
+        overlay["source"], timeout=config.get("overlay_download_timeout", 60)
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def build_boundary_overlays(
+    overlays: list[BoundaryOverlayDict], zoom_levels: list[int], config: dict
+) -> list[str]:
+    """
+    Write one simplified GeoJSON file per overlay and zoom level into the boundary overlay directory.
+
+    Returns:
+        list[str]: The paths of the files that were written. Overlays whose source cannot be read are skipped.
+    """
+    output_dir = get_boundary_overlay_dir(config)
+    os.makedirs(output_dir, exist_ok=True)
+
+    written_paths = []
+    for overlay in overlays:
+        try:
+            feature_collection = read_boundary_overlay_source(overlay, config)
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            continue
+
+        for zoom in zoom_levels:
+            simplified = simplify_feature_collection(
+                feature_collection,
+                get_simplification_tolerance(
+                    zoom, config.get("simplify_pixel_tolerance", 1.0)
+                ),
+            )
+            output_path = os.path.join(output_dir, f"{overlay['id']}_z{zoom}.geojson")
+            with open(output_path, "w") as f:
+                json.dump(simplified, f, separators=(",", ":"))
+
+            logger.info(
+                f"Wrote {overlay['name']} simplified for zoom {zoom} to {output_path} ({os.path.getsize(output_path)} bytes)"
+            )
+            written_paths.append(output_path)
+
+    return written_paths
+
+
+def get_built_zoom_levels(overlay_id: str, config: dict) -> list[int]:
+    zoom_levels = []
+    for path in glob.glob(
+        os.path.join(get_boundary_overlay_dir(config), f"{overlay_id}_z*.geojson")
+    ):
+        match = _BUILT_OVERLAY_FILENAME.match(os.path.basename(path))
+        if match is not None and match.group("id") == overlay_id:
+            zoom_levels.append(int(match.group("zoom")))
+    return sorted(zoom_levels)
+
+
+def get_boundary_overlay_url(
+    overlay: BoundaryOverlayDict, zoom: float, config: dict
+) -> str:
+    """
+    The URL of the most detailed built level of an overlay that is not finer than the map's zoom.
+
+    Overlays that were never built fall back to their source so the map still works without the build step.
+    """
+    zoom_levels = get_built_zoom_levels(overlay["id"], config)
+    if len(zoom_levels) == 0:
+        return overlay["source"]
+
+    coarser_levels = [level for level in zoom_levels if level <= zoom]
+    level = coarser_levels[-1] if len(coarser_levels) > 0 else zoom_levels[0]
+    filename = f"{overlay['id']}_z{level}.geojson"
+    # The build time is part of the URL so a rebuilt overlay is never hidden behind a cached copy:
+    version = int(
+        os.path.getmtime(os.path.join(get_boundary_overlay_dir(config), filename))
+    )
+    return f"{BOUNDARY_OVERLAY_ROUTE_PREFIX}/{filename}?v={version}"
+
+
+def register_boundary_overlay_routes(server: Flask, config: dict):
+    """Serve the built overlay files with an ETag and a long lived Cache-Control, the URLs change whenever an overlay is rebuilt."""
+
+    @server.route(f"{BOUNDARY_OVERLAY_ROUTE_PREFIX}/<filename>")
+    def serve_boundary_overlay(filename: str):
+        if _BUILT_OVERLAY_FILENAME.match(filename) is None:
+            abort(404)
+
+        response = send_from_directory(
+            get_boundary_overlay_dir(config),
+            filename,
+            mimetype="application/geo+json",
+            max_age=config.get("overlay_max_age_seconds", 7 * 24 * 3600),
+            conditional=True,
+            etag=True,
+        )
+        response.cache_control.public = True
+        return response
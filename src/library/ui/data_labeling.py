@@ -5,8 +5,16 @@ from dash import Dash, html, dcc, dash_table
 from dash_extensions.javascript import assign
 
 from library.ui.register_ui_callbacks import register_callbacks
-from library.ui.leaflet_maps import main_map, mirror_map
-from library.io_interfaces.db_io import DatabaseInterface
+from library.ui.leaflet_maps import generate_main_map, generate_mirror_map
+from library.ui.post_prefetcher import PostPrefetcher
+from library.ui.artifact_routes import register_artifact_routes
+from library.ui.boundary_overlays import register_boundary_overlay_routes
+from library.ui.tile_proxy import register_tile_proxy_routes
+from library.ui.label_clusters import LabelClusterOverlay
+from library.io_interfaces.db_io import (
+    DatabaseInterface,
+    UNLABELED_POSTS_TABLE_COLUMNS,
+)
 from library.io_interfaces.filestore_io import FileInterface
 
 
@@ -25,16 +33,38 @@ def generate_data_labelling_dash_app(
 
     app = Dash()
 
-    register_callbacks(db_io=db_io, file_io=file_io, config=config)
+    # Screenshots and post json of the rows after the selected one are read ahead of the labeller:
+    post_prefetcher = PostPrefetcher(file_io=file_io, config=config)
+
+    # Existing labels are drawn on the main map as clusters answered per viewport:
+    label_cluster_overlay = LabelClusterOverlay(db_io=db_io, config=config)
+
+    register_callbacks(
+        db_io=db_io,
+        file_io=file_io,
+        config=config,
+        post_prefetcher=post_prefetcher,
+        label_cluster_overlay=label_cluster_overlay,
+    )
+    register_artifact_routes(
+        server=app.server,
+        file_io=file_io,
+        config=config,
+        post_prefetcher=post_prefetcher,
+    )
+    register_boundary_overlay_routes(server=app.server, config=config)
+    # Basemap tiles go through a local caching proxy only when a cache directory is configured:
+    if config.get("tile_cache_dir", None) is not None:
+        register_tile_proxy_routes(server=app.server, config=config)
 
     app.layout = html.Div(
         [
             html.Div(
                 [
                     # Setup a map with the edit control.
-                    main_map,
+                    generate_main_map(config),
                     # Setup another map to that mirrors the edit control geometries using the GeoJSON component.
-                    mirror_map,
+                    generate_mirror_map(config),
                     dcc.Dropdown(
                         id="aoi_interests",
                         value=[],
@@ -51,6 +81,9 @@ def generate_data_labelling_dash_app(
             html.Div(
                 children=[
                     dcc.Markdown(id="selected_post_id"),
+                    dcc.Markdown(id="selected_post_text"),
+                    # Served by the artifact route so the browser caches it like any image:
+                    html.Img(id="selected_post_screenshot", style={"maxWidth": "100%"}),
                     html.Div(
                         children=[
                             dcc.Markdown(
@@ -110,9 +143,22 @@ def generate_data_labelling_dash_app(
                 ],
                 style={"margin": "1rem"},
             ),
+            # Paging, filtering and sorting run as database queries, see render_unlabeled_posts_page:
             dash_table.DataTable(
                 id="unlabeled_posts_tbl",
-                data=None,
+                data=[],
+                columns=[
+                    {"name": column, "id": column}
+                    for column in UNLABELED_POSTS_TABLE_COLUMNS
+                ],
+                page_action="custom",
+                page_current=0,
+                page_size=config.get("table_page_size", 25),
+                filter_action="custom",
+                filter_query="",
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
                 style_cell={
                     "overflow": "hidden",
                     "textOverflow": "ellipsis",
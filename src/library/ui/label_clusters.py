@@ -0,0 +1,240 @@
+import math
+import threading
+import time
+import numpy as np
+import pandas as pd
+from loguru import logger
+from typing import TypedDict
+
+from library.io_interfaces.db_io import DatabaseInterface
+
+
+class LabelClusterLevelDict(TypedDict):
+    x: np.ndarray
+    y: np.ndarray
+    longitude: np.ndarray
+    latitude: np.ndarray
+    point_count: np.ndarray
+    representative: np.ndarray
+
+
+def project_to_mercator(
+    longitudes: np.ndarray, latitudes: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Web Mercator coordinates scaled to the unit square, x to the east and y to the south like tile indices."""
+    x = longitudes / 360 + 0.5
+    sin_latitude = np.sin(np.radians(np.clip(latitudes, -85.0511, 85.0511)))
+    y = 0.5 - 0.25 * np.log((1 + sin_latitude) / (1 - sin_latitude)) / math.pi
+    return x, y
+
+
+def unproject_from_mercator(
+    x: np.ndarray, y: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    longitudes = (x - 0.5) * 360
+    latitudes = np.degrees(2 * np.arctan(np.exp((0.5 - y) * 2 * math.pi)) - math.pi / 2)
+    return longitudes, latitudes
+
+
+def abbreviate_point_count(point_count: int) -> str:
+    if point_count >= 10_000:
+        return f"{round(point_count / 1000)}k"
+    if point_count >= 1000:
+        return f"{point_count / 1000:.1f}k"
+    return str(point_count)
+
+
+class LabelClusterIndex:
+    """
+    Hierarchical grid clusters of label centroids for every zoom level, in the style of supercluster.
+
+    Each zoom level merges the clusters of the level below it that share a grid cell
+    `radius_px` screen pixels wide at that zoom, placing the merged cluster at the
+    count-weighted mean of its children. Everything is computed up front, so
+    answering a viewport is a bounding box mask over one level's arrays no matter
+    how many labels there are.
+    """
+
+    def __init__(
+        self,
+        label_centroids: pd.DataFrame,
+        min_zoom: int = 0,
+        max_zoom: int = 16,
+        radius_px: float = 60,
+        tile_size: int = 256,
+    ):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.label_ids = label_centroids["label_id"].astype(str).to_numpy()
+        self.post_ids = label_centroids["post_id"].astype(str).to_numpy()
+
+        longitudes = label_centroids["longitude"].to_numpy(dtype=float)
+        latitudes = label_centroids["latitude"].to_numpy(dtype=float)
+        x, y = project_to_mercator(longitudes, latitudes)
+
+        # Past max_zoom every label is drawn on its own:
+        level: LabelClusterLevelDict = {
+            "x": x,
+            "y": y,
+            "longitude": longitudes,
+            "latitude": latitudes,
+            "point_count": np.ones(len(x), dtype=np.int64),
+            "representative": np.arange(len(x)),
+        }
+        self.levels: dict[int, LabelClusterLevelDict] = {max_zoom + 1: level}
+
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            cell_size = radius_px / (tile_size * 2**zoom)
+            cells_per_side = math.ceil(1 / cell_size) + 1
+            cell_keys = np.floor(level["x"] / cell_size).astype(np.int64) * (
+                cells_per_side
+            ) + np.floor(level["y"] / cell_size).astype(np.int64)
+
+            _, first_child, cluster_of_child = np.unique(
+                cell_keys, return_index=True, return_inverse=True
+            )
+            point_count = np.bincount(cluster_of_child, weights=level["point_count"])
+            x = (
+                np.bincount(cluster_of_child, weights=level["x"] * level["point_count"])
+                / point_count
+            )
+            y = (
+                np.bincount(cluster_of_child, weights=level["y"] * level["point_count"])
+                / point_count
+            )
+            longitude, latitude = unproject_from_mercator(x, y)
+            representative = level["representative"][first_child]
+            # A cluster of one is the label itself, keep its exact position rather than the round trip through mercator:
+            is_single = point_count == 1
+            longitude[is_single] = longitudes[representative[is_single]]
+            latitude[is_single] = latitudes[representative[is_single]]
+
+            level = {
+                "x": x,
+                "y": y,
+                "longitude": longitude,
+                "latitude": latitude,
+                "point_count": point_count.astype(np.int64),
+                "representative": representative,
+            }
+            self.levels[zoom] = level
+
+        logger.info(
+            f"Clustered {len(self.label_ids)} labels into {len(self.levels[min_zoom]['x'])} clusters at zoom {min_zoom}"
+        )
+
+    def get_clusters(
+        self, bbox: tuple[float, float, float, float], zoom: float
+    ) -> dict:
+        """
+        The clusters and single labels inside a (min_x, min_y, max_x, max_y) EPSG:4326 extent.
+
+        Returns:
+            dict: A GeoJSON FeatureCollection. Clusters carry `cluster`, `point_count` and
+                `point_count_abbreviated` properties, single labels their `label_id` and `post_id`.
+        """
+        level = self.levels[
+            min(max(math.floor(zoom), self.min_zoom), self.max_zoom + 1)
+        ]
+        min_x, min_y, max_x, max_y = bbox
+
+        # Leaflet reports longitudes past ±180 once the map is panned across the antimeridian or
+        # zoomed out past one world width. The extent is wrapped back into the index's [-180, 180]
+        # and split where it crosses the antimeridian, and the matches are moved into the viewport's
+        # copy of the world so they are drawn where the labeller is looking:
+        if max_x - min_x >= 360:
+            display_longitudes = level["longitude"]
+            in_longitude = np.ones(len(display_longitudes), dtype=bool)
+        else:
+            world_offset = math.floor((min_x + 180) / 360) * 360
+            display_longitudes = (
+                np.where(
+                    level["longitude"] >= min_x - world_offset,
+                    level["longitude"],
+                    level["longitude"] + 360,
+                )
+                + world_offset
+            )
+            in_longitude = display_longitudes <= max_x
+
+        in_bbox = (
+            in_longitude & (level["latitude"] >= min_y) & (level["latitude"] <= max_y)
+        )
+
+        features = []
+        for i in np.flatnonzero(in_bbox):
+            point_count = int(level["point_count"][i])
+            if point_count == 1:
+                label_index = level["representative"][i]
+                properties = {
+                    "cluster": False,
+                    "label_id": self.label_ids[label_index],
+                    "post_id": self.post_ids[label_index],
+                }
+            else:
+                properties = {
+                    "cluster": True,
+                    "point_count": point_count,
+                    "point_count_abbreviated": abbreviate_point_count(point_count),
+                }
+            features.append(
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "Point",
+                        "coordinates": [
+                            float(display_longitudes[i]),
+                            float(level["latitude"][i]),
+                        ],
+                    },
+                    "properties": properties,
+                }
+            )
+
+        return {"type": "FeatureCollection", "features": features}
+
+
+class LabelClusterOverlay:
+    """
+    Keeps a `LabelClusterIndex` of all stored labels, rebuilt from `get_label_centroids`
+    once it is older than `label_cluster_refresh_seconds`.
+    """
+
+    def __init__(self, db_io: DatabaseInterface, config: dict):
+        self.db_io = db_io
+        self.config = config
+        self.refresh_seconds: float = config.get("label_cluster_refresh_seconds", 60)
+        self._lock = threading.Lock()
+        self._index: LabelClusterIndex | None = None
+        self._built_at = 0.0
+
+    def get_index(self) -> LabelClusterIndex | None:
+        with self._lock:
+            if (
+                self._index is not None
+                and time.monotonic() - self._built_at < self.refresh_seconds
+            ):
+                return self._index
+
+            label_centroids: pd.DataFrame | None = self.db_io.get_label_centroids(
+                db_engine=self.config["db_engine"], config=self.config
+            )
+            # A failed refresh keeps serving the clusters that were already built:
+            if label_centroids is None:
+                return self._index
+
+            self._index = LabelClusterIndex(
+                label_centroids,
+                max_zoom=self.config.get("label_cluster_max_zoom", 16),
+                radius_px=self.config.get("label_cluster_radius_px", 60),
+            )
+            self._built_at = time.monotonic()
+            return self._index
+
+    def get_clusters(
+        self, bbox: tuple[float, float, float, float], zoom: float
+    ) -> dict:
+        index = self.get_index()
+        if index is None:
+            return {"type": "FeatureCollection", "features": []}
+        return index.get_clusters(bbox, zoom)
@@ -1,6 +1,14 @@
 import dash_leaflet as dl
+from loguru import logger
 from dash_extensions.javascript import assign
 
+from library.ui.tile_proxy import get_tile_layer_url
+from library.ui.boundary_overlays import (
+    get_boundary_overlay_dir,
+    get_boundary_overlay_url,
+    get_boundary_overlays,
+)
+
 point_to_layer = assign(
     """function(feature, latlng, context){
     const p = feature.properties;
@@ -10,92 +18,143 @@ point_to_layer = assign(
 }"""
 )
 
-main_basemap_layers = [
-    dl.LayersControl(
-        [
-            dl.BaseLayer(
-                dl.TileLayer(url="http://tile.openstreetmap.org/{z}/{x}/{y}.png"),
-                name="Open Street Map",
-                checked=True,
-            ),
-            dl.BaseLayer(
-                dl.TileLayer(url="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}"),
-                name="Google Street Map",
-                checked=False,
-            ),
+# Clusters are precomputed on the server, see LabelClusterIndex, so this only draws what is in view:
+label_cluster_to_layer = assign(
+    """function(feature, latlng, context){
+    const p = feature.properties;
+    if(!p.cluster){return L.circleMarker(latlng, {radius: 5, color: '#d7301f', fillOpacity: 0.8})}
+    const size = p.point_count < 100 ? 'small' : (p.point_count < 1000 ? 'medium' : 'large');
+    const icon = L.divIcon({
+        html: '<div><span>' + p.point_count_abbreviated + '</span></div>',
+        className: 'marker-cluster marker-cluster-' + size,
+        iconSize: L.point(40, 40)
+    });
+    return L.marker(latlng, {icon: icon});
+}"""
+)
+
+boundary_overlay_tooltip = assign(
+    """function(feature, layer, context){
+    const key = context && context.hideout ? context.hideout.tooltip_property : null;
+    if (key && feature.properties && feature.properties[key]) {
+        layer.bindTooltip(feature.properties[key], {sticky: true});
+    }
+}"""
+)
+
+# The main map opens over Ukraine, the boundary overlays are swapped for finer levels as it zooms in:
+MAIN_MAP_CENTER = [48.4, 31.2]
+MAIN_MAP_ZOOM = 6
+
+
+def generate_boundary_overlay_layers(config: dict) -> list[dl.Overlay]:
+    overlay_layers = []
+    for overlay in get_boundary_overlays(config):
+        overlay_url = get_boundary_overlay_url(overlay, MAIN_MAP_ZOOM, config)
+        if overlay_url == overlay["source"]:
+            logger.warning(
+                f"No simplified {overlay['name']} overlay in {get_boundary_overlay_dir(config)}, loading it from {overlay['source']}"
+            )
+
+        overlay_layers.append(
             dl.Overlay(
                 dl.LayerGroup(
                     dl.GeoJSON(
-                        url="https://raw.githubusercontent.com/EugeneBorshch/ukraine_geojson/refs/heads/master/UA_FULL_Ukraine.geojson",
-                        zoomToBounds=True,
+                        id={"type": "boundary_overlay", "overlay": overlay["id"]},
+                        url=overlay_url,
                         zoomToBoundsOnClick=True,
-                        onEachFeature=assign(
-                            """
-                            function(feature, layer) {
-                                if (feature.properties && feature.properties["name:en"]) {
-                                    layer.bindTooltip(feature.properties["name:en"], {sticky: true});
-                                }
-                            }
-                            """
-                        ),
-                        style={"color": "blue", "weight": 2, "fillOpacity": 0.2},
+                        onEachFeature=boundary_overlay_tooltip,
+                        hideout={
+                            "tooltip_property": overlay.get("tooltip_property", None)
+                        },
+                        style={
+                            "color": overlay["color"],
+                            "weight": 2,
+                            "fillOpacity": 0.2,
+                        },
                     )
                 ),
-                name="Ukraine",
-                checked=True,
-            ),
-            dl.Overlay(
-                dl.LayerGroup(
-                    dl.GeoJSON(
-                        url="https://raw.githubusercontent.com/georgique/world-geojson/refs/heads/develop/countries/russia.json",
-                        zoomToBoundsOnClick=True,
-                        style={"color": "red", "weight": 2, "fillOpacity": 0.2},
-                    )
+                name=overlay["name"],
+                checked=overlay["checked"],
+            )
+        )
+    return overlay_layers
+
+
+def generate_main_basemap_layers(config: dict) -> list:
+    return [
+        dl.LayersControl(
+            [
+                dl.BaseLayer(
+                    dl.TileLayer(url=get_tile_layer_url("osm", config)),
+                    name="Open Street Map",
+                    checked=True,
                 ),
-                name="Russia",
-                checked=True,
-            ),
-        ]
-    )
-]
-
-mirror_basemap_layers = [
-    dl.LayersControl(
-        [
-            dl.BaseLayer(
-                dl.TileLayer(url="http://tile.openstreetmap.org/{z}/{x}/{y}.png"),
-                name="Open Street Map",
-                checked=False,
-            ),
-            dl.BaseLayer(
-                dl.TileLayer(url="https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}"),
-                name="Google Street Map",
-                checked=True,
-            ),
-        ]
+                dl.BaseLayer(
+                    dl.TileLayer(url=get_tile_layer_url("google", config)),
+                    name="Google Street Map",
+                    checked=False,
+                ),
+            ]
+            + generate_boundary_overlay_layers(config)
+            + [
+                dl.Overlay(
+                    dl.LayerGroup(
+                        dl.GeoJSON(
+                            id="label_clusters",
+                            data={"type": "FeatureCollection", "features": []},
+                            pointToLayer=label_cluster_to_layer,
+                        )
+                    ),
+                    name="Labels",
+                    checked=True,
+                ),
+            ]
+        )
+    ]
+
+
+def generate_mirror_basemap_layers(config: dict) -> list:
+    return [
+        dl.LayersControl(
+            [
+                dl.BaseLayer(
+                    dl.TileLayer(url=get_tile_layer_url("osm", config)),
+                    name="Open Street Map",
+                    checked=False,
+                ),
+                dl.BaseLayer(
+                    dl.TileLayer(url=get_tile_layer_url("google", config)),
+                    name="Google Street Map",
+                    checked=True,
+                ),
+            ]
+        )
+    ]
+
+
+def generate_main_map(config: dict) -> dl.Map:
+    return dl.Map(
+        center=MAIN_MAP_CENTER,
+        zoom=MAIN_MAP_ZOOM,
+        children=generate_main_basemap_layers(config)
+        + [
+            dl.FullScreenControl(),
+            dl.FeatureGroup([dl.EditControl(id="edit_control")]),
+        ],
+        style={"width": "50%", "height": "50vh", "display": "inline-block"},
+        id="map",
     )
-]
-
-
-main_map = dl.Map(
-    center=[56, 10],
-    zoom=4,
-    children=main_basemap_layers
-    + [
-        dl.FullScreenControl(),
-        dl.FeatureGroup([dl.EditControl(id="edit_control")]),
-    ],
-    style={"width": "50%", "height": "50vh", "display": "inline-block"},
-    id="map",
-)
 
-mirror_map = dl.Map(
-    center=[56, 10],
-    zoom=4,
-    children=mirror_basemap_layers
-    + [
-        dl.GeoJSON(id="geojson", pointToLayer=point_to_layer, zoomToBounds=True),
-    ],
-    style={"width": "50%", "height": "50vh", "display": "inline-block"},
-    id="mirror",
-)
+
+def generate_mirror_map(config: dict) -> dl.Map:
+    return dl.Map(
+        center=[56, 10],
+        zoom=4,
+        children=generate_mirror_basemap_layers(config)
+        + [
+            dl.GeoJSON(id="geojson", pointToLayer=point_to_layer, zoomToBounds=True),
+        ],
+        style={"width": "50%", "height": "50vh", "display": "inline-block"},
+        id="mirror",
+    )
@@ -0,0 +1,184 @@
+import io
+import json
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from loguru import logger
+from typing import TypedDict
+
+from library.types import RedditPostDict
+from library.io_interfaces.filestore_io import FileInterface
+
+
+class PostPrefetcherStatsDict(TypedDict):
+    hits: int
+    waits: int
+    misses: int
+    cached_entries: int
+    cached_bytes: int
+
+
+def get_post_artifact_paths(post: RedditPostDict) -> list[str]:
+    """The screenshot and thumbnail paths of a post, in the order the labeller looks at them."""
+    fields = post["fields"]
+    artifact_paths = []
+    if fields.get("screenshot_path") is not None:
+        artifact_paths.append(fields["screenshot_path"])
+    for static_file in fields.get("static_files", []):
+        if static_file.get("type") == "thumbnail" and "path" in static_file:
+            artifact_paths.append(static_file["path"])
+    return artifact_paths
+
+
+class PostPrefetcher:
+    """
+    Warms the artifacts of the posts a labeller is about to look at.
+
+    `prefetch` reads the screenshots, thumbnails and parsed `post.json` of the
+    given posts through `FileInterface.read_file` on a small thread pool into a
+    byte-bounded LRU. Each call replaces the previous window, so queued reads for
+    posts the labeller has moved past are cancelled. `get_file` and `get_post_json`
+    serve from the cache, wait on a read already in flight, or read synchronously.
+    """
+
+    def __init__(self, file_io: FileInterface, config: dict):
+        self.file_io = file_io
+        self.config = config
+        self.dir_name: str = config["root_dir_name"]
+        self.prefetch_depth: int = config.get("prefetch_depth", 5)
+        self.max_cache_bytes: int = config.get(
+            "prefetch_cache_bytes", 256 * 1024 * 1024
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.get("prefetch_workers", 2),
+            thread_name_prefix="post-prefetch",
+        )
+        # Reentrant because cancelling a queued read, or registering the callback of one
+        # that already finished, runs `_forget_in_flight` inline while `prefetch` holds it:
+        self._lock = threading.RLock()
+        self._cache: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()
+        self._cached_bytes = 0
+        self._in_flight: dict[tuple[str, str], Future] = {}
+        self._hits = 0
+        self._waits = 0
+        self._misses = 0
+
+    def _read(self, key: tuple[str, str]) -> object | None:
+        kind, filepath = key
+        file_stream = self.file_io.read_file(self.dir_name, filepath, self.config)
+        # read_file hands back an error message or None rather than raising:
+        if not isinstance(file_stream, io.BytesIO):
+            return None
+
+        contents = file_stream.getvalue()
+        try:
+            value = json.loads(contents) if kind == "json" else contents
+        except Exception as e:
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            return None
+
+        self._store(key, value, len(contents))
+        return value
+
+    def _store(self, key: tuple[str, str], value: object, num_bytes: int):
+        if num_bytes > self.max_cache_bytes:
+            return
+
+        with self._lock:
+            if key in self._cache:
+                self._cached_bytes -= self._cache.pop(key)[1]
+            self._cache[key] = (value, num_bytes)
+            self._cached_bytes += num_bytes
+
+            while self._cached_bytes > self.max_cache_bytes:
+                _, (_, evicted_bytes) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted_bytes
+
+    def _forget_in_flight(self, key: tuple[str, str], future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def prefetch(
+        self, posts: list[RedditPostDict], selected_post: RedditPostDict | None = None
+    ):
+        """
+        Start reading the artifacts of the next `prefetch_depth` posts, dropping the previous window.
+
+        The `selected_post` being shown leads the window, so its reads are queued
+        first and one already in flight isn't cancelled before it is served.
+        """
+        window_posts = posts[: self.prefetch_depth]
+        if selected_post is not None:
+            window_posts = [selected_post] + window_posts
+
+        window_keys: list[tuple[str, str]] = []
+        for post in window_posts:
+            if post["fields"].get("json_file_path") is not None:
+                window_keys.append(("json", post["fields"]["json_file_path"]))
+            window_keys.extend(
+                ("file", filepath) for filepath in get_post_artifact_paths(post)
+            )
+
+        with self._lock:
+            # A cancelled read is dropped from `_in_flight` by its done callback:
+            for key, future in list(self._in_flight.items()):
+                if key not in window_keys:
+                    future.cancel()
+
+            for key in window_keys:
+                if key in self._cache or key in self._in_flight:
+                    continue
+                future = self._executor.submit(self._read, key)
+                self._in_flight[key] = future
+                future.add_done_callback(
+                    lambda future, key=key: self._forget_in_flight(key, future)
+                )
+
+    def _get(self, key: tuple[str, str], read_on_miss: bool = True) -> object | None:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return self._cache[key][0]
+            future = self._in_flight.get(key)
+
+        if future is not None and not future.cancelled():
+            with self._lock:
+                self._waits += 1
+            try:
+                return future.result()
+            except CancelledError:
+                # Another callback's `prefetch` dropped the read while it was queued, read it here instead:
+                pass
+            except Exception as e:
+                error_msg = traceback.format_exc()
+                logger.error(error_msg)
+                return None
+
+        with self._lock:
+            self._misses += 1
+        return self._read(key) if read_on_miss else None
+
+    def get_file(self, filepath: str) -> bytes | None:
+        return self._get(("file", filepath))
+
+    def get_cached_file(self, filepath: str) -> bytes | None:
+        """Like `get_file` but returns None instead of reading a file that was never prefetched."""
+        return self._get(("file", filepath), read_on_miss=False)
+
+    def get_post_json(self, filepath: str) -> list | dict | None:
+        return self._get(("json", filepath))
+
+    def stats(self) -> PostPrefetcherStatsDict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "waits": self._waits,
+                "misses": self._misses,
+                "cached_entries": len(self._cache),
+                "cached_bytes": self._cached_bytes,
+            }
@@ -1,19 +1,159 @@
 import json
+import math
 import dash
 import pprint
 import pandas as pd
-from dash import Output, Input, State
+from dash import ALL, Output, Input, State
+from library.types import RedditPostDict
 from library.io_interfaces.db_io import DatabaseInterface
 from library.io_interfaces.filestore_io import FileInterface
+from library.ui.post_prefetcher import PostPrefetcher
+from library.ui.artifact_routes import get_artifact_url
+from library.ui.label_clusters import LabelClusterOverlay
+from library.ui.boundary_overlays import get_boundary_overlay_url, get_boundary_overlays
 
+# DataTable filter_query operators mapped to the operators get_unlabeled_posts_page accepts:
+FILTER_QUERY_OPERATORS = {
+    "ge": ">=",
+    "le": "<=",
+    "lt": "<",
+    "gt": ">",
+    "ne": "!=",
+    "eq": "=",
+    "contains": "contains",
+    "datestartswith": "datestartswith",
+    "=": "=",
+    "!=": "!=",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+}
 
-def register_callbacks(db_io: DatabaseInterface, file_io: FileInterface, config: dict):
+
+def split_filter_query(filter_query: str | None) -> list[tuple[str, str, str | float]]:
+    """
+    Parse a DataTable `filter_query` such as `{title} contains kyiv && {post_created_date} ge "2024-08"`.
+
+    Returns:
+        list[tuple[str, str, str | float]]: (column, operator, value) for every part that could be parsed.
+    """
+    if not filter_query:
+        return []
+
+    filters: list[tuple[str, str, str | float]] = []
+    for filter_part in filter_query.split(" && "):
+        name_part, _, remainder = filter_part.partition("} ")
+        operator, _, value_part = remainder.strip().partition(" ")
+        # Case (in)sensitive variants such as icontains / seq share the base operator:
+        if (
+            operator not in FILTER_QUERY_OPERATORS
+            and operator[1:] in FILTER_QUERY_OPERATORS
+        ):
+            operator = operator[1:]
+        if operator not in FILTER_QUERY_OPERATORS or value_part == "":
+            continue
+        operator = FILTER_QUERY_OPERATORS[operator]
+
+        column = name_part[name_part.find("{") + 1 :]
+        value_part = value_part.strip()
+        quote = value_part[0]
+        if quote == value_part[-1] and quote in ("'", '"', "`") and len(value_part) > 1:
+            value: str | float = value_part[1:-1].replace("\\" + quote, quote)
+        elif operator in ("contains", "datestartswith"):
+            value = value_part
+        else:
+            try:
+                value = float(value_part)
+            except ValueError:
+                value = value_part
+
+        filters.append((column, operator, value))
+
+    return filters
+
+
+def get_posts_in_table_order(
+    db_io: DatabaseInterface, post_ids: list[str], config: dict
+) -> list[RedditPostDict] | None:
+    posts: list[RedditPostDict] | None = db_io.get_reddit_posts(
+        post_ids, db_engine=config["db_engine"], config=config
+    )
+    if posts is None:
+        return None
+    posts_by_id = {post["id"]: post for post in posts}
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id]
+
+
+def register_callbacks(
+    db_io: DatabaseInterface,
+    file_io: FileInterface,
+    config: dict,
+    post_prefetcher: PostPrefetcher,
+    label_cluster_overlay: LabelClusterOverlay,
+):
 
     # Copy data from the edit control to the geojson component.
     @dash.callback(Output("geojson", "data"), Input("edit_control", "geojson"))
     def mirror(x):
         return x
 
+    @dash.callback(
+        Output("label_clusters", "data"),
+        Input("map", "bounds"),
+        Input("map", "zoom"),
+    )
+    def render_label_clusters(bounds: list[list[float]] | None, zoom: float | None):
+        # Leaflet reports [[south, west], [north, east]] once the map is mounted:
+        if bounds is None:
+            bbox = (-180, -90, 180, 90)
+        else:
+            (south, west), (north, east) = bounds
+            bbox = (west, south, east, north)
+
+        return label_cluster_overlay.get_clusters(bbox, zoom if zoom is not None else 0)
+
+    @dash.callback(
+        Output("map", "viewport"),
+        Input("label_clusters", "clickData"),
+        State("map", "zoom"),
+    )
+    def zoom_into_label_cluster(click_data: dict | None, zoom: float | None):
+        if click_data is None or not click_data["properties"].get("cluster", False):
+            raise dash.exceptions.PreventUpdate
+
+        longitude, latitude = click_data["geometry"]["coordinates"]
+        return dict(
+            center=[latitude, longitude], zoom=(zoom or 0) + 2, transition="flyTo"
+        )
+
+    @dash.callback(
+        Output({"type": "boundary_overlay", "overlay": ALL}, "url"),
+        Input("map", "zoom"),
+        State({"type": "boundary_overlay", "overlay": ALL}, "id"),
+        State({"type": "boundary_overlay", "overlay": ALL}, "url"),
+    )
+    def render_boundary_overlay_detail(
+        zoom: float | None, overlay_ids: list[dict], current_urls: list[str]
+    ):
+        if zoom is None:
+            raise dash.exceptions.PreventUpdate
+
+        overlays_by_id = {
+            overlay["id"]: overlay for overlay in get_boundary_overlays(config)
+        }
+        overlay_urls = [
+            get_boundary_overlay_url(
+                overlays_by_id[overlay_id["overlay"]], zoom, config
+            )
+            for overlay_id in overlay_ids
+        ]
+        # Only overlays crossing into another level are fetched again:
+        return [
+            dash.no_update if overlay_url == current_url else overlay_url
+            for overlay_url, current_url in zip(overlay_urls, current_urls)
+        ]
+
     # Trigger mode (draw marker).
     @dash.callback(
         Output("edit_control", "drawToolbar"), Input("draw_marker", "n_clicks")
@@ -34,47 +174,107 @@ def register_callbacks(db_io: DatabaseInterface, file_io: FileInterface, config:
 
     @dash.callback(
         Output("unlabeled_posts_tbl", "data"),
-        Output("unlabeled_posts_tbl", "columns"),
+        Output("unlabeled_posts_tbl", "page_count"),
         Input("unlabeled_posts_tbl_btn", "n_clicks"),
+        Input("unlabeled_posts_tbl", "page_current"),
+        Input("unlabeled_posts_tbl", "page_size"),
+        Input("unlabeled_posts_tbl", "sort_by"),
+        Input("unlabeled_posts_tbl", "filter_query"),
     )
-    def render_all_unlabeled_posts(n_clicks):
-        unlabeled_posts_df: pd.DataFrame | None = db_io.get_all_unlabeled_posts(
-            db_engine=config["db_engine"], config=config
+    def render_unlabeled_posts_page(
+        n_clicks, page_current: int, page_size: int, sort_by: list, filter_query: str
+    ):
+        # Nothing is loaded until the table is requested:
+        if n_clicks is None:
+            raise dash.exceptions.PreventUpdate
+
+        unlabeled_posts_page: tuple[
+            pd.DataFrame, int
+        ] | None = db_io.get_unlabeled_posts_page(
+            page_current=page_current or 0,
+            page_size=page_size,
+            filters=split_filter_query(filter_query),
+            sort_by=sort_by or [],
+            db_engine=config["db_engine"],
+            config=config,
+        )
+        if unlabeled_posts_page is None:
+            raise dash.exceptions.PreventUpdate
+
+        unlabeled_posts_df, total_posts = unlabeled_posts_page
+
+        # The labeller starts at the top of a fresh page, so warm its first rows:
+        page_start_posts = get_posts_in_table_order(
+            db_io,
+            list(unlabeled_posts_df["post_id"].astype(str))[
+                : post_prefetcher.prefetch_depth
+            ],
+            config,
         )
+        if page_start_posts is not None:
+            post_prefetcher.prefetch(page_start_posts)
+
         return (
-            unlabeled_posts_df.to_dict(orient="records"),
-            [{"name": i, "id": i} for i in unlabeled_posts_df.columns],
+            unlabeled_posts_df.astype(str).to_dict(orient="records"),
+            max(1, math.ceil(total_posts / page_size)),
         )
 
     @dash.callback(
         Output("selected_post_id", "children"),
         Output("selected_post_json_fields", "children"),
-        Output("current_map_extents", "children"),
+        Output("selected_post_text", "children"),
+        Output("selected_post_screenshot", "src"),
         Input("unlabeled_posts_tbl", "active_cell"),
-        Input("edit_control", "geojson"),
         State("unlabeled_posts_tbl", "data"),
     )
-    def unlabeled_post_tbl_onclick(
-        active_cell: dict, current_geojson: dict, posts_data: list[dict]
-    ):
+    def unlabeled_post_tbl_onclick(active_cell: dict, posts_data: list[dict]):
 
-        if active_cell is None:
+        if active_cell is None or active_cell["row"] >= len(posts_data):
             raise dash.exceptions.PreventUpdate
 
-        selected_tbl_row = posts_data[active_cell["row"]]
+        selected_row = active_cell["row"]
 
-        fields = selected_tbl_row["fields"]
-        if isinstance(fields, str):
-            try:
-                fields = json.loads(fields)
-                core_url = fields["url"]
-            except json.JSONDecodeError:
-                pass
+        # The full fields are read for the selected post and the rows after it in one query:
+        upcoming_posts = get_posts_in_table_order(
+            db_io,
+            [
+                tbl_row["post_id"]
+                for tbl_row in posts_data[
+                    selected_row : selected_row + 1 + post_prefetcher.prefetch_depth
+                ]
+            ],
+            config,
+        )
+        if (
+            upcoming_posts is None
+            or len(upcoming_posts) == 0
+            or upcoming_posts[0]["id"] != posts_data[selected_row]["post_id"]
+        ):
+            raise dash.exceptions.PreventUpdate
+
+        selected_post = upcoming_posts[0]
+        post_prefetcher.prefetch(upcoming_posts[1:], selected_post=selected_post)
 
-        print(core_url)
+        post_text = ""
+        if selected_post["fields"].get("json_file_path") is not None:
+            post_json = post_prefetcher.get_post_json(
+                selected_post["fields"]["json_file_path"]
+            )
+            if post_json is not None:
+                post_text = post_json[0]["data"]["children"][0]["data"].get(
+                    "selftext", ""
+                )
 
         return (
-            f"## Selected post: {selected_tbl_row['post_id']}",
-            json.dumps(fields, indent=2).replace('"', ""),
-            json.dumps(current_geojson, indent=2),
+            f"## Selected post: {selected_post['id']}",
+            json.dumps(selected_post["fields"], indent=2).replace('"', ""),
+            post_text,
+            get_artifact_url(selected_post["fields"].get("screenshot_path"), config),
         )
+
+    # Drawn shapes are echoed on their own so editing them doesn't re-run the post selection:
+    @dash.callback(
+        Output("current_map_extents", "children"), Input("edit_control", "geojson")
+    )
+    def render_current_map_extents(current_geojson: dict):
+        return json.dumps(current_geojson, indent=2)
@@ -0,0 +1,280 @@
+import os
+import math
+import time
+import requests
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import Future
+from flask import Flask, Response, abort
+from loguru import logger
+from typing import Iterator, TypedDict
+
+DEFAULT_TILE_SOURCES = {
+    "osm": "http://tile.openstreetmap.org/{z}/{x}/{y}.png",
+    "google": "https://mt1.google.com/vt/lyrs=y&x={x}&y={y}&z={z}",
+}
+
+TILE_PROXY_ROUTE_PREFIX = "/tiles"
+
+
+class TileCacheStatsDict(TypedDict):
+    hits: int
+    misses: int
+    coalesced: int
+    stale: int
+    errors: int
+    cached_tiles: int
+    cached_bytes: int
+
+
+def get_tile_sources(config: dict) -> dict[str, str]:
+    return config.get("tile_sources", DEFAULT_TILE_SOURCES)
+
+
+def get_tile_layer_url(source: str, config: dict) -> str:
+    """The `TileLayer` url for a tile source, through the tile proxy when `tile_cache_dir` is set."""
+    if config.get("tile_cache_dir", None) is None:
+        return get_tile_sources(config)[source]
+    return f"{TILE_PROXY_ROUTE_PREFIX}/{source}/{{z}}/{{x}}/{{y}}"
+
+
+def iter_tiles_in_bbox(
+    bbox: tuple[float, float, float, float], zoom: int
+) -> Iterator[tuple[int, int, int]]:
+    """Every (z, x, y) web mercator tile intersecting a (min_x, min_y, max_x, max_y) EPSG:4326 extent."""
+    min_x, min_y, max_x, max_y = bbox
+    num_tiles = 2**zoom
+
+    def tile_x(longitude: float) -> int:
+        return min(num_tiles - 1, max(0, int((longitude + 180) / 360 * num_tiles)))
+
+    def tile_y(latitude: float) -> int:
+        latitude = math.radians(max(-85.0511, min(85.0511, latitude)))
+        y = (1 - math.asinh(math.tan(latitude)) / math.pi) / 2
+        return min(num_tiles - 1, max(0, int(y * num_tiles)))
+
+    for x in range(tile_x(min_x), tile_x(max_x) + 1):
+        for y in range(tile_y(max_y), tile_y(min_y) + 1):
+            yield zoom, x, y
+
+
+def sniff_tile_mime_type(body: bytes) -> str:
+    if body.startswith(b"\x89PNG"):
+        return "image/png"
+    if body.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if body[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class TileCache:
+    """
+    On-disk LRU cache of basemap tiles in front of the upstream tile servers.
+
+    A tile younger than `ttl_seconds` is served from disk. Older or missing tiles
+    are fetched once however many map requests ask for them at the same time,
+    and a stale tile is still served if the upstream can't be reached. With
+    `tile_cache_offline` set a pre-seeded cache is served without any upstream
+    requests. The least recently used tiles are deleted once the cache grows
+    past `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        tile_sources: dict[str, str],
+        max_bytes: int = 1024 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+        config: dict = {},
+    ):
+        self.cache_dir = cache_dir
+        self.tile_sources = tile_sources
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.config = config
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0, "errors": 0}
+
+        # Tiles already on disk start out in the order they were fetched:
+        cached_tiles = []
+        for root, _, filenames in os.walk(cache_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                tile_path = os.path.join(root, filename)
+                tile_stat = os.stat(tile_path)
+                cached_tiles.append((tile_stat.st_mtime, tile_path, tile_stat.st_size))
+        self._lru: OrderedDict[str, int] = OrderedDict(
+            (tile_path, size) for _, tile_path, size in sorted(cached_tiles)
+        )
+        self._cached_bytes = sum(self._lru.values())
+        self._evict()
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _tile_path(self, source: str, z: int, x: int, y: int) -> str:
+        return os.path.join(self.cache_dir, source, str(z), str(x), str(y))
+
+    def _evict(self):
+        while self._cached_bytes > self.max_bytes and len(self._lru) > 0:
+            tile_path, size = self._lru.popitem(last=False)
+            self._cached_bytes -= size
+            try:
+                os.remove(tile_path)
+            except FileNotFoundError:
+                pass
+
+    def _read_tile(self, tile_path: str) -> tuple[bytes, float] | None:
+        try:
+            with open(tile_path, "rb") as f:
+                body = f.read()
+            return body, os.path.getmtime(tile_path)
+        except FileNotFoundError:
+            return None
+
+    def _store_tile(self, tile_path: str, body: bytes):
+        os.makedirs(os.path.dirname(tile_path), exist_ok=True)
+        # Written to a temp name and renamed so concurrent readers never see half a tile:
+        temp_path = f"{tile_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(body)
+        os.replace(temp_path, tile_path)
+
+        with self._lock:
+            self._cached_bytes -= self._lru.pop(tile_path, 0)
+            self._lru[tile_path] = len(body)
+            self._cached_bytes += len(body)
+            self._evict()
+
+    def _fetch_tile(
+        self, source: str, z: int, x: int, y: int, stale_body: bytes | None
+    ) -> bytes | None:
+        url = self.tile_sources[source].format(z=z, x=x, y=y)
+        try:
+            response = requests.get(
+                url,
+                headers={
+                    "User-Agent": self.config.get(
+                        "tile_user_agent", "reddit-spatial-labelling-tile-proxy"
+                    )
+                },
+                timeout=self.config.get("tile_request_timeout", 10),
+            )
+            response.raise_for_status()
+            self._store_tile(self._tile_path(source, z, x, y), response.content)
+            self._count("misses")
+            return response.content
+
+        except Exception as e:
+            if stale_body is not None:
+                logger.warning(f"Serving stale tile {source}/{z}/{x}/{y}: {e}")
+                self._count("stale")
+                return stale_body
+
+            error_msg = traceback.format_exc()
+            logger.error(error_msg)
+            self._count("errors")
+            return None
+
+    def is_valid_tile(self, source: str, z: int, x: int, y: int) -> bool:
+        return (
+            source in self.tile_sources
+            and 0 <= z <= self.config.get("tile_max_zoom", 22)
+            and 0 <= x < 2**z
+            and 0 <= y < 2**z
+        )
+
+    def get_tile(self, source: str, z: int, x: int, y: int) -> bytes | None:
+        """
+        Return a tile from the cache or the upstream of `source`.
+
+        Returns:
+            bytes | None: The tile image, or None for an unknown source, an out of range tile or an upstream error.
+        """
+        if not self.is_valid_tile(source, z, x, y):
+            return None
+
+        tile_path = self._tile_path(source, z, x, y)
+        cached_tile = self._read_tile(tile_path)
+        # Offline every cached tile counts as fresh and nothing is requested upstream:
+        is_offline = self.config.get("tile_cache_offline", False)
+        if cached_tile is not None and (
+            is_offline or time.time() - cached_tile[1] < self.ttl_seconds
+        ):
+            with self._lock:
+                if tile_path in self._lru:
+                    self._lru.move_to_end(tile_path)
+            self._count("hits")
+            return cached_tile[0]
+        if is_offline:
+            self._count("errors")
+            return None
+
+        # Requests for a tile that is already being fetched wait on that fetch instead of sending their own:
+        with self._lock:
+            future = self._in_flight.get(tile_path, None)
+            is_fetching = future is None
+            if is_fetching:
+                future = Future()
+                self._in_flight[tile_path] = future
+
+        if not is_fetching:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            body = self._fetch_tile(
+                source, z, x, y, cached_tile[0] if cached_tile is not None else None
+            )
+            future.set_result(body)
+            return body
+        finally:
+            if not future.done():
+                future.set_result(None)
+            with self._lock:
+                del self._in_flight[tile_path]
+
+    def stats(self) -> TileCacheStatsDict:
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_tiles": len(self._lru),
+                "cached_bytes": self._cached_bytes,
+            }
+
+
+def register_tile_proxy_routes(server: Flask, config: dict) -> TileCache:
+    """Serve `/tiles/<source>/<z>/<x>/<y>` from a `TileCache` in `tile_cache_dir`."""
+    tile_cache = TileCache(
+        config["tile_cache_dir"],
+        get_tile_sources(config),
+        max_bytes=config.get("tile_cache_max_bytes", 1024 * 1024 * 1024),
+        ttl_seconds=config.get("tile_cache_ttl_seconds", 7 * 24 * 3600),
+        config=config,
+    )
+
+    @server.route(f"{TILE_PROXY_ROUTE_PREFIX}/<source>/<int:z>/<int:x>/<int:y>")
+    def serve_tile(source: str, z: int, x: int, y: int):
+        if not tile_cache.is_valid_tile(source, z, x, y):
+            abort(404)
+
+        body = tile_cache.get_tile(source, z, x, y)
+        if body is None:
+            abort(502)
+
+        return Response(
+            body,
+            mimetype=sniff_tile_mime_type(body),
+            headers={
+                "Cache-Control": f"public, max-age={config.get('tile_browser_max_age_seconds', 24 * 3600)}"
+            },
+        )
+
+    return tile_cache
@@ -0,0 +1,27 @@
+def build_comment(
+    id: str,
+    author: str = "alice",
+    created_utc: int = 1723456789,
+    body: str | None = None,
+    parent_id: str | None = None,
+    replies: list[dict] = [],
+) -> dict:
+    """A reddit `t1` comment thing. `parent_id` adds the fullname fields morechildren responses carry."""
+    data = {"id": id}
+    if parent_id is not None:
+        data["name"] = f"t1_{id}"
+        data["parent_id"] = parent_id
+    data.update(
+        {
+            "author": author,
+            "author_fullname": f"t2_{author}",
+            "body": body if body is not None else f"Comment body for {id}",
+            "created_utc": created_utc,
+            "replies": (
+                {"kind": "Listing", "data": {"children": replies}}
+                if len(replies) > 0
+                else ""
+            ),
+        }
+    )
+    return {"kind": "t1", "data": data}
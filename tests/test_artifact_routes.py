@@ -0,0 +1,112 @@
+import io
+import pytest
+from flask import Flask
+
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.ui.post_prefetcher import PostPrefetcher
+from library.ui.artifact_routes import get_artifact_url, register_artifact_routes
+
+SEGMENT_BYTES = bytes(range(256)) * 40
+
+MPD_DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static"></MPD>"""
+
+
+@pytest.fixture
+def artifact_client(tmp_path):
+    LocalFSInterface.upload_file(
+        io.BytesIO(SEGMENT_BYTES), str(tmp_path), "post-1/0_DASH_480.mp4", {}
+    )
+    LocalFSInterface.upload_file(
+        io.BytesIO(MPD_DOCUMENT), str(tmp_path), "post-1/Video_DASH.mpd", {}
+    )
+    (tmp_path.parent / "secret.txt").write_text("outside the root directory")
+
+    config = {"root_dir_name": str(tmp_path), "artifact_chunk_size": 1000}
+    server = Flask(__name__)
+    register_artifact_routes(server, LocalFSInterface, config)
+    return server.test_client()
+
+
+def test_artifacts_are_served_with_validators(artifact_client):
+
+    response = artifact_client.get("/artifacts/post-1/0_DASH_480.mp4")
+    assert response.status_code == 200
+    assert response.data == SEGMENT_BYTES
+    assert response.headers["Content-Type"] == "video/mp4"
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["Cache-Control"] == "private, max-age=3600"
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    revalidated = artifact_client.get(
+        "/artifacts/post-1/0_DASH_480.mp4", headers={"If-None-Match": etag}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.data == b""
+
+    manifest = artifact_client.get("/artifacts/post-1/Video_DASH.mpd")
+    assert manifest.data == MPD_DOCUMENT
+    assert manifest.headers["Content-Type"].startswith("application/dash+xml")
+    assert manifest.headers["Cache-Control"] == "no-cache"
+
+
+def test_byte_ranges(artifact_client):
+
+    response = artifact_client.get(
+        "/artifacts/post-1/0_DASH_480.mp4", headers={"Range": "bytes=2500-5499"}
+    )
+    assert response.status_code == 206
+    assert response.data == SEGMENT_BYTES[2500:5500]
+    assert response.headers["Content-Range"] == f"bytes 2500-5499/{len(SEGMENT_BYTES)}"
+    assert response.headers["Content-Length"] == "3000"
+
+    suffix = artifact_client.get(
+        "/artifacts/post-1/0_DASH_480.mp4", headers={"Range": "bytes=-100"}
+    )
+    assert suffix.data == SEGMENT_BYTES[-100:]
+
+    unsatisfiable = artifact_client.get(
+        "/artifacts/post-1/0_DASH_480.mp4", headers={"Range": "bytes=20000-"}
+    )
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == f"bytes */{len(SEGMENT_BYTES)}"
+
+    # A range against an old version of the file gets the whole current file:
+    stale_range = artifact_client.get(
+        "/artifacts/post-1/0_DASH_480.mp4",
+        headers={"Range": "bytes=0-99", "If-Range": '"an-old-etag"'},
+    )
+    assert stale_range.status_code == 200
+    assert stale_range.data == SEGMENT_BYTES
+
+
+def test_only_files_under_the_root_are_served(artifact_client, tmp_path):
+
+    assert artifact_client.get("/artifacts/post-1/missing.mp4").status_code == 404
+    assert artifact_client.get("/artifacts/../secret.txt").status_code == 404
+    assert artifact_client.get("/artifacts/%2E%2E/secret.txt").status_code == 404
+
+    config = {"root_dir_name": str(tmp_path)}
+    assert (
+        get_artifact_url(str(tmp_path / "post-1" / "screenshot.png"), config)
+        == "/artifacts/post-1/screenshot.png"
+    )
+    assert get_artifact_url(str(tmp_path.parent / "secret.txt"), config) is None
+
+
+def test_prefetched_artifacts_are_served_from_memory(tmp_path):
+
+    LocalFSInterface.upload_file(
+        io.BytesIO(b"\x89PNG" + bytes(100)), str(tmp_path), "post-1/screenshot.png", {}
+    )
+    config = {"root_dir_name": str(tmp_path)}
+    post_prefetcher = PostPrefetcher(LocalFSInterface, config)
+    post_prefetcher.get_file("post-1/screenshot.png")
+
+    server = Flask(__name__)
+    register_artifact_routes(server, LocalFSInterface, config, post_prefetcher)
+    response = server.test_client().get("/artifacts/post-1/screenshot.png")
+
+    assert response.data == b"\x89PNG" + bytes(100)
+    assert post_prefetcher.stats()["hits"] == 1
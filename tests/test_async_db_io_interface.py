@@ -0,0 +1,324 @@
+import os
+import asyncio
+import pytest
+import sqlalchemy as sa
+
+from database_test_markers import requires_postgres, requires_spatialite
+from geoalchemy2 import load_spatialite
+from sqlalchemy.event import listen
+
+from library.types import RedditPostDict, PostSpatialLabelDict
+from library.io_interfaces.db_io import create_postgres_engine
+from library.io_interfaces.async_db_io import (
+    AsyncSQLiteInterface,
+    AsyncPostgresInterface,
+    create_async_sqlite_engine,
+    create_async_postgres_engine,
+)
+
+POST_IDS = [f"5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f6{i}" for i in range(6)]
+
+
+def build_reddit_post(id: str) -> RedditPostDict:
+    return {
+        "id": id,
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {
+            "subreddit": "UkraineWarVideoReport",
+            "url": f"https://www.reddit.com/r/UkraineWarVideoReport/comments/{id}",
+            "title": "Example post",
+            "static_downloaded_flag": False,
+            "screenshot_path": f"{id}/screenshot.png",
+            "json_file_path": f"{id}/post.json",
+            "post_created_date": 1723456789000,
+            "static_root_url": f"{id}/",
+            "static_files": [{"id": "NULL", "type": "video"}],
+            "user": None,
+        },
+    }
+
+
+async def run_insert_and_dedup(interface, db_engine) -> tuple[list, list, list]:
+    existing_before = await interface.get_unique_posts(POST_IDS, db_engine, {})
+
+    # Every insert gets its own pooled connection on the one engine:
+    insert_results = await asyncio.gather(
+        *[
+            interface.insert_reddit_posts_db(build_reddit_post(id), db_engine, {})
+            for id in POST_IDS[:5]
+        ]
+    )
+
+    existing_after = await interface.get_unique_posts(POST_IDS, db_engine, {})
+    return existing_before, insert_results, existing_after
+
+
+def build_label(post_id: str, label_id: str) -> PostSpatialLabelDict:
+    return {
+        "post_id": post_id,
+        "label_id": label_id,
+        "geometry": "POLYGON ((30.1 50.1, 30.2 50.1, 30.2 50.2, 30.1 50.2, 30.1 50.1))",
+        "comment": f"Label {label_id}",
+    }
+
+
+async def run_label_lifecycle(interface, db_engine) -> dict:
+    await asyncio.gather(
+        *[
+            interface.insert_reddit_posts_db(build_reddit_post(id), db_engine, {})
+            for id in POST_IDS[:2]
+        ]
+    )
+
+    # Labels for different posts are added and read back concurrently:
+    added = await asyncio.gather(
+        interface.add_post_labels(
+            [
+                build_label(POST_IDS[0], "label001"),
+                build_label(POST_IDS[0], "label002"),
+            ],
+            db_engine,
+            {},
+        ),
+        interface.add_post_labels(
+            [build_label(POST_IDS[1], "label003")], db_engine, {}
+        ),
+    )
+    labelled = await asyncio.gather(
+        *[interface.get_post_w_labels(id, db_engine, {}) for id in POST_IDS[:2]]
+    )
+
+    replaced, removed_count = await asyncio.gather(
+        interface.replace_post_labels(
+            POST_IDS[0], [build_label(POST_IDS[0], "label004")], db_engine, {}
+        ),
+        interface.remove_post_labels("label003", db_engine, {}),
+    )
+    rejected_replace = await interface.replace_post_labels(
+        POST_IDS[0], [build_label(POST_IDS[1], "label005")], db_engine, {}
+    )
+    final = await asyncio.gather(
+        *[interface.get_post_w_labels(id, db_engine, {}) for id in POST_IDS[:2]]
+    )
+
+    return {
+        "added": [sorted(df["label_id"]) for df in added],
+        "labelled": [sorted(df["label_id"]) for df in labelled],
+        "replaced": sorted(replaced["label_id"]),
+        "removed_count": removed_count,
+        "rejected_replace": rejected_replace,
+        "final": [sorted(df["label_id"]) for df in final],
+    }
+
+
+def assert_label_lifecycle(results: dict):
+    assert results["added"] == [["label001", "label002"], ["label003"]]
+    assert results["labelled"] == [["label001", "label002"], ["label003"]]
+    assert results["replaced"] == ["label004"]
+    assert results["removed_count"] == 1
+    # Labels for another post are rejected without touching the existing labels:
+    assert results["rejected_replace"] is None
+    assert results["final"] == [["label004"], []]
+
+
+@pytest.fixture
+def async_sqlite_db_path(tmp_path) -> str:
+
+    # A file database so every pooled connection sees the same tables:
+    db_path = str(tmp_path / "async.sqlite")
+    engine = sa.create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE source (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                created_date TIMESTAMP NOT NULL,
+                fields TEXT
+            );
+        """
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE tasks (
+                id TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMP NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """
+            )
+        )
+    engine.dispose()
+
+    return db_path
+
+
+def test_async_sqlite_concurrent_inserts_and_dedup(async_sqlite_db_path):
+    async def run() -> tuple[list, list, list, str | None]:
+        db_engine = create_async_sqlite_engine(
+            async_sqlite_db_path, {"load_spatialite": False, "pool_size": 5}
+        )
+        try:
+            results = await run_insert_and_dedup(AsyncSQLiteInterface, db_engine)
+            # A post that is already stored is rejected rather than duplicated:
+            duplicate_insert = await AsyncSQLiteInterface.insert_reddit_posts_db(
+                build_reddit_post(POST_IDS[0]), db_engine, {}
+            )
+            async with db_engine.connect() as conn:
+                task_count = (
+                    await conn.execute(sa.text("SELECT COUNT(*) FROM tasks"))
+                ).scalar_one()
+            return *results, duplicate_insert, task_count
+        finally:
+            await db_engine.dispose()
+
+    (
+        existing_before,
+        insert_results,
+        existing_after,
+        duplicate_insert,
+        task_count,
+    ) = asyncio.run(run())
+
+    assert existing_before == []
+    assert all(result is not None for result in insert_results)
+    assert sorted(existing_after) == POST_IDS[:5]
+    assert duplicate_insert is None
+    # Video download and comment extraction tasks for each inserted post:
+    assert task_count == 5 * 2
+
+
+@pytest.fixture
+def async_sqlite_label_db_path(async_sqlite_db_path) -> str:
+
+    engine = sa.create_engine(f"sqlite:///{async_sqlite_db_path}")
+    listen(engine, "connect", load_spatialite)
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE labels (
+                label_id TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                comment TEXT
+            );
+        """
+            )
+        )
+        conn.execute(
+            sa.text(
+                "SELECT AddGeometryColumn('labels', 'geometry', 4326, 'POLYGON', 'XY');"
+            )
+        )
+    engine.dispose()
+
+    return async_sqlite_db_path
+
+
+@requires_spatialite
+def test_async_sqlite_concurrent_label_calls(async_sqlite_label_db_path):
+    async def run() -> dict:
+        db_engine = create_async_sqlite_engine(
+            async_sqlite_label_db_path, {"pool_size": 5}
+        )
+        try:
+            return await run_label_lifecycle(AsyncSQLiteInterface, db_engine)
+        finally:
+            await db_engine.dispose()
+
+    assert_label_lifecycle(asyncio.run(run()))
+
+
+@pytest.fixture
+def postgres_schema():
+
+    engine = create_postgres_engine(os.environ["PSQL_URI"], config={"pool_size": 1})
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE EXTENSION IF NOT EXISTS postgis;
+            DROP SCHEMA IF EXISTS core CASCADE;
+            CREATE SCHEMA core;
+
+            CREATE TABLE core.source (
+                id UUID PRIMARY KEY,
+                type TEXT NOT NULL,
+                created_date TIMESTAMPTZ NOT NULL,
+                fields JSONB NOT NULL
+            );
+
+            CREATE TABLE core.tasks (
+                id UUID PRIMARY KEY,
+                post_id UUID NOT NULL REFERENCES core.source (id),
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMPTZ NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMPTZ,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE core.labels (
+                label_id TEXT PRIMARY KEY,
+                post_id UUID NOT NULL REFERENCES core.source (id),
+                comment TEXT,
+                geometry geometry(POLYGON, 4326)
+            );
+        """
+            )
+        )
+
+    yield
+
+    with engine.connect() as conn, conn.begin():
+        conn.execute(sa.text("DROP SCHEMA IF EXISTS core CASCADE;"))
+    engine.dispose()
+
+
+@requires_postgres
+def test_async_postgres_concurrent_inserts_and_dedup(postgres_schema):
+    async def run() -> tuple[list, list, list, str | None]:
+        db_engine = create_async_postgres_engine(
+            os.environ["PSQL_URI"], {"pool_size": 5, "max_overflow": 0}
+        )
+        try:
+            results = await run_insert_and_dedup(AsyncPostgresInterface, db_engine)
+            duplicate_insert = await AsyncPostgresInterface.insert_reddit_posts_db(
+                build_reddit_post(POST_IDS[0]), db_engine, {}
+            )
+            return *results, duplicate_insert
+        finally:
+            await db_engine.dispose()
+
+    existing_before, insert_results, existing_after, duplicate_insert = asyncio.run(
+        run()
+    )
+
+    assert existing_before == []
+    assert all(result is not None for result in insert_results)
+    assert sorted(existing_after) == POST_IDS[:5]
+    assert duplicate_insert is None
+
+
+@requires_postgres
+def test_async_postgres_concurrent_label_calls(postgres_schema):
+    async def run() -> dict:
+        db_engine = create_async_postgres_engine(
+            os.environ["PSQL_URI"], {"pool_size": 5, "max_overflow": 0}
+        )
+        try:
+            return await run_label_lifecycle(AsyncPostgresInterface, db_engine)
+        finally:
+            await db_engine.dispose()
+
+    assert_label_lifecycle(asyncio.run(run()))
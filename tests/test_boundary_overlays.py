@@ -0,0 +1,100 @@
+import json
+import math
+import shapely
+from flask import Flask
+
+from library.ui.boundary_overlays import (
+    build_boundary_overlays,
+    get_boundary_overlay_url,
+    register_boundary_overlay_routes,
+    simplify_feature_collection,
+)
+
+
+def build_wiggly_boundary() -> dict:
+    # A circle of 5000 vertices around Kyiv with a few hundred metres of noise on the edge:
+    ring = [
+        [
+            30.5 + (2 + 0.005 * math.sin(i * 1.7)) * math.cos(2 * math.pi * i / 5000),
+            50.4 + (2 + 0.005 * math.sin(i * 1.7)) * math.sin(2 * math.pi * i / 5000),
+        ]
+        for i in range(5000)
+    ]
+    ring.append(ring[0])
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name:en": "Kyiv Oblast"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            },
+            {"type": "Feature", "properties": {}, "geometry": None},
+        ],
+    }
+
+
+def test_simplified_overlays_stay_valid_and_shrink_with_zoom():
+
+    boundary = build_wiggly_boundary()
+
+    vertex_counts = []
+    for zoom in [3, 7, 11]:
+        simplified = simplify_feature_collection(boundary, 360 / (256 * 2**zoom))
+        assert len(simplified["features"]) == 1
+        assert simplified["features"][0]["properties"] == {"name:en": "Kyiv Oblast"}
+
+        geometry = shapely.geometry.shape(simplified["features"][0]["geometry"])
+        assert geometry.is_valid
+        vertex_counts.append(shapely.get_num_coordinates(geometry))
+
+    assert vertex_counts[0] < vertex_counts[1] < vertex_counts[2] <= 5001
+    assert vertex_counts[0] < 100
+
+
+def test_built_overlays_are_served_per_zoom_with_cache_headers(tmp_path):
+
+    source_path = tmp_path / "kyiv.geojson"
+    source_path.write_text(json.dumps(build_wiggly_boundary()))
+    overlay = {
+        "id": "kyiv",
+        "name": "Kyiv",
+        "source": str(source_path),
+        "color": "blue",
+        "checked": True,
+    }
+    config = {"boundary_overlay_dir": str(tmp_path / "overlays")}
+
+    # Before the build step the map falls back to the source:
+    assert get_boundary_overlay_url(overlay, 6, config) == str(source_path)
+
+    written_paths = build_boundary_overlays([overlay], [3, 7], config)
+    assert len(written_paths) == 2
+
+    assert get_boundary_overlay_url(overlay, 2, config).startswith(
+        "/overlays/kyiv_z3.geojson?v="
+    )
+    assert get_boundary_overlay_url(overlay, 6.5, config).startswith(
+        "/overlays/kyiv_z3.geojson?v="
+    )
+    overlay_url = get_boundary_overlay_url(overlay, 12, config)
+    assert overlay_url.startswith("/overlays/kyiv_z7.geojson?v=")
+
+    server = Flask(__name__)
+    register_boundary_overlay_routes(server, config)
+    client = server.test_client()
+
+    response = client.get(overlay_url)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/geo+json"
+    assert "public" in response.headers["Cache-Control"]
+    assert "max-age=604800" in response.headers["Cache-Control"]
+    assert response.get_json()["features"][0]["properties"]["name:en"] == "Kyiv Oblast"
+
+    revalidated = client.get(
+        overlay_url, headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert revalidated.status_code == 304
+
+    assert client.get("/overlays/kyiv_z5.geojson").status_code == 404
+    assert client.get("/overlays/kyiv.geojson").status_code == 404
@@ -0,0 +1,229 @@
+import io
+import json
+import pytest
+import sqlalchemy as sa
+
+from library.types import RedditPostDict
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import FileInterface, LocalFSInterface
+from library.bulk_comment_extraction import (
+    run_bulk_comment_extraction,
+    build_jsonl_comment_sink,
+    read_checkpoint,
+)
+
+
+class StreamOnlyFSInterface(FileInterface):
+    """Local files that can only be opened as streams, so a full read fails the test."""
+
+    def read_file(dir_name: str, filepath: str, config: dict):
+        raise AssertionError(f"{filepath} was read whole in stream mode")
+
+    def open_file_stream(dir_name: str, filepath: str, config: dict):
+        return LocalFSInterface.open_file_stream(dir_name, filepath, config)
+
+
+def build_post_json(post_id: str, num_comments: int) -> bytes:
+    comments = [
+        {
+            "kind": "t1",
+            "data": {
+                "id": f"{post_id}_c{i}",
+                "author": "alice",
+                "author_fullname": "t2_alice",
+                "body": f"Comment {i}",
+                "created_utc": 1723456789 + i,
+                "replies": "",
+            },
+        }
+        for i in range(num_comments)
+    ]
+    return json.dumps(
+        [
+            {"kind": "Listing", "data": {"children": []}},
+            {"kind": "Listing", "data": {"children": comments}},
+        ]
+    ).encode()
+
+
+@pytest.fixture
+def stored_corpus(tmp_path) -> dict:
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'corpus.db'}")
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE source (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                created_date TIMESTAMP NOT NULL,
+                fields TEXT
+            );
+        """
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE tasks (
+                id TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMP NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """
+            )
+        )
+
+    file_directory = tmp_path / "static"
+    for i in range(5):
+        post_id = f"00000000-0000-0000-0000-00000000000{i}"
+        post: RedditPostDict = {
+            "id": post_id,
+            "type": "reddit_post",
+            "created_date": 1723456789000,
+            "fields": {"json_file_path": f"{post_id}/post.json", "static_files": []},
+        }
+        SQLiteInterface.insert_reddit_posts_db(post, engine, {})
+
+        # The last post's json was never uploaded:
+        if i < 4:
+            LocalFSInterface.upload_file(
+                io.BytesIO(build_post_json(post_id, num_comments=i + 1)),
+                str(file_directory),
+                post["fields"]["json_file_path"],
+                {},
+            )
+
+    return {
+        "db_engine": engine,
+        "root_dir_name": str(file_directory),
+        "checkpoint_path": str(tmp_path / "checkpoint.txt"),
+        "num_workers": 2,
+        "chunk_size": 2,
+    }
+
+
+def test_get_reddit_posts_page(stored_corpus):
+
+    engine = stored_corpus["db_engine"]
+    first_page = SQLiteInterface.get_reddit_posts_page(None, 3, engine, {})
+    second_page = SQLiteInterface.get_reddit_posts_page(
+        first_page[-1]["id"], 3, engine, {}
+    )
+
+    assert [post["id"][-1] for post in first_page + second_page] == list("01234")
+    assert first_page[0]["created_date"] == 1723456789000
+    assert first_page[0]["fields"]["json_file_path"].endswith("/post.json")
+
+
+def test_bulk_comment_extraction_is_resumable(stored_corpus, tmp_path):
+
+    output_path = str(tmp_path / "comments.jsonl")
+    sink = build_jsonl_comment_sink(output_path)
+
+    stats = run_bulk_comment_extraction(
+        SQLiteInterface, LocalFSInterface, sink, stored_corpus
+    )
+
+    assert stats["posts_extracted"] == 4
+    assert stats["posts_failed"] == 1
+    # 1 + 2 + 3 + 4 comments with 3 nodes and 3 edges each:
+    assert stats["elements"] == 10 * 6
+    assert len(read_checkpoint(stored_corpus["checkpoint_path"])) == 4
+
+    with open(output_path) as f:
+        written_post_ids = [json.loads(line)["post_id"] for line in f]
+    assert sorted(written_post_ids) == sorted(
+        read_checkpoint(stored_corpus["checkpoint_path"])
+    )
+
+    # A rerun only retries the post that failed:
+    rerun_stats = run_bulk_comment_extraction(
+        SQLiteInterface, LocalFSInterface, sink, stored_corpus
+    )
+    assert rerun_stats["posts_extracted"] == 0
+    assert rerun_stats["posts_skipped"] == 4
+    assert rerun_stats["posts_failed"] == 1
+
+
+def test_sink_reads_elements_lazily_from_spool_files(stored_corpus, tmp_path):
+
+    spool_dir = tmp_path / "spool"
+    element_counts: dict[str, int] = {}
+
+    def counting_sink(results):
+        for post, elements in results:
+            assert not isinstance(elements, list)
+            element_counts[post["id"]] = sum(1 for _ in elements)
+
+    stats = run_bulk_comment_extraction(
+        SQLiteInterface,
+        LocalFSInterface,
+        counting_sink,
+        {**stored_corpus, "checkpoint_path": None, "spool_dir": str(spool_dir)},
+    )
+
+    assert stats["elements"] == sum(element_counts.values()) == 10 * 6
+    assert sorted(element_counts.values()) == [6, 12, 18, 24]
+    # Spool files are removed once their chunk has been through the sink:
+    assert list(spool_dir.iterdir()) == []
+
+
+def test_stream_mode_parses_post_json_off_the_file_stream(stored_corpus):
+
+    stats = run_bulk_comment_extraction(
+        SQLiteInterface,
+        StreamOnlyFSInterface,
+        lambda results: None,
+        {
+            **stored_corpus,
+            "checkpoint_path": None,
+            "worker_config": {"stream_comments_json": True},
+        },
+    )
+
+    assert stats["posts_extracted"] == 4
+    # The post whose json was never uploaded fails to open:
+    assert stats["posts_failed"] == 1
+    assert stats["elements"] == 10 * 6
+
+
+def test_claimed_comment_extraction_tasks_are_completed(stored_corpus):
+
+    claimed_config = {**stored_corpus, "checkpoint_path": None, "claim_tasks": True}
+    extracted_post_ids: list[str] = []
+
+    def recording_sink(results):
+        extracted_post_ids.extend(post["id"] for post, _ in results)
+
+    stats = run_bulk_comment_extraction(
+        SQLiteInterface, LocalFSInterface, recording_sink, claimed_config
+    )
+
+    assert stats["posts_extracted"] == 4
+    assert stats["posts_failed"] == 1
+    assert stats["elements"] == 10 * 6
+
+    with stored_corpus["db_engine"].connect() as conn:
+        task_statuses = dict(
+            conn.execute(
+                sa.text(
+                    "SELECT post_id, status FROM tasks WHERE task_type = 'COMMENT_EXTRACTION'"
+                )
+            ).all()
+        )
+    assert sorted(task_statuses.values()) == ["done"] * 4 + ["failed"]
+    assert all(task_statuses[post_id] == "done" for post_id in extracted_post_ids)
+
+    # Nothing is left pending for the next run to claim:
+    rerun_stats = run_bulk_comment_extraction(
+        SQLiteInterface, LocalFSInterface, recording_sink, claimed_config
+    )
+    assert rerun_stats["posts_extracted"] == 0
+    assert rerun_stats["posts_failed"] == 0
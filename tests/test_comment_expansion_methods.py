@@ -0,0 +1,193 @@
+import io
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from library.types import RedditPostDict
+from library.comments_extraction_methods import (
+    get_comments_from_json,
+    iter_comment_tree,
+)
+from library.comment_expansion_methods import (
+    collect_more_stubs,
+    expand_more_comment_stubs,
+)
+from reddit_comment_factories import build_comment
+
+
+def build_more_stub(parent_id: str, children: list[str]):
+    return {
+        "kind": "more",
+        "data": {"parent_id": parent_id, "children": children, "count": len(children)},
+    }
+
+
+# Canned morechildren responses keyed by requested comment id. c5 comes back with a nested stub
+# that has to be expanded in a second round:
+CANNED_THINGS = {
+    "c3": build_comment("c3", parent_id="t1_c1"),
+    "c4": build_comment("c4", parent_id="t1_c3"),
+    "c5": build_comment("c5", parent_id="t3_post1"),
+    "c6": build_more_stub("t1_c5", ["c7"]),
+    "c7": build_comment("c7", parent_id="t1_c5"),
+}
+
+
+class MoreChildrenHandler(BaseHTTPRequestHandler):
+    requested_batches: list[list[str]] = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        children_ids = query["children"][0].split(",")
+        MoreChildrenHandler.requested_batches.append(children_ids)
+
+        things = [CANNED_THINGS[id] for id in children_ids if id in CANNED_THINGS]
+        body = json.dumps({"json": {"errors": [], "data": {"things": things}}})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def morechildren_server():
+    MoreChildrenHandler.requested_batches = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MoreChildrenHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def post_json() -> list[dict]:
+    return [
+        {
+            "kind": "Listing",
+            "data": {"children": [{"kind": "t3", "data": {"name": "t3_post1"}}]},
+        },
+        {
+            "kind": "Listing",
+            "data": {
+                "children": [
+                    build_comment(
+                        "c1",
+                        parent_id="t3_post1",
+                        replies=[
+                            build_comment("c2", parent_id="t1_c1"),
+                            build_more_stub("t1_c1", ["c3", "c4"]),
+                        ],
+                    ),
+                    build_more_stub("t3_post1", ["c5", "c6"]),
+                    # "Continue this thread" stubs have no ids and are left alone:
+                    {"kind": "more", "data": {"parent_id": "t1_c1", "children": []}},
+                ]
+            },
+        },
+    ]
+
+
+def test_collect_more_stubs_removes_stubs(post_json):
+
+    comment_listing = post_json[1]["data"]["children"]
+    more_stubs = collect_more_stubs(comment_listing)
+
+    assert [stub["children"] for stub in more_stubs] == [["c5", "c6"], ["c3", "c4"]]
+    assert [c["kind"] for c in comment_listing] == ["t1", "more"]
+    assert comment_listing[0]["data"]["replies"]["data"]["children"][-1]["kind"] == "t1"
+
+
+def test_expand_more_comment_stubs(post_json, morechildren_server):
+
+    merged_count = expand_more_comment_stubs(
+        post_json,
+        config={
+            "reddit_base_url": morechildren_server,
+            "reddit_requests_per_second": 100,
+        },
+    )
+
+    assert merged_count == 5
+    assert len(MoreChildrenHandler.requested_batches) == 2
+
+    walked = {
+        comment_data["id"]: parent_id
+        for comment_data, parent_id in iter_comment_tree(
+            post_json[1]["data"]["children"]
+        )
+    }
+    assert walked == {
+        "c1": None,
+        "c2": "c1",
+        "c3": "c1",
+        "c4": "c3",
+        "c5": None,
+        "c7": "c5",
+    }
+
+
+def test_expand_more_comment_stubs_batches_concurrently(morechildren_server):
+
+    children_ids = [f"x{i}" for i in range(250)]
+    post_json = [
+        {
+            "kind": "Listing",
+            "data": {"children": [{"kind": "t3", "data": {"name": "t3_post1"}}]},
+        },
+        {
+            "kind": "Listing",
+            "data": {"children": [build_more_stub("t3_post1", children_ids)]},
+        },
+    ]
+
+    expand_more_comment_stubs(
+        post_json,
+        config={
+            "reddit_base_url": morechildren_server,
+            "reddit_requests_per_second": 100,
+            "reddit_request_burst": 3,
+        },
+    )
+
+    assert sorted(len(batch) for batch in MoreChildrenHandler.requested_batches) == [
+        50,
+        100,
+        100,
+    ]
+
+
+def test_get_comments_from_json_expands_stubs(post_json, morechildren_server):
+
+    post: RedditPostDict = {
+        "id": "5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+    json_bytes_stream = io.BytesIO(json.dumps(post_json).encode())
+
+    unexpanded = get_comments_from_json(post, json_bytes_stream)
+    expanded = get_comments_from_json(
+        post,
+        json_bytes_stream,
+        config={
+            "expand_more_comments": True,
+            "reddit_base_url": morechildren_server,
+            "reddit_requests_per_second": 100,
+        },
+    )
+
+    comment_ids = lambda elements: [
+        e["properties"]["id"]
+        for e in elements
+        if e["type"] == "node" and e["labels"][-1] == "Comment"
+    ]
+    assert comment_ids(unexpanded) == ["c1", "c2"]
+    assert comment_ids(expanded) == ["c1", "c2", "c3", "c4", "c5", "c7"]
@@ -0,0 +1,239 @@
+import io
+import sys
+import json
+import pytest
+import tracemalloc
+
+from library.types import RedditPostDict
+from library.comments_extraction_methods import (
+    recursively_build_comment_creation_lst,
+    get_comments_from_json,
+    iter_comments_from_json,
+    iter_comment_tree,
+    iter_comment_graph_elements,
+    iter_comment_listing_from_json_stream,
+)
+from library.columnar_comment_extraction import (
+    extract_comment_graph_tables,
+    comment_graph_tables_to_dicts,
+    get_comment_graph_tables_from_json,
+)
+from reddit_comment_factories import build_comment
+
+
+@pytest.fixture
+def reddit_post() -> RedditPostDict:
+    return {
+        "id": "5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+
+
+@pytest.fixture
+def comment_listing() -> list[dict]:
+    return [
+        build_comment(
+            "c1",
+            "alice",
+            1723456789,
+            replies=[
+                build_comment(
+                    "c2",
+                    "bob",
+                    1723456800,
+                    replies=[build_comment("c3", "alice", 1723543200)],
+                ),
+                {"kind": "more", "data": {"children": ["c9"]}},
+            ],
+        ),
+        build_comment("c4", "[deleted]", 1723456900),
+        build_comment("c5", "bob", 1723543300),
+    ]
+
+
+def as_hashable(element: dict) -> str:
+    return json.dumps(element, sort_keys=True)
+
+
+def test_columnar_extraction_matches_recursive_extraction(reddit_post, comment_listing):
+
+    recursive_output: list[dict] = []
+    for comment_json in comment_listing:
+        recursively_build_comment_creation_lst(
+            output_lst=recursive_output, post=reddit_post, comment_json_obj=comment_json
+        )
+
+    tables = extract_comment_graph_tables(reddit_post, comment_listing)
+    columnar_output = comment_graph_tables_to_dicts(tables)
+
+    # The recursive extractor repeats author/day nodes, the columnar one emits each node once:
+    assert len(columnar_output) == len({as_hashable(e) for e in columnar_output})
+    assert {as_hashable(e) for e in columnar_output} == {
+        as_hashable(e) for e in recursive_output
+    }
+
+
+def test_columnar_extraction_dedups_nodes(reddit_post, comment_listing):
+
+    tables = extract_comment_graph_tables(reddit_post, comment_listing)
+
+    assert tables["comments"].column("id").to_pylist() == ["c1", "c2", "c3", "c4", "c5"]
+    assert tables["users"].num_rows == 3
+    assert tables["days"].column("day").to_pylist() == ["2024-08-12", "2024-08-13"]
+    # 3 edges per comment plus 2 per reply (c2, c3):
+    assert tables["edges"].num_rows == 5 * 3 + 2 * 2
+
+
+def test_get_comment_graph_tables_from_json(reddit_post, comment_listing):
+
+    post_json = [
+        {"kind": "Listing", "data": {"children": []}},
+        {"kind": "Listing", "data": {"children": comment_listing}},
+    ]
+    json_bytes_stream = io.BytesIO(json.dumps(post_json).encode())
+
+    tables = get_comment_graph_tables_from_json(reddit_post, json_bytes_stream)
+    recursive_output = get_comments_from_json(reddit_post, json_bytes_stream)
+
+    assert {as_hashable(e) for e in comment_graph_tables_to_dicts(tables)} == {
+        as_hashable(e) for e in recursive_output
+    }
+
+
+def build_reply_chain(depth: int) -> dict:
+    # Built bottom up in a loop, the chain itself is deeper than the recursion limit:
+    comment = build_comment(f"c{depth - 1}", "alice", 1723456789 + depth)
+    for level in range(depth - 2, -1, -1):
+        comment = build_comment(
+            f"c{level}", "bob", 1723456789 + level, replies=[comment]
+        )
+    return comment
+
+
+def test_iter_comment_tree_survives_deep_reply_chains():
+
+    depth = sys.getrecursionlimit() * 5
+    walked = list(iter_comment_tree([build_reply_chain(depth)]))
+
+    assert len(walked) == depth
+    assert walked[0] == (walked[0][0], None)
+    assert [parent_id for _, parent_id in walked[1:4]] == ["c0", "c1", "c2"]
+
+
+def test_iter_comment_graph_elements_is_lazy(reddit_post, comment_listing):
+
+    elements = iter_comment_graph_elements(reddit_post, comment_listing)
+
+    first_comment_node = next(elements)
+    assert first_comment_node["type"] == "node"
+    assert first_comment_node["properties"]["id"] == "c1"
+
+    recursive_output: list[dict] = []
+    for comment_json in comment_listing:
+        recursively_build_comment_creation_lst(
+            output_lst=recursive_output, post=reddit_post, comment_json_obj=comment_json
+        )
+    assert [first_comment_node] + list(elements) == recursive_output
+
+
+class ForwardOnlyStream(io.RawIOBase):
+    """Mimics an object store response body that can't be rewound."""
+
+    def __init__(self, payload: bytes):
+        self.payload = io.BytesIO(payload)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        chunk = self.payload.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def build_post_json_bytes(comment_listing: list[dict]) -> bytes:
+    post_json = [
+        {
+            "kind": "Listing",
+            "data": {"children": [{"kind": "t3", "data": {"name": "t3_post1"}}]},
+        },
+        {"kind": "Listing", "data": {"children": comment_listing}},
+    ]
+    return json.dumps(post_json).encode()
+
+
+def test_streaming_parse_matches_full_parse(reddit_post, comment_listing):
+
+    post_json_bytes = build_post_json_bytes(comment_listing)
+
+    full_parse = get_comments_from_json(reddit_post, io.BytesIO(post_json_bytes))
+    streamed = get_comments_from_json(
+        reddit_post,
+        ForwardOnlyStream(post_json_bytes),
+        config={"stream_comments_json": True},
+    )
+    streamed_tables = get_comment_graph_tables_from_json(
+        reddit_post,
+        ForwardOnlyStream(post_json_bytes),
+        config={"stream_comments_json": True},
+    )
+
+    assert streamed == full_parse
+    assert {as_hashable(e) for e in comment_graph_tables_to_dicts(streamed_tables)} == {
+        as_hashable(e) for e in full_parse
+    }
+
+    # The streaming form hands elements over one at a time instead of as a list:
+    streamed_elements = iter_comments_from_json(
+        reddit_post,
+        ForwardOnlyStream(post_json_bytes),
+        config={"stream_comments_json": True},
+    )
+    assert not isinstance(streamed_elements, list)
+    assert next(streamed_elements) == full_parse[0]
+    assert [full_parse[0], *streamed_elements] == full_parse
+
+
+def test_streaming_parse_memory_is_bounded_by_subtree(reddit_post):
+
+    comment_listing = [
+        build_comment(
+            f"c{i}",
+            "alice",
+            1723456789,
+            replies=[build_comment(f"r{i}", "bob", 1723456790)],
+        )
+        for i in range(5000)
+    ]
+    post_json_bytes = build_post_json_bytes(comment_listing)
+    del comment_listing
+
+    def peak_bytes(consume_fn) -> int:
+        tracemalloc.start()
+        consume_fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    streamed_peak = peak_bytes(
+        lambda: sum(
+            1
+            for _ in iter_comment_tree(
+                iter_comment_listing_from_json_stream(
+                    ForwardOnlyStream(post_json_bytes)
+                )
+            )
+        )
+    )
+    full_parse_peak = peak_bytes(
+        lambda: sum(
+            1
+            for _ in iter_comment_tree(
+                json.loads(post_json_bytes)[1]["data"]["children"]
+            )
+        )
+    )
+
+    assert streamed_peak * 10 < full_parse_peak
@@ -0,0 +1,85 @@
+import pytest
+
+from library.dash_representation_selection import (
+    DailyBandwidthBudget,
+    parse_mpd_duration,
+)
+from library.ingest_reddit_video import select_mpd_representations
+
+MPD_DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" mediaPresentationDuration="PT10S" type="static">
+  <Period id="0" duration="PT10S">
+    <AdaptationSet id="0" contentType="video" mimeType="video/mp4">
+      <Representation id="1" bandwidth="800000" height="480" mimeType="video/mp4"><BaseURL>DASH_480.mp4</BaseURL></Representation>
+      <Representation id="2" bandwidth="4000000" height="1080" mimeType="video/mp4"><BaseURL>DASH_1080.mp4</BaseURL></Representation>
+      <Representation id="3" bandwidth="1600000" height="720" mimeType="video/mp4"><BaseURL>DASH_720.mp4</BaseURL></Representation>
+    </AdaptationSet>
+    <AdaptationSet id="1" contentType="audio" mimeType="audio/mp4">
+      <Representation id="4" bandwidth="64000" mimeType="audio/mp4"><BaseURL>DASH_AUDIO_64.mp4</BaseURL></Representation>
+      <Representation id="5" bandwidth="128000" mimeType="audio/mp4"><BaseURL>DASH_AUDIO_128.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>"""
+
+POST_DATA = {"url": "https://v.redd.it/abc123"}
+
+
+def select(policy: dict):
+    parsed_result = select_mpd_representations(MPD_DOCUMENT, POST_DATA, 10, policy)
+    return parsed_result, parsed_result["videos_periods"][0]["extension"]
+
+
+@pytest.mark.parametrize(
+    "policy,expected_video",
+    [
+        ({}, "DASH_1080.mp4"),
+        ({"max_video_height": 720}, "DASH_720.mp4"),
+        ({"max_video_height": 240}, "DASH_480.mp4"),
+        ({"target_video_bitrate": 2_000_000}, "DASH_720.mp4"),
+        ({"target_video_bitrate": 100_000}, "DASH_480.mp4"),
+        # 10s of 1080 video is 5MB, 720 fits under 2.5MB alongside the audio:
+        ({"max_post_bytes": 2_500_000}, "DASH_720.mp4"),
+    ],
+)
+def test_video_selection_policy(policy, expected_video):
+
+    parsed_result, selected_video = select(policy)
+
+    assert selected_video == expected_video
+    assert parsed_result["audio_periods"][0]["extension"] == "DASH_AUDIO_128.mp4"
+    assert (
+        parsed_result["videos_periods"][0]["url"]
+        == f"https://v.redd.it/abc123/{expected_video}"
+    )
+
+
+def test_predicted_post_size():
+
+    parsed_result, _ = select({"max_post_bytes": 1})
+
+    # Nothing smaller than the 480 video is left, the caller sees the post is still over budget:
+    assert parsed_result["videos_periods"][0]["extension"] == "DASH_480.mp4"
+    assert parsed_result["estimated_bytes"] == (800_000 + 128_000) * 10 // 8
+
+
+def test_parse_mpd_duration():
+
+    assert parse_mpd_duration("PT10S") == 10
+    assert parse_mpd_duration("PT1H2M3.5S") == 3723.5
+    assert parse_mpd_duration("not a duration") is None
+    assert parse_mpd_duration(None) is None
+
+
+def test_daily_bandwidth_budget_is_shared_across_runs(tmp_path):
+
+    state_path = str(tmp_path / "budget.json")
+
+    budget = DailyBandwidthBudget(1000, state_path=state_path)
+    assert budget.reserve(600)
+    assert not budget.reserve(600)
+    budget.adjust(-200)
+
+    next_run_budget = DailyBandwidthBudget(1000, state_path=state_path)
+    assert next_run_budget.remaining_bytes() == 600
+    assert next_run_budget.reserve(600)
+    assert next_run_budget.remaining_bytes() == 0
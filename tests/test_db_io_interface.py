@@ -7,23 +7,24 @@ from shapely import Polygon
 
 import pandas as pd
 import os
-import sys
-
-import pysqlite3
-
-sys.modules["sqlite3"] = pysqlite3
 
+from database_test_markers import requires_postgres, requires_spatialite
 from library.types import RedditPostFields, RedditPostDict, PostSpatialLabelDict
-from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.db_io import (
+    SQLiteInterface,
+    PostgresInterface,
+    create_postgres_engine,
+    VIDEO_DOWNLOAD_TASK,
+    COMMENT_EXTRACTION_TASK,
+)
+
+PSQL_POST_ID_1 = "5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f60"
+PSQL_POST_ID_2 = "6a1e8c9f-4d2c-3a1d-8b65-2e3d4c5b6a71"
 
 
 @pytest.fixture
 def sqlite_engine():
 
-    os.environ[
-        "SPATIALITE_LIBRARY_PATH"
-    ] = "/opt/homebrew/Cellar/libspatialite/5.1.0_1/lib/mod_spatialite.dylib"
-
     engine = sa.create_engine(
         "sqlite:///:memory:", future=True, plugins=["geoalchemy2"]
     )
@@ -64,6 +65,22 @@ def sqlite_engine():
             )
         )
 
+        conn.execute(
+            sa.text(
+                """
+            SELECT CreateSpatialIndex('labels', 'geometry');
+        """
+            )
+        )
+
+        conn.execute(
+            sa.text(
+                """
+            CREATE INDEX labels_post_id_idx ON labels (post_id);
+        """
+            )
+        )
+
         conn.execute(
             sa.text(
                 """
@@ -195,3 +212,571 @@ def test_removing_post_labels(sqlite_engine):
     )
 
     print(post_w_label)
+
+
+@requires_spatialite
+def test_get_posts_in_extent(sqlite_engine):
+
+    labels: list[PostSpatialLabelDict] = [
+        {
+            "post_id": "abc123",
+            "label_id": "label001",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+        {
+            "post_id": "edf456",
+            "label_id": "label002",
+            "geometry": "POLYGON ((30.1 50.1, 30.2 50.1, 30.2 50.2, 30.1 50.2, 30.1 50.1))",
+            "comment": "This is a test label",
+        },
+    ]
+
+    SQLiteInterface.add_post_labels(labels=labels, db_engine=sqlite_engine, config={})
+
+    posts_in_extent: pd.DataFrame = SQLiteInterface.get_posts_in_extent(
+        bbox=(30.0, 50.0, 31.0, 51.0),
+        time_range=None,
+        db_engine=sqlite_engine,
+        config={},
+    )
+
+    assert posts_in_extent["label_id"].to_list() == ["label002"]
+    assert posts_in_extent["post_id"].to_list() == ["edf456"]
+
+    posts_in_empty_extent: pd.DataFrame = SQLiteInterface.get_posts_in_extent(
+        bbox=(0.0, 0.0, 1.0, 1.0),
+        time_range=None,
+        db_engine=sqlite_engine,
+        config={},
+    )
+
+    assert len(posts_in_empty_extent) == 0
+
+
+@requires_spatialite
+def test_add_post_labels_returns_affected_posts(sqlite_engine):
+
+    labels: list[PostSpatialLabelDict] = [
+        {
+            "post_id": "abc123",
+            "label_id": "label001",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+        {
+            "post_id": "edf456",
+            "label_id": "label002",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+    ]
+
+    SQLiteInterface.add_post_labels(labels=labels, db_engine=sqlite_engine, config={})
+
+    inserted_df: pd.DataFrame = SQLiteInterface.add_post_labels(
+        labels=[
+            {
+                "post_id": "abc123",
+                "label_id": "label003",
+                "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+                "comment": "This is a test label",
+            }
+        ],
+        db_engine=sqlite_engine,
+        config={},
+    )
+
+    assert set(inserted_df["post_id"]) == {"abc123"}
+    assert set(inserted_df["label_id"]) == {"label001", "label003"}
+
+
+@requires_spatialite
+def test_replace_post_labels(sqlite_engine):
+
+    labels: list[PostSpatialLabelDict] = [
+        {
+            "post_id": "abc123",
+            "label_id": "label001",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+        {
+            "post_id": "abc123",
+            "label_id": "label002",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+    ]
+
+    SQLiteInterface.add_post_labels(labels=labels, db_engine=sqlite_engine, config={})
+
+    replaced_df: pd.DataFrame = SQLiteInterface.replace_post_labels(
+        id="abc123",
+        labels=[
+            {
+                "post_id": "abc123",
+                "label_id": "label003",
+                "geometry": "POLYGON ((30.1 50.1, 30.2 50.1, 30.2 50.2, 30.1 50.2, 30.1 50.1))",
+                "comment": "Replacement label",
+            }
+        ],
+        db_engine=sqlite_engine,
+        config={},
+    )
+
+    assert replaced_df["label_id"].to_list() == ["label003"]
+
+    # Labels for another post are rejected without touching the existing labels:
+    assert (
+        SQLiteInterface.replace_post_labels(
+            id="abc123",
+            labels=[
+                {
+                    "post_id": "edf456",
+                    "label_id": "label004",
+                    "geometry": "POLYGON ((30.1 50.1, 30.2 50.1, 30.2 50.2, 30.1 50.2, 30.1 50.1))",
+                    "comment": "Wrong post",
+                }
+            ],
+            db_engine=sqlite_engine,
+            config={},
+        )
+        is None
+    )
+
+
+@pytest.fixture
+def postgres_engine():
+
+    engine = create_postgres_engine(os.environ["PSQL_URI"], config={"pool_size": 2})
+
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE EXTENSION IF NOT EXISTS postgis;
+            DROP SCHEMA IF EXISTS core CASCADE;
+            CREATE SCHEMA core;
+
+            CREATE TABLE core.source (
+                id UUID PRIMARY KEY,
+                type TEXT NOT NULL,
+                created_date TIMESTAMPTZ NOT NULL,
+                fields JSONB NOT NULL
+            );
+
+            CREATE TABLE core.labels (
+                label_id TEXT PRIMARY KEY,
+                post_id UUID NOT NULL REFERENCES core.source (id),
+                comment TEXT,
+                geometry geometry(POLYGON, 4326)
+            );
+
+            CREATE INDEX labels_geometry_gist_idx ON core.labels USING GIST (geometry);
+
+            CREATE TABLE core.tasks (
+                id UUID PRIMARY KEY,
+                post_id UUID NOT NULL REFERENCES core.source (id),
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMPTZ NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMPTZ,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+            INSERT INTO core.source (id, type, created_date, fields)
+            VALUES
+                (:id_1, 'reddit_post', '2024-08-12T10:00:00Z', '{"example": "data"}'),
+                (:id_2, 'reddit_post', '2024-08-12T10:00:00Z', '{"example": "data"}')
+            ;
+        """
+            ),
+            {"id_1": PSQL_POST_ID_1, "id_2": PSQL_POST_ID_2},
+        )
+
+    yield engine
+
+    with engine.connect() as conn, conn.begin():
+        conn.execute(sa.text("DROP SCHEMA IF EXISTS core CASCADE;"))
+    engine.dispose()
+
+
+@requires_postgres
+def test_postgres_label_lifecycle(postgres_engine):
+
+    labels: list[PostSpatialLabelDict] = [
+        {
+            "post_id": PSQL_POST_ID_1,
+            "label_id": "label001",
+            "geometry": "POLYGON ((30.1 50.1, 30.2 50.1, 30.2 50.2, 30.1 50.2, 30.1 50.1))",
+            "comment": "This is a test label",
+        },
+        {
+            "post_id": PSQL_POST_ID_1,
+            "label_id": "label002",
+            "geometry": "POLYGON ((-64.8 32.3, -65.5 18.3, -80.3 25.2, -64.8 32.3))",
+            "comment": "This is a test label",
+        },
+    ]
+
+    inserted_df = PostgresInterface.add_post_labels(
+        labels=labels, db_engine=postgres_engine, config={}
+    )
+    assert set(inserted_df["label_id"]) == {"label001", "label002"}
+
+    unlabeled_df = PostgresInterface.get_all_unlabeled_posts(
+        db_engine=postgres_engine, config={}
+    )
+    assert unlabeled_df["post_id"].to_list() == [PSQL_POST_ID_2]
+
+    posts_in_extent = PostgresInterface.get_posts_in_extent(
+        bbox=(30.0, 50.0, 31.0, 51.0),
+        time_range=None,
+        db_engine=postgres_engine,
+        config={},
+    )
+    assert posts_in_extent["label_id"].to_list() == ["label001"]
+
+    replaced_df = PostgresInterface.replace_post_labels(
+        id=PSQL_POST_ID_1,
+        labels=[{**labels[0], "label_id": "label003"}],
+        db_engine=postgres_engine,
+        config={},
+    )
+    assert replaced_df["label_id"].to_list() == ["label003"]
+
+    assert (
+        PostgresInterface.remove_post_labels(
+            id="label003", db_engine=postgres_engine, config={}
+        )
+        == 1
+    )
+
+    post_w_labels = PostgresInterface.get_post_w_labels(
+        id=PSQL_POST_ID_1, db_engine=postgres_engine, config={}
+    )
+    assert len(post_w_labels) == 0
+
+
+def build_reddit_post(id: str, static_files: list[dict]) -> RedditPostDict:
+    return {
+        "id": id,
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {
+            "subreddit": "UkraineWarVideoReport",
+            "url": f"https://www.reddit.com/r/UkraineWarVideoReport/comments/{id}",
+            "title": "Example post",
+            "static_downloaded_flag": False,
+            "screenshot_path": f"{id}/screenshot.png",
+            "json_file_path": f"{id}/post.json",
+            "post_created_date": 1723456789000,
+            "static_root_url": f"{id}/",
+            "static_files": static_files,
+            "user": None,
+        },
+    }
+
+
+@pytest.fixture
+def sqlite_outbox_engine():
+
+    # The outbox does not touch any spatial columns so it can be tested without SpatiaLite:
+    engine = sa.create_engine("sqlite:///:memory:", future=True)
+
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE source (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                created_date TIMESTAMP NOT NULL,
+                fields TEXT
+            );
+        """
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+            CREATE TABLE tasks (
+                id TEXT PRIMARY KEY,
+                post_id TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                created_date TIMESTAMP NOT NULL,
+                claimed_by TEXT,
+                claimed_date TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+        """
+            )
+        )
+
+    return engine
+
+
+def test_insert_reddit_post_queues_outbox_tasks(sqlite_outbox_engine):
+
+    SQLiteInterface.insert_reddit_posts_db(
+        reddit_post=build_reddit_post("abc123", [{"id": "NULL", "type": "video"}]),
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+    SQLiteInterface.insert_reddit_posts_db(
+        reddit_post=build_reddit_post("edf456", []),
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+
+    video_tasks = SQLiteInterface.claim_tasks(
+        task_type=VIDEO_DOWNLOAD_TASK,
+        limit=10,
+        worker_id="worker-1",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+    assert [task["post_id"] for task in video_tasks] == ["abc123"]
+    assert video_tasks[0]["claimed_by"] == "worker-1"
+    assert video_tasks[0]["attempts"] == 1
+
+    comment_tasks = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=10,
+        worker_id="worker-1",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+    assert sorted(task["post_id"] for task in comment_tasks) == ["abc123", "edf456"]
+
+    # Nothing makes thumbnails so no task is queued for them:
+    with sqlite_outbox_engine.connect() as conn:
+        task_types = conn.execute(
+            sa.text("SELECT DISTINCT task_type FROM tasks")
+        ).scalars()
+        assert sorted(task_types) == [COMMENT_EXTRACTION_TASK, VIDEO_DOWNLOAD_TASK]
+
+
+def test_claimed_tasks_are_not_reclaimed(sqlite_outbox_engine):
+
+    for id in ["abc123", "edf456", "ghi789"]:
+        SQLiteInterface.insert_reddit_posts_db(
+            reddit_post=build_reddit_post(id, []),
+            db_engine=sqlite_outbox_engine,
+            config={},
+        )
+
+    first_claim = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=2,
+        worker_id="worker-1",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+    second_claim = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=2,
+        worker_id="worker-2",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+
+    assert len(first_claim) == 2
+    assert len(second_claim) == 1
+    assert {task["id"] for task in first_claim}.isdisjoint(
+        {task["id"] for task in second_claim}
+    )
+
+    # Putting a task back on the queue makes it claimable again:
+    assert (
+        SQLiteInterface.complete_task(
+            id=second_claim[0]["id"],
+            status="pending",
+            db_engine=sqlite_outbox_engine,
+            config={},
+        )
+        == 1
+    )
+    retried_claim = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=2,
+        worker_id="worker-3",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+    assert [task["id"] for task in retried_claim] == [second_claim[0]["id"]]
+    assert retried_claim[0]["attempts"] == 2
+
+
+def test_stale_claimed_tasks_are_reclaimed(sqlite_outbox_engine):
+
+    for id in ["abc123", "edf456"]:
+        SQLiteInterface.insert_reddit_posts_db(
+            reddit_post=build_reddit_post(id, []),
+            db_engine=sqlite_outbox_engine,
+            config={},
+        )
+
+    crashed_claim = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=1,
+        worker_id="worker-1",
+        db_engine=sqlite_outbox_engine,
+        config={},
+    )
+
+    # Within the lease the claim is left alone:
+    fresh_claim = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=2,
+        worker_id="worker-2",
+        db_engine=sqlite_outbox_engine,
+        config={"task_claim_timeout_seconds": 3600},
+    )
+    assert crashed_claim[0]["id"] not in {task["id"] for task in fresh_claim}
+
+    # worker-1 never completed its task, so once the lease runs out it goes to another worker:
+    reclaimed = SQLiteInterface.claim_tasks(
+        task_type=COMMENT_EXTRACTION_TASK,
+        limit=2,
+        worker_id="worker-3",
+        db_engine=sqlite_outbox_engine,
+        config={"task_claim_timeout_seconds": 0},
+    )
+    assert crashed_claim[0]["id"] in {task["id"] for task in reclaimed}
+    reclaimed_task = next(
+        task for task in reclaimed if task["id"] == crashed_claim[0]["id"]
+    )
+    assert reclaimed_task["claimed_by"] == "worker-3"
+    assert reclaimed_task["attempts"] == 2
+
+
+@requires_postgres
+def test_postgres_claim_tasks(postgres_engine):
+
+    post_id = "7b2f9d0a-5e3d-3b2e-9c76-3f4e5d6c7b82"
+    PostgresInterface.insert_reddit_posts_db(
+        reddit_post=build_reddit_post(post_id, [{"id": "NULL", "type": "video"}]),
+        db_engine=postgres_engine,
+        config={},
+    )
+
+    video_tasks = PostgresInterface.claim_tasks(
+        task_type=VIDEO_DOWNLOAD_TASK,
+        limit=10,
+        worker_id="worker-1",
+        db_engine=postgres_engine,
+        config={},
+    )
+    assert [task["post_id"] for task in video_tasks] == [post_id]
+
+    assert (
+        PostgresInterface.claim_tasks(
+            task_type=VIDEO_DOWNLOAD_TASK,
+            limit=10,
+            worker_id="worker-2",
+            db_engine=postgres_engine,
+            config={},
+        )
+        == []
+    )
+    # An expired lease hands the task to the next worker:
+    reclaimed_tasks = PostgresInterface.claim_tasks(
+        task_type=VIDEO_DOWNLOAD_TASK,
+        limit=10,
+        worker_id="worker-3",
+        db_engine=postgres_engine,
+        config={"task_claim_timeout_seconds": 0},
+    )
+    assert [task["id"] for task in reclaimed_tasks] == [video_tasks[0]["id"]]
+    assert reclaimed_tasks[0]["attempts"] == 2
+
+    assert (
+        PostgresInterface.complete_task(
+            id=video_tasks[0]["id"], status="done", db_engine=postgres_engine, config={}
+        )
+        == 1
+    )
+
+
+def test_get_unlabeled_posts_page(sqlite_outbox_engine):
+
+    with sqlite_outbox_engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                "CREATE TABLE labels (label_id TEXT PRIMARY KEY, post_id TEXT NOT NULL, comment TEXT);"
+            )
+        )
+
+    post_ids = [f"00000000-0000-0000-0000-00000000000{i}" for i in range(5)]
+    for i, post_id in enumerate(post_ids):
+        reddit_post = build_reddit_post(post_id, [])
+        reddit_post["created_date"] += i * 1000
+        reddit_post["fields"]["title"] = f"Example post {i}"
+        SQLiteInterface.insert_reddit_posts_db(
+            reddit_post=reddit_post, db_engine=sqlite_outbox_engine, config={}
+        )
+    with sqlite_outbox_engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text("INSERT INTO labels VALUES ('label-1', :post_id, NULL)"),
+            {"post_id": post_ids[4]},
+        )
+
+    # Newest unlabeled posts come first by default:
+    first_page, total_posts = SQLiteInterface.get_unlabeled_posts_page(
+        0, 2, [], [], sqlite_outbox_engine, {}
+    )
+    assert total_posts == 4
+    assert list(first_page["post_id"]) == [post_ids[3], post_ids[2]]
+    assert list(first_page.columns) == [
+        "post_id",
+        "post_created_date",
+        "subreddit",
+        "title",
+        "url",
+    ]
+
+    last_page, _ = SQLiteInterface.get_unlabeled_posts_page(
+        1, 3, [], [], sqlite_outbox_engine, {}
+    )
+    assert list(last_page["post_id"]) == [post_ids[0]]
+
+    filtered_page, filtered_total = SQLiteInterface.get_unlabeled_posts_page(
+        0,
+        10,
+        [
+            ("title", "contains", "post 1"),
+            ("post_created_date", "datestartswith", "20"),
+        ],
+        [{"column_id": "title", "direction": "asc"}],
+        sqlite_outbox_engine,
+        {},
+    )
+    assert filtered_total == 1
+    assert list(filtered_page["title"]) == ["Example post 1"]
+
+    sorted_page, _ = SQLiteInterface.get_unlabeled_posts_page(
+        0,
+        10,
+        [],
+        [{"column_id": "title", "direction": "asc"}],
+        sqlite_outbox_engine,
+        {},
+    )
+    assert list(sorted_page["post_id"]) == post_ids[:4]
+
+    # Column names end up in the query text so anything outside the table is refused:
+    assert (
+        SQLiteInterface.get_unlabeled_posts_page(
+            0, 10, [("fields; DROP TABLE source", "=", 1)], [], sqlite_outbox_engine, {}
+        )
+        is None
+    )
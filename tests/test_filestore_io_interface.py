@@ -0,0 +1,50 @@
+import io
+import pytest
+
+from library.io_interfaces.filestore_io import LocalFSInterface, _ChunkIteratorReader
+
+
+def test_local_open_file_stream(tmp_path):
+
+    contents = b'[{"kind": "Listing"}]' * 1000
+    LocalFSInterface.upload_file(
+        io.BytesIO(contents), str(tmp_path), "post/post.json", {}
+    )
+
+    with LocalFSInterface.open_file_stream(
+        str(tmp_path), "post/post.json", {}
+    ) as stream:
+        assert stream.read(10) == contents[:10]
+        assert stream.read() == contents[10:]
+
+    assert stream.closed
+
+
+def test_local_open_file_stream_missing_file(tmp_path):
+
+    with pytest.raises(FileNotFoundError):
+        with LocalFSInterface.open_file_stream(str(tmp_path), "missing.json", {}):
+            pass
+
+
+def test_chunk_iterator_reader_serves_exact_reads():
+
+    reader = io.BufferedReader(
+        _ChunkIteratorReader(iter([b"abc", b"", b"defgh", b"i"]))
+    )
+
+    assert reader.read(4) == b"abcd"
+    assert reader.read(10) == b"efghi"
+    assert reader.read(1) == b""
+
+
+def test_local_upload_stream(tmp_path):
+
+    uploaded_path = LocalFSInterface.upload_stream(
+        (bytes([i]) * 1024 for i in range(10)), str(tmp_path), "post/video.mp4", {}
+    )
+
+    with open(uploaded_path, "rb") as f:
+        contents = f.read()
+    assert len(contents) == 10 * 1024
+    assert contents[-1] == 9
@@ -0,0 +1,195 @@
+import csv
+import pytest
+import pyarrow.parquet as pq
+
+from library.types import RedditPostDict
+from library.comments_extraction_methods import (
+    build_post_graph_node,
+    iter_comment_graph_elements,
+)
+from library.graph_bulk_export import Neo4jImportExporter
+from reddit_comment_factories import build_comment
+
+
+def build_post_elements(post_id: str, comment_prefix: str) -> list[dict]:
+    post: RedditPostDict = {
+        "id": post_id,
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+    comment_listing = [
+        build_comment(
+            f"{comment_prefix}1",
+            "alice",
+            body=f"Comment body for {comment_prefix}1, with a comma",
+            replies=[build_comment(f"{comment_prefix}2", "bob")],
+        ),
+        build_comment(f"{comment_prefix}3", "alice"),
+    ]
+    return list(iter_comment_graph_elements(post, comment_listing))
+
+
+def read_csv_partition(partition_dir) -> list[dict]:
+    with open(partition_dir / "header.csv", newline="") as f:
+        header = next(csv.reader(f))
+    rows = []
+    for part_path in sorted(partition_dir.glob("part-*.csv")):
+        with open(part_path, newline="") as f:
+            rows.extend(dict(zip(header, row)) for row in csv.reader(f))
+    return rows
+
+
+def test_csv_export_dedups_nodes_across_runs(tmp_path):
+
+    # A one id cache forces every duplicate check through the on-disk table:
+    with Neo4jImportExporter(
+        str(tmp_path), rows_per_part=2, id_cache_size=1
+    ) as exporter:
+        exporter.write_elements(build_post_elements("post_a", "a"))
+
+    # A second run into the same directory picks up the ids and part numbers already exported:
+    with Neo4jImportExporter(
+        str(tmp_path), rows_per_part=2, id_cache_size=1
+    ) as exporter:
+        exporter.write_elements(build_post_elements("post_b", "b"))
+        import_command = exporter.import_command()
+
+    comments = read_csv_partition(tmp_path / "nodes_Reddit_Entity_Comment")
+    accounts = read_csv_partition(tmp_path / "nodes_Reddit_User_Entity_Account")
+    days = read_csv_partition(tmp_path / "nodes_Date")
+    replies = read_csv_partition(tmp_path / "relationships_REPLIED_TO")
+    posted_on = read_csv_partition(tmp_path / "relationships_POSTED_ON")
+
+    assert [row["id:ID"] for row in comments] == ["a1", "a2", "a3", "b1", "b2", "b3"]
+    assert comments[0]["body"] == "Comment body for a1, with a comma"
+    assert comments[0][":LABEL"] == "Reddit;Entity;Comment"
+    assert len(accounts) == 2
+    assert len(days) == 1
+    assert replies == [
+        {
+            ":START_ID": "a2",
+            "datetime": "2024-08-12T09:59:49Z",
+            ":END_ID": "a1",
+            ":TYPE": "REPLIED_TO",
+        },
+        {
+            ":START_ID": "b2",
+            "datetime": "2024-08-12T09:59:49Z",
+            ":END_ID": "b1",
+            ":TYPE": "REPLIED_TO",
+        },
+    ]
+    assert list(posted_on[0].keys()) == [":START_ID", ":END_ID", ":TYPE"]
+
+    assert "--nodes=nodes_Date/header.csv,nodes_Date/part-.*" in import_command
+    assert (
+        "--relationships=relationships_HAS_REPLY/header.csv,relationships_HAS_REPLY/part-.*"
+        in import_command
+    )
+
+
+def test_crash_before_flush_leaves_nothing_to_import_twice(tmp_path):
+
+    # rows_per_part=2 writes parts mid-stream, then the process dies before the chunk's flush:
+    crashed_exporter = Neo4jImportExporter(str(tmp_path), rows_per_part=2)
+    crashed_exporter.write_elements(build_post_elements("post_a", "a"))
+    assert len(list(tmp_path.glob("*/staged-part-*.csv"))) > 0
+    assert len(list(tmp_path.glob("*/part-*.csv"))) == 0
+    crashed_exporter._node_ids_db.close()
+
+    # The rerun of the unflushed chunk writes its nodes again instead of treating them as exported:
+    with Neo4jImportExporter(str(tmp_path), rows_per_part=2) as exporter:
+        exporter.write_elements(build_post_elements("post_a", "a"))
+        assert exporter.nodes_deduplicated == 3
+        import_command = exporter.import_command()
+
+    # The crashed run's parts were dropped so nothing is imported twice:
+    assert len(list(tmp_path.glob("*/staged-part-*"))) == 0
+    comments = read_csv_partition(tmp_path / "nodes_Reddit_Entity_Comment")
+    assert sorted(row["id:ID"] for row in comments) == ["a1", "a2", "a3"]
+    replies = read_csv_partition(tmp_path / "relationships_REPLIED_TO")
+    assert [(row[":START_ID"], row[":END_ID"]) for row in replies] == [("a2", "a1")]
+    commented_on = read_csv_partition(tmp_path / "relationships_COMMENTED_ON")
+    assert len(commented_on) == 3
+    assert "--skip-duplicate-nodes" in import_command
+
+    # Flushed ids are committed and deduplicated by the next run:
+    with Neo4jImportExporter(str(tmp_path), rows_per_part=2) as exporter:
+        exporter.write_elements(build_post_elements("post_a", "a"))
+        assert exporter.nodes_written == 0
+
+
+def test_csv_export_keeps_multiline_comment_bodies(tmp_path):
+
+    post: RedditPostDict = {
+        "id": "post_a",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+    with Neo4jImportExporter(str(tmp_path)) as exporter:
+        exporter.write_elements(
+            iter_comment_graph_elements(
+                post, [build_comment("a1", body="First line\n\nSecond line")]
+            )
+        )
+        import_command = exporter.import_command()
+
+    comments = read_csv_partition(tmp_path / "nodes_Reddit_Entity_Comment")
+    assert comments[0]["body"] == "First line\n\nSecond line"
+    assert "--multiline-fields=true" in import_command
+
+
+def test_post_nodes_give_commented_on_edges_an_endpoint(tmp_path):
+
+    post: RedditPostDict = {
+        "id": "post_a",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {"subreddit": "UkraineWarVideoReport", "title": "Example post"},
+    }
+    with Neo4jImportExporter(str(tmp_path)) as exporter:
+        exporter.write_elements([build_post_graph_node(post)])
+        exporter.write_elements(build_post_elements("post_a", "a"))
+        import_command = exporter.import_command()
+
+    posts = read_csv_partition(tmp_path / "nodes_Reddit_Entity_Post")
+    commented_on = read_csv_partition(tmp_path / "relationships_COMMENTED_ON")
+
+    assert posts[0]["id:ID"] == "post_a"
+    assert posts[0]["datetime"] == "2024-08-12T09:59:49Z"
+    assert posts[0][":LABEL"] == "Reddit;Entity;Post"
+    assert {row[":END_ID"] for row in commented_on} == {"post_a"}
+    assert "--nodes=nodes_Reddit_Entity_Post/header.csv" in import_command
+
+
+def test_typed_headers_and_parquet_export(tmp_path):
+
+    with Neo4jImportExporter(str(tmp_path), file_format="parquet") as exporter:
+        exporter.write_node(
+            ["Reddit", "Entity", "Comment"],
+            {"id": "c1", "body": "hello", "score": 12, "ratio": 0.5, "stickied": False},
+        )
+        exporter.write_node(["Reddit", "Entity", "Comment"], {"id": "c1"})
+
+    table = pq.read_table(
+        tmp_path / "nodes_Reddit_Entity_Comment" / "part-00000.parquet"
+    )
+
+    assert table.column_names == [
+        "id:ID",
+        "body",
+        "score:long",
+        "ratio:double",
+        "stickied:boolean",
+        ":LABEL",
+    ]
+    assert table.num_rows == 1
+    assert exporter.nodes_deduplicated == 1
+
+
+def test_unsupported_export_format(tmp_path):
+
+    with pytest.raises(ValueError):
+        Neo4jImportExporter(str(tmp_path), file_format="json")
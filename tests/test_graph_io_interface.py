@@ -0,0 +1,226 @@
+import threading
+import pytest
+
+from library.types import RedditPostDict
+from library.comments_extraction_methods import iter_comment_graph_elements
+from library.io_interfaces.graph_io import Neo4jGraphInterface
+from reddit_comment_factories import build_comment
+
+
+class RecordedCounters:
+    def __init__(self, relationships_created: int):
+        self.relationships_created = relationships_created
+
+
+class RecordedResult:
+    def __init__(self, relationships_created: int = 0):
+        self.counters = RecordedCounters(relationships_created)
+
+    def consume(self):
+        return self
+
+
+class RecordedTransaction:
+    def __init__(self, driver, recorded_queries: list):
+        self.driver = driver
+        self.recorded_queries = recorded_queries
+
+    def run(self, query: str, **params):
+        self.recorded_queries.append((query, params))
+        return RecordedResult(self.driver.apply(query, params.get("rows", [])))
+
+
+class RecordedSession:
+    """Stands in for a neo4j.Session and records every query it is asked to run."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query: str, **params):
+        with self.driver.lock:
+            self.driver.queries.append((query, params))
+        return RecordedResult()
+
+    def execute_write(self, transaction_function, *args):
+        recorded_queries = []
+        result = transaction_function(
+            RecordedTransaction(self.driver, recorded_queries), *args
+        )
+        with self.driver.lock:
+            self.driver.queries.extend(recorded_queries)
+        return result
+
+
+class RecordedDriver:
+    """
+    Keeps the ids of the nodes that were MERGEd so edge queries can drop rows
+    whose MATCHed endpoints don't exist, like neo4j does.
+    """
+
+    def __init__(self, existing_node_ids: set[str] = set()):
+        self.queries: list[tuple[str, dict]] = []
+        self.node_ids: set[str] = set(existing_node_ids)
+        self.lock = threading.Lock()
+
+    def session(self, database=None):
+        return RecordedSession(self)
+
+    def apply(self, query: str, rows: list[dict]) -> int:
+        with self.lock:
+            if "MERGE (n:" in query:
+                self.node_ids.update(row["id"] for row in rows)
+                return 0
+
+            relationships_created = 0
+            for row in rows:
+                if "MERGE (a:" in query:
+                    self.node_ids.add(row["from"])
+                if "MERGE (b:" in query:
+                    self.node_ids.add(row["to"])
+                if row["from"] in self.node_ids and row["to"] in self.node_ids:
+                    relationships_created += 1
+            return relationships_created
+
+
+@pytest.fixture
+def comment_graph_elements() -> list[dict]:
+    post: RedditPostDict = {
+        "id": "5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {},
+    }
+    comment_listing = [
+        build_comment("c1", "alice", replies=[build_comment("c2", "bob")]),
+        build_comment("c3", "alice"),
+    ]
+    return list(iter_comment_graph_elements(post, comment_listing))
+
+
+@pytest.mark.parametrize("parallelism", [1, 4])
+def test_write_graph_elements_batches_by_label_and_type(
+    comment_graph_elements, parallelism
+):
+
+    driver = RecordedDriver()
+    stats = Neo4jGraphInterface.write_graph_elements(
+        comment_graph_elements,
+        driver,
+        config={"graph_batch_size": 2, "graph_parallelism": parallelism},
+    )
+
+    # 3 comments, 2 authors, 1 day. Duplicate author/day dicts collapse into one row each:
+    assert stats["nodes_written"] == 6
+    # 3 edges per comment plus REPLIED_TO/HAS_REPLY for c2:
+    assert stats["edges_written"] == 11
+
+    # Comment, Account and Date plus the Post stubs:
+    constraint_queries = [q for q, _ in driver.queries if "CREATE CONSTRAINT" in q]
+    assert len(constraint_queries) == 4
+
+    unwind_queries = [(q, p) for q, p in driver.queries if q.startswith("UNWIND")]
+    assert all(len(params["rows"]) <= 2 for _, params in unwind_queries)
+
+    node_ids_written = [
+        row["id"]
+        for query, params in unwind_queries
+        if "MERGE (n:" in query
+        for row in params["rows"]
+    ]
+    assert sorted(node_ids_written) == sorted(set(node_ids_written))
+
+    # Every edge's endpoints were written by an earlier node batch, except the post stub:
+    written_node_ids = set()
+    for query, params in unwind_queries:
+        if "MERGE (n:" in query:
+            written_node_ids.update(row["id"] for row in params["rows"])
+            continue
+        for row in params["rows"]:
+            assert row["from"] in written_node_ids
+            assert row["to"] in written_node_ids or ":`COMMENTED_ON`" in query
+
+    # Every endpoint is looked up on its constrained label so neo4j can seek the id index:
+    edge_queries = [q for q, _ in unwind_queries if "MERGE (n:" not in q]
+    assert all(
+        "(a {" not in q and "(b {" not in q and "(a:`" in q and "(b:`" in q
+        for q in edge_queries
+    )
+    posted_queries = [q for q in edge_queries if ":`POSTED`" in q]
+    assert all(
+        "MATCH (a:`Account` {id: row.from}) MATCH (b:`Comment` {id: row.to})" in q
+        for q in posted_queries
+    )
+    # The post node is not part of the comment elements so it is merged as a stub:
+    commented_on_queries = [q for q in edge_queries if ":`COMMENTED_ON`" in q]
+    assert all(
+        "MATCH (a:`Comment` {id: row.from}) MERGE (b:`Post` {id: row.to})" in q
+        for q in commented_on_queries
+    )
+
+
+def test_edges_to_missing_endpoints_are_not_counted(comment_graph_elements):
+
+    # An incremental refresh of a reply whose parent comment was never written:
+    reply_elements = [
+        element
+        for element in comment_graph_elements
+        if not (element["type"] == "node" and element["properties"]["id"] == "c1")
+    ]
+
+    driver = RecordedDriver()
+    stats = Neo4jGraphInterface.write_graph_elements(
+        reply_elements, driver, config={"graph_create_constraints": False}
+    )
+
+    # POSTED, POSTED_ON and COMMENTED_ON of c1 plus REPLIED_TO/HAS_REPLY of c2 are dropped by MATCH:
+    assert stats["edges_written"] == 11 - 5
+    replied_to_queries = [q for q, _ in driver.queries if ":`REPLIED_TO`" in q]
+    assert all(
+        "MATCH (a:`Comment` {id: row.from}) MATCH (b:`Comment` {id: row.to})" in q
+        for q in replied_to_queries
+    )
+
+    # Once the parent exists the same edges are created:
+    stats = Neo4jGraphInterface.write_graph_elements(
+        reply_elements,
+        RecordedDriver(existing_node_ids={"c1"}),
+        config={"graph_create_constraints": False},
+    )
+    assert stats["edges_written"] == 11
+
+
+def test_edges_without_endpoint_labels_are_rejected():
+
+    stats = Neo4jGraphInterface.write_graph_elements(
+        [
+            {
+                "type": "edge",
+                "labels": ["MENTIONS"],
+                "connection": {"from": "c1", "to": "c2"},
+                "properties": {},
+            }
+        ],
+        RecordedDriver(),
+        config={"graph_create_constraints": False},
+    )
+
+    assert stats is None
+
+
+def test_write_graph_elements_reports_throughput(comment_graph_elements):
+
+    stats = Neo4jGraphInterface.write_graph_elements(
+        iter(comment_graph_elements),
+        RecordedDriver(),
+        config={"graph_create_constraints": False},
+    )
+
+    assert stats["seconds"] > 0
+    assert stats["nodes_per_second"] > 0
+    assert stats["edges_per_second"] > 0
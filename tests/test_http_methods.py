@@ -0,0 +1,256 @@
+import threading
+import tracemalloc
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.http_methods import (
+    HttpCache,
+    get_partial_download_path,
+    resumable_stream_url_to_storage,
+)
+
+MEDIA_SIZE = 32 * 1024 * 1024
+MEDIA_BLOCK = bytes(range(256)) * 256
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/DASH_1080.mp4":
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(MEDIA_SIZE))
+        self.end_headers()
+        for _ in range(MEDIA_SIZE // len(MEDIA_BLOCK)):
+            self.wfile.write(MEDIA_BLOCK)
+
+    def log_message(self, format, *args):
+        pass
+
+
+RESUMABLE_MEDIA = bytes(range(256)) * 4 * 1024
+
+
+class DroppingMediaHandler(BaseHTTPRequestHandler):
+    """Serves byte ranges of RESUMABLE_MEDIA but cuts the connection after `drop_after` bytes of each response."""
+
+    drop_after = 400_000
+    bytes_served = 0
+    range_requests = 0
+
+    def do_GET(self):
+        start = 0
+        if self.headers.get("Range", None) is not None:
+            DroppingMediaHandler.range_requests += 1
+            start = int(self.headers["Range"].removeprefix("bytes=").split("-")[0])
+
+        body = RESUMABLE_MEDIA[start:]
+        self.send_response(206 if start > 0 else 200)
+        self.send_header("ETag", '"media-v1"')
+        self.send_header("Content-Length", str(len(body)))
+        if start > 0:
+            self.send_header(
+                "Content-Range",
+                f"bytes {start}-{len(RESUMABLE_MEDIA) - 1}/{len(RESUMABLE_MEDIA)}",
+            )
+        self.end_headers()
+
+        sent_body = body[: DroppingMediaHandler.drop_after]
+        self.wfile.write(sent_body)
+        DroppingMediaHandler.bytes_served += len(sent_body)
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def dropping_media_server():
+    DroppingMediaHandler.bytes_served = 0
+    DroppingMediaHandler.range_requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DroppingMediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+class ManifestHandler(BaseHTTPRequestHandler):
+    manifest_version = 1
+    full_responses = 0
+    not_modified_responses = 0
+
+    def do_GET(self):
+        etag = f'"manifest-v{ManifestHandler.manifest_version}"'
+        if self.headers.get("If-None-Match", None) == etag:
+            ManifestHandler.not_modified_responses += 1
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        ManifestHandler.full_responses += 1
+        body = f"<MPD version='{ManifestHandler.manifest_version}'/>".encode()
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def manifest_server():
+    ManifestHandler.manifest_version = 1
+    ManifestHandler.full_responses = 0
+    ManifestHandler.not_modified_responses = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ManifestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/DASHPlaylist.mpd"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def media_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_resumable_download_memory_is_constant(tmp_path, media_server):
+
+    tracemalloc.start()
+    download_result = resumable_stream_url_to_storage(
+        f"{media_server}/DASH_1080.mp4",
+        LocalFSInterface,
+        str(tmp_path),
+        "post/1_DASH_1080.mp4",
+        {
+            "download_chunk_size": 256 * 1024,
+            "partial_download_dir": str(tmp_path / "partial"),
+        },
+    )
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert download_result["bytes"] == MEDIA_SIZE
+    assert download_result["bytes_per_second"] > 0
+    assert (tmp_path / "post" / "1_DASH_1080.mp4").stat().st_size == MEDIA_SIZE
+    # A handful of chunks in flight, nowhere near the 32 MiB file:
+    assert peak_bytes < 4 * 1024 * 1024
+
+
+def test_resumable_download_http_error(tmp_path, media_server):
+
+    assert (
+        resumable_stream_url_to_storage(
+            f"{media_server}/missing.mp4",
+            LocalFSInterface,
+            str(tmp_path),
+            "post/missing.mp4",
+            {
+                "download_max_retries": 0,
+                "partial_download_dir": str(tmp_path / "partial"),
+            },
+        )
+        is None
+    )
+    assert not (tmp_path / "post" / "missing.mp4").exists()
+
+
+def test_resumable_download_only_fetches_missing_bytes(tmp_path, dropping_media_server):
+
+    download_result = resumable_stream_url_to_storage(
+        f"{dropping_media_server}/DASH_1080.mp4",
+        LocalFSInterface,
+        str(tmp_path),
+        "post/1_DASH_1080.mp4",
+        {
+            "download_retry_backoff": 0,
+            "partial_download_dir": str(tmp_path / "partial"),
+        },
+    )
+
+    assert download_result["bytes"] == len(RESUMABLE_MEDIA)
+    assert (tmp_path / "post" / "1_DASH_1080.mp4").read_bytes() == RESUMABLE_MEDIA
+    # Two drops, each retry picked up where the last one stopped:
+    assert DroppingMediaHandler.range_requests == 2
+    assert DroppingMediaHandler.bytes_served == len(RESUMABLE_MEDIA)
+    assert list((tmp_path / "partial").iterdir()) == []
+
+
+def test_resumable_download_continues_across_runs(tmp_path, dropping_media_server):
+
+    url = f"{dropping_media_server}/DASH_1080.mp4"
+    config = {
+        "download_max_retries": 0,
+        "partial_download_dir": str(tmp_path / "partial"),
+    }
+    partial_path = get_partial_download_path(url, "post/1_DASH_1080.mp4", config)
+
+    for _ in range(2):
+        assert (
+            resumable_stream_url_to_storage(
+                url, LocalFSInterface, str(tmp_path), "post/1_DASH_1080.mp4", config
+            )
+            is None
+        )
+    assert not (tmp_path / "post" / "1_DASH_1080.mp4").exists()
+    with open(partial_path, "rb") as f:
+        assert f.read() == RESUMABLE_MEDIA[: 2 * DroppingMediaHandler.drop_after]
+
+    download_result = resumable_stream_url_to_storage(
+        url, LocalFSInterface, str(tmp_path), "post/1_DASH_1080.mp4", config
+    )
+
+    assert download_result["bytes"] == len(RESUMABLE_MEDIA) - 2 * (
+        DroppingMediaHandler.drop_after
+    )
+    assert (tmp_path / "post" / "1_DASH_1080.mp4").read_bytes() == RESUMABLE_MEDIA
+    assert DroppingMediaHandler.bytes_served == len(RESUMABLE_MEDIA)
+
+
+def test_http_cache_serves_fresh_entries_without_requests(tmp_path, manifest_server):
+
+    http_cache = HttpCache(str(tmp_path), ttl_seconds=3600)
+    assert http_cache.get(manifest_server, {}) == b"<MPD version='1'/>"
+    assert http_cache.get(manifest_server, {}) == b"<MPD version='1'/>"
+
+    # A later run reads the entry another process stored:
+    next_run_cache = HttpCache(str(tmp_path), ttl_seconds=3600)
+    assert next_run_cache.get(manifest_server, {}) == b"<MPD version='1'/>"
+
+    assert ManifestHandler.full_responses == 1
+    assert http_cache.stats() == {
+        "hits": 1,
+        "revalidated": 0,
+        "misses": 1,
+        "errors": 0,
+        "hit_rate": 0.5,
+    }
+
+
+def test_http_cache_revalidates_stale_entries(tmp_path, manifest_server):
+
+    http_cache = HttpCache(str(tmp_path), ttl_seconds=0)
+    assert http_cache.get(manifest_server, {}) == b"<MPD version='1'/>"
+    assert http_cache.get(manifest_server, {}) == b"<MPD version='1'/>"
+    assert ManifestHandler.not_modified_responses == 1
+
+    ManifestHandler.manifest_version = 2
+    assert http_cache.get(manifest_server, {}) == b"<MPD version='2'/>"
+
+    assert ManifestHandler.full_responses == 2
+    assert http_cache.stats()["revalidated"] == 1
+    assert http_cache.stats()["misses"] == 2
@@ -0,0 +1,177 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from library.types import RedditPostDict
+from library.io_interfaces.filestore_io import FileInterface, LocalFSInterface
+from library.incremental_comment_refresh import (
+    refresh_post_comments,
+    load_comment_index,
+)
+from reddit_comment_factories import build_comment
+
+
+class RaisingReadFSInterface(FileInterface):
+    """Local files, but reading a missing one raises like `S3FSInterface.read_file` does."""
+
+    uploaded_configs: list[dict] = []
+
+    def read_file(dir_name: str, filepath: str, config: dict):
+        if LocalFSInterface.get_file_info(dir_name, filepath, config) is None:
+            raise UnboundLocalError("cannot access local variable 'response'")
+        return LocalFSInterface.read_file(dir_name, filepath, config)
+
+    def get_file_info(dir_name: str, filepath: str, config: dict):
+        return LocalFSInterface.get_file_info(dir_name, filepath, config)
+
+    def upload_file(contents_buffer, dir_name: str, filepath: str, config: dict):
+        RaisingReadFSInterface.uploaded_configs.append(config)
+        return LocalFSInterface.upload_file(contents_buffer, dir_name, filepath, config)
+
+
+class PostJsonHandler(BaseHTTPRequestHandler):
+    comment_listing: list[dict] = []
+
+    def do_GET(self):
+        body = json.dumps(
+            [
+                {
+                    "kind": "Listing",
+                    "data": {"children": [{"kind": "t3", "data": {"name": "t3_p"}}]},
+                },
+                {
+                    "kind": "Listing",
+                    "data": {"children": PostJsonHandler.comment_listing},
+                },
+            ]
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def post_json_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PostJsonHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_refresh_only_emits_changed_comments(tmp_path, post_json_server):
+
+    post: RedditPostDict = {
+        "id": "5f0d7b8e-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {"url": f"{post_json_server}/r/test/comments/p/"},
+    }
+    config = {"root_dir_name": str(tmp_path), "reddit_requests_per_second": 100}
+
+    written_batches: list[list[dict]] = []
+
+    def write_elements(elements: list[dict]):
+        written_batches.append(elements)
+        return {"nodes_written": len(elements)}
+
+    def written_comment_ids() -> list[str]:
+        return [
+            e["properties"]["id"]
+            for e in written_batches[-1]
+            if e["type"] == "node" and e["labels"][-1] == "Comment"
+        ]
+
+    PostJsonHandler.comment_listing = [
+        build_comment("c1", body="first", replies=[build_comment("c2", body="reply")]),
+        build_comment("c3", body="third"),
+    ]
+    first_refresh = refresh_post_comments(
+        post, LocalFSInterface, write_elements, config
+    )
+    assert first_refresh["new_comments"] == 3
+    assert written_comment_ids() == ["c1", "c2", "c3"]
+
+    # Nothing changed so nothing is written:
+    second_refresh = refresh_post_comments(
+        post, LocalFSInterface, write_elements, config
+    )
+    assert second_refresh["unchanged_comments"] == 3
+    assert second_refresh["elements"] == 0
+    assert len(written_batches) == 1
+
+    PostJsonHandler.comment_listing = [
+        build_comment(
+            "c1",
+            body="first",
+            replies=[
+                build_comment("c2", body="reply"),
+                build_comment("c4", body="new reply"),
+            ],
+        ),
+        build_comment("c3", body="third (edited)"),
+    ]
+    third_refresh = refresh_post_comments(
+        post, LocalFSInterface, write_elements, config
+    )
+    assert third_refresh["new_comments"] == 1
+    assert third_refresh["edited_comments"] == 1
+    assert third_refresh["unchanged_comments"] == 2
+    assert written_comment_ids() == ["c4", "c3"]
+    assert set(load_comment_index(post, LocalFSInterface, config)) == {
+        "c1",
+        "c2",
+        "c3",
+        "c4",
+    }
+
+
+def test_failed_write_keeps_previous_index(tmp_path, post_json_server):
+
+    post: RedditPostDict = {
+        "id": "7a1c2b3d-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {"url": f"{post_json_server}/r/test/comments/q/"},
+    }
+    config = {"root_dir_name": str(tmp_path), "reddit_requests_per_second": 100}
+    PostJsonHandler.comment_listing = [build_comment("c1", body="first")]
+
+    assert (
+        refresh_post_comments(post, LocalFSInterface, lambda elements: None, config)
+        is None
+    )
+    assert load_comment_index(post, LocalFSInterface, config) == {}
+
+
+def test_first_refresh_creates_missing_index(tmp_path, post_json_server):
+
+    post: RedditPostDict = {
+        "id": "9b2d3c4e-3c1b-3f0c-9a54-1d2c3b4a5f60",
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {"url": f"{post_json_server}/r/test/comments/r/"},
+    }
+    config = {"root_dir_name": str(tmp_path), "reddit_requests_per_second": 100}
+    PostJsonHandler.comment_listing = [build_comment("c1", body="first")]
+    RaisingReadFSInterface.uploaded_configs = []
+
+    assert load_comment_index(post, RaisingReadFSInterface, config) == {}
+
+    refresh = refresh_post_comments(
+        post, RaisingReadFSInterface, lambda elements: elements, config
+    )
+    assert refresh["new_comments"] == 1
+    assert set(load_comment_index(post, RaisingReadFSInterface, config)) == {"c1"}
+
+    # The index is uploaded as json without changing the config shared with other uploads:
+    assert RaisingReadFSInterface.uploaded_configs[0]["content_type"] == (
+        "application/json"
+    )
+    assert "content_type" not in config
@@ -0,0 +1,303 @@
+import io
+import json
+import time
+import threading
+import pytest
+import sqlalchemy as sa
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from library.types import RedditPostDict
+from library.io_interfaces.db_io import SQLiteInterface
+from library.io_interfaces.filestore_io import FileInterface, LocalFSInterface
+from library.dash_representation_selection import DailyBandwidthBudget
+from library.ingest_reddit_video import (
+    download_representations,
+    ingest_all_video_data,
+    ingest_video_post,
+)
+
+REPRESENTATION_BYTES = b"\x00\x01" * 64 * 1024
+
+MPD_DOCUMENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+<MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static">
+  <Period id="0" duration="PT4S">
+    <AdaptationSet id="0" contentType="video">
+      <Representation id="1" bandwidth="800000" height="480" mimeType="video/mp4"><BaseURL>DASH_480.mp4</BaseURL></Representation>
+      <Representation id="2" bandwidth="1600000" height="720" mimeType="video/mp4"><BaseURL>DASH_720.mp4</BaseURL></Representation>
+    </AdaptationSet>
+    <AdaptationSet id="1" contentType="audio">
+      <Representation id="3" bandwidth="128000" mimeType="audio/mp4"><BaseURL>DASH_AUDIO_128.mp4</BaseURL></Representation>
+    </AdaptationSet>
+  </Period>
+</MPD>"""
+
+
+class SlowMediaHandler(BaseHTTPRequestHandler):
+    active_requests = 0
+    max_active_requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with SlowMediaHandler.lock:
+            SlowMediaHandler.active_requests += 1
+            SlowMediaHandler.max_active_requests = max(
+                SlowMediaHandler.max_active_requests,
+                SlowMediaHandler.active_requests,
+            )
+        try:
+            time.sleep(0.2)
+            if self.path.startswith("/missing"):
+                self.send_response(404)
+                self.end_headers()
+                return
+
+            if self.path.endswith(".mpd"):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/dash+xml")
+                self.send_header("Content-Length", str(len(MPD_DOCUMENT)))
+                self.end_headers()
+                self.wfile.write(MPD_DOCUMENT)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Content-Length", str(len(REPRESENTATION_BYTES)))
+            self.end_headers()
+            self.wfile.write(REPRESENTATION_BYTES)
+        finally:
+            with SlowMediaHandler.lock:
+                SlowMediaHandler.active_requests -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RejectingMPDFSInterface(FileInterface):
+    """Local files, but storing the original MPD fails after the bandwidth is reserved."""
+
+    def read_file(dir_name: str, filepath: str, config: dict):
+        return LocalFSInterface.read_file(dir_name, filepath, config)
+
+    def upload_file(contents_buffer, dir_name: str, filepath: str, config: dict):
+        if filepath.endswith("Origin_DASH.mpd"):
+            return None
+        return LocalFSInterface.upload_file(contents_buffer, dir_name, filepath, config)
+
+
+def build_video_post_json(media_server: str) -> list[dict]:
+    return [
+        {
+            "kind": "Listing",
+            "data": {
+                "children": [
+                    {
+                        "kind": "t3",
+                        "data": {
+                            "url": f"{media_server}/abc123",
+                            "secure_media": {
+                                "reddit_video": {
+                                    "dash_url": f"{media_server}/abc123/DASHPlaylist.mpd",
+                                    "duration": 4,
+                                }
+                            },
+                        },
+                    }
+                ]
+            },
+        },
+        {"kind": "Listing", "data": {"children": []}},
+    ]
+
+
+@pytest.fixture
+def media_server():
+    SlowMediaHandler.max_active_requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowMediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_representations_download_concurrently(tmp_path, media_server):
+
+    representation_downloads = [
+        (f"{media_server}/DASH_{period_id}.mp4", f"post/{period_id}.mp4", "video/mp4")
+        for period_id in range(4)
+    ]
+    representation_downloads.append(
+        (f"{media_server}/missing.mp4", "post/missing.mp4", "audio/mp4")
+    )
+
+    start = time.perf_counter()
+    download_results = download_representations(
+        representation_downloads,
+        LocalFSInterface,
+        str(tmp_path),
+        {
+            "partial_download_dir": str(tmp_path / "partial"),
+            "representation_concurrency": 5,
+            "video_requests_per_second": 1000,
+        },
+    )
+    seconds = time.perf_counter() - start
+
+    assert [result["path"] for result in download_results[:4]] == [
+        str(tmp_path / "post" / f"{period_id}.mp4") for period_id in range(4)
+    ]
+    assert download_results[4] is None
+    assert (tmp_path / "post" / "3.mp4").read_bytes() == REPRESENTATION_BYTES
+    assert SlowMediaHandler.max_active_requests > 1
+    # Five 0.2s requests run back to back would take a full second:
+    assert seconds < 0.8
+
+
+def test_representation_downloads_share_the_host_rate_limit(tmp_path, media_server):
+
+    # The limiter is shared per host, a separate loopback name keeps it from clashing with other tests:
+    media_server = media_server.replace("127.0.0.1", "localhost")
+    representation_downloads = [
+        (f"{media_server}/DASH_{period_id}.mp4", f"post/{period_id}.mp4", "video/mp4")
+        for period_id in range(3)
+    ]
+
+    start = time.perf_counter()
+    download_results = download_representations(
+        representation_downloads,
+        LocalFSInterface,
+        str(tmp_path),
+        {
+            "partial_download_dir": str(tmp_path / "partial"),
+            "representation_concurrency": 3,
+            "video_requests_per_second": 5,
+        },
+    )
+    seconds = time.perf_counter() - start
+
+    assert all(result is not None for result in download_results)
+    # One token up front then 0.2s per extra request at 5 requests per second:
+    assert seconds >= 0.4
+
+
+def test_ingest_video_posts_offline(tmp_path, media_server):
+
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'corpus.db'}")
+    with engine.connect() as conn, conn.begin():
+        conn.execute(
+            sa.text(
+                "CREATE TABLE source (id TEXT PRIMARY KEY, type TEXT NOT NULL, created_date TIMESTAMP NOT NULL, fields TEXT);"
+            )
+        )
+        conn.execute(
+            sa.text(
+                """
+                CREATE TABLE tasks (
+                    id TEXT PRIMARY KEY, post_id TEXT NOT NULL, task_type TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending', created_date TIMESTAMP NOT NULL,
+                    claimed_by TEXT, claimed_date TIMESTAMP, attempts INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+        )
+        conn.execute(
+            sa.text(
+                "CREATE TABLE content (id TEXT PRIMARY KEY, source TEXT NOT NULL, type TEXT NOT NULL, created_date TIMESTAMP NOT NULL, storage_path TEXT, fields TEXT);"
+            )
+        )
+
+    file_directory = tmp_path / "static"
+    post_id = "00000000-0000-0000-0000-000000000001"
+    post_json = build_video_post_json(media_server)
+    LocalFSInterface.upload_file(
+        io.BytesIO(json.dumps(post_json).encode()),
+        str(file_directory),
+        f"{post_id}/post.json",
+        {},
+    )
+    post: RedditPostDict = {
+        "id": post_id,
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {
+            "json_file_path": f"{post_id}/post.json",
+            "static_files": [{"id": "NULL", "type": "video"}],
+        },
+    }
+    SQLiteInterface.insert_reddit_posts_db(post, engine, {})
+
+    config = {
+        "db_engine": engine,
+        "root_dir_name": str(file_directory),
+        "partial_download_dir": str(tmp_path / "partial"),
+        "video_requests_per_second": 1000,
+        "max_video_height": 480,
+    }
+    assert ingest_all_video_data(LocalFSInterface, SQLiteInterface, config) == 1
+
+    post_directory = file_directory / post_id
+    assert (post_directory / "0_DASH_480.mp4").read_bytes() == REPRESENTATION_BYTES
+    assert (post_directory / "0-DASH_AUDIO_128.mp4").exists()
+    assert (post_directory / "Origin_DASH.mpd").read_bytes() == MPD_DOCUMENT
+    manifest = (post_directory / "Video_DASH.mpd").read_text()
+    assert "<BaseURL>0_DASH_480.mp4</BaseURL>" in manifest
+    assert "<BaseURL>0-DASH_AUDIO_128.mp4</BaseURL>" in manifest
+
+    with engine.connect() as conn:
+        content = conn.execute(sa.text("SELECT * FROM content")).mappings().one()
+        fields = json.loads(
+            conn.execute(sa.text("SELECT fields FROM source")).scalar_one()
+        )
+        task_status = conn.execute(
+            sa.text("SELECT status FROM tasks WHERE task_type = 'VIDEO_DOWNLOAD'")
+        ).scalar_one()
+
+    assert content["source"] == post_id
+    assert content["storage_path"] == f"{post_id}/Video_DASH.mpd"
+    assert fields["static_downloaded_flag"] is True
+    assert fields["static_files"] == [
+        {"id": content["id"], "type": "video", "path": f"{post_id}/Video_DASH.mpd"}
+    ]
+    assert task_status == "done"
+
+    # Nothing left to claim on a second run:
+    assert ingest_all_video_data(LocalFSInterface, SQLiteInterface, config) == 0
+
+
+def test_failed_download_returns_its_bandwidth_reservation(tmp_path, media_server):
+
+    file_directory = tmp_path / "static"
+    post_id = "00000000-0000-0000-0000-000000000002"
+    LocalFSInterface.upload_file(
+        io.BytesIO(json.dumps(build_video_post_json(media_server)).encode()),
+        str(file_directory),
+        f"{post_id}/post.json",
+        {},
+    )
+    post: RedditPostDict = {
+        "id": post_id,
+        "type": "reddit_post",
+        "created_date": 1723456789000,
+        "fields": {"json_file_path": f"{post_id}/post.json"},
+    }
+    config = {
+        "root_dir_name": str(file_directory),
+        "partial_download_dir": str(tmp_path / "partial"),
+        "video_requests_per_second": 1000,
+        "max_video_height": 480,
+    }
+    bandwidth_budget = DailyBandwidthBudget(10**9)
+
+    assert (
+        ingest_video_post(
+            post,
+            None,
+            RejectingMPDFSInterface,
+            SQLiteInterface,
+            config,
+            bandwidth_budget,
+        )
+        is False
+    )
+    # Nothing was transferred so the whole reservation is given back:
+    assert bandwidth_budget.used_bytes == 0
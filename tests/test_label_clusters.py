@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from library.ui.label_clusters import LabelClusterIndex, LabelClusterOverlay
+
+WORLD = (-180, -90, 180, 90)
+
+
+def build_label_centroids(num_labels: int) -> pd.DataFrame:
+    # Most labels sit around the front line with a thin scatter everywhere else, like the real corpus:
+    rng = np.random.default_rng(0)
+    num_front_line = num_labels * 9 // 10
+    longitudes = np.concatenate(
+        [
+            rng.normal(37.5, 1.5, num_front_line),
+            rng.uniform(-170, 170, num_labels - num_front_line),
+        ]
+    )
+    latitudes = np.concatenate(
+        [
+            rng.normal(48.0, 1.0, num_front_line),
+            rng.uniform(-60, 70, num_labels - num_front_line),
+        ]
+    )
+    return pd.DataFrame(
+        {
+            "label_id": [f"label-{i}" for i in range(num_labels)],
+            "post_id": [f"post-{i}" for i in range(num_labels)],
+            "longitude": longitudes,
+            "latitude": latitudes,
+        }
+    )
+
+
+def count_labels(feature_collection: dict) -> int:
+    return sum(
+        feature["properties"]["point_count"] if feature["properties"]["cluster"] else 1
+        for feature in feature_collection["features"]
+    )
+
+
+def test_clusters_cover_every_label_at_every_zoom():
+
+    index = LabelClusterIndex(build_label_centroids(100_000))
+
+    for zoom in [0, 4, 8, 12, 17]:
+        assert count_labels(index.get_clusters(WORLD, zoom)) == 100_000
+
+    # Zoomed out the whole corpus collapses into a handful of markers:
+    assert len(index.get_clusters(WORLD, 2)["features"]) < 500
+
+
+def test_viewport_queries_stay_small():
+
+    index = LabelClusterIndex(build_label_centroids(100_000))
+
+    # Roughly a 1000x600 pixel viewport over Donetsk at zoom 8:
+    viewport_clusters = index.get_clusters((36.0, 47.0, 39.0, 49.0), 8)
+
+    assert 0 < len(viewport_clusters["features"]) < 300
+    assert all(
+        36.0 <= feature["geometry"]["coordinates"][0] <= 39.0
+        for feature in viewport_clusters["features"]
+    )
+
+
+def test_single_labels_keep_their_ids():
+
+    label_centroids = pd.DataFrame(
+        {
+            "label_id": ["label-a", "label-b", "label-c"],
+            "post_id": ["post-a", "post-b", "post-c"],
+            "longitude": [30.52, 30.5201, 36.23],
+            "latitude": [50.45, 50.4501, 49.99],
+        }
+    )
+    index = LabelClusterIndex(label_centroids, max_zoom=16)
+
+    zoomed_out = index.get_clusters(WORLD, 5)["features"]
+    assert sorted(
+        feature["properties"].get("point_count", 1) for feature in zoomed_out
+    ) == [1, 2]
+    kharkiv = next(
+        feature for feature in zoomed_out if not feature["properties"]["cluster"]
+    )
+    assert kharkiv["properties"]["label_id"] == "label-c"
+    assert kharkiv["geometry"]["coordinates"] == [36.23, 49.99]
+
+    # Past max_zoom the two Kyiv labels are drawn separately:
+    zoomed_in = index.get_clusters(WORLD, 18)["features"]
+    assert sorted(feature["properties"]["label_id"] for feature in zoomed_in) == [
+        "label-a",
+        "label-b",
+        "label-c",
+    ]
+
+
+def test_viewports_across_the_antimeridian():
+
+    label_centroids = pd.DataFrame(
+        {
+            "label_id": ["label-east", "label-west", "label-kyiv"],
+            "post_id": ["post-east", "post-west", "post-kyiv"],
+            "longitude": [179.5, -179.5, 30.52],
+            "latitude": [0.0, 0.0, 50.45],
+        }
+    )
+    index = LabelClusterIndex(label_centroids)
+
+    def label_coordinates(bbox: tuple[float, float, float, float]) -> dict:
+        return {
+            feature["properties"]["label_id"]: feature["geometry"]["coordinates"]
+            for feature in index.get_clusters(bbox, 18)["features"]
+        }
+
+    # Panned east across the antimeridian, the western label is drawn in the same world copy:
+    assert label_coordinates((170.0, -10.0, 190.0, 10.0)) == {
+        "label-east": [179.5, 0.0],
+        "label-west": [180.5, 0.0],
+    }
+    # And panned west across it:
+    assert label_coordinates((-190.0, -10.0, -170.0, 10.0)) == {
+        "label-east": [-180.5, 0.0],
+        "label-west": [-179.5, 0.0],
+    }
+    # A whole world further east still finds Kyiv:
+    assert label_coordinates((380.0, 40.0, 400.0, 60.0)) == {
+        "label-kyiv": [390.52, 50.45]
+    }
+    # Zoomed out past one world width every label is in view:
+    assert len(label_coordinates((-540.0, -85.0, 540.0, 85.0))) == 3
+
+
+class CountingLabelsInterface:
+    calls = 0
+
+    def get_label_centroids(db_engine, config: dict) -> pd.DataFrame | None:
+        CountingLabelsInterface.calls += 1
+        return build_label_centroids(100)
+
+
+def test_overlay_reuses_the_index_until_it_is_stale():
+
+    CountingLabelsInterface.calls = 0
+    overlay = LabelClusterOverlay(
+        CountingLabelsInterface,
+        {"db_engine": None, "label_cluster_refresh_seconds": 60},
+    )
+    overlay.get_clusters(WORLD, 3)
+    overlay.get_clusters(WORLD, 9)
+    assert CountingLabelsInterface.calls == 1
+
+    overlay.refresh_seconds = 0
+    assert count_labels(overlay.get_clusters(WORLD, 3)) == 100
+    assert CountingLabelsInterface.calls == 2
@@ -0,0 +1,185 @@
+import io
+import json
+import time
+import threading
+
+from library.types import RedditPostDict
+from library.io_interfaces.filestore_io import LocalFSInterface
+from library.ui.post_prefetcher import PostPrefetcher
+
+
+class CountingFSInterface(LocalFSInterface):
+    reads: list[str] = []
+    lock = threading.Lock()
+
+    def read_file(dir_name: str, filepath: str, config: dict) -> io.BytesIO | None:
+        with CountingFSInterface.lock:
+            CountingFSInterface.reads.append(filepath)
+        return LocalFSInterface.read_file(dir_name, filepath, config)
+
+
+def build_labelling_queue(tmp_path, num_posts: int) -> list[RedditPostDict]:
+    posts = []
+    for i in range(num_posts):
+        post_id = f"post-{i}"
+        post_json = [
+            {"data": {"children": [{"data": {"selftext": f"Post body {i}"}}]}},
+            {"data": {"children": []}},
+        ]
+        LocalFSInterface.upload_file(
+            io.BytesIO(json.dumps(post_json).encode()),
+            str(tmp_path),
+            f"{post_id}/post.json",
+            {},
+        )
+        LocalFSInterface.upload_file(
+            io.BytesIO(b"\x89PNG" + bytes(1000)),
+            str(tmp_path),
+            f"{post_id}/screenshot.png",
+            {},
+        )
+        LocalFSInterface.upload_file(
+            io.BytesIO(b"\x89PNG" + bytes(100)),
+            str(tmp_path),
+            f"{post_id}/thumbnail.png",
+            {},
+        )
+        posts.append(
+            {
+                "id": post_id,
+                "type": "reddit_post",
+                "created_date": 1723456789000,
+                "fields": {
+                    "json_file_path": f"{post_id}/post.json",
+                    "screenshot_path": f"{post_id}/screenshot.png",
+                    "static_files": [
+                        {
+                            "id": f"{post_id}-thumbnail",
+                            "type": "thumbnail",
+                            "path": f"{post_id}/thumbnail.png",
+                        }
+                    ],
+                },
+            }
+        )
+    return posts
+
+
+def test_prefetched_posts_are_served_without_reading_again(tmp_path):
+
+    CountingFSInterface.reads = []
+    posts = build_labelling_queue(tmp_path, 4)
+    prefetcher = PostPrefetcher(
+        CountingFSInterface, {"root_dir_name": str(tmp_path), "prefetch_depth": 2}
+    )
+
+    prefetcher.prefetch(posts)
+    prefetcher._executor.shutdown(wait=True)
+
+    # Only the first prefetch_depth posts of the window are read ahead:
+    assert sorted(CountingFSInterface.reads) == sorted(
+        f"post-{i}/{filename}"
+        for i in range(2)
+        for filename in ["post.json", "screenshot.png", "thumbnail.png"]
+    )
+
+    post_json = prefetcher.get_post_json("post-1/post.json")
+    assert post_json[0]["data"]["children"][0]["data"]["selftext"] == "Post body 1"
+    assert prefetcher.get_file("post-1/screenshot.png") == b"\x89PNG" + bytes(1000)
+    assert len(CountingFSInterface.reads) == 6
+    assert prefetcher.stats()["hits"] == 2
+
+    # Outside the window the read happens on demand and is cached after:
+    assert prefetcher.get_file("post-3/thumbnail.png") == b"\x89PNG" + bytes(100)
+    assert prefetcher.get_file("post-3/thumbnail.png") == b"\x89PNG" + bytes(100)
+    assert prefetcher.stats()["misses"] == 1
+    assert len(CountingFSInterface.reads) == 7
+
+
+def test_selected_post_reads_are_not_cancelled(tmp_path):
+
+    posts = build_labelling_queue(tmp_path, 4)
+    prefetcher = PostPrefetcher(
+        LocalFSInterface,
+        {"root_dir_name": str(tmp_path), "prefetch_depth": 2, "prefetch_workers": 1},
+    )
+
+    # Hold the only worker so every read of the first window stays queued:
+    release_worker = threading.Event()
+    prefetcher._executor.submit(release_worker.wait)
+    try:
+        prefetcher.prefetch(posts[:2])
+
+        # Moving on to post-1 keeps its queued reads and drops post-0's:
+        prefetcher.prefetch(posts[2:], selected_post=posts[1])
+        assert ("json", "post-1/post.json") in prefetcher._in_flight
+        assert ("json", "post-0/post.json") not in prefetcher._in_flight
+    finally:
+        release_worker.set()
+
+    post_json = prefetcher.get_post_json("post-1/post.json")
+    assert post_json[0]["data"]["children"][0]["data"]["selftext"] == "Post body 1"
+    assert prefetcher.stats()["waits"] == 1
+    assert prefetcher.stats()["misses"] == 0
+
+
+def test_read_cancelled_while_waiting_is_read_synchronously(tmp_path):
+
+    posts = build_labelling_queue(tmp_path, 3)
+    prefetcher = PostPrefetcher(
+        LocalFSInterface,
+        {"root_dir_name": str(tmp_path), "prefetch_depth": 1, "prefetch_workers": 1},
+    )
+
+    release_worker = threading.Event()
+    prefetcher._executor.submit(release_worker.wait)
+    served_json = []
+    try:
+        prefetcher.prefetch(posts[:1])
+        waiting_reader = threading.Thread(
+            target=lambda: served_json.append(
+                prefetcher.get_post_json("post-0/post.json")
+            )
+        )
+        waiting_reader.start()
+        while prefetcher.stats()["waits"] == 0:
+            time.sleep(0.01)
+
+        # Another callback moves the window on while the reader waits on the queued read:
+        prefetcher.prefetch(posts[2:])
+        waiting_reader.join(timeout=5)
+    finally:
+        release_worker.set()
+
+    assert served_json[0][0]["data"]["children"][0]["data"]["selftext"] == (
+        "Post body 0"
+    )
+    assert prefetcher.stats()["misses"] == 1
+
+
+def test_prefetch_cache_is_bounded(tmp_path):
+
+    posts = build_labelling_queue(tmp_path, 3)
+    prefetcher = PostPrefetcher(
+        LocalFSInterface,
+        {"root_dir_name": str(tmp_path), "prefetch_cache_bytes": 2500},
+    )
+
+    for post in posts:
+        prefetcher.get_file(post["fields"]["screenshot_path"])
+
+    stats = prefetcher.stats()
+    assert stats["cached_bytes"] <= 2500
+    assert stats["cached_entries"] == 2
+    # The least recently used screenshot was evicted first:
+    prefetcher.get_file("post-0/screenshot.png")
+    assert prefetcher.stats()["misses"] == 4
+
+
+def test_missing_artifacts_are_not_cached(tmp_path):
+
+    prefetcher = PostPrefetcher(LocalFSInterface, {"root_dir_name": str(tmp_path)})
+
+    assert prefetcher.get_file("missing/screenshot.png") is None
+    assert prefetcher.get_post_json("missing/post.json") is None
+    assert prefetcher.stats()["cached_entries"] == 0
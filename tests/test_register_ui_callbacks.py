@@ -0,0 +1,39 @@
+from dash._callback import GLOBAL_CALLBACK_LIST
+
+from library.ui.register_ui_callbacks import register_callbacks, split_filter_query
+
+
+def test_split_filter_query():
+
+    assert split_filter_query(None) == []
+    assert split_filter_query(
+        '{title} icontains kyiv && {post_created_date} datestartswith 2024-08 && {subreddit} eq "Ukraine War"'
+    ) == [
+        ("title", "contains", "kyiv"),
+        ("post_created_date", "datestartswith", "2024-08"),
+        ("subreddit", "=", "Ukraine War"),
+    ]
+    assert split_filter_query("{score} ge 10") == [("score", ">=", 10.0)]
+    # Incomplete expressions typed into the filter row are ignored until they parse:
+    assert split_filter_query("{title} contains") == []
+
+
+def test_drawing_shapes_does_not_reselect_the_post():
+
+    first_callback = len(GLOBAL_CALLBACK_LIST)
+    register_callbacks(None, None, {}, None, None)
+    callback_inputs = {
+        callback["output"]: [
+            f"{callback_input['id']}.{callback_input['property']}"
+            for callback_input in callback["inputs"]
+        ]
+        for callback in GLOBAL_CALLBACK_LIST[first_callback:]
+    }
+
+    selection_inputs = [
+        inputs
+        for output, inputs in callback_inputs.items()
+        if "selected_post_id.children" in output
+    ]
+    assert selection_inputs == [["unlabeled_posts_tbl.active_cell"]]
+    assert callback_inputs["current_map_extents.children"] == ["edit_control.geojson"]
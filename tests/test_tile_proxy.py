@@ -0,0 +1,159 @@
+import os
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask import Flask
+
+from library.ui.tile_proxy import (
+    TileCache,
+    get_tile_layer_url,
+    iter_tiles_in_bbox,
+    register_tile_proxy_routes,
+)
+
+TILE_BYTES = b"\x89PNG\r\n\x1a\n" + bytes(992)
+
+
+class SlowTileHandler(BaseHTTPRequestHandler):
+    requested_paths: list[str] = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with SlowTileHandler.lock:
+            SlowTileHandler.requested_paths.append(self.path)
+        time.sleep(0.2)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(TILE_BYTES)))
+        self.end_headers()
+        self.wfile.write(TILE_BYTES)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def tile_server():
+    SlowTileHandler.requested_paths = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowTileHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def build_tile_sources(server: ThreadingHTTPServer) -> dict[str, str]:
+    return {
+        "local": f"http://127.0.0.1:{server.server_address[1]}/{{z}}/{{x}}/{{y}}.png"
+    }
+
+
+def test_concurrent_requests_for_a_tile_are_coalesced(tmp_path, tile_server):
+
+    tile_cache = TileCache(str(tmp_path), build_tile_sources(tile_server))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tiles = list(
+            executor.map(lambda _: tile_cache.get_tile("local", 6, 37, 22), range(8))
+        )
+
+    assert tiles == [TILE_BYTES] * 8
+    assert SlowTileHandler.requested_paths == ["/6/37/22.png"]
+
+    assert tile_cache.get_tile("local", 6, 37, 22) == TILE_BYTES
+    assert len(SlowTileHandler.requested_paths) == 1
+    stats = tile_cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] + stats["hits"] == 8
+
+
+def test_least_recently_used_tiles_are_evicted(tmp_path, tile_server):
+
+    tile_cache = TileCache(
+        str(tmp_path), build_tile_sources(tile_server), max_bytes=2500
+    )
+
+    tile_cache.get_tile("local", 6, 0, 0)
+    tile_cache.get_tile("local", 6, 1, 0)
+    # Touching the first tile makes the second one the least recently used:
+    tile_cache.get_tile("local", 6, 0, 0)
+    tile_cache.get_tile("local", 6, 2, 0)
+
+    assert os.path.exists(tmp_path / "local" / "6" / "0" / "0")
+    assert not os.path.exists(tmp_path / "local" / "6" / "1" / "0")
+    assert tile_cache.stats()["cached_bytes"] <= 2500
+
+    # A restarted app picks up the tiles left on disk:
+    assert (
+        TileCache(str(tmp_path), build_tile_sources(tile_server)).stats()[
+            "cached_tiles"
+        ]
+        == 2
+    )
+
+
+def test_stale_and_offline_tiles(tmp_path, tile_server):
+
+    tile_sources = build_tile_sources(tile_server)
+    TileCache(str(tmp_path), tile_sources).get_tile("local", 3, 4, 2)
+
+    expired_cache = TileCache(str(tmp_path), tile_sources, ttl_seconds=0)
+    assert expired_cache.get_tile("local", 3, 4, 2) == TILE_BYTES
+    assert len(SlowTileHandler.requested_paths) == 2
+
+    tile_server.shutdown()
+    tile_server.server_close()
+
+    # Without the upstream an expired tile is still better than a blank map:
+    assert expired_cache.get_tile("local", 3, 4, 2) == TILE_BYTES
+    assert expired_cache.stats()["stale"] == 1
+
+    offline_cache = TileCache(
+        str(tmp_path), tile_sources, ttl_seconds=0, config={"tile_cache_offline": True}
+    )
+    assert offline_cache.get_tile("local", 3, 4, 2) == TILE_BYTES
+    assert offline_cache.get_tile("local", 3, 4, 3) is None
+    assert offline_cache.stats()["hits"] == 1
+
+
+def test_tile_proxy_route(tmp_path, tile_server):
+
+    config = {
+        "tile_cache_dir": str(tmp_path),
+        "tile_sources": build_tile_sources(tile_server),
+    }
+    server = Flask(__name__)
+    register_tile_proxy_routes(server, config)
+    client = server.test_client()
+
+    assert get_tile_layer_url("local", config) == "/tiles/local/{z}/{x}/{y}"
+    assert (
+        get_tile_layer_url("local", {"tile_sources": config["tile_sources"]})
+        == config["tile_sources"]["local"]
+    )
+
+    response = client.get("/tiles/local/6/37/22")
+    assert response.status_code == 200
+    assert response.data == TILE_BYTES
+    assert response.headers["Content-Type"] == "image/png"
+    assert response.headers["Cache-Control"] == "public, max-age=86400"
+
+    assert client.get("/tiles/local/6/64/22").status_code == 404
+    assert client.get("/tiles/unknown/6/37/22").status_code == 404
+
+
+def test_tiles_in_bbox():
+
+    assert list(iter_tiles_in_bbox((-180, -85, 180, 85), 1)) == [
+        (1, 0, 0),
+        (1, 0, 1),
+        (1, 1, 0),
+        (1, 1, 1),
+    ]
+    # Kyiv at zoom 10:
+    assert list(iter_tiles_in_bbox((30.52, 50.45, 30.52, 50.45), 10)) == [
+        (10, 598, 345)
+    ]